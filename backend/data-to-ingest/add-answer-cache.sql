@@ -0,0 +1,191 @@
+-- Semantic answer cache for the chat route
+-- A first-turn question is answered from cache when an earlier question from a
+-- student with the same profile fingerprint (program, term, completed courses, goals) has
+-- a query embedding within the similarity threshold, and the catalog has not changed
+-- since. The first ingestion write to a catalog table in a transaction bumps
+-- catalog_version, which empties the cache.
+
+CREATE TABLE IF NOT EXISTS catalog_version (
+  id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id), -- single row
+  version BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO catalog_version (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS answer_cache (
+  id BIGSERIAL PRIMARY KEY,
+  profile_fingerprint TEXT NOT NULL, -- see profileFingerprint in frontend/src/lib/answer-cache.ts
+  embedding_model TEXT NOT NULL, -- "model:dimensions" of the query embedding
+  embedding VECTOR NOT NULL, -- untyped: the dimensions follow the active embedding version
+  query TEXT NOT NULL,
+  response TEXT NOT NULL,
+  recommendations JSONB NOT NULL DEFAULT '[]',
+  citations JSONB NOT NULL DEFAULT '[]',
+  catalog_version BIGINT NOT NULL,
+  compute_ms INTEGER NOT NULL, -- what answering took without the cache
+  hits INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  last_hit_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Entries per fingerprint are few, so candidates are scanned exactly after this filter
+CREATE INDEX IF NOT EXISTS idx_answer_cache_lookup
+  ON answer_cache (profile_fingerprint, embedding_model, catalog_version);
+
+CREATE TABLE IF NOT EXISTS answer_cache_stats (
+  day DATE PRIMARY KEY DEFAULT CURRENT_DATE,
+  lookups BIGINT NOT NULL DEFAULT 0,
+  hits BIGINT NOT NULL DEFAULT 0,
+  saved_ms BIGINT NOT NULL DEFAULT 0
+);
+
+-- Invalidation: statement-level triggers, and only the first one in a transaction does
+-- the work. DataProcessor inserts chunks one statement at a time, so bumping per
+-- statement would queue every insert behind the catalog_version row lock; the
+-- transaction-local flag (reset at commit or rollback) makes it one bump per batch.
+CREATE OR REPLACE FUNCTION bump_catalog_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF current_setting('catalog.version_bumped', true) = 'on' THEN
+    RETURN NULL;
+  END IF;
+  PERFORM set_config('catalog.version_bumped', 'on', true);
+  UPDATE catalog_version SET version = version + 1, updated_at = NOW();
+  DELETE FROM answer_cache;
+  RETURN NULL;
+END;
+$$;
+
+-- Courses: content columns only, so embedding writes by the worker do not invalidate
+DROP TRIGGER IF EXISTS courses_catalog_version ON courses;
+CREATE TRIGGER courses_catalog_version
+  AFTER INSERT OR DELETE OR UPDATE OF title, description, skills, dept, level, prereqs, terms_offered, units, workload, assessments OR TRUNCATE
+  ON courses
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS elective_docs_catalog_version ON elective_docs;
+CREATE TRIGGER elective_docs_catalog_version
+  AFTER INSERT OR DELETE OR UPDATE OF text, source_url OR TRUNCATE
+  ON elective_docs
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS specializations_catalog_version ON specializations;
+CREATE TRIGGER specializations_catalog_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON specializations
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS certificates_catalog_version ON certificates;
+CREATE TRIGGER certificates_catalog_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON certificates
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS diplomas_catalog_version ON diplomas;
+CREATE TRIGGER diplomas_catalog_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON diplomas
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+-- Lookup: the closest cached answer for this fingerprint, if similar enough.
+-- Always returns one row; cache_version is the catalog version to store a miss under.
+CREATE OR REPLACE FUNCTION match_cached_answer(
+  query_embedding VECTOR,
+  query_model TEXT,
+  fingerprint TEXT,
+  similarity_threshold FLOAT DEFAULT 0.95
+)
+RETURNS TABLE (
+  hit BOOLEAN,
+  cache_version BIGINT,
+  answer TEXT,
+  recommendations JSONB,
+  citations JSONB,
+  similarity FLOAT,
+  saved_ms INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  current_version BIGINT;
+  best RECORD;
+  is_hit BOOLEAN;
+BEGIN
+  SELECT cv.version INTO current_version FROM catalog_version cv;
+
+  SELECT ac.id, ac.response, ac.recommendations, ac.citations, ac.compute_ms,
+         1 - (ac.embedding <=> query_embedding) AS cosine
+  INTO best
+  FROM answer_cache ac
+  WHERE ac.profile_fingerprint = fingerprint
+    AND ac.embedding_model = query_model
+    AND ac.catalog_version = current_version
+  ORDER BY ac.embedding <=> query_embedding
+  LIMIT 1;
+
+  is_hit := best.id IS NOT NULL AND best.cosine >= similarity_threshold;
+
+  INSERT INTO answer_cache_stats AS s (day, lookups, hits, saved_ms)
+  VALUES (CURRENT_DATE, 1, is_hit::INT, CASE WHEN is_hit THEN best.compute_ms ELSE 0 END)
+  ON CONFLICT (day) DO UPDATE
+    SET lookups = s.lookups + 1,
+        hits = s.hits + EXCLUDED.hits,
+        saved_ms = s.saved_ms + EXCLUDED.saved_ms;
+
+  IF is_hit THEN
+    UPDATE answer_cache SET hits = answer_cache.hits + 1, last_hit_at = NOW() WHERE answer_cache.id = best.id;
+    RETURN QUERY SELECT true, current_version, best.response, best.recommendations, best.citations,
+                        best.cosine, best.compute_ms;
+  ELSE
+    RETURN QUERY SELECT false, current_version, NULL::TEXT, NULL::JSONB, NULL::JSONB,
+                        best.cosine, 0;
+  END IF;
+END;
+$$;
+
+-- Store a freshly computed answer, unless the catalog changed while it was being computed
+CREATE OR REPLACE FUNCTION store_cached_answer(
+  query_embedding VECTOR,
+  query_model TEXT,
+  fingerprint TEXT,
+  query_text TEXT,
+  answer TEXT,
+  answer_recommendations JSONB,
+  answer_citations JSONB,
+  computed_under BIGINT,
+  compute_ms INTEGER
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO answer_cache (profile_fingerprint, embedding_model, embedding, query, response,
+                            recommendations, citations, catalog_version, compute_ms)
+  SELECT fingerprint, query_model, query_embedding, query_text, answer,
+         answer_recommendations, answer_citations, computed_under, store_cached_answer.compute_ms
+  FROM catalog_version cv
+  WHERE cv.version = computed_under;
+  RETURN FOUND;
+END;
+$$;
+
+-- Hit ratio and latency saved, per day
+CREATE OR REPLACE FUNCTION get_answer_cache_stats(days INTEGER DEFAULT 7)
+RETURNS TABLE (
+  day DATE,
+  lookups BIGINT,
+  hits BIGINT,
+  hit_ratio FLOAT,
+  saved_ms BIGINT,
+  avg_saved_ms FLOAT
+)
+LANGUAGE SQL STABLE
+AS $$
+  SELECT s.day, s.lookups, s.hits,
+         s.hits::FLOAT / NULLIF(s.lookups, 0),
+         s.saved_ms,
+         s.saved_ms::FLOAT / NULLIF(s.hits, 0)
+  FROM answer_cache_stats s
+  WHERE s.day > CURRENT_DATE - days
+  ORDER BY s.day DESC;
+$$;
@@ -0,0 +1,158 @@
+-- Catalog context for one chat message in a single round trip
+-- get_chat_context returns the courses, specializations, certificates, diplomas and
+-- document chunks the chat route used to fetch with five separate PostgREST calls
+-- (searchCourses, searchSpecializations, searchCertificates, searchDiplomas and
+-- searchElectiveDocs in frontend/src/lib/search.ts), as one JSON document. The
+-- keyword matching mirrors those functions so both paths return the same rows.
+
+-- Up to max_terms lowercase words of the query longer than two characters, minus stopwords
+CREATE OR REPLACE FUNCTION chat_search_terms(query_text TEXT, stopwords TEXT[], max_terms INT DEFAULT 3)
+RETURNS TEXT[]
+LANGUAGE SQL IMMUTABLE
+AS $$
+  SELECT COALESCE(array_agg(t.term ORDER BY t.ord), '{}')
+  FROM (
+    SELECT w.term, w.ord
+    FROM regexp_split_to_table(regexp_replace(lower(COALESCE(query_text, '')), '[^\w\s]', ' ', 'g'), '\s+')
+         WITH ORDINALITY AS w(term, ord)
+    WHERE length(w.term) > 2 AND NOT (w.term = ANY(stopwords))
+    ORDER BY w.ord
+    LIMIT max_terms
+  ) t;
+$$;
+
+-- A row as JSON without its vector columns (embedding, embedding_<version>, embedding_short, ...)
+CREATE OR REPLACE FUNCTION chat_row_json(row_data JSONB)
+RETURNS JSONB
+LANGUAGE SQL IMMUTABLE
+AS $$
+  SELECT COALESCE(jsonb_object_agg(key, value), '{}')
+  FROM jsonb_each(row_data)
+  WHERE key NOT LIKE 'embedding%';
+$$;
+
+-- Parameters were added since the first version; drop it so calls cannot be ambiguous
+DROP FUNCTION IF EXISTS get_chat_context(TEXT, VECTOR, TEXT, JSONB, INT, INT, INT, FLOAT, TEXT);
+
+CREATE OR REPLACE FUNCTION get_chat_context(
+  query_text TEXT,
+  query_embedding VECTOR DEFAULT NULL, -- omit to skip the document search
+  program TEXT DEFAULT NULL, -- full program name, e.g. 'Software Engineering'
+  skills JSONB DEFAULT NULL, -- courses must contain all of these, like filters.skills
+  course_limit INT DEFAULT 20,
+  option_limit INT DEFAULT 3,
+  doc_limit INT DEFAULT 5,
+  doc_threshold FLOAT DEFAULT 0.6,
+  query_model TEXT DEFAULT NULL, -- embedding model, once add-embedding-versions.sql is run
+  doc_pool INT DEFAULT NULL, -- pick doc_limit diverse chunks out of this many (add-diverse-retrieval.sql)
+  doc_diversity FLOAT DEFAULT 0.2,
+  doc_per_source INT DEFAULT 2
+)
+RETURNS JSONB
+LANGUAGE plpgsql STABLE
+AS $$
+DECLARE
+  query_lower TEXT := lower(COALESCE(query_text, ''));
+  course_terms TEXT[];
+  option_terms TEXT[];
+  option_patterns TEXT[];
+  course_rows JSONB := '[]';
+  doc_rows JSONB := '[]';
+BEGIN
+  -- Stopword lists of searchCourses and extractSearchKeywords respectively
+  course_terms := chat_search_terms(query_text, ARRAY['what', 'can', 'i', 'choose', 'to', 'do', 'want', 'the', 'and', 'or', 'for', 'with', 'about', 'from', 'are', 'is', 'in', 'on', 'at', 'by', 'of', 'a', 'an', 'havent', 'taken', 'any', 'give', 'me', 'please']);
+  option_terms := chat_search_terms(query_text, ARRAY['i', 'havent', 'have', 'taken', 'any', 'can', 'you', 'give', 'me', 'recommendations', 'for', 'please', 'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by']);
+  SELECT COALESCE(array_agg('%' || replace(t, '_', '\_') || '%'), '{}') INTO option_patterns FROM unnest(option_terms) t;
+
+  -- CSE questions: themed courses first, falling through to keyword search when none match
+  IF query_lower LIKE '%cse%' OR query_lower LIKE '%complementary studies%' THEN
+    SELECT COALESCE(jsonb_agg(chat_row_json(to_jsonb(c))), '[]') INTO course_rows
+    FROM (
+      SELECT * FROM courses
+      WHERE title ILIKE ANY (ARRAY['%ethics%', '%society%', '%sustainability%', '%social%', '%environment%'])
+      LIMIT course_limit
+    ) c;
+  END IF;
+
+  IF jsonb_array_length(course_rows) = 0 THEN
+    SELECT COALESCE(jsonb_agg(chat_row_json(to_jsonb(c))), '[]') INTO course_rows
+    FROM (
+      SELECT * FROM courses
+      WHERE (
+        query_text IS NULL OR query_text = ''
+        OR (cardinality(course_terms) > 0 AND EXISTS (
+          SELECT 1 FROM unnest(course_terms) t
+          WHERE courses.title ILIKE '%' || replace(t, '_', '\_') || '%'
+             OR courses.description ILIKE '%' || replace(t, '_', '\_') || '%'
+             OR courses.skills @> jsonb_build_array(t)
+        ))
+        OR (cardinality(course_terms) = 0 AND (
+          courses.title ILIKE ANY (ARRAY['%elective%', '%course%'])
+          OR courses.description ILIKE ANY (ARRAY['%elective%', '%course%'])
+        ))
+      )
+      -- searchCourses adds this as a second or= filter, which PostgREST ANDs with the first
+      AND (NOT ('machine' = ANY(course_terms) OR 'learning' = ANY(course_terms)) OR (
+        courses.title ILIKE ANY (ARRAY['%artificial%', '%intelligence%', '%ai%', '%ml%'])
+        OR courses.description ILIKE ANY (ARRAY['%artificial%', '%intelligence%', '%ai%', '%ml%'])
+      ))
+      AND (get_chat_context.skills IS NULL OR jsonb_array_length(get_chat_context.skills) = 0
+           OR courses.skills @> get_chat_context.skills)
+      LIMIT course_limit
+    ) c;
+  END IF;
+
+  IF query_embedding IS NOT NULL AND doc_pool IS NOT NULL THEN
+    SELECT COALESCE(jsonb_agg(to_jsonb(d)), '[]') INTO doc_rows
+    FROM search_elective_docs_diverse(query_embedding, doc_threshold, doc_limit, doc_pool,
+                                      doc_diversity, doc_per_source, query_model) d;
+  ELSIF query_embedding IS NOT NULL THEN
+    -- Reuse the search RPC so versioned column routing stays in one place
+    IF query_model IS NULL THEN
+      SELECT COALESCE(jsonb_agg(to_jsonb(d)), '[]') INTO doc_rows
+      FROM search_elective_docs(query_embedding, doc_threshold, doc_limit) d;
+    ELSE
+      SELECT COALESCE(jsonb_agg(to_jsonb(d)), '[]') INTO doc_rows
+      FROM search_elective_docs(query_embedding, doc_threshold, doc_limit, query_model) d;
+    END IF;
+  END IF;
+
+  RETURN jsonb_build_object(
+    'courses', course_rows,
+    'specializations', (
+      SELECT COALESCE(jsonb_agg(chat_row_json(to_jsonb(s))), '[]')
+      FROM (
+        SELECT * FROM specializations
+        WHERE (cardinality(option_patterns) = 0
+               OR specializations.name ILIKE ANY (option_patterns)
+               OR specializations.description ILIKE ANY (option_patterns))
+          AND (get_chat_context.program IS NULL OR specializations.program = get_chat_context.program)
+        LIMIT option_limit
+      ) s
+    ),
+    'certificates', (
+      SELECT COALESCE(jsonb_agg(chat_row_json(to_jsonb(c))), '[]')
+      FROM (
+        SELECT * FROM certificates
+        WHERE certificates.uw_engineering_listed
+          AND (cardinality(option_patterns) = 0
+               OR certificates.name ILIKE ANY (option_patterns)
+               OR certificates.description ILIKE ANY (option_patterns))
+        LIMIT option_limit
+      ) c
+    ),
+    'diplomas', (
+      SELECT COALESCE(jsonb_agg(chat_row_json(to_jsonb(d))), '[]')
+      FROM (
+        SELECT * FROM diplomas
+        WHERE diplomas.uw_engineering_listed
+          AND (cardinality(option_patterns) = 0
+               OR diplomas.name ILIKE ANY (option_patterns)
+               OR diplomas.description ILIKE ANY (option_patterns))
+        LIMIT option_limit
+      ) d
+    ),
+    'docs', doc_rows
+  );
+END;
+$$;
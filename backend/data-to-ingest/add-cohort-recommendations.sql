@@ -0,0 +1,64 @@
+-- Precomputed recommendations per student cohort
+-- A cohort is a program, current term and a student's first three goal tags: everything
+-- calculateCourseScore uses except completed courses and workload limits.
+-- scripts/cohort_recommendations.py scores the whole catalog for every cohort found
+-- in profiles and stores the best courses here. The chat route looks its cohort up
+-- and re-ranks those courses with the student's own prerequisites and workload.
+
+CREATE TABLE IF NOT EXISTS cohorts (
+  cohort_fingerprint TEXT PRIMARY KEY, -- sha256 of 'program|term|goal,goal,goal', see cohortFingerprint()
+  program TEXT,
+  current_term TEXT,
+  goal_tags JSONB NOT NULL DEFAULT '[]',
+  students INT NOT NULL DEFAULT 0,
+  catalog_hash TEXT NOT NULL, -- md5 of the scoring columns of every course when the list was built
+  computed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS cohort_recommendations (
+  cohort_fingerprint TEXT NOT NULL REFERENCES cohorts(cohort_fingerprint) ON DELETE CASCADE,
+  rank SMALLINT NOT NULL, -- 1 = best for the cohort
+  course_id TEXT NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+  score SMALLINT NOT NULL, -- goal + program + term + level components
+  components JSONB NOT NULL,
+  PRIMARY KEY (cohort_fingerprint, rank)
+);
+
+-- The return type gained topic_id, which CREATE OR REPLACE cannot change
+DROP FUNCTION IF EXISTS get_cohort_recommendations(TEXT, INT);
+
+CREATE OR REPLACE FUNCTION get_cohort_recommendations(
+  fingerprint TEXT,
+  match_count INT DEFAULT 100
+)
+RETURNS TABLE (
+  id TEXT,
+  title TEXT,
+  dept TEXT,
+  number INT,
+  units NUMERIC,
+  level INT,
+  description TEXT,
+  terms_offered JSONB,
+  prereqs TEXT,
+  skills JSONB,
+  workload JSONB,
+  assessments JSONB,
+  source_url TEXT,
+  topic_id INT,
+  cohort_rank SMALLINT,
+  cohort_score SMALLINT
+)
+LANGUAGE SQL STABLE
+AS $$
+  SELECT
+    courses.id, courses.title, courses.dept, courses.number, courses.units, courses.level,
+    courses.description, courses.terms_offered, courses.prereqs, courses.skills,
+    courses.workload, courses.assessments, courses.source_url, courses.topic_id,
+    cohort_recommendations.rank, cohort_recommendations.score
+  FROM cohort_recommendations
+  JOIN courses ON courses.id = cohort_recommendations.course_id
+  WHERE cohort_recommendations.cohort_fingerprint = fingerprint
+  ORDER BY cohort_recommendations.rank
+  LIMIT match_count;
+$$;
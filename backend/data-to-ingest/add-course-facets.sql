@@ -0,0 +1,111 @@
+-- Materialized facet bitmaps for catalog filters
+-- scripts/catalog_facets.py numbers the courses (course_facet_rows) and stores one
+-- bitmap per facet value: bit i is set when course i has that dept, level, term
+-- offered or skill. Facets are named after the courses columns and take the same keys
+-- as filters. Any filter combination is then a few AND/OR operations on short
+-- bit strings plus a bit_count, with no scan of courses or JSONB containment checks.
+-- The ingestion scripts rebuild the bitmaps at the end of a run, and so does
+-- skill_tagging.py; run `python ../scripts/catalog_facets.py build` after any other
+-- change to courses. Requires PostgreSQL 14+ (bit_count).
+
+CREATE TABLE IF NOT EXISTS course_facet_rows (
+  ordinal INT PRIMARY KEY, -- bit position, from 0
+  course_id TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS course_facets (
+  facet TEXT NOT NULL, -- dept | level | terms_offered | skills, and one 'all' row with every bit set
+  value TEXT NOT NULL,
+  courses INT NOT NULL,
+  bitmap BIT VARYING NOT NULL, -- leftmost bit is ordinal 0
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (facet, value)
+);
+
+-- Courses matching filters like {"dept": ["ECE", "SE"], "level": [400], "terms_offered": "F", "skills": ["robotics"]}
+-- Values of dept, level and terms_offered are alternatives; every listed skill is required, like
+-- the skills filter of searchCourses. skip_facet leaves one facet's filter out.
+CREATE OR REPLACE FUNCTION course_facet_mask(filters JSONB DEFAULT '{}', skip_facet TEXT DEFAULT NULL)
+RETURNS BIT VARYING
+LANGUAGE plpgsql STABLE
+AS $$
+DECLARE
+  mask BIT VARYING;
+  empty BIT VARYING;
+  matching BIT VARYING;
+  entry RECORD;
+  wanted JSONB;
+  value_bitmap BIT VARYING;
+BEGIN
+  SELECT bitmap INTO mask FROM course_facets WHERE facet = 'all';
+  IF mask IS NULL THEN
+    RAISE EXCEPTION 'Course facets have not been built; run scripts/catalog_facets.py build';
+  END IF;
+  empty := mask # mask;
+
+  FOR entry IN SELECT key, value FROM jsonb_each(COALESCE(filters, '{}')) LOOP
+    IF entry.key NOT IN ('dept', 'level', 'terms_offered', 'skills') THEN
+      RAISE EXCEPTION 'Unknown course facet %', entry.key;
+    END IF;
+    CONTINUE WHEN entry.key = skip_facet OR entry.value = 'null'::JSONB;
+    wanted := CASE jsonb_typeof(entry.value) WHEN 'array' THEN entry.value ELSE jsonb_build_array(entry.value) END;
+    CONTINUE WHEN jsonb_array_length(wanted) = 0;
+
+    matching := CASE entry.key WHEN 'skills' THEN mask ELSE empty END;
+    FOR value_bitmap IN
+      SELECT COALESCE(course_facets.bitmap, empty)
+      FROM jsonb_array_elements_text(wanted) AS w(value)
+      LEFT JOIN course_facets ON course_facets.facet = entry.key AND course_facets.value = w.value
+    LOOP
+      IF entry.key = 'skills' THEN
+        matching := matching & value_bitmap;
+      ELSE
+        matching := matching | value_bitmap;
+      END IF;
+    END LOOP;
+    mask := mask & matching;
+  END LOOP;
+  RETURN mask;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION count_courses_by_facets(filters JSONB DEFAULT '{}')
+RETURNS INT
+LANGUAGE SQL STABLE
+AS $$
+  SELECT bit_count(course_facet_mask(filters))::INT;
+$$;
+
+-- Options for every facet with the courses each would match. Counts for dept, level and
+-- terms_offered ignore that facet's own selection, so the other values stay visible as alternatives;
+-- skill counts are of courses that also have the selected skills.
+CREATE OR REPLACE FUNCTION get_course_facets(filters JSONB DEFAULT '{}')
+RETURNS TABLE (
+  facet TEXT,
+  value TEXT,
+  courses INT,
+  selected BOOLEAN
+)
+LANGUAGE SQL STABLE
+AS $$
+  WITH masks AS (
+    SELECT names.facet,
+           course_facet_mask(filters, CASE WHEN names.facet = 'skills' THEN NULL ELSE names.facet END) AS mask,
+           COALESCE(filters -> names.facet, '[]') AS wanted
+    FROM (SELECT DISTINCT course_facets.facet FROM course_facets WHERE course_facets.facet <> 'all') names
+  )
+  SELECT
+    course_facets.facet,
+    course_facets.value,
+    bit_count(course_facets.bitmap & masks.mask)::INT,
+    EXISTS (
+      SELECT 1
+      FROM jsonb_array_elements_text(
+        CASE jsonb_typeof(masks.wanted) WHEN 'array' THEN masks.wanted ELSE jsonb_build_array(masks.wanted) END
+      ) AS w(value)
+      WHERE w.value = course_facets.value
+    )
+  FROM course_facets
+  JOIN masks ON masks.facet = course_facets.facet
+  ORDER BY course_facets.facet, 3 DESC, course_facets.value;
+$$;
@@ -0,0 +1,47 @@
+-- Precomputed "courses like this" graph
+-- scripts/course_neighbors.py stores the top-k most similar courses per course by
+-- embedding cosine similarity, so related courses are a primary-key lookup instead
+-- of a vector query. course_neighbor_state remembers which embedding each list was
+-- computed from, so later runs only recompute what changed.
+
+CREATE TABLE IF NOT EXISTS course_neighbors (
+  course_id TEXT NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+  rank SMALLINT NOT NULL, -- 1 = most similar
+  neighbor_id TEXT NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+  similarity REAL NOT NULL,
+  PRIMARY KEY (course_id, rank)
+);
+
+CREATE TABLE IF NOT EXISTS course_neighbor_state (
+  course_id TEXT PRIMARY KEY REFERENCES courses(id) ON DELETE CASCADE,
+  embedding_hash TEXT NOT NULL, -- md5 of the embedding text the neighbours were computed with
+  computed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION get_similar_courses(
+  target_course_id TEXT,
+  match_count INT DEFAULT 10
+)
+RETURNS TABLE (
+  id TEXT,
+  title TEXT,
+  dept TEXT,
+  number INT,
+  level INT,
+  description TEXT,
+  terms_offered JSONB,
+  skills JSONB,
+  similarity FLOAT
+)
+LANGUAGE SQL STABLE
+AS $$
+  SELECT
+    courses.id, courses.title, courses.dept, courses.number, courses.level,
+    courses.description, courses.terms_offered, courses.skills,
+    course_neighbors.similarity::FLOAT
+  FROM course_neighbors
+  JOIN courses ON courses.id = course_neighbors.neighbor_id
+  WHERE course_neighbors.course_id = target_course_id
+  ORDER BY course_neighbors.rank
+  LIMIT match_count;
+$$;
@@ -0,0 +1,111 @@
+-- Diverse document chunks for the chat context
+-- Overlapping chunks of one page embed close together, so a plain top 5 is often the
+-- same passage several times. search_elective_docs_diverse takes a larger pool from
+-- search_elective_docs and picks from it by maximal marginal relevance: each pick
+-- maximizes (1 - diversity) * similarity to the query - diversity * highest similarity
+-- to a chunk already picked. At most per_source chunks come from one source_url unless
+-- nothing else is left. scripts/diversify.py is the same selection in NumPy, and
+-- scripts/benchmark_search.py compares it with plain top-k.
+-- get_chat_context (add-chat-context.sql) uses it when called with doc_pool.
+
+CREATE OR REPLACE FUNCTION search_elective_docs_diverse(
+  query_embedding VECTOR,
+  match_threshold FLOAT DEFAULT 0.5,
+  match_count INT DEFAULT 5,
+  pool_count INT DEFAULT 25,
+  diversity FLOAT DEFAULT 0.2, -- 0 = plain similarity order
+  per_source INT DEFAULT 2, -- NULL for no cap
+  query_model TEXT DEFAULT NULL -- embedding model, once add-embedding-versions.sql is run
+)
+RETURNS TABLE (
+  id UUID,
+  course_id TEXT,
+  option_id TEXT,
+  text TEXT,
+  source_url TEXT,
+  similarity FLOAT
+)
+LANGUAGE plpgsql STABLE
+AS $$
+#variable_conflict use_column
+DECLARE
+  pool_ids UUID[];
+  pool_sources TEXT[];
+  relevance FLOAT[];
+  vector_column TEXT;
+  pair_similarity FLOAT[]; -- pool x pool, row-major
+  closest FLOAT[]; -- highest similarity to a picked chunk
+  picked INT[] := '{}';
+  capped BOOLEAN := per_source IS NOT NULL;
+  n INT;
+  best INT;
+  best_score FLOAT;
+  candidate_score FLOAT;
+BEGIN
+  -- The pool, through the search RPC so versioned column routing stays in one place
+  IF query_model IS NULL THEN
+    SELECT array_agg(d.id ORDER BY d.similarity DESC), array_agg(d.source_url ORDER BY d.similarity DESC),
+           array_agg(d.similarity ORDER BY d.similarity DESC)
+    INTO pool_ids, pool_sources, relevance
+    FROM search_elective_docs(query_embedding, match_threshold, pool_count) d;
+  ELSE
+    SELECT array_agg(d.id ORDER BY d.similarity DESC), array_agg(d.source_url ORDER BY d.similarity DESC),
+           array_agg(d.similarity ORDER BY d.similarity DESC)
+    INTO pool_ids, pool_sources, relevance
+    FROM search_elective_docs(query_embedding, match_threshold, pool_count, query_model) d;
+  END IF;
+  n := COALESCE(cardinality(pool_ids), 0);
+  IF n = 0 THEN
+    RETURN;
+  END IF;
+
+  -- Compare chunks on the column the pool was ranked by
+  IF to_regclass('embedding_versions') IS NOT NULL THEN
+    EXECUTE $sql$
+      SELECT column_name FROM embedding_versions
+      WHERE dimensions = $2
+        AND (model = $1 AND status IN ('active', 'previous') OR $1 IS NULL AND status = 'active')
+      ORDER BY status = 'active' DESC
+      LIMIT 1
+    $sql$ INTO vector_column USING query_model, vector_dims(query_embedding);
+  END IF;
+  EXECUTE format($sql$
+    SELECT array_agg(1 - (a.%1$I <=> b.%1$I) ORDER BY x.ord, y.ord)
+    FROM unnest($1::UUID[]) WITH ORDINALITY AS x(doc_id, ord)
+    JOIN elective_docs a ON a.id = x.doc_id
+    CROSS JOIN unnest($1::UUID[]) WITH ORDINALITY AS y(doc_id, ord)
+    JOIN elective_docs b ON b.id = y.doc_id
+  $sql$, COALESCE(vector_column, 'embedding')) INTO pair_similarity USING pool_ids;
+
+  closest := array_fill(0::FLOAT, ARRAY[n]);
+  WHILE cardinality(picked) < LEAST(match_count, n) LOOP
+    best := NULL;
+    FOR i IN 1..n LOOP
+      CONTINUE WHEN i = ANY(picked);
+      CONTINUE WHEN capped AND pool_sources[i] IS NOT NULL
+        AND (SELECT count(*) FROM unnest(picked) p WHERE pool_sources[p] = pool_sources[i]) >= per_source;
+      candidate_score := (1 - diversity) * relevance[i] - diversity * closest[i];
+      IF best IS NULL OR candidate_score > best_score THEN
+        best := i;
+        best_score := candidate_score;
+      END IF;
+    END LOOP;
+
+    IF best IS NULL THEN
+      capped := FALSE; -- every remaining chunk is from a capped source
+      CONTINUE;
+    END IF;
+    picked := picked || best;
+    FOR i IN 1..n LOOP
+      closest[i] := GREATEST(closest[i], pair_similarity[(i - 1) * n + best]);
+    END LOOP;
+  END LOOP;
+
+  RETURN QUERY
+  SELECT elective_docs.id, elective_docs.course_id, elective_docs.option_id, elective_docs.text,
+         elective_docs.source_url, relevance[p.pos]
+  FROM unnest(picked) WITH ORDINALITY AS p(pos, pick_order)
+  JOIN elective_docs ON elective_docs.id = pool_ids[p.pos]
+  ORDER BY p.pick_order;
+END;
+$$;
@@ -0,0 +1,25 @@
+-- Exact and near-duplicate tracking for elective_docs chunks
+-- scripts/chunk_dedup.py signs every chunk before it is embedded: content_hash is the
+-- md5 of the lowercased, whitespace-collapsed text; minhash is a 128-value MinHash
+-- signature over word 3-shingles and lsh_bands its 16 LSH bucket keys. New chunks
+-- that hash-match, or share a bucket with a stored chunk of similar signature, are
+-- never embedded or inserted.
+
+ALTER TABLE elective_docs ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE elective_docs ADD COLUMN IF NOT EXISTS minhash BIGINT[];
+ALTER TABLE elective_docs ADD COLUMN IF NOT EXISTS lsh_bands TEXT[];
+
+-- Rows stored before this are hashed by chunk_dedup.py backfill rather than here:
+-- Postgres btrim/\s/lower do not normalise text the way Python does, and a hash that
+-- differs from the ingester's would let exact duplicates back in. NULL hashes do not
+-- conflict, so the unique index can be built before the backfill.
+
+-- Makes the ON CONFLICT DO NOTHING in DataProcessor.store_chunks effective
+CREATE UNIQUE INDEX IF NOT EXISTS idx_elective_docs_content_hash ON elective_docs(content_hash);
+
+-- Bucket lookups for near-duplicate candidates (lsh_bands && ARRAY[...])
+CREATE INDEX IF NOT EXISTS idx_elective_docs_lsh_bands ON elective_docs USING GIN (lsh_bands);
+
+-- Then hash and sign the existing rows, deleting exact duplicates (oldest copy kept):
+--   python scripts/chunk_dedup.py backfill
+-- A table hashed by the earlier version of this file needs --rehash once.
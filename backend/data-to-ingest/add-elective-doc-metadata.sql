@@ -0,0 +1,6 @@
+-- Source metadata for elective_docs chunks
+-- data_processor.py process-dir stores what extraction found out about each file on
+-- every chunk cut from it: {"title", "kind" (html/pdf/txt/md), "pages", "bytes"}.
+-- Chunks from process-doc and older rows leave it NULL.
+
+ALTER TABLE elective_docs ADD COLUMN IF NOT EXISTS metadata JSONB;
@@ -0,0 +1,71 @@
+-- Track which rows need their embedding (re)generated
+-- A trigger flags courses/elective_docs rows whenever the text that feeds the
+-- embedding changes; scripts/embedding_worker.py drains the flagged rows.
+
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS embedding_stale BOOLEAN NOT NULL DEFAULT true;
+ALTER TABLE elective_docs ADD COLUMN IF NOT EXISTS embedding_stale BOOLEAN NOT NULL DEFAULT true;
+
+-- Existing rows are stale only if they were never embedded
+UPDATE courses SET embedding_stale = (embedding IS NULL) WHERE embedding_stale;
+UPDATE elective_docs SET embedding_stale = (embedding IS NULL) WHERE embedding_stale;
+
+-- Courses: the columns used by build_course_text in scripts/course_embeddings.py
+CREATE OR REPLACE FUNCTION mark_course_embedding_stale()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    NEW.embedding_stale := NEW.embedding IS NULL;
+  ELSIF (NEW.title, NEW.description, NEW.skills, NEW.dept, NEW.level, NEW.prereqs, NEW.terms_offered)
+        IS DISTINCT FROM
+        (OLD.title, OLD.description, OLD.skills, OLD.dept, OLD.level, OLD.prereqs, OLD.terms_offered) THEN
+    NEW.embedding_stale := true;
+  ELSIF NEW.embedding IS DISTINCT FROM OLD.embedding THEN
+    -- A writer stored a fresh vector without touching the text
+    NEW.embedding_stale := NEW.embedding IS NULL;
+  END IF;
+
+  IF NEW.embedding_stale THEN
+    PERFORM pg_notify('embedding_stale', 'courses');
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS courses_embedding_stale ON courses;
+CREATE TRIGGER courses_embedding_stale
+  BEFORE INSERT OR UPDATE OF title, description, skills, dept, level, prereqs, terms_offered, embedding
+  ON courses
+  FOR EACH ROW EXECUTE FUNCTION mark_course_embedding_stale();
+
+-- Document chunks: only the chunk text is embedded
+CREATE OR REPLACE FUNCTION mark_elective_doc_embedding_stale()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    NEW.embedding_stale := NEW.embedding IS NULL;
+  ELSIF NEW.text IS DISTINCT FROM OLD.text THEN
+    NEW.embedding_stale := true;
+  ELSIF NEW.embedding IS DISTINCT FROM OLD.embedding THEN
+    NEW.embedding_stale := NEW.embedding IS NULL;
+  END IF;
+
+  IF NEW.embedding_stale THEN
+    PERFORM pg_notify('embedding_stale', 'elective_docs');
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS elective_docs_embedding_stale ON elective_docs;
+CREATE TRIGGER elective_docs_embedding_stale
+  BEFORE INSERT OR UPDATE OF text, embedding
+  ON elective_docs
+  FOR EACH ROW EXECUTE FUNCTION mark_elective_doc_embedding_stale();
+
+-- Partial indexes keep the worker's "next stale batch" query cheap however large the tables get
+CREATE INDEX IF NOT EXISTS idx_courses_embedding_stale ON courses (updated_at) WHERE embedding_stale;
+CREATE INDEX IF NOT EXISTS idx_elective_docs_embedding_stale ON elective_docs (created_at) WHERE embedding_stale;
@@ -0,0 +1,30 @@
+-- Sharded embedding generation
+-- Rows are split into n disjoint shards by a stable hash of their id, so n workers
+-- on n machines can (re)embed a table without overlapping. Requires
+-- add-embedding-dirty-tracking.sql.
+
+-- Stable across Postgres versions (unlike hashtext); mirrored by shard_of() in
+-- scripts/embedding_shards.py. 28 bits keeps the value a non-negative int.
+CREATE OR REPLACE FUNCTION embedding_shard(row_id TEXT, shard_count INT)
+RETURNS INT
+LANGUAGE SQL
+IMMUTABLE PARALLEL SAFE
+AS $$
+  SELECT (('x' || substr(md5(row_id), 1, 7))::bit(28)::int) % shard_count;
+$$;
+
+-- One lease per shard of a re-embedding job; workers heartbeat here and the
+-- coordinator releases leases whose worker went quiet
+CREATE TABLE IF NOT EXISTS embedding_shard_leases (
+  job TEXT NOT NULL, -- e.g. "reembed-text-embedding-3-small"
+  shard_count INTEGER NOT NULL,
+  shard INTEGER NOT NULL,
+  worker TEXT, -- hostname:pid of the worker holding the lease
+  status TEXT NOT NULL DEFAULT 'pending', -- pending / running / done
+  rows_done BIGINT NOT NULL DEFAULT 0,
+  heartbeat_at TIMESTAMP WITH TIME ZONE,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (job, shard_count, shard)
+);
+
+CREATE INDEX IF NOT EXISTS idx_embedding_shard_leases_status ON embedding_shard_leases(job, status);
@@ -0,0 +1,138 @@
+-- Versioned embedding columns for zero-downtime model changes
+-- Each version owns one VECTOR column on courses and elective_docs. New versions
+-- are added and backfilled next to the active one by scripts/embedding_migration.py,
+-- which then flips the search RPCs over in a single transaction.
+
+CREATE TABLE IF NOT EXISTS embedding_versions (
+  version TEXT PRIMARY KEY, -- e.g. "v1", "v2"
+  model TEXT NOT NULL, -- OpenAI embedding model
+  dimensions INTEGER NOT NULL, -- passed as the "dimensions" request parameter
+  column_name TEXT NOT NULL UNIQUE, -- vector column on courses and elective_docs
+  status TEXT NOT NULL DEFAULT 'backfilling', -- backfilling / active / previous / retired
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  activated_at TIMESTAMP WITH TIME ZONE
+);
+
+-- At most one version serves search at a time
+CREATE UNIQUE INDEX IF NOT EXISTS idx_embedding_versions_active ON embedding_versions ((true)) WHERE status = 'active';
+
+-- The original column created by add-vector-search.sql
+INSERT INTO embedding_versions (version, model, dimensions, column_name, status, activated_at)
+VALUES ('v1', 'text-embedding-3-small', 1536, 'embedding', 'active', NOW())
+ON CONFLICT (version) DO NOTHING;
+
+-- Lets clients embed queries with whatever model search is currently serving
+CREATE OR REPLACE FUNCTION get_active_embedding_version()
+RETURNS TABLE (
+  version TEXT,
+  model TEXT,
+  dimensions INTEGER
+)
+LANGUAGE SQL STABLE
+AS $$
+  SELECT embedding_versions.version, embedding_versions.model, embedding_versions.dimensions
+  FROM embedding_versions
+  WHERE embedding_versions.status = 'active';
+$$;
+
+-- search_courses_vector and search_elective_docs take the query model as a fourth
+-- argument from here on, so clients that see embedding_versions can always send it.
+-- These are the v1-only bodies embedding_migration.py rpc_sql() generates; once a
+-- flip has made another version active or previous the script owns the RPCs, and
+-- re-running this file leaves them alone.
+DO $migrate$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM embedding_versions
+    WHERE version <> 'v1' AND status IN ('active', 'previous')
+  ) THEN
+    EXECUTE 'DROP FUNCTION IF EXISTS search_courses_vector(VECTOR, FLOAT, INT)';
+    EXECUTE 'DROP FUNCTION IF EXISTS search_courses_vector(VECTOR, FLOAT, INT, TEXT)';
+    EXECUTE $create$
+CREATE FUNCTION search_courses_vector(
+  query_embedding VECTOR,
+  match_threshold FLOAT DEFAULT 0.3,
+  match_count INT DEFAULT 20,
+  query_model TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+  id TEXT,
+  title TEXT,
+  dept TEXT,
+  number INT,
+  units FLOAT,
+  level INT,
+  description TEXT,
+  terms_offered JSONB,
+  prereqs TEXT,
+  skills JSONB,
+  workload JSONB,
+  assessments JSONB,
+  source_url TEXT,
+  similarity FLOAT
+)
+LANGUAGE plpgsql STABLE
+AS $$
+#variable_conflict use_column
+BEGIN
+  IF query_model IS NULL OR (query_model = 'text-embedding-3-small' AND vector_dims(query_embedding) = 1536) THEN
+    RETURN QUERY
+    SELECT
+      courses.id, courses.title, courses.dept, courses.number, courses.units::FLOAT, courses.level,
+      courses.description, courses.terms_offered, courses.prereqs, courses.skills,
+      courses.workload, courses.assessments, courses.source_url,
+      1 - (courses.embedding <=> query_embedding) AS similarity
+    FROM courses
+    WHERE courses.embedding IS NOT NULL
+      AND 1 - (courses.embedding <=> query_embedding) > match_threshold
+    ORDER BY courses.embedding <=> query_embedding
+    LIMIT match_count;
+  ELSE
+    RAISE EXCEPTION 'No live embedding version for model % with % dimensions',
+      query_model, vector_dims(query_embedding);
+  END IF;
+END;
+$$
+$create$;
+    EXECUTE 'DROP FUNCTION IF EXISTS search_elective_docs(VECTOR, FLOAT, INT)';
+    EXECUTE 'DROP FUNCTION IF EXISTS search_elective_docs(VECTOR, FLOAT, INT, TEXT)';
+    EXECUTE $create$
+CREATE FUNCTION search_elective_docs(
+  query_embedding VECTOR,
+  match_threshold FLOAT DEFAULT 0.5,
+  match_count INT DEFAULT 10,
+  query_model TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+  id UUID,
+  course_id TEXT,
+  option_id TEXT,
+  text TEXT,
+  source_url TEXT,
+  similarity FLOAT
+)
+LANGUAGE plpgsql STABLE
+AS $$
+#variable_conflict use_column
+BEGIN
+  IF query_model IS NULL OR (query_model = 'text-embedding-3-small' AND vector_dims(query_embedding) = 1536) THEN
+    RETURN QUERY
+    SELECT
+      elective_docs.id, elective_docs.course_id, elective_docs.option_id,
+      elective_docs.text, elective_docs.source_url,
+      1 - (elective_docs.embedding <=> query_embedding) AS similarity
+    FROM elective_docs
+    WHERE 1 - (elective_docs.embedding <=> query_embedding) > match_threshold
+    ORDER BY elective_docs.embedding <=> query_embedding
+    LIMIT match_count;
+  ELSE
+    RAISE EXCEPTION 'No live embedding version for model % with % dimensions',
+      query_model, vector_dims(query_embedding);
+  END IF;
+END;
+$$
+$create$;
+    NOTIFY pgrst, 'reload schema';
+  END IF;
+END;
+$migrate$;
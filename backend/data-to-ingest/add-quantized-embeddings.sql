@@ -0,0 +1,151 @@
+-- Quantized vector indexes with full-precision re-rank
+-- Requires pgvector 0.7+ (halfvec, binary_quantize). The indexes are expression
+-- indexes over the existing embedding column, so nothing extra is stored in the
+-- table and nothing can drift out of sync. A halfvec HNSW index is half the size of a
+-- float32 one, and a sign-bit index is 1/32. The RPCs below take a coarse top N from
+-- one of them and re-rank it with the full-precision column.
+-- scripts/benchmark_search.py measures the recall/memory trade-off on our corpus.
+-- The RPCs are for benchmarking against search_elective_docs/search_courses_vector
+-- from SQL; the app does not call them. They always read the v1 "embedding" column,
+-- so after embedding_migration.py flips to another version they only answer queries
+-- embedded with text-embedding-3-small.
+
+CREATE INDEX IF NOT EXISTS idx_courses_embedding_half ON courses
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops);
+
+CREATE INDEX IF NOT EXISTS idx_courses_embedding_bits ON courses
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops);
+
+CREATE INDEX IF NOT EXISTS idx_elective_docs_embedding_half ON elective_docs
+USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops);
+
+CREATE INDEX IF NOT EXISTS idx_elective_docs_embedding_bits ON elective_docs
+USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops);
+
+-- Candidates ordered by Hamming distance on sign bits (quantization = 'binary') or by
+-- halfvec cosine distance ('half'), then re-ranked by exact cosine similarity.
+-- An HNSW scan returns at most hnsw.ef_search rows (default 40), so it is raised to
+-- candidate_count for the call; the SET clause keeps the change inside the function.
+CREATE OR REPLACE FUNCTION search_elective_docs_quantized(
+  query_embedding VECTOR(1536),
+  match_threshold FLOAT DEFAULT 0.5,
+  match_count INT DEFAULT 10,
+  candidate_count INT DEFAULT 100,
+  quantization TEXT DEFAULT 'binary'
+)
+RETURNS TABLE (
+  id UUID,
+  course_id TEXT,
+  option_id TEXT,
+  text TEXT,
+  source_url TEXT,
+  similarity FLOAT
+)
+LANGUAGE plpgsql STABLE
+SET hnsw.ef_search = 100
+AS $$
+#variable_conflict use_column
+BEGIN
+  PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(candidate_count, 40), 1000)::TEXT, true);
+  RETURN QUERY
+  WITH candidates AS (
+    (
+      SELECT elective_docs.id
+      FROM elective_docs
+      WHERE quantization = 'binary'
+      ORDER BY binary_quantize(elective_docs.embedding)::bit(1536) <~> binary_quantize(query_embedding)
+      LIMIT candidate_count
+    )
+    UNION ALL
+    (
+      SELECT elective_docs.id
+      FROM elective_docs
+      WHERE quantization = 'half'
+      ORDER BY elective_docs.embedding::halfvec(1536) <=> query_embedding::halfvec(1536)
+      LIMIT candidate_count
+    )
+  )
+  SELECT
+    elective_docs.id,
+    elective_docs.course_id,
+    elective_docs.option_id,
+    elective_docs.text,
+    elective_docs.source_url,
+    1 - (elective_docs.embedding <=> query_embedding) AS similarity
+  FROM elective_docs
+  JOIN candidates ON candidates.id = elective_docs.id
+  WHERE 1 - (elective_docs.embedding <=> query_embedding) > match_threshold
+  ORDER BY elective_docs.embedding <=> query_embedding
+  LIMIT match_count;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION search_courses_quantized(
+  query_embedding VECTOR(1536),
+  match_threshold FLOAT DEFAULT 0.3,
+  match_count INT DEFAULT 20,
+  candidate_count INT DEFAULT 100,
+  quantization TEXT DEFAULT 'binary'
+)
+RETURNS TABLE (
+  id TEXT,
+  title TEXT,
+  dept TEXT,
+  number INT,
+  units FLOAT,
+  level INT,
+  description TEXT,
+  terms_offered JSONB,
+  prereqs TEXT,
+  skills JSONB,
+  workload JSONB,
+  assessments JSONB,
+  source_url TEXT,
+  similarity FLOAT
+)
+LANGUAGE plpgsql STABLE
+SET hnsw.ef_search = 100
+AS $$
+#variable_conflict use_column
+BEGIN
+  PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(candidate_count, 40), 1000)::TEXT, true);
+  RETURN QUERY
+  WITH candidates AS (
+    (
+      SELECT courses.id
+      FROM courses
+      WHERE quantization = 'binary'
+      ORDER BY binary_quantize(courses.embedding)::bit(1536) <~> binary_quantize(query_embedding)
+      LIMIT candidate_count
+    )
+    UNION ALL
+    (
+      SELECT courses.id
+      FROM courses
+      WHERE quantization = 'half'
+      ORDER BY courses.embedding::halfvec(1536) <=> query_embedding::halfvec(1536)
+      LIMIT candidate_count
+    )
+  )
+  SELECT
+    courses.id,
+    courses.title,
+    courses.dept,
+    courses.number,
+    courses.units::FLOAT,
+    courses.level,
+    courses.description,
+    courses.terms_offered,
+    courses.prereqs,
+    courses.skills,
+    courses.workload,
+    courses.assessments,
+    courses.source_url,
+    1 - (courses.embedding <=> query_embedding) AS similarity
+  FROM courses
+  JOIN candidates ON candidates.id = courses.id
+  WHERE 1 - (courses.embedding <=> query_embedding) > match_threshold
+  ORDER BY courses.embedding <=> query_embedding
+  LIMIT match_count;
+END;
+$$;
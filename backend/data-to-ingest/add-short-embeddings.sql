@@ -0,0 +1,169 @@
+-- Matryoshka-shortened embeddings for two-stage retrieval
+-- Requires pgvector 0.7+ (subvector, l2_normalize). text-embedding-3 vectors put most of
+-- their signal in the leading dimensions: the first 256 components, re-normalised, are
+-- exactly what the API returns for dimensions=256. The short vector is a generated
+-- column over the v1 "embedding" column, so every writer of "embedding" fills it for
+-- free and the two never disagree. Its HNSW index is 1/6 the size of the full one. The
+-- two-stage RPCs take candidates from it and re-score them on the full vector; a query
+-- embedded for another version (see embedding_migration.py) has no short column to
+-- use and is answered by the regular versioned search RPC instead.
+-- scripts/benchmark_search.py measures recall against prefix length and candidate count.
+
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS embedding_short VECTOR(256)
+  GENERATED ALWAYS AS (l2_normalize(subvector(embedding, 1, 256))::vector(256)) STORED;
+
+ALTER TABLE elective_docs ADD COLUMN IF NOT EXISTS embedding_short VECTOR(256)
+  GENERATED ALWAYS AS (l2_normalize(subvector(embedding, 1, 256))::vector(256)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_courses_embedding_short ON courses
+USING hnsw (embedding_short vector_cosine_ops);
+
+CREATE INDEX IF NOT EXISTS idx_elective_docs_embedding_short ON elective_docs
+USING hnsw (embedding_short vector_cosine_ops);
+
+-- Whether a query embedded with query_model is served from the v1 "embedding" column,
+-- the same lookup search_elective_docs_diverse uses (always true before
+-- add-embedding-versions.sql is run)
+CREATE OR REPLACE FUNCTION embedding_query_uses_v1(query_model TEXT, query_dims INT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql STABLE
+AS $$
+DECLARE
+  vector_column TEXT;
+BEGIN
+  IF to_regclass('embedding_versions') IS NULL THEN
+    RETURN query_dims = 1536;
+  END IF;
+  EXECUTE $sql$
+    SELECT column_name FROM embedding_versions
+    WHERE dimensions = $2
+      AND (model = $1 AND status IN ('active', 'previous') OR $1 IS NULL AND status = 'active')
+    ORDER BY status = 'active' DESC
+    LIMIT 1
+  $sql$ INTO vector_column USING query_model, query_dims;
+  RETURN vector_column = 'embedding';
+END;
+$$;
+
+-- query_model was added since the first version; drop it so calls cannot be ambiguous
+DROP FUNCTION IF EXISTS search_elective_docs_two_stage(VECTOR, FLOAT, INT, INT);
+DROP FUNCTION IF EXISTS search_courses_two_stage(VECTOR, FLOAT, INT, INT);
+
+-- Candidates from the short vector, re-scored on the full one. An HNSW scan returns at
+-- most hnsw.ef_search rows (default 40), so it is raised to candidate_count for the
+-- call; the SET clause keeps the change inside the function.
+CREATE OR REPLACE FUNCTION search_elective_docs_two_stage(
+  query_embedding VECTOR,
+  match_threshold FLOAT DEFAULT 0.5,
+  match_count INT DEFAULT 10,
+  candidate_count INT DEFAULT 100,
+  query_model TEXT DEFAULT NULL -- embedding model, once add-embedding-versions.sql is run
+)
+RETURNS TABLE (
+  id UUID,
+  course_id TEXT,
+  option_id TEXT,
+  text TEXT,
+  source_url TEXT,
+  similarity FLOAT
+)
+LANGUAGE plpgsql STABLE
+SET hnsw.ef_search = 100
+AS $$
+#variable_conflict use_column
+BEGIN
+  IF NOT COALESCE(embedding_query_uses_v1(query_model, vector_dims(query_embedding)), FALSE) THEN
+    RETURN QUERY
+    SELECT d.* FROM search_elective_docs(query_embedding, match_threshold, match_count, query_model) d;
+    RETURN;
+  END IF;
+
+  PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(candidate_count, 40), 1000)::TEXT, true);
+  RETURN QUERY
+  WITH candidates AS (
+    SELECT elective_docs.id
+    FROM elective_docs
+    WHERE elective_docs.embedding_short IS NOT NULL
+    ORDER BY elective_docs.embedding_short <=> l2_normalize(subvector(query_embedding, 1, 256))::vector(256)
+    LIMIT candidate_count
+  )
+  SELECT
+    elective_docs.id,
+    elective_docs.course_id,
+    elective_docs.option_id,
+    elective_docs.text,
+    elective_docs.source_url,
+    1 - (elective_docs.embedding <=> query_embedding) AS similarity
+  FROM elective_docs
+  JOIN candidates ON candidates.id = elective_docs.id
+  WHERE 1 - (elective_docs.embedding <=> query_embedding) > match_threshold
+  ORDER BY elective_docs.embedding <=> query_embedding
+  LIMIT match_count;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION search_courses_two_stage(
+  query_embedding VECTOR,
+  match_threshold FLOAT DEFAULT 0.3,
+  match_count INT DEFAULT 20,
+  candidate_count INT DEFAULT 100,
+  query_model TEXT DEFAULT NULL -- embedding model, once add-embedding-versions.sql is run
+)
+RETURNS TABLE (
+  id TEXT,
+  title TEXT,
+  dept TEXT,
+  number INT,
+  units FLOAT,
+  level INT,
+  description TEXT,
+  terms_offered JSONB,
+  prereqs TEXT,
+  skills JSONB,
+  workload JSONB,
+  assessments JSONB,
+  source_url TEXT,
+  similarity FLOAT
+)
+LANGUAGE plpgsql STABLE
+SET hnsw.ef_search = 100
+AS $$
+#variable_conflict use_column
+BEGIN
+  IF NOT COALESCE(embedding_query_uses_v1(query_model, vector_dims(query_embedding)), FALSE) THEN
+    RETURN QUERY
+    SELECT c.* FROM search_courses_vector(query_embedding, match_threshold, match_count, query_model) c;
+    RETURN;
+  END IF;
+
+  PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(candidate_count, 40), 1000)::TEXT, true);
+  RETURN QUERY
+  WITH candidates AS (
+    SELECT courses.id
+    FROM courses
+    WHERE courses.embedding_short IS NOT NULL
+    ORDER BY courses.embedding_short <=> l2_normalize(subvector(query_embedding, 1, 256))::vector(256)
+    LIMIT candidate_count
+  )
+  SELECT
+    courses.id,
+    courses.title,
+    courses.dept,
+    courses.number,
+    courses.units::FLOAT,
+    courses.level,
+    courses.description,
+    courses.terms_offered,
+    courses.prereqs,
+    courses.skills,
+    courses.workload,
+    courses.assessments,
+    courses.source_url,
+    1 - (courses.embedding <=> query_embedding) AS similarity
+  FROM courses
+  JOIN candidates ON candidates.id = courses.id
+  WHERE 1 - (courses.embedding <=> query_embedding) > match_threshold
+  ORDER BY courses.embedding <=> query_embedding
+  LIMIT match_count;
+END;
+$$;
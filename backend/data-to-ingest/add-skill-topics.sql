@@ -0,0 +1,54 @@
+-- Skill tags and topics derived from course embeddings
+-- scripts/skill_tagging.py labels every embedded course with the skill prototypes its
+-- embedding is nearest to and clusters the catalog into topics. It writes the labels
+-- to courses.skills and the cluster to courses.topic_id, so the skills.cs.[...] filter
+-- in search is a selective lookup on idx_courses_skills.
+
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS topic_id INT;
+
+-- Ingestion no longer guesses skills from the title; new rows wait for the tagger
+ALTER TABLE courses ALTER COLUMN skills SET DEFAULT '[]';
+UPDATE courses SET skills = '[]' WHERE skills IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_courses_topic_id ON courses (topic_id);
+
+CREATE TABLE IF NOT EXISTS course_topics (
+  topic_id INT PRIMARY KEY,
+  label TEXT NOT NULL, -- skill prototype nearest to the centroid
+  size INT NOT NULL,
+  top_skills JSONB NOT NULL DEFAULT '[]', -- most common skills among the topic's courses
+  centroid VECTOR, -- warm start for the next run, so topic ids stay stable
+  embedding_column TEXT NOT NULL, -- courses column the centroid was computed from
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- skills is derived from the embedding now, so it no longer marks the embedding
+-- stale (see add-embedding-dirty-tracking.sql); otherwise tagging would re-embed
+CREATE OR REPLACE FUNCTION mark_course_embedding_stale()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    NEW.embedding_stale := NEW.embedding IS NULL;
+  ELSIF (NEW.title, NEW.description, NEW.dept, NEW.level, NEW.prereqs, NEW.terms_offered)
+        IS DISTINCT FROM
+        (OLD.title, OLD.description, OLD.dept, OLD.level, OLD.prereqs, OLD.terms_offered) THEN
+    NEW.embedding_stale := true;
+  ELSIF NEW.embedding IS DISTINCT FROM OLD.embedding THEN
+    -- A writer stored a fresh vector without touching the text
+    NEW.embedding_stale := NEW.embedding IS NULL;
+  END IF;
+
+  IF NEW.embedding_stale THEN
+    PERFORM pg_notify('embedding_stale', 'courses');
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS courses_embedding_stale ON courses;
+CREATE TRIGGER courses_embedding_stale
+  BEFORE INSERT OR UPDATE OF title, description, dept, level, prereqs, terms_offered, embedding
+  ON courses
+  FOR EACH ROW EXECUTE FUNCTION mark_course_embedding_stale();
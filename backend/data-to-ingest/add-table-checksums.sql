@@ -0,0 +1,23 @@
+-- Server-side table checksums for verify-catalog.py
+-- Each row's listed columns are joined with a unit separator (NULL as \N) and hashed
+-- with md5; the row hashes are sorted and hashed again. Row order and ids do not
+-- matter, so the checksum of a table equals the same computation over the rows an
+-- ingester parsed from its source file, and only one short row comes back to the client.
+
+CREATE OR REPLACE FUNCTION table_checksum(table_name TEXT, columns TEXT[])
+RETURNS TABLE (
+  row_count BIGINT,
+  checksum TEXT
+)
+LANGUAGE plpgsql STABLE
+AS $$
+BEGIN
+  RETURN QUERY EXECUTE format($sql$
+    SELECT count(*), md5(COALESCE(string_agg(row_hash, '' ORDER BY row_hash COLLATE "C"), ''))
+    FROM (SELECT md5(concat_ws(E'\x1f', %s)) AS row_hash FROM %I) AS hashed
+  $sql$,
+    (SELECT string_agg(format('COALESCE(%I::TEXT, %L)', column_name, '\N'), ', ' ORDER BY position)
+     FROM unnest(columns) WITH ORDINALITY AS c(column_name, position)),
+    table_name);
+END;
+$$;
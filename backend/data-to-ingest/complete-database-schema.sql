@@ -341,26 +341,33 @@ ALTER TABLE chat_sessions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE chat_messages ENABLE ROW LEVEL SECURITY;
 
 -- User profiles policies
+DROP POLICY IF EXISTS "Users can view their own profile" ON user_profiles;
 CREATE POLICY "Users can view their own profile" ON user_profiles
   FOR SELECT USING (auth.uid()::text = user_id);
 
+DROP POLICY IF EXISTS "Users can update their own profile" ON user_profiles;
 CREATE POLICY "Users can update their own profile" ON user_profiles
   FOR UPDATE USING (auth.uid()::text = user_id);
 
+DROP POLICY IF EXISTS "Users can insert their own profile" ON user_profiles;
 CREATE POLICY "Users can insert their own profile" ON user_profiles
   FOR INSERT WITH CHECK (auth.uid()::text = user_id);
 
 -- Chat sessions policies
+DROP POLICY IF EXISTS "Users can view their own chat sessions" ON chat_sessions;
 CREATE POLICY "Users can view their own chat sessions" ON chat_sessions
   FOR SELECT USING (auth.uid()::text = user_id);
 
+DROP POLICY IF EXISTS "Users can insert their own chat sessions" ON chat_sessions;
 CREATE POLICY "Users can insert their own chat sessions" ON chat_sessions
   FOR INSERT WITH CHECK (auth.uid()::text = user_id);
 
+DROP POLICY IF EXISTS "Users can update their own chat sessions" ON chat_sessions;
 CREATE POLICY "Users can update their own chat sessions" ON chat_sessions
   FOR UPDATE USING (auth.uid()::text = user_id);
 
 -- Chat messages policies
+DROP POLICY IF EXISTS "Users can view messages from their sessions" ON chat_messages;
 CREATE POLICY "Users can view messages from their sessions" ON chat_messages
   FOR SELECT USING (
     session_id IN (
@@ -368,6 +375,7 @@ CREATE POLICY "Users can view messages from their sessions" ON chat_messages
     )
   );
 
+DROP POLICY IF EXISTS "Users can insert messages to their sessions" ON chat_messages;
 CREATE POLICY "Users can insert messages to their sessions" ON chat_messages
   FOR INSERT WITH CHECK (
     session_id IN (
@@ -1,81 +1,69 @@
 #!/usr/bin/env python3
 """
 Generate embeddings for all courses in the database
+Usage: python generate-course-embeddings.py [--resume] [--shard i/n] [--profile]
 """
 
 import os
 import sys
-import json
 from supabase import create_client, Client
-from openai import OpenAI
 import time
 
 # Add the parent directory to the path so we can import from lib
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from checkpoint_journal import CheckpointJournal, hash_text
+from course_embeddings import build_course_text, embedding_client
+from embedding_migration import embed_for_versions, live_versions_rest
+from embedding_shards import parse_shard, shard_of
+from run_metrics import payload_bytes, pop_profile_flag, span, start_run
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Initialize OpenAI client (through the embedding gateway when EMBEDDING_GATEWAY_URL is set)
+openai_client = embedding_client()
 
 # Initialize Supabase client
 url = os.getenv('SUPABASE_URL')
 key = os.getenv('SUPABASE_ANON_KEY')
 supabase: Client = create_client(url, key)
 
-def get_embedding(text: str) -> list[float]:
-    """Get embedding for text using OpenAI"""
-    try:
-        response = openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Error getting embedding: {e}")
+def get_shard_arg():
+    """Read --shard i/n from the command line (None when not sharded)"""
+    if '--shard' not in sys.argv:
         return None
-
-def generate_course_embedding(course):
-    """Generate embedding for a single course"""
-    # Create a comprehensive text representation of the course
-    text_parts = []
-    
-    if course.get('title'):
-        text_parts.append(f"Title: {course['title']}")
-    
-    if course.get('description'):
-        text_parts.append(f"Description: {course['description']}")
-    
-    if course.get('skills') and isinstance(course['skills'], list):
-        text_parts.append(f"Skills: {', '.join(course['skills'])}")
-    
-    if course.get('dept'):
-        text_parts.append(f"Department: {course['dept']}")
-    
-    if course.get('level'):
-        text_parts.append(f"Level: {course['level']}")
-    
-    if course.get('prereqs'):
-        text_parts.append(f"Prerequisites: {course['prereqs']}")
-    
-    if course.get('terms_offered') and isinstance(course['terms_offered'], list):
-        text_parts.append(f"Terms offered: {', '.join(course['terms_offered'])}")
-    
-    # Join all parts
-    full_text = " | ".join(text_parts)
-    
-    # Get embedding
-    embedding = get_embedding(full_text)
-    return embedding
+    position = sys.argv.index('--shard')
+    if position + 1 >= len(sys.argv):
+        print("❌ --shard needs a value like 0/4")
+        sys.exit(1)
+    try:
+        shard = parse_shard(sys.argv[position + 1])
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if shard[0] is None:
+        print("❌ auto shards need the database worker: python ../scripts/embedding_worker.py --shard auto/n")
+        sys.exit(1)
+    return shard
 
 def main():
+    profile = pop_profile_flag()
+    resume = '--resume' in sys.argv
+    shard = get_shard_arg()
+    with start_run('course-embeddings', profile=profile):
+        generate_embeddings(resume, shard)
+
+def generate_embeddings(resume: bool, shard):
     print("🚀 Starting course embedding generation...")
     
     # Get all courses
     print("📚 Fetching courses from database...")
-    response = supabase.table('courses').select('*').execute()
+    with span('fetch', table='courses') as current:
+        response = supabase.table('courses').select('*').execute()
+        current.add(rows=len(response.data or []))
     
     if not response.data:
         print("❌ No courses found in database")
@@ -84,55 +72,84 @@ def main():
     courses = response.data
     print(f"📚 Found {len(courses)} courses")
     
+    if shard:
+        # Same stable hash as embedding_shard() in SQL, so n machines each take a disjoint slice
+        index, shard_count = shard
+        courses = [course for course in courses if shard_of(course['id'], shard_count) == index]
+        print(f"🧩 Shard {index}/{shard_count}: {len(courses)} courses")
+    
+    # Every live embedding version is written, so a version being backfilled or kept for
+    # rollback (see embedding_migration.py) never keeps outdated vectors
+    versions = live_versions_rest(supabase)
+    active = next((v for v in versions if v['status'] == 'active'), versions[0])
+    print("🧬 Embedding versions: " + ', '.join(f"{v['version']}={v['model']}" for v in versions))
+    
+    # Each course is journaled under a hash of its text, so edited courses are re-embedded on resume;
+    # a change to the live versions starts the journal over
+    job = f"course-embeddings:{shard[0]}/{shard[1]}" if shard else 'course-embeddings'
+    journal = CheckpointJournal(
+        job, hash_text(*(f"{v['model']}:{v['dimensions']}" for v in versions)), resume=resume
+    )
+    pending = []
+    for course in courses:
+        course_text = build_course_text(course)
+        course_key = f"{course['id']}:{hash_text(course_text)}"
+        if not journal.is_done(course_key):
+            pending.append((course, course_text, course_key))
+    journal.report()
+    courses = pending
+    
     # Process courses in batches
     batch_size = 10
     processed = 0
     errors = 0
     
+    batch_count = (len(courses) + batch_size - 1) // batch_size
+    
     for i in range(0, len(courses), batch_size):
         batch = courses[i:i + batch_size]
-        print(f"🔄 Processing batch {i//batch_size + 1}/{(len(courses) + batch_size - 1)//batch_size}")
         
-        for course in batch:
-            try:
-                print(f"  📝 Processing {course['id']}: {course['title']}")
-                
-                # Generate embedding
-                embedding = generate_course_embedding(course)
-                
-                if embedding:
-                    # Update course with embedding
-                    update_response = supabase.table('courses').update({
-                        'embedding': embedding
-                    }).eq('id', course['id']).execute()
+        # One embeddings request per batch and version (recorded as embed spans with their tokens)
+        try:
+            embeddings = embed_for_versions(openai_client, [course_text for _, course_text, _ in batch], versions)
+        except Exception as e:
+            print(f"  ❌ Batch {i//batch_size + 1}/{batch_count}: embedding request failed: {e}")
+            errors += len(batch)
+            continue
+        
+        with span('upload', table='courses') as current:
+            for position, (course, course_text, course_key) in enumerate(batch):
+                try:
+                    update = {column: vectors[position] for column, vectors in embeddings.items()}
+                    update_response = supabase.table('courses').update(update).eq('id', course['id']).execute()
+                    current.add(bytes=payload_bytes(update))
                     
                     if update_response.data:
-                        print(f"    ✅ Updated {course['id']} with embedding")
+                        journal.mark_done(course_key)
                         processed += 1
+                        current.add(rows=1)
                     else:
-                        print(f"    ❌ Failed to update {course['id']}")
+                        print(f"  ❌ Failed to update {course['id']}")
                         errors += 1
-                else:
-                    print(f"    ❌ Failed to generate embedding for {course['id']}")
+                except Exception as e:
+                    print(f"  ❌ Error updating {course['id']}: {e}")
                     errors += 1
-                
-                # Rate limiting - wait a bit between requests
-                time.sleep(0.1)
-                
-            except Exception as e:
-                print(f"    ❌ Error processing {course['id']}: {e}")
-                errors += 1
         
-        # Wait between batches
+        print(f"🔄 Batch {i//batch_size + 1}/{batch_count}: {processed} embedded, {errors} errors")
+        
+        # Rate limiting - wait a bit between batches
         time.sleep(1)
     
+    journal.close()
+    
     print(f"\n🎉 Embedding generation complete!")
     print(f"✅ Successfully processed: {processed} courses")
     print(f"❌ Errors: {errors} courses")
     
     # Verify some embeddings were created
     print("\n🔍 Verifying embeddings...")
-    verify_response = supabase.table('courses').select('id, title').not_.is_('embedding', 'null').limit(5).execute()
+    verify_response = supabase.table('courses').select('id, title') \
+        .not_.is_(active['column_name'], 'null').limit(5).execute()
     
     if verify_response.data:
         print(f"✅ Found {len(verify_response.data)} courses with embeddings")
@@ -4,7 +4,6 @@ Comprehensive data ingestion script for Waterloo Engineering data
 Processes courses, specializations, certificates, and diplomas
 """
 
-import json
 import os
 import sys
 import re
@@ -14,15 +13,22 @@ from typing import Dict, List, Any, Optional
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
+sys.path.append(str(project_root / 'scripts'))
 
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from catalog_facets import refresh_after_ingest
+from cohort_recommendations import refresh_after_ingest as refresh_cohorts_after_ingest
+from checkpoint_journal import CheckpointJournal, hash_records
+from run_metrics import load_json, payload_bytes, pop_profile_flag, span, start_run
+
 # Load environment variables
 load_dotenv()
 
 class ComprehensiveDataIngestion:
-    def __init__(self):
+    def __init__(self, resume: bool = False):
+        self.resume = resume
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         
@@ -68,38 +74,11 @@ class ComprehensiveDataIngestion:
             return (level // 100) * 100
         return 200  # Default to 200 level
     
-    def get_skills_from_title(self, title: str) -> List[str]:
-        """Extract skills from course title"""
-        skills = []
-        title_lower = title.lower()
-        
-        skill_keywords = {
-            'robotics': ['robot', 'robotics', 'automation'],
-            'control': ['control', 'control systems', 'feedback'],
-            'machine learning': ['machine learning', 'ml', 'ai', 'artificial intelligence'],
-            'embedded': ['embedded', 'microcontroller', 'microprocessor'],
-            'software': ['software', 'programming', 'coding'],
-            'hardware': ['hardware', 'circuit', 'electronics'],
-            'mechanics': ['mechanics', 'dynamics', 'statics'],
-            'materials': ['materials', 'material science'],
-            'thermodynamics': ['thermodynamics', 'heat transfer'],
-            'fluid mechanics': ['fluid', 'hydraulics', 'pneumatics'],
-            'structures': ['structures', 'structural', 'design'],
-            'environmental': ['environmental', 'sustainability', 'green']
-        }
-        
-        for skill, keywords in skill_keywords.items():
-            if any(keyword in title_lower for keyword in keywords):
-                skills.append(skill)
-        
-        return skills if skills else ['general engineering']
-    
     def process_specializations(self, json_file: str) -> List[Dict[str, Any]]:
         """Process specializations JSON file"""
         print(f"📖 Processing specializations from {json_file}")
         
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json(json_file)
         
         specializations = []
         
@@ -126,8 +105,7 @@ class ComprehensiveDataIngestion:
         """Process certificates JSON file"""
         print(f"📖 Processing certificates from {json_file}")
         
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json(json_file)
         
         certificates = []
         
@@ -152,8 +130,7 @@ class ComprehensiveDataIngestion:
         """Process diplomas JSON file"""
         print(f"📖 Processing diplomas from {json_file}")
         
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json(json_file)
         
         diplomas = []
         
@@ -197,7 +174,6 @@ class ComprehensiveDataIngestion:
                             'number': course_info['number'],
                             'level': self.get_course_level(course_id),
                             'terms_offered': ["F", "W"],
-                            'skills': self.get_skills_from_title(course_info['title']),
                             'units': 0.5,
                             'description': f"Course from {spec['program']} specialization",
                             'prereqs': '',
@@ -224,7 +200,6 @@ class ComprehensiveDataIngestion:
                                         'number': course_info['number'],
                                         'level': self.get_course_level(course_id),
                                         'terms_offered': ["F", "W"],
-                                        'skills': self.get_skills_from_title(course_info['title']),
                                         'units': 0.5,
                                         'description': f"Course from {spec['program']} specialization",
                                         'prereqs': '',
@@ -243,16 +218,24 @@ class ComprehensiveDataIngestion:
             return
         
         print(f"📤 Uploading {len(data)} records to {table_name}...")
+        journal = CheckpointJournal(f"ingest-all-data:{table_name}", hash_records(data), resume=self.resume)
         
         # Upload in batches to avoid timeout
         batch_size = 50
-        for i in range(0, len(data), batch_size):
-            batch = data[i:i + batch_size]
-            try:
-                result = self.supabase.table(table_name).upsert(batch, on_conflict='id').execute()
-                print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(data) + batch_size - 1)//batch_size}")
-            except Exception as e:
-                print(f"❌ Error uploading batch {i//batch_size + 1}: {e}")
+        with journal:
+            for i in range(0, len(data), batch_size):
+                if journal.is_done(f"rows:{i}"):
+                    continue
+                batch = data[i:i + batch_size]
+                try:
+                    with span('upload', table=table_name) as current:
+                        result = self.supabase.table(table_name).upsert(batch, on_conflict='id').execute()
+                        current.add(rows=len(batch), bytes=payload_bytes(batch))
+                    journal.mark_done(f"rows:{i}", len(batch))
+                    print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(data) + batch_size - 1)//batch_size}")
+                except Exception as e:
+                    print(f"❌ Error uploading batch {i//batch_size + 1}: {e}")
+            journal.report()
         
         print(f"✅ Successfully uploaded {len(data)} records to {table_name}!")
     
@@ -261,20 +244,32 @@ class ComprehensiveDataIngestion:
         print("🚀 Starting comprehensive data ingestion...")
         
         # Process specializations
-        specializations = self.process_specializations('waterloo_engineering_specializations_COMPLETE.json')
+        with span('transform', table='specializations') as current:
+            specializations = self.process_specializations('waterloo_engineering_specializations_COMPLETE.json')
+            current.add(rows=len(specializations))
         self.upload_data('specializations', specializations)
         
         # Process certificates
-        certificates = self.process_certificates('waterloo_engineering_certificates.json')
+        with span('transform', table='certificates') as current:
+            certificates = self.process_certificates('waterloo_engineering_certificates.json')
+            current.add(rows=len(certificates))
         self.upload_data('certificates', certificates)
         
         # Process diplomas
-        diplomas = self.process_diplomas('waterloo_engineering_undergrad_diplomas.json')
+        with span('transform', table='diplomas') as current:
+            diplomas = self.process_diplomas('waterloo_engineering_undergrad_diplomas.json')
+            current.add(rows=len(diplomas))
         self.upload_data('diplomas', diplomas)
         
         # Extract and upload courses from specializations
-        courses = self.process_courses_from_specializations(specializations)
+        with span('transform', table='courses') as current:
+            courses = self.process_courses_from_specializations(specializations)
+            current.add(rows=len(courses))
         self.upload_data('courses', courses)
+        with span('facets'):
+            refresh_after_ingest()
+        with span('cohorts'):
+            refresh_cohorts_after_ingest()
         
         print("🎉 Comprehensive data ingestion complete!")
         print(f"📊 Summary:")
@@ -284,16 +279,20 @@ class ComprehensiveDataIngestion:
         print(f"  - Courses: {len(courses)}")
 
 def main():
+    profile = pop_profile_flag()
     if len(sys.argv) > 1 and sys.argv[1] == '--help':
-        print("Usage: python ingest-all-data.py")
+        print("Usage: python ingest-all-data.py [--resume] [--profile]")
+        print("  --resume  skip batches completed by an earlier interrupted run")
+        print("  --profile write a cProfile, memory and stage-time report to backend/.cache/profiles/")
         print("This script will process all JSON files in the current directory:")
         print("  - waterloo_engineering_specializations_COMPLETE.json")
         print("  - waterloo_engineering_certificates.json")
         print("  - waterloo_engineering_undergrad_diplomas.json")
         return
     
-    processor = ComprehensiveDataIngestion()
-    processor.ingest_all_data()
+    with start_run('ingest-all-data', profile=profile):
+        processor = ComprehensiveDataIngestion(resume='--resume' in sys.argv)
+        processor.ingest_all_data()
 
 if __name__ == "__main__":
     main()
@@ -4,11 +4,18 @@ Ingest courses from uw_engineering_core_by_program_TIDY.json
 """
 
 import os
-import json
 import sys
 from supabase import create_client, Client
 from typing import Dict, List, Any
 import re
+from pathlib import Path
+
+# Add the scripts directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent / 'scripts'))
+
+from catalog_facets import refresh_after_ingest
+from cohort_recommendations import refresh_after_ingest as refresh_cohorts_after_ingest
+from run_metrics import load_json, payload_bytes, pop_profile_flag, span, start_run
 
 class CourseIngestion:
     def __init__(self):
@@ -68,30 +75,6 @@ class CourseIngestion:
         else:
             return 500
 
-    def get_skills_from_title(self, title: str) -> List[str]:
-        """Extract skills from course title"""
-        skills = []
-        title_lower = title.lower()
-        
-        skill_keywords = {
-            'robotics': ['robot', 'robotic', 'autonomous', 'control'],
-            'ai': ['artificial intelligence', 'machine learning', 'neural', 'ai'],
-            'software': ['software', 'programming', 'development', 'coding'],
-            'hardware': ['hardware', 'circuit', 'electronics', 'embedded'],
-            'mechanics': ['mechanics', 'dynamics', 'statics', 'materials'],
-            'design': ['design', 'studio', 'project'],
-            'math': ['calculus', 'linear algebra', 'differential', 'statistics'],
-            'chemistry': ['chemistry', 'chemical'],
-            'physics': ['physics', 'mechanics', 'thermodynamics'],
-            'environmental': ['environmental', 'sustainability', 'energy']
-        }
-        
-        for skill, keywords in skill_keywords.items():
-            if any(keyword in title_lower for keyword in keywords):
-                skills.append(skill)
-        
-        return skills if skills else ['general']
-
     def process_courses(self, json_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Process all programs and extract course information"""
         courses = {}
@@ -114,7 +97,6 @@ class CourseIngestion:
                                     **course_info,
                                     'units': 0.5,
                                     'terms_offered': ["F", "W"],
-                                    'skills': self.get_skills_from_title(course_info['title']),
                                     'description': f"Course from {program_name} program",
                                     'prereqs': '',
                                     'workload': {"reading": 2, "assignments": 3, "projects": 1, "labs": 1},
@@ -131,13 +113,16 @@ class CourseIngestion:
         
         # Clear existing courses first
         print("🗑️ Clearing existing courses...")
-        self.supabase.table('courses').delete().neq('id', '').execute()
+        with span('clear', table='courses'):
+            self.supabase.table('courses').delete().neq('id', '').execute()
         
         # Upload in batches to avoid timeout
         batch_size = 50
         for i in range(0, len(courses_data), batch_size):
             batch = courses_data[i:i + batch_size]
-            result = self.supabase.table('courses').insert(batch).execute()
+            with span('upload', table='courses') as current:
+                result = self.supabase.table('courses').insert(batch).execute()
+                current.add(rows=len(batch), bytes=payload_bytes(batch))
             print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(courses_data) + batch_size - 1)//batch_size}")
         
         print(f"✅ Successfully uploaded {len(courses_data)} courses!")
@@ -146,11 +131,12 @@ class CourseIngestion:
         """Main method to process the JSON file"""
         print(f"📖 Reading JSON file: {json_file_path}")
         
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = load_json(json_file_path)
         
         print("🔄 Processing courses...")
-        courses_data = self.process_courses(json_data)
+        with span('transform') as current:
+            courses_data = self.process_courses(json_data)
+            current.add(rows=len(courses_data))
         
         print(f"📊 Found {len(courses_data)} unique courses")
         
@@ -160,8 +146,9 @@ class CourseIngestion:
         print("🎉 Course data processing complete!")
 
 def main():
+    profile = pop_profile_flag()
     if len(sys.argv) < 2:
-        print("Usage: python ingest-courses.py <json_file_path>")
+        print("Usage: python ingest-courses.py <json_file_path> [--profile]")
         print("Example: python ingest-courses.py uw_engineering_core_by_program_TIDY.json")
         sys.exit(1)
     
@@ -171,8 +158,13 @@ def main():
         print(f"❌ Error: File {json_file} not found")
         sys.exit(1)
     
-    processor = CourseIngestion()
-    processor.process_json_file(json_file)
+    with start_run('ingest-courses', profile=profile):
+        processor = CourseIngestion()
+        processor.process_json_file(json_file)
+        with span('facets'):
+            refresh_after_ingest()
+        with span('cohorts'):
+            refresh_cohorts_after_ingest()
 
 if __name__ == "__main__":
     main()
@@ -6,9 +6,15 @@ Ingest CSE (Complementary Studies Electives) from CSV file
 import os
 import csv
 import sys
+from pathlib import Path
 from supabase import create_client, Client
 from typing import Dict, List, Any
 
+# Add the scripts directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent / 'scripts'))
+
+from run_metrics import payload_bytes, pop_profile_flag, span, start_run
+
 class CSEElectivesIngestion:
     def __init__(self):
         self.supabase_url = os.getenv('SUPABASE_URL')
@@ -117,8 +123,7 @@ class CSEElectivesIngestion:
                     'workload': {"reading": 3, "assignments": 2, "projects": 1, "labs": 0},
                     'assessments': {"midterm": 25, "final": 35, "assignments": 30, "participation": 10},
                     'source_url': f"https://uwaterloo.ca/arts/undergraduate-studies/course-catalog/{course_code.lower()}",
-                    'cse_classification': list_name,
-                    'skills': [category.lower().replace('_', ' '), 'complementary studies', 'general education']
+                    'cse_classification': list_name
                 }
                 
                 courses.append(course)
@@ -133,7 +138,9 @@ class CSEElectivesIngestion:
         batch_size = 50
         for i in range(0, len(courses_data), batch_size):
             batch = courses_data[i:i + batch_size]
-            result = self.supabase.table('courses').upsert(batch, on_conflict='id').execute()
+            with span('upload', table='courses') as current:
+                result = self.supabase.table('courses').upsert(batch, on_conflict='id').execute()
+                current.add(rows=len(batch), bytes=payload_bytes(batch))
             print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(courses_data) + batch_size - 1)//batch_size}")
         
         print(f"✅ Successfully uploaded {len(courses_data)} CSE electives!")
@@ -147,7 +154,9 @@ class CSEElectivesIngestion:
             sys.exit(1)
         
         print("🔄 Processing CSE electives...")
-        courses_data = self.process_cse_electives(csv_file_path)
+        with span('parse', file=Path(csv_file_path).name) as current:
+            courses_data = self.process_cse_electives(csv_file_path)
+            current.add(rows=len(courses_data), bytes=os.path.getsize(csv_file_path))
         
         print(f"📊 Found {len(courses_data)} CSE electives")
         
@@ -157,15 +166,17 @@ class CSEElectivesIngestion:
         print("🎉 CSE electives processing complete!")
 
 def main():
+    profile = pop_profile_flag()
     if len(sys.argv) < 2:
-        print("Usage: python ingest-cse-electives.py <csv_file_path>")
+        print("Usage: python ingest-cse-electives.py <csv_file_path> [--profile]")
         print("Example: python ingest-cse-electives.py 'CSE_s (1).csv'")
         sys.exit(1)
     
     csv_file = sys.argv[1]
     
-    processor = CSEElectivesIngestion()
-    processor.process_csv_file(csv_file)
+    with start_run('ingest-cse-electives', profile=profile):
+        processor = CSEElectivesIngestion()
+        processor.process_csv_file(csv_file)
 
 if __name__ == "__main__":
     main()
@@ -3,7 +3,6 @@
 Ingest the waterloo_engineering_diplomas_detailed.json file
 """
 
-import json
 import os
 import sys
 import re
@@ -13,15 +12,20 @@ from typing import Dict, List, Any, Optional
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
+sys.path.append(str(project_root / 'scripts'))
 
 from dotenv import load_dotenv
 from supabase import create_client
 
+from checkpoint_journal import CheckpointJournal, hash_records
+from run_metrics import load_json, payload_bytes, pop_profile_flag, span, start_run
+
 # Load environment variables
 load_dotenv()
 
 class DiplomaIngestion:
-    def __init__(self):
+    def __init__(self, resume: bool = False):
+        self.resume = resume
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         
@@ -70,34 +74,11 @@ class DiplomaIngestion:
             return (level // 100) * 100
         return 200  # Default to 200 level
     
-    def get_skills_from_title(self, title: str) -> List[str]:
-        """Extract skills from course title"""
-        skills = []
-        title_lower = title.lower()
-        
-        skill_keywords = {
-            'language': ['language', 'linguistics', 'communication'],
-            'environment': ['environment', 'sustainability', 'climate', 'cities'],
-            'business': ['business', 'management', 'economics', 'finance'],
-            'mathematics': ['mathematics', 'math', 'statistics', 'calculus'],
-            'science': ['science', 'physics', 'chemistry', 'biology'],
-            'engineering': ['engineering', 'design', 'technology'],
-            'arts': ['arts', 'humanities', 'culture', 'history'],
-            'social sciences': ['psychology', 'sociology', 'politics', 'social']
-        }
-        
-        for skill, keywords in skill_keywords.items():
-            if any(keyword in title_lower for keyword in keywords):
-                skills.append(skill)
-        
-        return skills if skills else ['general studies']
-    
     def process_diplomas(self, json_file: str) -> tuple:
         """Process the diplomas JSON file"""
         print(f"📖 Processing diplomas from {json_file}")
         
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json(json_file)
         
         diplomas = []
         courses = {}
@@ -141,7 +122,6 @@ class DiplomaIngestion:
                             'number': course_info['number'],
                             'level': self.get_course_level(course_id),
                             'terms_offered': ["F", "W"],
-                            'skills': self.get_skills_from_title(course_info['title']),
                             'units': 0.5,
                             'description': f"Course from {diploma_data.get('name', '')} diploma",
                             'prereqs': '',
@@ -164,7 +144,6 @@ class DiplomaIngestion:
                             'number': course_info['number'],
                             'level': self.get_course_level(course_id),
                             'terms_offered': ["F", "W"],
-                            'skills': self.get_skills_from_title(course_info['title']),
                             'units': 0.5,
                             'description': f"Course from {diploma_data.get('name', '')} diploma",
                             'prereqs': '',
@@ -183,16 +162,24 @@ class DiplomaIngestion:
             return
         
         print(f"📤 Uploading {len(data)} records to {table_name}...")
+        journal = CheckpointJournal(f"ingest-diplomas:{table_name}", hash_records(data), resume=self.resume)
         
         # Upload in batches to avoid timeout
         batch_size = 50
-        for i in range(0, len(data), batch_size):
-            batch = data[i:i + batch_size]
-            try:
-                result = self.supabase.table(table_name).upsert(batch, on_conflict='id').execute()
-                print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(data) + batch_size - 1)//batch_size}")
-            except Exception as e:
-                print(f"❌ Error uploading batch {i//batch_size + 1}: {e}")
+        with journal:
+            for i in range(0, len(data), batch_size):
+                if journal.is_done(f"rows:{i}"):
+                    continue
+                batch = data[i:i + batch_size]
+                try:
+                    with span('upload', table=table_name) as current:
+                        result = self.supabase.table(table_name).upsert(batch, on_conflict='id').execute()
+                        current.add(rows=len(batch), bytes=payload_bytes(batch))
+                    journal.mark_done(f"rows:{i}", len(batch))
+                    print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(data) + batch_size - 1)//batch_size}")
+                except Exception as e:
+                    print(f"❌ Error uploading batch {i//batch_size + 1}: {e}")
+            journal.report()
         
         print(f"✅ Successfully uploaded {len(data)} records to {table_name}!")
     
@@ -201,11 +188,16 @@ class DiplomaIngestion:
         print("🚀 Starting diplomas data ingestion...")
         
         # Process diplomas and courses
-        diplomas, courses = self.process_diplomas('waterloo_engineering_diplomas_detailed.json')
+        with span('transform') as current:
+            diplomas, courses = self.process_diplomas('waterloo_engineering_diplomas_detailed.json')
+            current.add(rows=len(diplomas) + len(courses))
         
         # Upload diplomas (replace existing data)
-        print("🗑️ Clearing existing diplomas...")
-        self.supabase.table('diplomas').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
+        # A resumed run keeps the rows uploaded before the interruption
+        if not self.resume:
+            print("🗑️ Clearing existing diplomas...")
+            with span('clear', table='diplomas'):
+                self.supabase.table('diplomas').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
         
         print("📤 Uploading new diplomas...")
         self.upload_data('diplomas', diplomas)
@@ -220,13 +212,17 @@ class DiplomaIngestion:
         print(f"  - Courses: {len(courses)}")
 
 def main():
+    profile = pop_profile_flag()
     if len(sys.argv) > 1 and sys.argv[1] == '--help':
-        print("Usage: python ingest-diplomas.py")
+        print("Usage: python ingest-diplomas.py [--resume] [--profile]")
+        print("  --resume  skip batches completed by an earlier interrupted run")
+        print("  --profile write a cProfile, memory and stage-time report to backend/.cache/profiles/")
         print("This script will process waterloo_engineering_diplomas_detailed.json and update the database")
         return
     
-    processor = DiplomaIngestion()
-    processor.ingest_diplomas()
+    with start_run('ingest-diplomas', profile=profile):
+        processor = DiplomaIngestion(resume='--resume' in sys.argv)
+        processor.ingest_diplomas()
 
 if __name__ == "__main__":
     main()
@@ -4,7 +4,6 @@ Ingest the comprehensive full_specialization_list.json file
 This has much better structured data with detailed course requirements
 """
 
-import json
 import os
 import sys
 import re
@@ -14,15 +13,20 @@ from typing import Dict, List, Any, Optional
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
+sys.path.append(str(project_root / 'scripts'))
 
 from dotenv import load_dotenv
 from supabase import create_client
 
+from checkpoint_journal import CheckpointJournal, hash_records
+from run_metrics import load_json, payload_bytes, pop_profile_flag, span, start_run
+
 # Load environment variables
 load_dotenv()
 
 class FullSpecializationIngestion:
-    def __init__(self):
+    def __init__(self, resume: bool = False):
+        self.resume = resume
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         
@@ -74,41 +78,11 @@ class FullSpecializationIngestion:
             return (level // 100) * 100
         return 200  # Default to 200 level
     
-    def get_skills_from_title(self, title: str) -> List[str]:
-        """Extract skills from course title"""
-        skills = []
-        title_lower = title.lower()
-        
-        skill_keywords = {
-            'robotics': ['robot', 'robotics', 'automation'],
-            'control': ['control', 'control systems', 'feedback'],
-            'machine learning': ['machine learning', 'ml', 'ai', 'artificial intelligence'],
-            'embedded': ['embedded', 'microcontroller', 'microprocessor'],
-            'software': ['software', 'programming', 'coding'],
-            'hardware': ['hardware', 'circuit', 'electronics'],
-            'mechanics': ['mechanics', 'dynamics', 'statics'],
-            'materials': ['materials', 'material science'],
-            'thermodynamics': ['thermodynamics', 'heat transfer'],
-            'fluid mechanics': ['fluid', 'hydraulics', 'pneumatics'],
-            'structures': ['structures', 'structural', 'design'],
-            'environmental': ['environmental', 'sustainability', 'green'],
-            'biomedical': ['biomedical', 'bio', 'medical', 'health'],
-            'business': ['business', 'management', 'economics', 'finance'],
-            'data science': ['data', 'analytics', 'statistics', 'visualization']
-        }
-        
-        for skill, keywords in skill_keywords.items():
-            if any(keyword in title_lower for keyword in keywords):
-                skills.append(skill)
-        
-        return skills if skills else ['general engineering']
-    
     def process_full_specializations(self, json_file: str) -> tuple:
         """Process the comprehensive specializations JSON file"""
         print(f"📖 Processing full specializations from {json_file}")
         
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json(json_file)
         
         specializations = []
         courses = {}
@@ -153,7 +127,6 @@ class FullSpecializationIngestion:
                                 'number': course_info['number'],
                                 'level': self.get_course_level(course_id),
                                 'terms_offered': ["F", "W"],
-                                'skills': self.get_skills_from_title(course_info['title']),
                                 'units': 0.5,
                                 'description': f"Course from {program_name} specialization",
                                 'prereqs': '',
@@ -176,7 +149,6 @@ class FullSpecializationIngestion:
                                 'number': course_info['number'],
                                 'level': self.get_course_level(course_id),
                                 'terms_offered': ["F", "W"],
-                                'skills': self.get_skills_from_title(course_info['title']),
                                 'units': 0.5,
                                 'description': f"Course from {program_name} specialization",
                                 'prereqs': '',
@@ -195,16 +167,24 @@ class FullSpecializationIngestion:
             return
         
         print(f"📤 Uploading {len(data)} records to {table_name}...")
+        journal = CheckpointJournal(f"ingest-full-specializations:{table_name}", hash_records(data), resume=self.resume)
         
         # Upload in batches to avoid timeout
         batch_size = 50
-        for i in range(0, len(data), batch_size):
-            batch = data[i:i + batch_size]
-            try:
-                result = self.supabase.table(table_name).upsert(batch, on_conflict='id').execute()
-                print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(data) + batch_size - 1)//batch_size}")
-            except Exception as e:
-                print(f"❌ Error uploading batch {i//batch_size + 1}: {e}")
+        with journal:
+            for i in range(0, len(data), batch_size):
+                if journal.is_done(f"rows:{i}"):
+                    continue
+                batch = data[i:i + batch_size]
+                try:
+                    with span('upload', table=table_name) as current:
+                        result = self.supabase.table(table_name).upsert(batch, on_conflict='id').execute()
+                        current.add(rows=len(batch), bytes=payload_bytes(batch))
+                    journal.mark_done(f"rows:{i}", len(batch))
+                    print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(data) + batch_size - 1)//batch_size}")
+                except Exception as e:
+                    print(f"❌ Error uploading batch {i//batch_size + 1}: {e}")
+            journal.report()
         
         print(f"✅ Successfully uploaded {len(data)} records to {table_name}!")
     
@@ -213,11 +193,16 @@ class FullSpecializationIngestion:
         print("🚀 Starting full specializations data ingestion...")
         
         # Process specializations and courses
-        specializations, courses = self.process_full_specializations('full_specialization_list.json')
+        with span('transform') as current:
+            specializations, courses = self.process_full_specializations('full_specialization_list.json')
+            current.add(rows=len(specializations) + len(courses))
         
         # Upload specializations (replace existing data)
-        print("🗑️ Clearing existing specializations...")
-        self.supabase.table('specializations').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
+        # A resumed run keeps the rows uploaded before the interruption
+        if not self.resume:
+            print("🗑️ Clearing existing specializations...")
+            with span('clear', table='specializations'):
+                self.supabase.table('specializations').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
         
         print("📤 Uploading new specializations...")
         self.upload_data('specializations', specializations)
@@ -232,13 +217,17 @@ class FullSpecializationIngestion:
         print(f"  - Courses: {len(courses)}")
 
 def main():
+    profile = pop_profile_flag()
     if len(sys.argv) > 1 and sys.argv[1] == '--help':
-        print("Usage: python ingest-full-specializations.py")
+        print("Usage: python ingest-full-specializations.py [--resume] [--profile]")
+        print("  --resume  skip batches completed by an earlier interrupted run")
+        print("  --profile write a cProfile, memory and stage-time report to backend/.cache/profiles/")
         print("This script will process full_specialization_list.json and update the database")
         return
     
-    processor = FullSpecializationIngestion()
-    processor.ingest_full_specializations()
+    with start_run('ingest-full-specializations', profile=profile):
+        processor = FullSpecializationIngestion(resume='--resume' in sys.argv)
+        processor.ingest_full_specializations()
 
 if __name__ == "__main__":
     main()
@@ -4,7 +4,6 @@ Comprehensive JSON ingestion script for Waterloo Engineering data
 Processes JSON files and uploads directly to Supabase
 """
 
-import json
 import os
 import sys
 import re
@@ -14,10 +13,15 @@ from typing import Dict, List, Any, Optional
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
+sys.path.append(str(project_root / 'scripts'))
 
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from catalog_facets import refresh_after_ingest
+from cohort_recommendations import refresh_after_ingest as refresh_cohorts_after_ingest
+from run_metrics import load_json, payload_bytes, pop_profile_flag, span, start_run
+
 # Load environment variables
 load_dotenv()
 
@@ -76,33 +80,6 @@ class JSONIngestionProcessor:
                 return 400
         return 200
     
-    def get_skills_from_title(self, title: str) -> List[str]:
-        """Extract skills/topics from course title"""
-        skills = []
-        title_lower = title.lower()
-        
-        skill_keywords = {
-            'robotics': ['robot', 'robotics', 'manipulator'],
-            'control': ['control', 'feedback', 'regulation'],
-            'machine learning': ['machine learning', 'ml', 'ai', 'artificial intelligence'],
-            'software': ['software', 'programming', 'coding', 'development'],
-            'hardware': ['hardware', 'circuit', 'electronics', 'digital'],
-            'mechanics': ['mechanics', 'dynamics', 'statics', 'materials'],
-            'mathematics': ['math', 'calculus', 'statistics', 'probability'],
-            'design': ['design', 'engineering design', 'project'],
-            'systems': ['systems', 'system design', 'integration'],
-            'data': ['data', 'database', 'analytics', 'visualization'],
-            'communication': ['communication', 'writing', 'presentation'],
-            'environmental': ['environmental', 'sustainability', 'energy'],
-            'biomedical': ['biomedical', 'bio', 'medical', 'health']
-        }
-        
-        for skill, keywords in skill_keywords.items():
-            if any(keyword in title_lower for keyword in keywords):
-                skills.append(skill)
-        
-        return skills if skills else ['general engineering']
-    
     def process_programs(self, json_data: Dict[str, Any]) -> tuple:
         """Process all programs and extract course information"""
         courses = {}
@@ -133,7 +110,6 @@ class JSONIngestionProcessor:
                             course_info.update({
                                 'level': self.get_course_level(course_id),
                                 'terms_offered': ["F", "W"],
-                                'skills': self.get_skills_from_title(course_info['title']),
                                 'units': 0.5,
                                 'description': f"Course from {program_name} program",
                                 'prereqs': '',
@@ -153,7 +129,9 @@ class JSONIngestionProcessor:
         batch_size = 50
         for i in range(0, len(courses_data), batch_size):
             batch = courses_data[i:i + batch_size]
-            result = self.supabase.table('courses').upsert(batch, on_conflict='id').execute()
+            with span('upload', table='courses') as current:
+                result = self.supabase.table('courses').upsert(batch, on_conflict='id').execute()
+                current.add(rows=len(batch), bytes=payload_bytes(batch))
             print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(courses_data) + batch_size - 1)//batch_size}")
         
         print(f"✅ Successfully uploaded {len(courses_data)} courses!")
@@ -162,18 +140,21 @@ class JSONIngestionProcessor:
         """Upload programs as options to Supabase"""
         print(f"📋 Uploading {len(programs_data)} programs...")
         
-        result = self.supabase.table('options').upsert(programs_data, on_conflict='id').execute()
+        with span('upload', table='options') as current:
+            result = self.supabase.table('options').upsert(programs_data, on_conflict='id').execute()
+            current.add(rows=len(programs_data), bytes=payload_bytes(programs_data))
         print(f"✅ Successfully uploaded {len(programs_data)} programs!")
     
     def process_json_file(self, json_file_path: str):
         """Main method to process the JSON file"""
         print(f"📖 Reading JSON file: {json_file_path}")
         
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = load_json(json_file_path)
         
         print("🔄 Processing programs and courses...")
-        courses_data, programs_data = self.process_programs(json_data)
+        with span('transform') as current:
+            courses_data, programs_data = self.process_programs(json_data)
+            current.add(rows=len(courses_data) + len(programs_data))
         
         print(f"📊 Found {len(courses_data)} unique courses across {len(programs_data)} programs")
         
@@ -186,8 +167,9 @@ class JSONIngestionProcessor:
         print("🎉 JSON data processing complete!")
 
 def main():
+    profile = pop_profile_flag()
     if len(sys.argv) < 2:
-        print("Usage: python ingest-json.py <json_file_path>")
+        print("Usage: python ingest-json.py <json_file_path> [--profile]")
         print("Example: python ingest-json.py uw_engineering_core_by_program_TIDY.json")
         sys.exit(1)
     
@@ -196,8 +178,13 @@ def main():
         print(f"❌ File not found: {json_file}")
         sys.exit(1)
     
-    processor = JSONIngestionProcessor()
-    processor.process_json_file(json_file)
+    with start_run('ingest-json', profile=profile):
+        processor = JSONIngestionProcessor()
+        processor.process_json_file(json_file)
+        with span('facets'):
+            refresh_after_ingest()
+        with span('cohorts'):
+            refresh_cohorts_after_ingest()
 
 if __name__ == "__main__":
     main()
@@ -3,24 +3,28 @@
 Ingest the waterloo_engineering_minors_concurrent_accelerated.json file
 """
 
-import json
 import os
 import sys
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
+sys.path.append(str(project_root / 'scripts'))
 
 from dotenv import load_dotenv
 from supabase import create_client
 
+from checkpoint_journal import CheckpointJournal, hash_records
+from run_metrics import load_json, payload_bytes, pop_profile_flag, span, start_run
+
 # Load environment variables
 load_dotenv()
 
 class MinorsConcurrentIngestion:
-    def __init__(self):
+    def __init__(self, resume: bool = False):
+        self.resume = resume
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         
@@ -187,42 +191,79 @@ class MinorsConcurrentIngestion:
         
         print(f"📤 Uploading {len(data)} records to {table_name}...")
         
+        with CheckpointJournal(f"ingest-minors-concurrent:{table_name}", hash_records(data), resume=self.resume) as journal:
+            if journal.is_done('all'):
+                journal.report()
+                return
+            # A resumed run skips the records an earlier run inserted one by one
+            pending = [(i, record) for i, record in enumerate(data) if not journal.is_done(f"row:{i}")]
+            journal.report()
+            failed = self._insert_data(table_name, pending, journal) if pending else 0
+            if failed:
+                print(f"⚠️ {failed} of {len(data)} {table_name} records failed; rerun with --resume to retry them")
+            else:
+                journal.mark_done('all', len(data))
+    
+    def _insert_data(self, table_name: str, records: List[Tuple[int, Dict[str, Any]]], journal) -> int:
+        """Insert rows, falling back to one-by-one inserts to find failing records
+
+        Returns how many records could not be inserted. Records inserted one by one
+        are journaled, so a resumed run only retries the ones that failed.
+        """
+        data = [record for _, record in records]
         try:
             # Use insert instead of upsert since we cleared the data
-            result = self.supabase.table(table_name).insert(data).execute()
+            with span('upload', table=table_name) as current:
+                result = self.supabase.table(table_name).insert(data).execute()
+                current.add(rows=len(data), bytes=payload_bytes(data))
             print(f"✅ Successfully uploaded {len(data)} records to {table_name}!")
+            return 0
         except Exception as e:
             print(f"❌ Error uploading to {table_name}: {e}")
             # Try to upload one by one to see which record fails
-            for i, record in enumerate(data):
+            failed = 0
+            for i, record in records:
                 try:
-                    self.supabase.table(table_name).insert(record).execute()
+                    with span('upload', table=table_name) as current:
+                        current.add(retries=1)
+                        self.supabase.table(table_name).insert(record).execute()
+                        current.add(rows=1, bytes=payload_bytes(record))
+                    journal.mark_done(f"row:{i}", 1)
                     print(f"✅ Record {i+1} uploaded successfully")
                 except Exception as record_error:
+                    failed += 1
                     print(f"❌ Record {i+1} failed: {record_error}")
                     print(f"Record data: {record}")
+            return failed
+    
+    def clear_existing_data(self):
+        """Delete minors/concurrent/accelerated rows and their program associations"""
+        print("🗑️ Clearing existing data...")
+        self.supabase.table('minors_engineering_programs').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
+        self.supabase.table('concurrent_degrees_engineering_programs').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
+        self.supabase.table('accelerated_masters_engineering_programs').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
+        self.supabase.table('minors').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
+        self.supabase.table('concurrent_degrees').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
+        self.supabase.table('accelerated_masters').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
     
     def ingest_minors_concurrent(self):
         """Main method to ingest the minors/concurrent/accelerated masters data"""
         print("🚀 Starting minors/concurrent/accelerated masters data ingestion...")
         
         # Load JSON data
-        with open('waterloo_engineering_minors_concurrent_accelerated.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_json('waterloo_engineering_minors_concurrent_accelerated.json')
         
         # Process each data type
-        minors = self.process_minors(data)
-        concurrent_degrees = self.process_concurrent_degrees(data)
-        accelerated_masters = self.process_accelerated_masters(data)
+        with span('transform') as current:
+            minors = self.process_minors(data)
+            concurrent_degrees = self.process_concurrent_degrees(data)
+            accelerated_masters = self.process_accelerated_masters(data)
+            current.add(rows=len(minors) + len(concurrent_degrees) + len(accelerated_masters))
         
-        # Clear existing data
-        print("🗑️ Clearing existing data...")
-        self.supabase.table('minors_engineering_programs').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        self.supabase.table('concurrent_degrees_engineering_programs').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        self.supabase.table('accelerated_masters_engineering_programs').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        self.supabase.table('minors').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        self.supabase.table('concurrent_degrees').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        self.supabase.table('accelerated_masters').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
+        # Clear existing data (a resumed run keeps the rows uploaded before the interruption)
+        if not self.resume:
+            with span('clear'):
+                self.clear_existing_data()
         
         # Upload data
         self.upload_data('minors', minors)
@@ -230,7 +271,11 @@ class MinorsConcurrentIngestion:
         self.upload_data('accelerated_masters', accelerated_masters)
         
         # Create associations
-        self.create_engineering_program_associations(data)
+        with CheckpointJournal('ingest-minors-concurrent:associations', hash_records([data]), resume=self.resume) as journal:
+            if not journal.is_done('all'):
+                with span('associations'):
+                    self.create_engineering_program_associations(data)
+                journal.mark_done('all')
         
         print("🎉 Minors/concurrent/accelerated masters data ingestion complete!")
         print(f"📊 Summary:")
@@ -239,13 +284,17 @@ class MinorsConcurrentIngestion:
         print(f"  - Accelerated Masters: {len(accelerated_masters)}")
 
 def main():
+    profile = pop_profile_flag()
     if len(sys.argv) > 1 and sys.argv[1] == '--help':
-        print("Usage: python ingest-minors-concurrent.py")
+        print("Usage: python ingest-minors-concurrent.py [--resume] [--profile]")
+        print("  --resume  skip batches completed by an earlier interrupted run")
+        print("  --profile write a cProfile, memory and stage-time report to backend/.cache/profiles/")
         print("This script will process waterloo_engineering_minors_concurrent_accelerated.json and update the database")
         return
     
-    processor = MinorsConcurrentIngestion()
-    processor.ingest_minors_concurrent()
+    with start_run('ingest-minors-concurrent', profile=profile):
+        processor = MinorsConcurrentIngestion(resume='--resume' in sys.argv)
+        processor.ingest_minors_concurrent()
 
 if __name__ == "__main__":
     main()
@@ -6,9 +6,15 @@ Ingest Technical Elective (TE) options from CSV file
 import os
 import csv
 import sys
+from pathlib import Path
 from supabase import create_client, Client
 from typing import Dict, List, Any
 
+# Add the scripts directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent / 'scripts'))
+
+from run_metrics import payload_bytes, pop_profile_flag, span, start_run
+
 class TEOptionsIngestion:
     def __init__(self):
         self.supabase_url = os.getenv('SUPABASE_URL')
@@ -121,13 +127,16 @@ class TEOptionsIngestion:
         
         # Clear existing options first
         print("🗑️ Clearing existing options...")
-        self.supabase.table('options').delete().neq('id', '').execute()
+        with span('clear', table='options'):
+            self.supabase.table('options').delete().neq('id', '').execute()
         
         # Upload in batches using upsert to handle duplicates
         batch_size = 50
         for i in range(0, len(options_data), batch_size):
             batch = options_data[i:i + batch_size]
-            result = self.supabase.table('options').upsert(batch, on_conflict='id').execute()
+            with span('upload', table='options') as current:
+                result = self.supabase.table('options').upsert(batch, on_conflict='id').execute()
+                current.add(rows=len(batch), bytes=payload_bytes(batch))
             print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(options_data) + batch_size - 1)//batch_size}")
         
         print(f"✅ Successfully uploaded {len(options_data)} TE options!")
@@ -141,7 +150,9 @@ class TEOptionsIngestion:
             sys.exit(1)
         
         print("🔄 Processing TE options...")
-        options_data = self.process_te_options(csv_file_path)
+        with span('parse', file=Path(csv_file_path).name) as current:
+            options_data = self.process_te_options(csv_file_path)
+            current.add(rows=len(options_data), bytes=os.path.getsize(csv_file_path))
         
         print(f"📊 Found {len(options_data)} TE options")
         
@@ -151,15 +162,17 @@ class TEOptionsIngestion:
         print("🎉 TE options processing complete!")
 
 def main():
+    profile = pop_profile_flag()
     if len(sys.argv) < 2:
-        print("Usage: python ingest-te-options.py <csv_file_path>")
+        print("Usage: python ingest-te-options.py <csv_file_path> [--profile]")
         print("Example: python ingest-te-options.py waterloo_engineering_TE_options_full_ALL_programs_with_option_column.csv")
         sys.exit(1)
     
     csv_file = sys.argv[1]
     
-    processor = TEOptionsIngestion()
-    processor.process_csv_file(csv_file)
+    with start_run('ingest-te-options', profile=profile):
+        processor = TEOptionsIngestion()
+        processor.process_csv_file(csv_file)
 
 if __name__ == "__main__":
     main()
@@ -11,6 +11,7 @@ from pathlib import Path
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
+sys.path.append(str(project_root / 'scripts'))
 
 from dotenv import load_dotenv
 from supabase import create_client
@@ -18,7 +19,39 @@ from supabase import create_client
 # Load environment variables
 load_dotenv()
 
+# Functions the app calls, installed after the tables they read;
+# get_chat_context calls search_elective_docs_diverse, so that goes first
+FUNCTION_SCRIPTS = ['add-diverse-retrieval.sql', 'add-chat-context.sql']
+
+def install_functions(supabase):
+    print("\n🔧 Installing database functions...")
+    for script in FUNCTION_SCRIPTS:
+        with open(script, 'r', encoding='utf-8') as f:
+            sql_content = f.read()
+        try:
+            supabase.rpc('exec_sql', {'sql': sql_content}).execute()
+            print(f"  ✅ {script}")
+        except Exception as e:
+            print(f"  ❌ {script} failed: {e}")
+
+def run_migrations(db_url):
+    """Apply only new and changed migrations, recorded in schema_migrations"""
+    import psycopg2
+    from schema_migrations import MigrationRunner
+
+    conn = psycopg2.connect(db_url)
+    try:
+        MigrationRunner(conn).apply()
+    finally:
+        conn.close()
+    return True
+
 def run_complete_schema():
+    # With a direct connection, use the incremental runner instead of replaying everything
+    db_url = os.getenv('DATABASE_URL')
+    if db_url:
+        return run_migrations(db_url)
+    
     supabase_url = os.getenv('SUPABASE_URL')
     supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
     
@@ -64,6 +97,7 @@ def run_complete_schema():
             except Exception as e:
                 print(f"  ❌ {table} table error: {e}")
         
+        install_functions(supabase)
         return True
         
     except Exception as e:
@@ -79,11 +113,11 @@ def run_complete_schema():
                     print(f"Running section {i+1}...")
                     supabase.rpc('exec_sql', {'sql': section}).execute()
                     print(f"✅ Section {i+1} completed")
-                    time.sleep(1)  # Small delay between sections
                 except Exception as section_error:
                     print(f"⚠️ Section {i+1} failed: {section_error}")
         
         print("🎉 Schema execution completed (with some warnings)")
+        install_functions(supabase)
         return True
 
 if __name__ == "__main__":
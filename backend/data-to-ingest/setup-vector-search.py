@@ -5,16 +5,23 @@ Setup vector search for courses
 
 import os
 import sys
+from pathlib import Path
 from supabase import create_client
-from openai import OpenAI
 import time
 
+# Add the scripts directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent / 'scripts'))
+
+from course_embeddings import build_course_text, embedding_client
+from embedding_migration import embed_for_versions, live_versions_rest
+from schema_migrations import split_statements
+
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
 # Initialize clients
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+openai_client = embedding_client()
 url = os.getenv('SUPABASE_URL')
 key = os.getenv('SUPABASE_ANON_KEY')
 supabase = create_client(url, key)
@@ -22,62 +29,14 @@ supabase = create_client(url, key)
 def execute_sql(sql_content):
     """Execute SQL content"""
     try:
-        # Split by semicolon and execute each statement
-        statements = [stmt.strip() for stmt in sql_content.split(';') if stmt.strip()]
-        
-        for stmt in statements:
-            if stmt:
-                print(f"Executing: {stmt[:50]}...")
-                result = supabase.rpc('exec_sql', {'sql': stmt})
-                print("✅ Success")
+        # Split into statements, keeping $$ function bodies whole
+        for stmt in split_statements(sql_content):
+            print(f"Executing: {stmt[:50]}...")
+            supabase.rpc('exec_sql', {'sql': stmt}).execute()
+            print("✅ Success")
     except Exception as e:
         print(f"❌ Error: {e}")
 
-def get_embedding(text: str) -> list[float]:
-    """Get embedding for text using OpenAI"""
-    try:
-        response = openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Error getting embedding: {e}")
-        return None
-
-def generate_course_embedding(course):
-    """Generate embedding for a single course"""
-    # Create a comprehensive text representation of the course
-    text_parts = []
-    
-    if course.get('title'):
-        text_parts.append(f"Title: {course['title']}")
-    
-    if course.get('description'):
-        text_parts.append(f"Description: {course['description']}")
-    
-    if course.get('skills') and isinstance(course['skills'], list):
-        text_parts.append(f"Skills: {', '.join(course['skills'])}")
-    
-    if course.get('dept'):
-        text_parts.append(f"Department: {course['dept']}")
-    
-    if course.get('level'):
-        text_parts.append(f"Level: {course['level']}")
-    
-    if course.get('prereqs'):
-        text_parts.append(f"Prerequisites: {course['prereqs']}")
-    
-    if course.get('terms_offered') and isinstance(course['terms_offered'], list):
-        text_parts.append(f"Terms offered: {', '.join(course['terms_offered'])}")
-    
-    # Join all parts
-    full_text = " | ".join(text_parts)
-    
-    # Get embedding
-    embedding = get_embedding(full_text)
-    return embedding
-
 def main():
     print("🚀 Setting up vector search for courses...")
     
@@ -101,25 +60,25 @@ def main():
     courses = response.data
     print(f"📚 Found {len(courses)} courses to process")
     
+    # Write every live embedding version, so the active column is never left behind
+    versions = live_versions_rest(supabase)
+    
     for course in courses:
         try:
             print(f"  📝 Processing {course['id']}: {course['title']}")
             
-            # Generate embedding
-            embedding = generate_course_embedding(course)
+            # Generate embeddings
+            embeddings = embed_for_versions(openai_client, [build_course_text(course)], versions)
+            
+            # Update course with embeddings
+            update_response = supabase.table('courses').update({
+                column: vectors[0] for column, vectors in embeddings.items()
+            }).eq('id', course['id']).execute()
             
-            if embedding:
-                # Update course with embedding
-                update_response = supabase.table('courses').update({
-                    'embedding': embedding
-                }).eq('id', course['id']).execute()
-                
-                if update_response.data:
-                    print(f"    ✅ Updated {course['id']} with embedding")
-                else:
-                    print(f"    ❌ Failed to update {course['id']}")
+            if update_response.data:
+                print(f"    ✅ Updated {course['id']} with embedding")
             else:
-                print(f"    ❌ Failed to generate embedding for {course['id']}")
+                print(f"    ❌ Failed to update {course['id']}")
             
             # Rate limiting
             time.sleep(0.5)
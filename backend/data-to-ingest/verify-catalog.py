@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Verify the loaded catalog without downloading it
+Row counts come from exact-count HEAD requests and content checksums from the
+table_checksum RPC (add-table-checksums.sql), all sent concurrently. Each checksum
+is compared with the same hash over the rows the ingester would upload, computed
+by running its own parsing method on the source file. A table with several possible
+sources (e.g. specializations from ingest-all-data.py or ingest-full-specializations.py)
+passes if it matches any of them.
+
+Usage: python verify-catalog.py [--workers 16]
+Exits with status 1 if a table is missing or does not match its source.
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import inspect
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dotenv import load_dotenv
+from supabase import create_client
+
+# Load environment variables
+load_dotenv()
+
+INGEST_DIR = Path(__file__).parent
+
+# table -> (text columns hashed, [(ingester script, class, parsing method, source file)])
+SOURCE_CHECKS = {
+    'specializations': (['program', 'name', 'graduation_requirements', 'description', 'source_url'], [
+        ('ingest-all-data.py', 'ComprehensiveDataIngestion', 'process_specializations',
+         'waterloo_engineering_specializations_COMPLETE.json'),
+        ('ingest-full-specializations.py', 'FullSpecializationIngestion', 'process_full_specializations',
+         'full_specialization_list.json'),
+    ]),
+    'certificates': (['name', 'description', 'source_url'], [
+        ('ingest-all-data.py', 'ComprehensiveDataIngestion', 'process_certificates',
+         'waterloo_engineering_certificates.json'),
+    ]),
+    'diplomas': (['name', 'administered_by', 'eligibility', 'description', 'source_url'], [
+        ('ingest-all-data.py', 'ComprehensiveDataIngestion', 'process_diplomas',
+         'waterloo_engineering_undergrad_diplomas.json'),
+        ('ingest-diplomas.py', 'DiplomaIngestion', 'process_diplomas',
+         'waterloo_engineering_diplomas_detailed.json'),
+    ]),
+    'minors': (['name', 'faculty', 'description', 'requirements', 'source_url'], [
+        ('ingest-minors-concurrent.py', 'MinorsConcurrentIngestion', 'process_minors',
+         'waterloo_engineering_minors_concurrent_accelerated.json'),
+    ]),
+    'concurrent_degrees': (['name', 'description', 'requirements', 'source_url'], [
+        ('ingest-minors-concurrent.py', 'MinorsConcurrentIngestion', 'process_concurrent_degrees',
+         'waterloo_engineering_minors_concurrent_accelerated.json'),
+    ]),
+    'accelerated_masters': (['program_name', 'description', 'administered_by', 'source_url'], [
+        ('ingest-minors-concurrent.py', 'MinorsConcurrentIngestion', 'process_accelerated_masters',
+         'waterloo_engineering_minors_concurrent_accelerated.json'),
+    ]),
+}
+
+# Tables filled from several sources or by the app: counted, and checksummed when
+# columns are given so two environments can be compared
+COUNT_ONLY = {
+    'courses': ['id', 'title', 'dept', 'prereqs', 'source_url'],
+    'elective_docs': None,
+    'specializations_courses': None,
+    'certificates_courses': None,
+    'diplomas_courses': None,
+    'user_profiles': None,
+    'chat_sessions': None,
+    'chat_messages': None,
+}
+
+def row_hash(row: Dict[str, Any], columns: List[str]) -> str:
+    """md5 of one row as table_checksum renders it"""
+    values = []
+    for column in columns:
+        value = row.get(column)
+        if value is None:
+            values.append('\\N')
+        else:
+            values.append(value if isinstance(value, str) else json.dumps(value))
+    return hashlib.md5('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+def rows_checksum(rows: List[Dict[str, Any]], columns: List[str]) -> str:
+    return hashlib.md5(''.join(sorted(row_hash(row, columns) for row in rows)).encode('utf-8')).hexdigest()
+
+_ingesters: Dict[str, Any] = {}
+_ingesters_lock = threading.Lock()
+
+def load_ingester(script: str):
+    with _ingesters_lock:
+        if script not in _ingesters:
+            spec = importlib.util.spec_from_file_location(script[:-3].replace('-', '_'), INGEST_DIR / script)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _ingesters[script] = module
+        return _ingesters[script]
+
+def parse_source(script: str, class_name: str, method: str, source_file: str) -> List[Dict[str, Any]]:
+    """Rows an ingester would upload, from its own parsing method"""
+    ingester = getattr(load_ingester(script), class_name)
+    processor = ingester.__new__(ingester)  # __init__ connects to Supabase, parsing does not need it
+    parse = getattr(processor, method)
+    path = str(INGEST_DIR / source_file)
+    if 'json_file' in inspect.signature(parse).parameters:
+        rows = parse(path)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = parse(json.load(f))
+    return rows[0] if isinstance(rows, tuple) else rows
+
+class CatalogVerifier:
+    def __init__(self, workers: int):
+        self.supabase_url = os.getenv('SUPABASE_URL')
+        self.supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+
+        if not self.supabase_url or not self.supabase_key:
+            print("❌ Missing Supabase environment variables")
+            sys.exit(1)
+
+        self.supabase = create_client(self.supabase_url, self.supabase_key)
+        self.workers = workers
+
+    def count(self, table: str) -> int:
+        return self.supabase.table(table).select('*', count='exact', head=True).execute().count
+
+    def checksum(self, table: str, columns: List[str]) -> Tuple[int, str]:
+        row = self.supabase.rpc('table_checksum', {'table_name': table, 'columns': columns}).execute().data[0]
+        return row['row_count'], row['checksum']
+
+    def verify(self) -> bool:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            stored = {table: pool.submit(self.checksum, table, columns)
+                      for table, (columns, _) in SOURCE_CHECKS.items()}
+            counted = {table: pool.submit(self.checksum, table, columns) if columns else pool.submit(self.count, table)
+                       for table, columns in COUNT_ONLY.items()}
+            parsed = {(table, source): pool.submit(parse_source, *source)
+                      for table, (_, sources) in SOURCE_CHECKS.items() for source in sources}
+            # The parsing methods print their progress; keep it out of the report
+            with redirect_stdout(io.StringIO()):
+                wait([*stored.values(), *counted.values(), *parsed.values()])
+
+            ok = True
+            print("🔍 Source tables:")
+            for table, (columns, sources) in SOURCE_CHECKS.items():
+                try:
+                    rows, checksum = stored[table].result()
+                except Exception as e:
+                    print(f"  ❌ {table:<22} {e}")
+                    ok = False
+                    continue
+                matched, expected = None, []
+                for source in sources:
+                    try:
+                        source_rows = parsed[(table, source)].result()
+                    except Exception as e:
+                        expected.append(f"{source[3]}: unreadable ({e})")
+                        continue
+                    if rows_checksum(source_rows, columns) == checksum:
+                        matched = source[3]
+                        break
+                    expected.append(f"{source[3]}: {len(source_rows)} rows")
+                if matched:
+                    print(f"  ✅ {table:<22} {rows:>6} rows  matches {matched}")
+                else:
+                    print(f"  ❌ {table:<22} {rows:>6} rows  differs from {'; '.join(expected)}")
+                    ok = False
+
+            print("\n📊 Other tables:")
+            for table, future in counted.items():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  ❌ {table:<22} {e}")
+                    ok = False
+                    continue
+                if isinstance(result, tuple):
+                    print(f"  ✅ {table:<22} {result[0]:>6} rows  checksum {result[1][:12]}")
+                else:
+                    print(f"  ✅ {table:<22} {result:>6} rows")
+
+        print(f"\n{'🎉 Catalog verified' if ok else '⚠️ Catalog does not match its sources'} "
+              f"in {time.perf_counter() - started:.2f}s")
+        return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify loaded tables against their source files")
+    parser.add_argument('--workers', type=int, default=16, help="concurrent requests")
+    args = parser.parse_args()
+
+    if not CatalogVerifier(args.workers).verify():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency of the chat route's catalog lookups: one PostgREST call per
+result set (searchCourses, searchSpecializations, searchCertificates, searchDiplomas,
+searchElectiveDocs) against a single get_chat_context call. Both paths go through
+the same Supabase REST endpoint the frontend uses, with each query embedded once
+up front so only database round trips are timed.
+
+Usage:
+  python benchmark_chat_context.py [--iterations 20] [--program "Software Engineering"] [--with-probe]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dotenv import load_dotenv
+import numpy as np
+from supabase import create_client
+
+from course_embeddings import EMBEDDING_MODEL, embed_texts, embedding_client
+
+# Load environment variables
+load_dotenv()
+
+QUERIES = [
+    "what AI electives can I take in ECE?",
+    "I want to learn machine learning, which courses should I choose",
+    "robotics and control courses for 3A",
+    "give me CSE recommendations about ethics and society",
+    "what specializations are there for software engineering",
+    "courses on power electronics and renewable energy",
+]
+
+# Stopword lists from searchCourses and extractSearchKeywords in frontend/src/lib/search.ts
+COURSE_STOPWORDS = {'what', 'can', 'i', 'choose', 'to', 'do', 'want', 'the', 'and', 'or', 'for', 'with', 'about',
+                    'from', 'are', 'is', 'in', 'on', 'at', 'by', 'of', 'a', 'an', 'havent', 'taken', 'any', 'give',
+                    'me', 'please'}
+OPTION_STOPWORDS = {'i', 'havent', 'have', 'taken', 'any', 'can', 'you', 'give', 'me', 'recommendations', 'for',
+                    'please', 'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'of', 'with', 'by'}
+
+def search_terms(query: str, stopwords: set, max_terms: int = 3) -> List[str]:
+    words = re.sub(r'[^\w\s]', ' ', query.lower()).split()
+    return [word for word in words if len(word) > 2 and word not in stopwords][:max_terms]
+
+def escape_like(term: str) -> str:
+    return re.sub(r'[%_]', r'\\\g<0>', term)
+
+class MultiCallPath:
+    """The per-table PostgREST queries the chat route made before get_chat_context"""
+
+    def __init__(self, supabase, with_probe: bool):
+        self.supabase = supabase
+        self.with_probe = with_probe
+
+    def courses(self, query: str, skills: Optional[List[str]], limit: int = 20):
+        lowered = query.lower()
+        if 'cse' in lowered or 'complementary studies' in lowered:
+            cse = self.supabase.table('courses').select('*').or_(
+                'title.ilike.%ethics%,title.ilike.%society%,title.ilike.%sustainability%,'
+                'title.ilike.%social%,title.ilike.%environment%'
+            ).limit(limit).execute()
+            if cse.data:
+                return cse.data
+
+        request = self.supabase.table('courses').select('*').limit(limit)
+        terms = search_terms(query, COURSE_STOPWORDS)
+        if terms:
+            request = request.or_(','.join(
+                f'title.ilike.%{escape_like(t)}%,description.ilike.%{escape_like(t)}%,skills.cs.["{t}"]' for t in terms
+            ))
+        else:
+            request = request.or_('title.ilike.%elective%,description.ilike.%elective%,'
+                                  'title.ilike.%course%,description.ilike.%course%')
+        if 'machine' in terms or 'learning' in terms:
+            request = request.or_('title.ilike.%artificial%,title.ilike.%intelligence%,title.ilike.%ai%,'
+                                  'title.ilike.%ml%,description.ilike.%artificial%,description.ilike.%intelligence%,'
+                                  'description.ilike.%ai%,description.ilike.%ml%')
+        if skills:
+            request = request.filter('skills', 'cs', '["' + '","'.join(skills) + '"]')
+
+        if self.with_probe:
+            # The connectivity check searchCourses used to run before every search
+            self.supabase.table('courses').select('id, title').limit(3).execute()
+        return request.execute().data
+
+    def options(self, table: str, query: str, program: Optional[str], limit: int = 3):
+        request = self.supabase.table(table).select('*').limit(limit)
+        if table != 'specializations':
+            request = request.eq('uw_engineering_listed', True)
+        terms = search_terms(query, OPTION_STOPWORDS)
+        if terms:
+            request = request.or_(','.join(
+                f'name.ilike.%{escape_like(t)}%,description.ilike.%{escape_like(t)}%' for t in terms
+            ))
+        if table == 'specializations' and program:
+            request = request.eq('program', program)
+        return request.execute().data
+
+    def run(self, query: str, embedding: List[float], program: str, skills: Optional[List[str]]) -> Dict:
+        return {
+            'courses': self.courses(query, skills),
+            'specializations': self.options('specializations', query, program),
+            'certificates': self.options('certificates', query, program),
+            'diplomas': self.options('diplomas', query, program),
+            'docs': self.supabase.rpc('search_elective_docs', {
+                'query_embedding': embedding, 'match_threshold': 0.6, 'match_count': 5
+            }).execute().data,
+        }
+
+class SingleCallPath:
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    def run(self, query: str, embedding: List[float], program: str, skills: Optional[List[str]]) -> Dict:
+        return self.supabase.rpc('get_chat_context', {
+            'query_text': query,
+            'query_embedding': embedding,
+            'program': program,
+            'skills': skills,
+        }).execute().data
+
+def time_path(run: Callable, cases: List[tuple], iterations: int) -> List[float]:
+    latencies = []
+    for _ in range(iterations):
+        for query, embedding in cases:
+            started = time.perf_counter()
+            run(query, embedding)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+def summarize(name: str, latencies: List[float]) -> float:
+    ms = np.array(latencies) * 1000
+    p50, p95 = np.percentile(ms, [50, 95])
+    print(f"  {name:<12} mean {ms.mean():7.1f} ms   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   ({len(ms)} requests)")
+    return statistics.median(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare multi-call and single-call chat context latency")
+    parser.add_argument('--iterations', type=int, default=20, help="passes over the query set")
+    parser.add_argument('--program', default='Software Engineering')
+    parser.add_argument('--skills', nargs='*', help="goal tags to filter courses by")
+    parser.add_argument('--with-probe', action='store_true', help="include the old connectivity probe query")
+    parser.add_argument('--random-embedding', action='store_true', help="skip OpenAI and use random unit vectors")
+    args = parser.parse_args()
+
+    supabase_url = os.getenv('SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('SUPABASE_ANON_KEY')
+    if not supabase_url or not supabase_key:
+        print("❌ Missing Supabase environment variables")
+        sys.exit(1)
+    supabase = create_client(supabase_url, supabase_key)
+
+    if args.random_embedding:
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((len(QUERIES), 1536))
+        embeddings = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+    else:
+        embeddings = embed_texts(embedding_client(), QUERIES, EMBEDDING_MODEL)
+    cases = list(zip(QUERIES, embeddings))
+
+    multi = MultiCallPath(supabase, args.with_probe)
+    single = SingleCallPath(supabase)
+    paths = {
+        'multi-call': lambda q, e: multi.run(q, e, args.program, args.skills),
+        'single-call': lambda q, e: single.run(q, e, args.program, args.skills),
+    }
+
+    # Same rows from both paths, checked before timing
+    for query, embedding in cases:
+        expected, actual = paths['multi-call'](query, embedding), paths['single-call'](query, embedding)
+        counts = {key: (len(expected[key] or []), len(actual[key] or [])) for key in expected}
+        mismatched = {key: pair for key, pair in counts.items() if pair[0] != pair[1]}
+        if mismatched:
+            print(f"⚠️ Result counts differ for {query!r}: {mismatched}")
+
+    # Warm connections and plans, then alternate so drift affects both paths alike
+    for run in paths.values():
+        time_path(run, cases, 1)
+    latencies = {name: [] for name in paths}
+    for _ in range(args.iterations):
+        for name, run in paths.items():
+            latencies[name].extend(time_path(run, cases, 1))
+
+    calls = 6 if args.with_probe else 5
+    print(f"📊 Chat context latency over {len(QUERIES)} queries x {args.iterations} iterations "
+          f"({calls} calls vs 1 per message)")
+    multi_median = summarize('multi-call', latencies['multi-call'])
+    single_median = summarize('single-call', latencies['single-call'])
+    print(f"\n⚡ Single call is {multi_median / single_median:.1f}x faster at the median "
+          f"({(multi_median - single_median) * 1000:.1f} ms saved per message)")
+
+if __name__ == "__main__":
+    main()
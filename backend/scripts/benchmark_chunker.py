@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the streaming chunker
+Writes a synthetic calendar-style dump of the requested size (or uses a real file),
+streams it through text_chunker and reports MB/s, chunks/s, the largest chunk in
+tokens and peak resident memory, which should stay flat as the input grows
+"""
+
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from text_chunker import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, chunk_stream, load_token_counter
+
+SUBJECTS = ['ECE', 'MTE', 'ME', 'SYDE', 'CHE', 'CIVE', 'MSE', 'NE', 'BME', 'GEOE']
+PHRASES = [
+    "Introduction to the analysis and design of {topic} systems",
+    "Students apply {topic} techniques to open-ended engineering problems",
+    "Topics include modelling, estimation and control of {topic} processes",
+    "Laboratory work reinforces the {topic} concepts covered in lectures",
+    "Prerequisite: a 2A or higher standing in an engineering program",
+    "Antirequisite: any course that substantially overlaps with this one",
+]
+TOPICS = ['signal processing', 'embedded', 'thermal', 'structural', 'machine learning',
+          'power electronics', 'fluid', 'control', 'materials', 'robotics']
+
+def write_synthetic_dump(path: Path, size_mb: int, seed: int = 0):
+    """Course-calendar-like paragraphs until the file reaches size_mb"""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            code = f"{rng.choice(SUBJECTS)} {rng.randint(100, 499)}"
+            sentences = [rng.choice(PHRASES).format(topic=rng.choice(TOPICS)) + '.'
+                         for _ in range(rng.randint(3, 9))]
+            paragraph = f"{code} - Course description. {' '.join(sentences)}\n\n"
+            f.write(paragraph)
+            written += len(paragraph.encode('utf-8'))
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run(path: Path, max_tokens: int, overlap_tokens: int, use_mmap: bool):
+    count_tokens = load_token_counter()
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    rss_before = peak_rss_mb()
+
+    chunks = 0
+    largest = 0
+    started = time.perf_counter()
+    for chunk in chunk_stream(str(path), max_tokens=max_tokens, overlap_tokens=overlap_tokens,
+                              use_mmap=use_mmap, count_tokens=count_tokens):
+        chunks += 1
+        largest = max(largest, count_tokens(chunk))
+    elapsed = time.perf_counter() - started
+
+    print(f"📄 {path.name}: {size_mb:.1f} MB {'(mmap)' if use_mmap else '(buffered)'}")
+    print(f"   {chunks} chunks in {elapsed:.2f}s — {size_mb / elapsed:.1f} MB/s, {chunks / elapsed:.0f} chunks/s")
+    print(f"   largest chunk {largest} tokens (limit {max_tokens}), "
+          f"peak RSS {peak_rss_mb():.0f} MB (started at {rss_before:.0f} MB)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming token-aware chunker")
+    parser.add_argument('--file', help="chunk this file instead of a synthetic dump")
+    parser.add_argument('--size-mb', type=int, default=100, help="synthetic dump size")
+    parser.add_argument('--max-tokens', type=int, default=DEFAULT_MAX_TOKENS)
+    parser.add_argument('--overlap-tokens', type=int, default=DEFAULT_OVERLAP_TOKENS)
+    parser.add_argument('--no-mmap', action='store_true', help="read with buffered I/O instead of a memory map")
+    args = parser.parse_args()
+
+    if args.file:
+        run(Path(args.file), args.max_tokens, args.overlap_tokens, not args.no_mmap)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"calendar_dump_{args.size_mb}mb.txt"
+        print(f"📝 Writing {args.size_mb} MB synthetic calendar dump...")
+        write_synthetic_dump(path, args.size_mb)
+        run(path, args.max_tokens, args.overlap_tokens, not args.no_mmap)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark the program/term course walker on synthetic program files
+Replicates the core curriculum JSON 1x, 10x and 100x (with renamed departments so
+every copy adds new courses) and checks that indexing time grows linearly
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Any
+
+from simple_uw_processor import index_programs
+
+DEFAULT_JSON = Path(__file__).parent.parent / 'data-to-ingest' / 'uw_engineering_core_by_program_TIDY.json'
+
+def make_synthetic_programs(json_data: Dict[str, Any], copies: int) -> Dict[str, Any]:
+    """Build a program file with `copies` renamed replicas of every program"""
+    programs = {}
+    for copy in range(copies):
+        suffix = f"X{copy}" if copy else ''
+        for program_name, program_data in json_data.get('programs', {}).items():
+            terms = {}
+            for term, courses_list in program_data.get('terms', {}).items():
+                # Rename "ECE 486 - ..." to "ECEX3 486 - ..." so each copy is a new course
+                terms[term] = [
+                    course.replace(' ', f"{suffix} ", 1) if suffix and course[:1].isupper() and ' - ' in course else course
+                    for course in courses_list
+                ]
+            programs[f"{program_name}{suffix}"] = {**program_data, 'terms': terms}
+    return {'programs': programs}
+
+def time_index(json_data: Dict[str, Any], repeats: int = 3) -> tuple:
+    """Return the best wall time over `repeats` runs and the resulting index"""
+    best = None
+    index = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        index = index_programs(json_data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, index
+
+def main():
+    json_file = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_JSON
+    if not json_file.exists():
+        print(f"❌ File not found: {json_file}")
+        sys.exit(1)
+
+    with open(json_file, 'r', encoding='utf-8') as f:
+        json_data = json.load(f)
+
+    print(f"📊 Benchmarking index_programs on {json_file.name}")
+    print(f"{'scale':>6} {'programs':>9} {'entries':>9} {'courses':>9} {'time (ms)':>10} {'us/entry':>9}")
+
+    baseline = None
+    for copies in (1, 10, 100):
+        synthetic = make_synthetic_programs(json_data, copies)
+        entries = sum(len(courses) for program in synthetic['programs'].values() for courses in program['terms'].values())
+        elapsed, index = time_index(synthetic)
+        per_entry = elapsed / entries * 1e6
+        baseline = baseline or per_entry
+        print(f"{copies:>5}x {len(index['programs']):>9} {entries:>9} {len(index['courses']):>9} {elapsed * 1000:>10.2f} {per_entry:>9.2f}")
+
+    ratio = per_entry / baseline
+    print(f"\n📈 Per-entry cost at 100x is {ratio:.2f}x the 1x cost ({'linear' if ratio < 2 else 'super-linear'})")
+
+if __name__ == "__main__":
+    main()
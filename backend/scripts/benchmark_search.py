@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Benchmark for quantized and two-stage embedding search
+Compares float32, float16, scalar int8 and binary sign-bit copies of the corpus:
+memory per copy, recall@10 against exact float32 search after re-ranking the coarse
+top N, and query latency. A second table sweeps Matryoshka prefix lengths and
+candidate counts for two-stage retrieval (short vector first, full vector re-score).
+A third table compares plain top-k document chunks with diverse selection (MMR over a
+larger pool, capped per source page): page recall@k, chunks repeating a page already
+picked, and words repeating text already in the context.
+Runs on the stored course/document embeddings, or on a synthetic clustered corpus
+when no database is available.
+
+Usage:
+  python benchmark_search.py [--table elective_docs|courses|all] [--candidates 100] [--queries 200]
+  python benchmark_search.py --short-dims 128,256,512 --candidate-sweep 50,100,200
+  python benchmark_search.py --diversity-sweep 0,0.2,0.3,0.5 --pool 25 --per-source 2 --context-k 5
+  python benchmark_search.py --synthetic 20000 [--dims 1536]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import numpy as np
+
+from diversify import mean_pairwise_similarity, mmr, redundant_tokens
+from quantized_index import QUANTIZATION_MODES, QuantizedIndex, exact_top_k, normalize, recall_at_k, top_k
+
+BENCHMARK_TABLES = ['courses', 'elective_docs']
+
+def load_corpus(table: str, column: str = 'embedding'):
+    """Embeddings and ids from the database, plus the on-disk size of each vector index"""
+    from dotenv import load_dotenv
+    import psycopg2
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables (use --synthetic to run offline)")
+        sys.exit(1)
+
+    tables = BENCHMARK_TABLES if table == 'all' else [table]
+    ids, vectors, index_sizes = [], [], {}
+    with psycopg2.connect(db_url) as conn:
+        with conn.cursor() as cur:
+            for name in tables:
+                cur.execute(f"SELECT id, {column}::text FROM {name} WHERE {column} IS NOT NULL")
+                for row_id, vector in cur.fetchall():
+                    ids.append(f"{name}:{row_id}")
+                    vectors.append(json.loads(vector))
+                cur.execute("""
+                    SELECT indexname, pg_relation_size(format('%%I', indexname)::regclass)
+                    FROM pg_indexes
+                    WHERE tablename = %s AND indexdef ~ '(ivfflat|hnsw)'
+                """, (name,))
+                index_sizes.update(cur.fetchall())
+    return ids, np.asarray(vectors, dtype=np.float32), index_sizes
+
+def synthetic_corpus(rows: int, dims: int, clusters: int = 64, seed: int = 0):
+    """Clustered vectors, roughly the shape of topic-grouped course text
+
+    Variance decays along the dimensions the way it does in Matryoshka-trained
+    embeddings, so prefix truncation behaves qualitatively like on real vectors.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dims)).astype(np.float32)
+    assignment = rng.integers(0, clusters, rows)
+    vectors = centers[assignment] + 0.8 * rng.standard_normal((rows, dims)).astype(np.float32)
+    decay = 1 / np.sqrt(1 + np.arange(dims, dtype=np.float32) / 32)
+    return [f"synthetic:{i}" for i in range(rows)], vectors * decay
+
+def make_queries(corpus: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    """Perturbed corpus rows, so every query has real near neighbours"""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(corpus), size=min(count, len(corpus)), replace=False)
+    noise = rng.standard_normal((len(picks), corpus.shape[1])).astype(np.float32)
+    base = corpus[picks] / np.linalg.norm(corpus[picks], axis=1, keepdims=True)
+    return base + 0.3 * noise / np.sqrt(corpus.shape[1])
+
+def load_doc_chunks(column: str = 'embedding'):
+    """Document chunk embeddings with their source page and text"""
+    from dotenv import load_dotenv
+    import psycopg2
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables (use --synthetic to run offline)")
+        sys.exit(1)
+
+    with psycopg2.connect(db_url) as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT source_url, text, {column}::text FROM elective_docs WHERE {column} IS NOT NULL")
+            rows = cur.fetchall()
+    vectors = np.asarray([json.loads(vector) for _, _, vector in rows], dtype=np.float32)
+    return vectors, [source for source, _, _ in rows], [text for _, text, _ in rows]
+
+def synthetic_chunks(pages: int, dims: int, seed: int = 2):
+    """Synthetic pages split into 1-4 overlapping chunks each, which embed close together"""
+    rng = np.random.default_rng(seed)
+    _, page_vectors = synthetic_corpus(pages, dims)
+    page_vectors = normalize(page_vectors)
+    counts = rng.integers(1, 5, pages)
+    sources = np.repeat(np.arange(pages), counts)
+    noise = rng.standard_normal((len(sources), dims)).astype(np.float32)
+    return page_vectors[sources] + 0.25 * noise / np.sqrt(dims), [f"page:{page}" for page in sources], page_vectors
+
+def format_bytes(size: float) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def run_benchmark(ids, corpus: np.ndarray, queries: np.ndarray, k: int, candidates: int, keep_full: bool):
+    truth = exact_top_k(corpus, queries, k)
+    baseline = None
+    results = []
+
+    for mode in QUANTIZATION_MODES:
+        index = QuantizedIndex(corpus, ids, mode=mode, keep_full=keep_full)
+        memory = index.memory_bytes()
+        baseline = baseline or memory
+
+        started = time.perf_counter()
+        found = [index.search_rows(query, k, candidates)[0] for query in queries]
+        elapsed = time.perf_counter() - started
+
+        results.append({
+            'mode': mode,
+            'memory': memory,
+            'saved': 1 - memory / baseline,
+            'recall': recall_at_k(found, truth, k),
+            'ms_per_query': 1000 * elapsed / len(queries),
+        })
+    return results
+
+def run_two_stage_benchmark(ids, corpus: np.ndarray, queries: np.ndarray, k: int, short_dims, candidate_counts):
+    """Recall/latency/memory of prefix-vector candidates re-scored on the full vector"""
+    truth = exact_top_k(corpus, queries, k)
+    full_memory = corpus.shape[0] * corpus.shape[1] * 4
+    results = []
+
+    for dims in short_dims:
+        index = QuantizedIndex(corpus, ids, mode='float32', prefix_dims=dims)
+        for candidates in candidate_counts:
+            started = time.perf_counter()
+            found = [index.search_rows(query, k, candidates)[0] for query in queries]
+            elapsed = time.perf_counter() - started
+            results.append({
+                'dims': dims,
+                'candidates': candidates,
+                'memory': index.memory_bytes(),
+                'saved': 1 - index.memory_bytes() / full_memory,
+                'recall': recall_at_k(found, truth, k),
+                'ms_per_query': 1000 * elapsed / len(queries),
+            })
+    return results
+
+def run_diversity_benchmark(vectors: np.ndarray, sources, texts, queries: np.ndarray, k: int, pool: int,
+                            diversities, per_source: int):
+    """Plain top-k chunks against MMR picks from the top `pool`, per diversity weight"""
+    sources = np.asarray(sources, dtype=object)
+    scores = normalize(queries) @ normalize(vectors).T
+    pools = [top_k(row, pool) for row in scores]
+    truth = []
+    for row in scores:
+        # The k best distinct pages, each ranked by its best chunk
+        pages = []
+        for index in top_k(row, k * 10):
+            if sources[index] not in pages:
+                pages.append(sources[index])
+            if len(pages) == k:
+                break
+        truth.append(set(pages))
+
+    settings = [('plain top-k', None, None)] + [(f"mmr {weight:g}", weight, per_source) for weight in diversities]
+    results = []
+    for label, weight, cap in settings:
+        started = time.perf_counter()
+        picked = []
+        for query, candidates in zip(queries, pools):
+            if weight is None:
+                picked.append(candidates[:k])
+            else:
+                order = mmr(query, vectors[candidates], k, weight, sources[candidates], cap)
+                picked.append(candidates[order])
+        elapsed = time.perf_counter() - started
+
+        recall = repeats = redundant = words = similarity = 0
+        for rows, pages in zip(picked, truth):
+            picked_pages = sources[rows].tolist()
+            recall += len(set(picked_pages) & pages) / max(len(pages), 1)
+            repeats += len(picked_pages) - len(set(picked_pages))
+            similarity += mean_pairwise_similarity(vectors[rows])
+            if texts is not None:
+                repeated, total = redundant_tokens([texts[row] for row in rows])
+                redundant += repeated
+                words += total
+        results.append({
+            'setting': label,
+            'recall': recall / len(queries),
+            'repeats': repeats / max(sum(len(rows) for rows in picked), 1),
+            'redundant': redundant / words if words else None,
+            'similarity': similarity / len(queries),
+            'ms_per_query': 1000 * elapsed / len(queries),
+        })
+    return results
+
+def parse_int_list(value: str):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized and two-stage embedding search")
+    parser.add_argument('--table', choices=BENCHMARK_TABLES + ['all'], default='all')
+    parser.add_argument('--synthetic', type=int, help="benchmark N synthetic vectors instead of the database")
+    parser.add_argument('--dims', type=int, default=1536, help="synthetic vector size")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--candidates', type=int, default=100, help="coarse top N re-ranked in full precision")
+    parser.add_argument('--no-full', action='store_true', help="re-rank from the quantized codes, not float32")
+    parser.add_argument('--short-dims', default='128,256,512', help="Matryoshka prefix lengths to sweep ('' to skip)")
+    parser.add_argument('--candidate-sweep', default='50,100,200', help="candidate counts for the two-stage sweep")
+    parser.add_argument('--diversity-sweep', default='0.1,0.2,0.3', help="MMR diversity weights to compare ('' to skip)")
+    parser.add_argument('--pool', type=int, default=25, help="chunks MMR chooses from")
+    parser.add_argument('--per-source', type=int, default=2, help="chunks per source page")
+    parser.add_argument('--context-k', type=int, default=5, help="chunks passed to the model")
+    args = parser.parse_args()
+
+    index_sizes = {}
+    if args.synthetic:
+        ids, corpus = synthetic_corpus(args.synthetic, args.dims)
+        source = f"{args.synthetic} synthetic vectors"
+    else:
+        ids, corpus, index_sizes = load_corpus(args.table)
+        source = f"{len(ids)} stored embeddings ({args.table})"
+    if len(corpus) == 0:
+        print("❌ No embeddings to benchmark")
+        sys.exit(1)
+
+    queries = make_queries(corpus, args.queries)
+    print(f"📊 {source}, {corpus.shape[1]} dims, {len(queries)} queries, "
+          f"re-ranking top {args.candidates} {'from codes' if args.no_full else 'in float32'}")
+
+    results = run_benchmark(ids, corpus, queries, args.k, args.candidates, keep_full=not args.no_full)
+
+    print(f"\n{'mode':>8} {'memory':>10} {'saved':>7} {f'recall@{args.k}':>10} {'ms/query':>9}")
+    for result in results:
+        print(f"{result['mode']:>8} {format_bytes(result['memory']):>10} {result['saved']:>6.1%} "
+              f"{result['recall']:>10.3f} {result['ms_per_query']:>9.2f}")
+    if not args.no_full:
+        print(f"\n💡 Memory is the coarse copy only; re-ranking also reads {format_bytes(corpus.nbytes)} of float32 "
+              f"vectors (kept on disk or in the table in a memory-bound setup)")
+
+    short_dims = [dims for dims in parse_int_list(args.short_dims) if dims < corpus.shape[1]]
+    if short_dims:
+        sweep = run_two_stage_benchmark(ids, corpus, queries, args.k, short_dims, parse_int_list(args.candidate_sweep))
+        print(f"\n🪆 Two-stage: prefix candidates, full-vector re-score")
+        print(f"{'dims':>6} {'top N':>6} {'index':>10} {'saved':>7} {f'recall@{args.k}':>10} {'ms/query':>9}")
+        for result in sweep:
+            print(f"{result['dims']:>6} {result['candidates']:>6} {format_bytes(result['memory']):>10} "
+                  f"{result['saved']:>6.1%} {result['recall']:>10.3f} {result['ms_per_query']:>9.2f}")
+
+    diversities = [float(part) for part in args.diversity_sweep.split(',') if part.strip()]
+    if diversities and (args.synthetic or args.table in ('elective_docs', 'all')):
+        if args.synthetic:
+            chunks, sources, page_vectors = synthetic_chunks(max(args.synthetic // 3, 1), args.dims)
+            texts = None
+            chunk_queries = make_queries(page_vectors, args.queries)
+        else:
+            chunks, sources, texts = load_doc_chunks()
+            chunk_queries = make_queries(chunks, args.queries) if len(chunks) else None
+        if chunk_queries is not None:
+            diversity = run_diversity_benchmark(chunks, sources, texts, chunk_queries, args.context_k, args.pool,
+                                                diversities, args.per_source)
+            print(f"\n🧩 Diverse context: {len(chunks)} chunks from {len(set(sources))} pages, top {args.context_k} "
+                  f"of {args.pool}, at most {args.per_source} per page")
+            print(f"{'setting':>12} {f'page recall@{args.context_k}':>15} {'repeat pages':>13} "
+                  f"{'repeat words':>13} {'mean sim':>9} {'ms/query':>9}")
+            for result in diversity:
+                words = f"{result['redundant']:.1%}" if result['redundant'] is not None else '-'
+                print(f"{result['setting']:>12} {result['recall']:>15.3f} {result['repeats']:>12.1%} "
+                      f"{words:>13} {result['similarity']:>9.3f} {result['ms_per_query']:>9.2f}")
+
+    if index_sizes:
+        print("\n🗂️ Vector indexes in the database:")
+        for name, size in sorted(index_sizes.items()):
+            print(f"  {name}: {format_bytes(size)}")
+
+if __name__ == "__main__":
+    main()
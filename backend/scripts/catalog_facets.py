@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Materialized facet counts for the catalog filters
+Courses are numbered in id order and every facet value (a department, a level, a
+term offered, a skill) gets a bitmap with bit i set when course i has it. How many
+courses match a filter combination is then an OR of the chosen values within
+dept/level/terms_offered, an AND across skills (like searchCourses), an AND across
+facets and a popcount, without reading courses. The bitmaps are stored in
+course_facets (see data-to-ingest/add-course-facets.sql), where count_courses_by_facets
+and get_course_facets answer the same questions in SQL. The ingestion scripts and
+skill_tagging.py rebuild them after changing courses.
+
+Commands:
+  build                          rebuild the bitmaps from courses
+  count [--dept ECE,SE] [--level 300,400] [--terms-offered F] [--skills robotics]
+                                 matching courses and per-value counts, from course_facets
+  benchmark [--courses 5000] [--queries 20000]
+                                 bitmap counts against a scan of the catalog
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+# Filter keys, named after the courses columns they come from
+FACETS = ['dept', 'level', 'terms_offered', 'skills']
+
+# Facets where a course must have every chosen value; the others match any of them
+ALL_REQUIRED = {'skills'}
+
+def facet_values(course: Dict[str, Any], facet: str) -> List[str]:
+    """A course's values for one facet, as the text stored in course_facets.value"""
+    value = course.get(facet)
+    if value is None or value == '':
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value if item not in (None, '')]
+    return [str(value)]
+
+def wanted_values(wanted: Any) -> List[str]:
+    if wanted is None:
+        return []
+    if not isinstance(wanted, (list, tuple, set)):
+        wanted = [wanted]
+    return [str(value) for value in wanted]
+
+def course_matches(course: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """The filter semantics of FacetIndex, one course at a time"""
+    for facet, wanted in filters.items():
+        wanted = set(wanted_values(wanted))
+        if not wanted:
+            continue
+        values = set(facet_values(course, facet))
+        if facet in ALL_REQUIRED:
+            if not wanted <= values:
+                return False
+        elif not wanted & values:
+            return False
+    return True
+
+def to_bit_string(bitmap: int, size: int) -> str:
+    """Bitmap as a BIT VARYING literal, ordinal 0 first"""
+    return format(bitmap, f'0{size}b')[::-1] if size else ''
+
+def popcount(bitmap: int) -> int:
+    return bin(bitmap).count('1')
+
+class FacetIndex:
+    """One integer bitmap per (facet, value) over the courses in id order"""
+
+    def __init__(self, course_ids: List[str], bitmaps: Dict[str, Dict[str, int]]):
+        self.course_ids = course_ids
+        self.bitmaps = {facet: bitmaps.get(facet, {}) for facet in FACETS}
+        self.all = (1 << len(course_ids)) - 1
+
+    @classmethod
+    def from_courses(cls, courses: Iterable[Dict[str, Any]]) -> 'FacetIndex':
+        course_ids = []
+        bitmaps: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        for ordinal, course in enumerate(courses):
+            course_ids.append(course['id'])
+            bit = 1 << ordinal
+            for facet in FACETS:
+                values = bitmaps[facet]
+                for value in set(facet_values(course, facet)):
+                    values[value] = values.get(value, 0) | bit
+        return cls(course_ids, bitmaps)
+
+    def mask(self, filters: Dict[str, Any], skip_facet: Optional[str] = None) -> int:
+        """Bitmap of the courses matching filters, leaving out skip_facet's filter"""
+        mask = self.all
+        for facet, wanted in filters.items():
+            if facet not in self.bitmaps:
+                raise ValueError(f"Unknown course facet {facet}")
+            wanted = wanted_values(wanted)
+            if facet == skip_facet or not wanted:
+                continue
+            values = self.bitmaps[facet]
+            if facet in ALL_REQUIRED:
+                for value in wanted:
+                    mask &= values.get(value, 0)
+            else:
+                matching = 0
+                for value in wanted:
+                    matching |= values.get(value, 0)
+                mask &= matching
+        return mask
+
+    def count(self, filters: Dict[str, Any]) -> int:
+        return popcount(self.mask(filters))
+
+    def facet_counts(self, filters: Dict[str, Any]) -> Dict[str, List[Tuple[str, int]]]:
+        """Courses per value of every facet, most first, like get_course_facets.
+        A facet's own filter is left out except for skills, so alternatives keep their counts."""
+        counts = {}
+        for facet in FACETS:
+            mask = self.mask(filters, None if facet in ALL_REQUIRED else facet)
+            counts[facet] = sorted(((value, popcount(bitmap & mask)) for value, bitmap in self.bitmaps[facet].items()),
+                                   key=lambda item: (-item[1], item[0]))
+        return counts
+
+def load_courses(conn) -> List[Dict[str, Any]]:
+    from psycopg2.extras import RealDictCursor
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT id, dept, level, terms_offered, skills FROM courses ORDER BY id")
+        return cur.fetchall()
+
+def materialize(conn) -> FacetIndex:
+    """Rebuild course_facet_rows and course_facets from courses in one transaction"""
+    from psycopg2.extras import execute_values
+
+    index = FacetIndex.from_courses(load_courses(conn))
+    size = len(index.course_ids)
+    rows = [('all', 'all', size, to_bit_string(index.all, size))]
+    for facet in FACETS:
+        rows.extend((facet, value, popcount(bitmap), to_bit_string(bitmap, size))
+                    for value, bitmap in index.bitmaps[facet].items())
+
+    with conn:
+        with conn.cursor() as cur:
+            # DELETE rather than TRUNCATE so readers keep the old bitmaps until the commit
+            cur.execute("DELETE FROM course_facet_rows")
+            cur.execute("DELETE FROM course_facets")
+            execute_values(cur, "INSERT INTO course_facet_rows (ordinal, course_id) VALUES %s",
+                           list(enumerate(index.course_ids)), page_size=5000)
+            execute_values(cur, "INSERT INTO course_facets (facet, value, courses, bitmap) VALUES %s",
+                           rows, template="(%s, %s, %s, %s::BIT VARYING)", page_size=1000)
+    return index
+
+def refresh(conn) -> Optional[FacetIndex]:
+    """materialize, with a hint instead of an error when the migration has not been run"""
+    import psycopg2
+
+    try:
+        index = materialize(conn)
+    except psycopg2.errors.UndefinedTable:
+        print("⚠️ course_facets not found; run data-to-ingest/add-course-facets.sql to enable catalog facets")
+        return None
+    print(f"✅ Catalog facets rebuilt: {len(index.course_ids)} courses, "
+          f"{sum(len(index.bitmaps[facet]) for facet in FACETS)} facet values")
+    return index
+
+def refresh_after_ingest():
+    """Rebuild the facets at the end of an ingestion run that changed courses"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("⚠️ DATABASE_URL not set; run 'python ../scripts/catalog_facets.py build' to refresh the catalog facets")
+        return
+
+    import psycopg2
+
+    conn = psycopg2.connect(db_url)
+    try:
+        refresh(conn)
+    finally:
+        conn.close()
+
+def show_counts(conn, filters: Dict[str, Any], top: int):
+    import json
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT count_courses_by_facets(%s::JSONB)", (json.dumps(filters),))
+        total = cur.fetchone()[0]
+        cur.execute("SELECT facet, value, courses, selected FROM get_course_facets(%s::JSONB)", (json.dumps(filters),))
+        rows = cur.fetchall()
+
+    print(f"📊 {total} courses match {json.dumps(filters) if filters else 'no filters'}")
+    for facet in FACETS:
+        values = [row for row in rows if row[0] == facet]
+        listed = [f"{'*' if selected else ''}{value} {courses}" for _, value, courses, selected in values[:top]]
+        more = f" (+{len(values) - top} more)" if len(values) > top else ''
+        print(f"  {facet:<14} {', '.join(listed) or '-'}{more}")
+
+def random_filters(rng, index: FacetIndex) -> Dict[str, Any]:
+    filters = {}
+    for facet in rng.choice(FACETS, size=int(rng.integers(1, 4)), replace=False):
+        values = sorted(index.bitmaps[facet])
+        if values:
+            filters[str(facet)] = [str(value) for value in
+                                   rng.choice(values, size=min(len(values), int(rng.integers(1, 3))), replace=False)]
+    return filters
+
+def benchmark(courses: int, queries: int):
+    import numpy as np
+
+    from recommendation_scorer import synthetic_catalog
+
+    rows, _ = synthetic_catalog(courses)
+    started = time.perf_counter()
+    index = FacetIndex.from_courses(rows)
+    built = time.perf_counter()
+    print(f"🧱 Indexed {len(rows)} courses, {sum(len(index.bitmaps[facet]) for facet in FACETS)} facet values "
+          f"in {(built - started) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(1)
+    workload = [random_filters(rng, index) for _ in range(queries)]
+
+    started = time.perf_counter()
+    bitmap_counts = [index.count(filters) for filters in workload]
+    bitmap_seconds = time.perf_counter() - started
+
+    scanned = workload[:max(1, queries // 10)]
+    started = time.perf_counter()
+    scan_counts = [sum(1 for course in rows if course_matches(course, filters)) for filters in scanned]
+    scan_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for bitmap, scan in zip(bitmap_counts, scan_counts) if bitmap != scan)
+    started = time.perf_counter()
+    for filters in workload[:1000]:
+        index.facet_counts(filters)
+    facet_seconds = time.perf_counter() - started
+
+    print(f"⚡ bitmap counts: {queries / bitmap_seconds:,.0f} queries/s")
+    print(f"🐢 catalog scan:  {len(scanned) / scan_seconds:,.0f} queries/s "
+          f"({(scan_seconds / len(scanned)) / (bitmap_seconds / queries):.0f}x slower)")
+    print(f"📊 full facet panels: {min(1000, queries) / facet_seconds:,.0f} /s")
+    print(f"{'✅' if not mismatches else '❌'} {len(scanned) - mismatches}/{len(scanned)} counts match the scan")
+
+def parse_list(value: Optional[str]) -> Optional[List[str]]:
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialized facet counts for the catalog filters")
+    parser.add_argument('command', choices=['build', 'count', 'benchmark'])
+    parser.add_argument('--dept', help="comma-separated, any of")
+    parser.add_argument('--level', help="comma-separated, any of")
+    parser.add_argument('--terms-offered', help="comma-separated, any of")
+    parser.add_argument('--skills', help="comma-separated, all of")
+    parser.add_argument('--top', type=int, default=8, help="values listed per facet")
+    parser.add_argument('--courses', type=int, default=5000, help="benchmark catalog size")
+    parser.add_argument('--queries', type=int, default=20000)
+    args = parser.parse_args()
+
+    if args.command == 'benchmark':
+        benchmark(args.courses, args.queries)
+        return
+
+    from dotenv import load_dotenv
+    import psycopg2
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    conn = psycopg2.connect(db_url)
+    try:
+        if args.command == 'build':
+            if refresh(conn) is None:
+                sys.exit(1)
+        else:
+            filters = {facet: values for facet, values in (
+                ('dept', parse_list(args.dept)),
+                ('level', parse_list(args.level)),
+                ('terms_offered', parse_list(args.terms_offered)),
+                ('skills', parse_list(args.skills)),
+            ) if values}
+            show_counts(conn, filters, args.top)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Local checkpoint journal for long ingestion and embedding runs
+Records which batches of a job finished so a rerun with --resume skips them
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+DEFAULT_JOURNAL_PATH = Path(__file__).parent.parent / '.checkpoints' / 'ingestion_journal.sqlite3'
+
+def hash_text(*parts: Any) -> str:
+    """Stable short hash of strings/values, used as input fingerprints and batch keys"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()[:16]
+
+def hash_records(records: Iterable[Any]) -> str:
+    """Hash a list of rows (dicts/lists) independent of key order"""
+    digest = hashlib.sha256()
+    for record in records:
+        digest.update(json.dumps(record, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()[:16]
+
+def hash_file(path: str) -> str:
+    """Hash a file's contents without loading it all into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+class CheckpointJournal:
+    """SQLite journal of completed batches, keyed by job name and input hash
+
+    A fresh run (resume=False) forgets earlier progress for the job; a resumed
+    run only skips batches recorded for the same input hash, so changed input
+    is always reprocessed.
+    """
+
+    def __init__(self, job: str, input_hash: str, resume: bool = False, path: Optional[str] = None):
+        self.job = job
+        self.input_hash = input_hash
+        self.resume = resume
+        self.path = Path(path or os.getenv('CHECKPOINT_JOURNAL') or DEFAULT_JOURNAL_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS completed_batches (
+                job TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                batch_key TEXT NOT NULL,
+                rows INTEGER DEFAULT 0,
+                completed_at REAL NOT NULL,
+                PRIMARY KEY (job, input_hash, batch_key)
+            )
+        """)
+
+        if resume:
+            cur = self.conn.execute(
+                "SELECT batch_key FROM completed_batches WHERE job = ? AND input_hash = ?",
+                (job, input_hash)
+            )
+            self.completed = {row[0] for row in cur}
+        else:
+            self.conn.execute("DELETE FROM completed_batches WHERE job = ?", (job,))
+            self.completed = set()
+        self.conn.commit()
+
+        self.skipped = 0
+
+    def is_done(self, batch_key: str) -> bool:
+        """Check whether a batch finished in an earlier run (counts it as skipped)"""
+        if batch_key in self.completed:
+            self.skipped += 1
+            return True
+        return False
+
+    def mark_done(self, batch_key: str, rows: int = 0):
+        """Record a batch as finished; call only after its writes are committed"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO completed_batches (job, input_hash, batch_key, rows, completed_at) VALUES (?, ?, ?, ?, ?)",
+            (self.job, self.input_hash, batch_key, rows, time.time())
+        )
+        self.conn.commit()
+        self.completed.add(batch_key)
+
+    def has_progress(self) -> bool:
+        """True when resuming a run that already completed some batches"""
+        return bool(self.completed)
+
+    def report(self):
+        """Print how much work the resume skipped"""
+        if self.resume:
+            print(f"⏭️ Resume: skipped {self.skipped} completed batches for {self.job}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
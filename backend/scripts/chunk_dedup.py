@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Exact and near-duplicate detection for document chunks before they are embedded
+Each chunk gets a content hash of its normalised text and a MinHash signature over
+word shingles, banded for LSH. A chunk is skipped when its hash already exists, or
+when an LSH candidate from the same run or from elective_docs has an estimated
+Jaccard similarity above the threshold (see data-to-ingest/add-elective-doc-dedup.sql)
+
+Commands:
+  backfill [--batch-size n] [--rehash]
+                              hash and sign existing elective_docs rows, deleting newer
+                              exact copies (--rehash recomputes every stored hash)
+  report [--threshold t]      count near-duplicate pairs already in elective_docs
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import numpy as np
+
+NUM_PERM = 128
+NUM_BANDS = 16  # 8 rows per band: candidates from roughly 0.7 Jaccard upwards
+SHINGLE_WORDS = 3
+DEFAULT_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(42)  # fixed seed: signatures are stored and must stay comparable
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace; stored hashes are only ever computed here"""
+    return re.sub(r'\s+', ' ', text.strip()).lower()
+
+def content_hash(text: str) -> str:
+    return hashlib.md5(normalize_text(text).encode('utf-8')).hexdigest()
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> np.ndarray:
+    """32-bit hashes of the word n-grams of a chunk"""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < size:
+        grams = [' '.join(words)] if words else ['']
+    else:
+        grams = [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.fromiter({zlib.crc32(gram.encode('utf-8')) for gram in grams}, dtype=np.uint64)
+
+def minhash(text: str) -> np.ndarray:
+    """NUM_PERM-value MinHash signature; (a*x + b) stays below 2**64 for 32-bit a, b and x"""
+    hashed = (np.outer(shingles(text), _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return (hashed.min(axis=0) & np.uint64(0xFFFFFFFF)).astype(np.int64)
+
+def lsh_bands(signature: Sequence[int]) -> List[str]:
+    """One bucket key per band; chunks sharing any key are near-duplicate candidates"""
+    rows = NUM_PERM // NUM_BANDS
+    signature = np.asarray(signature, dtype=np.int64)
+    return [
+        f"{band}:{hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).hexdigest()}"
+        for band in range(NUM_BANDS)
+    ]
+
+def estimated_jaccard(a: Sequence[int], b: Sequence[int]) -> float:
+    return float(np.mean(np.asarray(a) == np.asarray(b)))
+
+def dedup_enabled(conn) -> bool:
+    """True once add-elective-doc-dedup.sql has added the signature columns"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'elective_docs' AND column_name = 'lsh_bands'
+        """)
+        return cur.fetchone() is not None
+
+class ChunkDeduplicator:
+    """Filters chunks against everything seen in this run and, with a connection, elective_docs"""
+
+    def __init__(self, conn=None, threshold: float = DEFAULT_THRESHOLD):
+        self.conn = conn
+        self.threshold = threshold
+        self.hashes = set()
+        self.buckets: Dict[str, List[int]] = defaultdict(list)
+        self.signatures: List[np.ndarray] = []
+        self.stats = {'kept': 0, 'exact': 0, 'near': 0}
+
+    def _near_in_run(self, signature: np.ndarray, bands: List[str]) -> bool:
+        candidates = {i for band in bands for i in self.buckets.get(band, ())}
+        return any(estimated_jaccard(signature, self.signatures[i]) >= self.threshold for i in candidates)
+
+    def _remember(self, digest: str, signature: np.ndarray, bands: List[str]):
+        self.hashes.add(digest)
+        for band in bands:
+            self.buckets[band].append(len(self.signatures))
+        self.signatures.append(signature)
+
+    def _corpus_matches(self, entries: List[Dict]):
+        """Exact hashes and near-duplicate entries already stored, in two queries per batch"""
+        if not self.conn or not entries:
+            return set(), set()
+
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT content_hash FROM elective_docs WHERE content_hash = ANY(%s)",
+                        ([e['content_hash'] for e in entries],))
+            exact = {row[0] for row in cur.fetchall()}
+
+            all_bands = sorted({band for e in entries for band in e['lsh_bands']})
+            cur.execute("SELECT lsh_bands, minhash FROM elective_docs WHERE lsh_bands && %s::text[]", (all_bands,))
+            stored = cur.fetchall()
+
+        near = set()
+        for position, entry in enumerate(entries):
+            bands = set(entry['lsh_bands'])
+            for stored_bands, stored_signature in stored:
+                if bands.intersection(stored_bands) and \
+                        estimated_jaccard(entry['minhash'], stored_signature) >= self.threshold:
+                    near.add(position)
+                    break
+        return exact, near
+
+    def filter(self, chunks: Sequence[str]) -> List[Optional[Dict]]:
+        """Per chunk: a dict of dedup columns to store, or None if it duplicates something"""
+        entries = []
+        for chunk in chunks:
+            signature = minhash(chunk)
+            entries.append({
+                'content_hash': content_hash(chunk),
+                'minhash': signature,
+                'lsh_bands': lsh_bands(signature),
+            })
+
+        exact, near = self._corpus_matches(entries)
+        results = []
+        for position, entry in enumerate(entries):
+            if entry['content_hash'] in self.hashes or entry['content_hash'] in exact:
+                self.stats['exact'] += 1
+                results.append(None)
+            elif position in near or self._near_in_run(entry['minhash'], entry['lsh_bands']):
+                self.stats['near'] += 1
+                results.append(None)
+            else:
+                self._remember(entry['content_hash'], entry['minhash'], entry['lsh_bands'])
+                self.stats['kept'] += 1
+                results.append({**entry, 'minhash': entry['minhash'].tolist()})
+        return results
+
+    def report(self):
+        print(f"🧹 Dedup: kept {self.stats['kept']}, skipped {self.stats['exact']} exact "
+              f"and {self.stats['near']} near-duplicate chunks")
+
+BACKFILL_QUERY = {
+    'unsigned': """
+        SELECT id, text, created_at FROM elective_docs
+        WHERE lsh_bands IS NULL OR content_hash IS NULL
+        ORDER BY created_at, id
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    """,
+    'rehash': """
+        SELECT id, text, created_at FROM elective_docs
+        WHERE %(after)s::timestamptz IS NULL OR (created_at, id) > (%(after)s, %(after_id)s)
+        ORDER BY created_at, id
+        LIMIT %(limit)s
+        FOR UPDATE
+    """,
+}
+
+def backfill(conn, batch_size: int, rehash: bool = False):
+    """Hash and sign rows stored before dedup existed, oldest first
+
+    A row whose hash another row already has is an exact duplicate and is deleted, so
+    the oldest copy is kept. --rehash walks every row, for tables whose hashes were
+    computed before the hashing moved here.
+    """
+    total = deleted = 0
+    after = after_id = None
+    while True:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(BACKFILL_QUERY['rehash' if rehash else 'unsigned'],
+                            {'limit': batch_size, 'after': after, 'after_id': after_id})
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                after, after_id = rows[-1][2], rows[-1][0]
+
+                digests = [content_hash(text or '') for _, text, _ in rows]
+                cur.execute("SELECT content_hash, id FROM elective_docs WHERE content_hash = ANY(%s)", (digests,))
+                owners = dict(cur.fetchall())
+
+                updates, duplicates = [], []
+                for (row_id, text, _), digest in zip(rows, digests):
+                    if owners.get(digest, row_id) != row_id:
+                        duplicates.append(row_id)
+                        continue
+                    owners[digest] = row_id
+                    signature = minhash(text or '')
+                    updates.append((digest, signature.tolist(), lsh_bands(signature), row_id))
+                if duplicates:
+                    cur.execute("DELETE FROM elective_docs WHERE id = ANY(%s)", (duplicates,))
+                cur.executemany("""
+                    UPDATE elective_docs SET content_hash = %s, minhash = %s, lsh_bands = %s
+                    WHERE id = %s
+                """, updates)
+        total += len(updates)
+        deleted += len(duplicates)
+        print(f"🔄 Signed {total} chunks, deleted {deleted} exact duplicates")
+    print(f"✅ Backfilled {total} chunks ({deleted} exact duplicates deleted)")
+
+def report_duplicates(conn, threshold: float):
+    """Near-duplicate pairs currently stored, found through the LSH buckets"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, source_url, minhash, lsh_bands FROM elective_docs WHERE lsh_bands IS NOT NULL")
+        rows = cur.fetchall()
+
+    buckets = defaultdict(list)
+    for position, (_, _, _, bands) in enumerate(rows):
+        for band in bands:
+            buckets[band].append(position)
+
+    pairs = set()
+    for members in buckets.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if (a, b) not in pairs and estimated_jaccard(rows[a][2], rows[b][2]) >= threshold:
+                    pairs.add((a, b))
+
+    print(f"📊 {len(rows)} signed chunks, {len(pairs)} near-duplicate pairs at Jaccard >= {threshold}")
+    for a, b in sorted(pairs)[:20]:
+        print(f"  {rows[a][1]} ~ {rows[b][1]}")
+
+def main():
+    from dotenv import load_dotenv
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description="Deduplicate elective_docs chunks")
+    parser.add_argument('command', choices=['backfill', 'report'])
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--rehash', action='store_true', help="recompute the hash of every stored chunk")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    conn = psycopg2.connect(db_url)
+    try:
+        if args.command == 'backfill':
+            backfill(conn, args.batch_size, args.rehash)
+        else:
+            report_duplicates(conn, args.threshold)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Precomputed recommendation lists per student cohort
+A cohort is a program, current term and a student's first MAX_COHORT_GOALS goal tags. Those
+decide every calculateCourseScore component except prerequisites and workload,
+which depend on the individual student. This job finds the cohorts in profiles,
+scores the whole catalog for each one with recommendation_scorer.score_batch and
+stores the best `depth` courses in cohort_recommendations
+(see data-to-ingest/add-cohort-recommendations.sql). The chat route looks up its
+cohort and re-ranks that list with the student's own prerequisites and workload.
+
+Refreshes are incremental. Every list records a hash of the catalog's scoring
+columns. While the hash is unchanged, only new cohorts are scored. The ingesters
+that write courses refresh it when they finish (refresh_after_ingest); run it by
+hand after skill tagging. A run with nothing to do only reads.
+
+Commands:
+  refresh [--depth 100] [--full]  score new and stale cohorts, drop cohorts nobody is in
+  show <user_id> [--top 10]       print the stored list for a student's cohort
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import numpy as np
+
+from recommendation_scorer import Catalog, ProfileBatch, score_batch
+
+MAX_COHORT_GOALS = 3
+DEFAULT_DEPTH = 100
+# Components the cohort list is ranked by; prereqs and workload are per student
+COHORT_COMPONENTS = ['goal', 'program', 'term', 'level']
+# Recommendations the chat route shows, and students sampled to check them
+SHOWN = 5
+CHECK_STUDENTS = 200
+BLOCK_COHORTS = 256
+
+SCORING_COLUMNS = ['id', 'dept', 'level', 'skills', 'prereqs', 'terms_offered', 'workload']
+
+def cohort_goals(goal_tags: Optional[Sequence[str]]) -> List[str]:
+    """The student's top goals: their first MAX_COHORT_GOALS distinct tags, sorted for the key"""
+    return sorted(list(dict.fromkeys(goal.lower() for goal in goal_tags or []))[:MAX_COHORT_GOALS])
+
+def cohort_fingerprint(program: Optional[str], current_term: Optional[str], goals: Sequence[str]) -> str:
+    """Same value as cohortFingerprint() in frontend/src/lib/cohort-recommendations.ts"""
+    key = f"{program or ''}|{current_term or ''}|{','.join(goals)}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def group_cohorts(profiles: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Cohorts present in the profiles, with how many students are in each"""
+    cohorts: Dict[str, Dict[str, Any]] = {}
+    for profile in profiles:
+        goals = cohort_goals(profile.get('goal_tags'))
+        fingerprint = cohort_fingerprint(profile.get('program'), profile.get('current_term'), goals)
+        cohort = cohorts.setdefault(fingerprint, {
+            'program': profile.get('program') or None, 'current_term': profile.get('current_term') or None,
+            'goal_tags': goals, 'students': 0,
+        })
+        cohort['students'] += 1
+    return cohorts
+
+def catalog_hash(rows: Sequence[Dict[str, Any]]) -> str:
+    digest = hashlib.md5()
+    for row in rows:
+        digest.update(json.dumps([row.get(column) for column in SCORING_COLUMNS], sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+class CohortRecommendations:
+    def __init__(self, conn, depth: int = DEFAULT_DEPTH):
+        self.conn = conn
+        self.depth = depth
+
+    def load_catalog(self) -> List[Dict[str, Any]]:
+        from psycopg2.extras import RealDictCursor
+
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(f"SELECT {', '.join(SCORING_COLUMNS)} FROM courses ORDER BY id")
+            return cur.fetchall()
+
+    def load_profiles(self) -> List[Dict[str, Any]]:
+        from psycopg2.extras import RealDictCursor
+
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("SELECT program, current_term, goal_tags, completed_courses, constraints FROM profiles")
+            return cur.fetchall()
+
+    def stored_hashes(self) -> Dict[str, str]:
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT cohort_fingerprint, catalog_hash FROM cohorts")
+            return dict(cur.fetchall())
+
+    def refresh(self, full: bool = False):
+        started = time.perf_counter()
+        rows = self.load_catalog()
+        if not rows:
+            print("⚠️ No courses found")
+            return
+        current_hash = catalog_hash(rows)
+        profiles = self.load_profiles()
+        cohorts = group_cohorts(profiles)
+        stored = self.stored_hashes()
+
+        stale = sorted(fingerprint for fingerprint in cohorts
+                       if full or stored.get(fingerprint) != current_hash)
+        removed = sorted(set(stored) - set(cohorts))
+        loaded = time.perf_counter()
+        print(f"📚 {len(rows)} courses, {len(cohorts)} cohorts: {len(stale)} to score, {len(removed)} to drop")
+
+        catalog = Catalog(rows)
+        lists = {}
+        for start in range(0, len(stale), BLOCK_COHORTS):
+            block = stale[start:start + BLOCK_COHORTS]
+            members = [{**cohorts[fingerprint], 'completed_courses': [], 'constraints': {}} for fingerprint in block]
+            breakdown = score_batch(catalog, ProfileBatch(catalog, members))
+            scores = sum(breakdown.components[name].astype(np.int32) for name in COHORT_COMPONENTS)
+            for row, fingerprint in enumerate(block):
+                best = np.argsort(-scores[row], kind='stable')[:self.depth]
+                lists[fingerprint] = [
+                    (catalog.ids[col], int(scores[row, col]),
+                     {name: int(breakdown.components[name][row, col]) for name in COHORT_COMPONENTS})
+                    for col in best
+                ]
+        scored = time.perf_counter()
+
+        self.store(cohorts, lists, removed, current_hash)
+        print(f"✅ Scored {len(lists)} cohorts x {len(rows)} courses "
+              f"({len(lists) * len(rows) / max(scored - loaded, 1e-9):,.0f} scores/s), dropped {len(removed)}")
+        if lists:
+            agreement = self.check(catalog, profiles, lists)
+            print(f"   re-ranked lists match a full-catalog ranking for {agreement:.0%} of sampled students "
+                  f"(raise --depth to improve)")
+        print(f"   load {loaded - started:.2f}s, score {scored - loaded:.2f}s, store {time.perf_counter() - scored:.2f}s")
+
+    def check(self, catalog: Catalog, profiles: Sequence[Dict[str, Any]], lists: Dict[str, List]) -> float:
+        """Share of students whose top SHOWN scores are the same from their cohort list as from the whole catalog"""
+        column_of = {course_id: col for col, course_id in enumerate(catalog.ids)}
+        sample = [profile for profile in profiles
+                  if cohort_fingerprint(profile.get('program'), profile.get('current_term'),
+                                        cohort_goals(profile.get('goal_tags'))) in lists][:CHECK_STUDENTS]
+        if not sample:
+            return 1.0
+        totals = score_batch(catalog, ProfileBatch(catalog, sample)).total
+        matches = 0
+        for row, profile in enumerate(sample):
+            fingerprint = cohort_fingerprint(profile.get('program'), profile.get('current_term'),
+                                             cohort_goals(profile.get('goal_tags')))
+            columns = [column_of[course_id] for course_id, _, _ in lists[fingerprint]]
+            from_list = np.sort(totals[row, columns])[::-1][:SHOWN]
+            exact = np.sort(totals[row])[::-1][:SHOWN]
+            matches += np.array_equal(from_list, exact)
+        return matches / len(sample)
+
+    def store(self, cohorts: Dict[str, Dict[str, Any]], lists: Dict[str, List], removed: List[str], current_hash: str):
+        from psycopg2.extras import execute_values
+
+        refreshed = list(lists)
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM cohorts WHERE cohort_fingerprint = ANY(%s)", (removed,))
+                # Student counts change without the lists going stale, so every cohort is upserted
+                execute_values(cur, """
+                    INSERT INTO cohorts (cohort_fingerprint, program, current_term, goal_tags, students, catalog_hash)
+                    VALUES %s
+                    ON CONFLICT (cohort_fingerprint) DO UPDATE SET students = EXCLUDED.students
+                """, [(fingerprint, cohort['program'], cohort['current_term'], json.dumps(cohort['goal_tags']),
+                       cohort['students'], current_hash)
+                      for fingerprint, cohort in cohorts.items()], page_size=1000)
+                cur.execute("""
+                    UPDATE cohorts SET catalog_hash = %s, computed_at = NOW()
+                    WHERE cohort_fingerprint = ANY(%s)
+                """, (current_hash, refreshed))
+
+                cur.execute("DELETE FROM cohort_recommendations WHERE cohort_fingerprint = ANY(%s)", (refreshed,))
+                execute_values(cur, """
+                    INSERT INTO cohort_recommendations (cohort_fingerprint, rank, course_id, score, components) VALUES %s
+                """, [(fingerprint, rank, course_id, score, json.dumps(components))
+                      for fingerprint, entries in lists.items()
+                      for rank, (course_id, score, components) in enumerate(entries, start=1)], page_size=5000)
+
+    def show(self, user_id: str, top: int):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT program, current_term, goal_tags FROM profiles WHERE user_id::text = %s", (user_id,))
+            profile = cur.fetchone()
+            if not profile:
+                print(f"❌ No profile for user {user_id}")
+                return
+            program, current_term, goal_tags = profile
+            goals = cohort_goals(goal_tags)
+            fingerprint = cohort_fingerprint(program, current_term, goals)
+            cur.execute("""
+                SELECT cohorts.students, cohorts.computed_at, cohort_recommendations.rank,
+                       cohort_recommendations.course_id, courses.title, cohort_recommendations.score,
+                       cohort_recommendations.components
+                FROM cohorts
+                JOIN cohort_recommendations USING (cohort_fingerprint)
+                JOIN courses ON courses.id = cohort_recommendations.course_id
+                WHERE cohorts.cohort_fingerprint = %s
+                ORDER BY cohort_recommendations.rank
+                LIMIT %s
+            """, (fingerprint, top))
+            rows = cur.fetchall()
+
+        print(f"👥 Cohort {program or '-'} / {current_term or '-'} / {', '.join(goals) or 'no goals'}")
+        if not rows:
+            print("⚠️ No stored list for this cohort; run 'cohort_recommendations.py refresh'")
+            return
+        print(f"   {rows[0][0]} students, computed {rows[0][1]:%Y-%m-%d %H:%M}")
+        for _, _, rank, course_id, title, score, components in rows:
+            parts = ', '.join(f"{name} {components[name]}" for name in COHORT_COMPONENTS)
+            print(f"  {rank:>3}. {score:>3}  {course_id}: {title}  ({parts})")
+
+def refresh_after_ingest():
+    """Rescore the cohorts whose lists an ingestion run that changed courses made stale"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("⚠️ DATABASE_URL not set; run 'python ../scripts/cohort_recommendations.py refresh' "
+              "to refresh the cohort recommendations")
+        return
+
+    import psycopg2
+
+    conn = psycopg2.connect(db_url)
+    try:
+        CohortRecommendations(conn).refresh()
+    except psycopg2.errors.UndefinedTable:
+        print("⚠️ cohorts not found; run data-to-ingest/add-cohort-recommendations.sql "
+              "to enable cohort recommendations")
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute recommendation lists per student cohort")
+    parser.add_argument('command', choices=['refresh', 'show'])
+    parser.add_argument('user_id', nargs='?')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH, help="courses stored per cohort")
+    parser.add_argument('--full', action='store_true', help="rescore every cohort")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    import psycopg2
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    conn = psycopg2.connect(db_url)
+    try:
+        cohorts = CohortRecommendations(conn, args.depth)
+        if args.command == 'refresh':
+            cohorts.refresh(args.full)
+        else:
+            if not args.user_id:
+                parser.error("show needs a user id")
+            cohorts.show(args.user_id, args.top)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for building course/document embedding text and calling OpenAI
+Used by the embedding scripts and the background embedding worker so every
+path embeds the same text with the same model
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from run_metrics import span
+
+# Matches the VECTOR(1536) columns created by add-vector-search.sql
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Columns whose text feeds build_course_text; changing any of them makes the embedding stale.
+# skills is not one of them: skill_tagging.py derives it from the embedding.
+COURSE_TEXT_COLUMNS = ['title', 'description', 'dept', 'level', 'prereqs', 'terms_offered']
+
+def embedding_client():
+    """OpenAI client for embeddings, routed through the local gateway when EMBEDDING_GATEWAY_URL is set
+
+    The gateway (embedding_gateway.py) speaks the embeddings API, so callers are unchanged
+    and share its batching, request coalescing and cache with the frontend.
+    """
+    import openai
+
+    gateway_url = os.getenv('EMBEDDING_GATEWAY_URL')
+    if gateway_url:
+        # The gateway holds the real key; the SDK just needs a non-empty one
+        return openai.OpenAI(base_url=f"{gateway_url.rstrip('/')}/v1", api_key='gateway')
+    return openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+def build_course_text(course: Dict[str, Any]) -> str:
+    """Build the text representation of a course that gets embedded"""
+    text_parts = []
+
+    if course.get('title'):
+        text_parts.append(f"Title: {course['title']}")
+
+    if course.get('description'):
+        text_parts.append(f"Description: {course['description']}")
+
+    if course.get('dept'):
+        text_parts.append(f"Department: {course['dept']}")
+
+    if course.get('level'):
+        text_parts.append(f"Level: {course['level']}")
+
+    if course.get('prereqs'):
+        text_parts.append(f"Prerequisites: {course['prereqs']}")
+
+    if course.get('terms_offered') and isinstance(course['terms_offered'], list):
+        text_parts.append(f"Terms offered: {', '.join(course['terms_offered'])}")
+
+    return " | ".join(text_parts)
+
+def embed_texts(openai_client, texts: List[str], model: str = EMBEDDING_MODEL,
+                dimensions: Optional[int] = None) -> List[List[float]]:
+    """Embed a batch of texts with one OpenAI request, preserving input order
+
+    dimensions asks text-embedding-3 models for shortened vectors (e.g. 3-large at 1536).
+    Each request is recorded as an embed span with its text count and API tokens.
+    """
+    kwargs = {'dimensions': dimensions} if dimensions else {}
+    with span('embed', model=model) as current:
+        response = openai_client.embeddings.create(model=model, input=texts, **kwargs)
+        current.add(rows=len(texts), bytes=sum(len(text.encode('utf-8')) for text in texts),
+                    tokens=response.usage.total_tokens if response.usage else 0)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Offline course k-nearest-neighbour graph ("courses like this")
+Loads every course embedding, scores course pairs with blocked float32 matrix
+products and keeps the top k per course in course_neighbors
+(see data-to-ingest/add-course-neighbors.sql).
+
+Incremental runs only touch what changed. A course whose embedding changed is
+recomputed against the whole catalog. Any list that contained a changed or deleted
+course is recomputed too. Every other list is merged with the changed courses'
+scores, so an incremental run gives the same graph as a full rebuild.
+
+Commands:
+  build [--k 10] [--full]       update the graph (a full rebuild on the first run)
+  show <course_id> [--k 10]     print a course's stored neighbours
+  benchmark [--synthetic 30000] time a full build and a 1% incremental update in memory
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import numpy as np
+
+from quantized_index import normalize
+
+DEFAULT_K = 10
+
+# Query rows scored per matrix product: BLOCK_ROWS x catalog float32 scores in memory
+BLOCK_ROWS = 1024
+
+# neighbour list per course row: [(neighbour row, similarity), ...] best first
+NeighborLists = Dict[int, List[Tuple[int, float]]]
+
+def parse_vector(text: str) -> np.ndarray:
+    """pgvector text form '[0.1,0.2,...]' to float32, much faster than json.loads"""
+    return np.fromstring(text.strip('[]'), dtype=np.float32, sep=',')
+
+def load_course_embeddings(conn, column: str) -> Tuple[List[str], List[str], np.ndarray]:
+    """Course ids, md5 of each stored vector and the unit-length float32 matrix, ordered by id"""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT id, md5({column}::text), {column}::text
+            FROM courses
+            WHERE {column} IS NOT NULL
+            ORDER BY id
+        """)
+        rows = cur.fetchall()
+    ids = [row[0] for row in rows]
+    hashes = [row[1] for row in rows]
+    vectors = normalize(np.stack([parse_vector(row[2]) for row in rows])) if rows else np.zeros((0, 0), np.float32)
+    return ids, hashes, vectors
+
+def neighbors_for_rows(vectors: np.ndarray, rows: Sequence[int], k: int,
+                       block_rows: int = BLOCK_ROWS) -> NeighborLists:
+    """Exact top-k neighbours of the given rows against every row, excluding themselves"""
+    rows = np.asarray(rows, dtype=np.int64)
+    k = min(k, len(vectors) - 1)
+    result = {}
+    if k <= 0:
+        return {int(row): [] for row in rows}
+
+    for start in range(0, len(rows), block_rows):
+        block = rows[start:start + block_rows]
+        scores = vectors[block] @ vectors.T
+        scores[np.arange(len(block)), block] = -np.inf
+        # Partition on the scores themselves: negating would copy the whole block
+        part = np.argpartition(scores, -k, axis=1)[:, -k:]
+        part_scores = np.take_along_axis(scores, part, axis=1)
+        order = np.argsort(-part_scores, axis=1)
+        best = np.take_along_axis(part, order, axis=1)
+        best_scores = np.take_along_axis(part_scores, order, axis=1)
+        for row, neighbors, sims in zip(block, best, best_scores):
+            result[int(row)] = list(zip(neighbors.tolist(), sims.tolist()))
+    return result
+
+def update_neighbors(vectors: np.ndarray, current: NeighborLists, changed_rows: Iterable[int],
+                     removed: Set[int] = frozenset(), k: int = DEFAULT_K,
+                     block_rows: int = BLOCK_ROWS) -> NeighborLists:
+    """Neighbour lists that differ after the changed rows' vectors changed
+
+    current maps rows of `vectors` to their stored lists; removed holds the row
+    values that stand for deleted courses in those lists. Returns only the lists
+    to rewrite.
+    """
+    changed = sorted(set(changed_rows))
+    changed_set = set(changed)
+    stale_neighbors = changed_set | set(removed)
+    k = min(k, len(vectors) - 1)
+
+    # Lists that held a changed course may lose it, so they are rebuilt from scratch
+    dirty = set(changed)
+    for row, neighbors in current.items():
+        if row not in changed_set and any(neighbor in stale_neighbors for neighbor, _ in neighbors):
+            dirty.add(row)
+    updated = neighbors_for_rows(vectors, sorted(dirty), k, block_rows)
+
+    # Everything else can only gain changed courses that beat its current k-th score
+    others = np.array(sorted(row for row in current if row not in dirty), dtype=np.int64)
+    if changed and len(others):
+        changed_vectors = vectors[changed]
+        changed_index = np.asarray(changed, dtype=np.int64)
+        kth = np.array([current[row][-1][1] if len(current[row]) >= k else -np.inf for row in others],
+                       dtype=np.float32)
+        for start in range(0, len(others), block_rows):
+            block = others[start:start + block_rows]
+            scores = vectors[block] @ changed_vectors.T
+            hits = np.nonzero((scores > kth[start:start + block_rows, None]).any(axis=1))[0]
+            for position in hits:
+                row = int(block[position])
+                candidates = [(int(changed_index[j]), float(scores[position, j]))
+                              for j in np.nonzero(scores[position] > kth[start + position])[0]]
+                merged = sorted(current[row] + candidates, key=lambda item: -item[1])[:k]
+                updated[row] = merged
+    return updated
+
+class CourseNeighborGraph:
+    def __init__(self, conn, k: int = DEFAULT_K):
+        self.conn = conn
+        self.k = k
+
+    def active_column(self) -> str:
+        from embedding_migration import active_version
+        return active_version(self.conn)['column_name']
+
+    def load(self):
+        return load_course_embeddings(self.conn, self.active_column())
+
+    def load_state(self) -> Tuple[Dict[str, str], Dict[str, List[Tuple[str, float]]]]:
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT course_id, embedding_hash FROM course_neighbor_state")
+            state = dict(cur.fetchall())
+            cur.execute("SELECT course_id, neighbor_id, similarity FROM course_neighbors ORDER BY course_id, rank")
+            lists: Dict[str, List[Tuple[str, float]]] = {}
+            for course_id, neighbor_id, similarity in cur.fetchall():
+                lists.setdefault(course_id, []).append((neighbor_id, similarity))
+        return state, lists
+
+    def build(self, full: bool = False):
+        started = time.perf_counter()
+        ids, hashes, vectors = self.load()
+        loaded = time.perf_counter()
+        if not ids:
+            print("⚠️ No course embeddings found")
+            return
+        row_of = {course_id: row for row, course_id in enumerate(ids)}
+
+        state, stored = self.load_state()
+        # Courses deleted or no longer embedded since the last run
+        removed_ids = (set(state) | set(stored)) - set(ids)
+        if not state or any(len(neighbors) != min(self.k, len(ids) - 1) for neighbors in stored.values()):
+            # First run, or k changed since the stored lists were built
+            full = True
+
+        if full:
+            changed = list(range(len(ids)))
+            updated = neighbors_for_rows(vectors, changed, self.k)
+        else:
+            changed = [row for row, course_id in enumerate(ids) if state.get(course_id) != hashes[row]]
+            # Neighbours without a row now are stale; -1 marks them all
+            current = {
+                row_of[course_id]: [(row_of.get(n, -1), s) for n, s in neighbors]
+                for course_id, neighbors in stored.items() if course_id in row_of
+            }
+            updated = update_neighbors(vectors, current, changed, {-1}, self.k)
+        computed = time.perf_counter()
+
+        self.store(ids, hashes, updated, changed, removed_ids)
+        print(f"✅ {'Rebuilt' if full else 'Updated'} {len(updated)} of {len(ids)} neighbour lists "
+              f"({len(changed)} changed courses, {len(removed_ids)} removed, k={self.k})")
+        print(f"   load {loaded - started:.2f}s, similarity {computed - loaded:.2f}s, "
+              f"store {time.perf_counter() - computed:.2f}s")
+
+    def store(self, ids: List[str], hashes: List[str], updated: NeighborLists,
+              changed: Sequence[int], removed_ids: Set[str]):
+        from psycopg2.extras import execute_values
+
+        rows = [(ids[row], rank, ids[neighbor], similarity)
+                for row, neighbors in updated.items()
+                for rank, (neighbor, similarity) in enumerate(neighbors, start=1)]
+        rewritten = [ids[row] for row in updated] + sorted(removed_ids)
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM course_neighbors WHERE course_id = ANY(%s)", (rewritten,))
+                execute_values(cur, """
+                    INSERT INTO course_neighbors (course_id, rank, neighbor_id, similarity) VALUES %s
+                """, rows, page_size=5000)
+                cur.execute("DELETE FROM course_neighbor_state WHERE course_id = ANY(%s)", (sorted(removed_ids),))
+                execute_values(cur, """
+                    INSERT INTO course_neighbor_state (course_id, embedding_hash) VALUES %s
+                    ON CONFLICT (course_id) DO UPDATE
+                      SET embedding_hash = EXCLUDED.embedding_hash, computed_at = NOW()
+                """, [(ids[row], hashes[row]) for row in changed], page_size=5000)
+
+    def show(self, course_id: str):
+        course_id = course_id.replace(' ', '').upper()
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT id, title, similarity FROM get_similar_courses(%s, %s)", (course_id, self.k))
+            rows = cur.fetchall()
+        if not rows:
+            print(f"⚠️ No neighbours stored for {course_id}")
+            return
+        print(f"📚 Courses like {course_id}:")
+        for neighbor_id, title, similarity in rows:
+            print(f"  {similarity:.3f}  {neighbor_id}: {title}")
+
+def benchmark(rows: int, dims: int, k: int):
+    """Full build and a 1% incremental update on a synthetic catalog, checked against a rebuild"""
+    from benchmark_search import synthetic_corpus
+
+    _, vectors = synthetic_corpus(rows, dims)
+    vectors = normalize(vectors)
+    started = time.perf_counter()
+    graph = neighbors_for_rows(vectors, range(rows), k)
+    full_time = time.perf_counter() - started
+    print(f"📊 {rows} courses x {dims} dims, k={k}")
+    print(f"   full build          {full_time:.2f}s ({rows / full_time:.0f} courses/s)")
+
+    rng = np.random.default_rng(1)
+    changed = rng.choice(rows, size=max(1, rows // 100), replace=False)
+    vectors[changed] = normalize(vectors[changed] + rng.standard_normal((len(changed), dims)).astype(np.float32) * 0.02)
+    started = time.perf_counter()
+    updated = update_neighbors(vectors, graph, changed, k=k)
+    incremental_time = time.perf_counter() - started
+    graph.update(updated)
+    print(f"   incremental (1%)    {incremental_time:.2f}s, {len(updated)} lists rewritten")
+
+    check = rng.choice(rows, size=min(rows, 500), replace=False)
+    truth = neighbors_for_rows(vectors, check, k)
+    exact = np.mean([[n for n, _ in graph[row]] == [n for n, _ in truth[row]] for row in check])
+    print(f"   incremental == rebuild on {exact:.1%} of {len(check)} sampled lists")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the course k-nearest-neighbour graph")
+    parser.add_argument('command', choices=['build', 'show', 'benchmark'])
+    parser.add_argument('course_id', nargs='?')
+    parser.add_argument('--k', type=int, default=DEFAULT_K)
+    parser.add_argument('--full', action='store_true', help="recompute every list")
+    parser.add_argument('--synthetic', type=int, default=30000, help="benchmark catalog size")
+    parser.add_argument('--dims', type=int, default=1536)
+    args = parser.parse_args()
+
+    if args.command == 'benchmark':
+        benchmark(args.synthetic, args.dims, args.k)
+        return
+
+    from dotenv import load_dotenv
+    import psycopg2
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    conn = psycopg2.connect(db_url)
+    try:
+        graph = CourseNeighborGraph(conn, args.k)
+        if args.command == 'build':
+            graph.build(args.full)
+        else:
+            if not args.course_id:
+                parser.error("show needs a course id, e.g. ECE457A")
+            graph.show(args.course_id)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,11 @@ Handles PDF/HTML extraction, embedding generation, and database operations
 
 import os
 import sys
+import time
 import asyncio
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 import json
 
 # Add the project root to the Python path
@@ -16,181 +18,364 @@ project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
 from dotenv import load_dotenv
-import openai
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from checkpoint_journal import CheckpointJournal, hash_file, hash_text
+from chunk_dedup import ChunkDeduplicator, dedup_enabled
+from course_embeddings import EMBEDDING_MODEL, embed_texts, embedding_client
+from document_extraction import find_documents, iter_extracted
+from embedding_migration import embed_for_versions, live_versions
+from run_metrics import pop_profile_flag, span, start_run, traced
+from text_chunker import (DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, chunk_stream, chunk_text,
+                          load_token_counter)
+
 # Load environment variables
 load_dotenv()
 
 class DataProcessor:
-    def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    def __init__(self, resume: bool = False):
+        self.openai_client = embedding_client()
         self.db_url = os.getenv('DATABASE_URL')
+        self.resume = resume
+        self.count_tokens = load_token_counter()
+        self.metadata_column = None  # whether elective_docs has add-elective-doc-metadata.sql's column
         
     def get_embedding(self, text: str) -> List[float]:
         """Generate embedding for text using OpenAI"""
-        response = self.openai_client.embeddings.create(
-            model="text-embedding-3-large",
-            input=text
-        )
-        return response.data[0].embedding
+        return self.get_embeddings([text])[0]
     
-    def chunk_text(self, text: str, chunk_size: int = 1200, overlap: int = 150) -> List[str]:
-        """Split text into overlapping chunks"""
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = min(start + chunk_size, len(text))
-            chunk = text[start:end]
-            
-            # Try to break at sentence boundaries
-            if end < len(text):
-                last_period = chunk.rfind('.')
-                last_newline = chunk.rfind('\n')
-                break_point = max(last_period, last_newline)
-                
-                if break_point > start + chunk_size * 0.5:
-                    chunk = chunk[:break_point + 1]
-            
-            chunks.append(chunk.strip())
-            start = start + len(chunk) - overlap
-        
-        return [chunk for chunk in chunks if len(chunk) > 50]
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a batch of texts in one OpenAI request"""
+        return embed_texts(self.openai_client, texts, EMBEDDING_MODEL)
     
-    def process_document(self, text: str, source_url: str, course_id: str = None, option_id: str = None):
-        """Process a document and store chunks with embeddings"""
-        chunks = self.chunk_text(text)
+    def chunk_text(self, text: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                   overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> Iterator[str]:
+        """Lazily split text into overlapping, sentence-aligned chunks sized in model tokens"""
+        return chunk_text(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens,
+                          count_tokens=self.count_tokens)
+    
+    def process_document(self, text: str, source_url: str, course_id: str = None, option_id: str = None,
+                         batch_size: int = 64):
+        """Process an in-memory document and store chunks with embeddings"""
+        self.store_chunks(self.chunk_text(text), hash_text(text), source_url, course_id, option_id, batch_size)
+    
+    def process_file(self, path: str, source_url: str, course_id: str = None, option_id: str = None,
+                     batch_size: int = 64):
+        """Process a text file of any size, streaming it through the chunker in bounded memory"""
+        chunks = chunk_stream(path, count_tokens=self.count_tokens)
+        self.store_chunks(chunks, hash_file(path), source_url, course_id, option_id, batch_size)
+    
+    def process_directory(self, directory: str, base_url: str = None, course_id: str = None,
+                          option_id: str = None, workers: int = None, report_every: int = 25):
+        """Extract every HTML/PDF/text file under a directory on a process pool and store its chunks
+        
+        Extraction is CPU-bound and runs on all cores; the main process chunks, embeds
+        and inserts each document as soon as its text arrives.
+        """
+        paths = find_documents(directory)
+        if not paths:
+            print(f"No HTML, PDF or text files found in {directory}")
+            return
+        
+        workers = workers or os.cpu_count() or 1
+        print(f"📂 Processing {len(paths)} files from {directory} with {workers} extraction workers")
         
+        docs = chunks = failed = 0
+        extracted_bytes = 0
+        started = time.perf_counter()
         with psycopg2.connect(self.db_url) as conn:
+            # Each parse span is the wait for the next extracted document from the pool
+            documents = traced(iter_extracted(paths, workers), 'parse',
+                               lambda document: {'rows': 1, 'bytes': document['bytes']})
+            for document in documents:
+                if document['error'] or not document['text']:
+                    failed += 1
+                    print(f"⚠️ Skipped {document['path']}: {document['error'] or 'no text extracted'}")
+                    continue
+                
+                source_url = self.source_url_for(document['path'], directory, base_url)
+                metadata = {key: document[key] for key in ('title', 'kind', 'pages', 'bytes')}
+                chunks += self.store_chunks(self.chunk_text(document['text']), hash_text(document['text']),
+                                            source_url, course_id, option_id, conn=conn, verbose=False,
+                                            metadata=metadata)
+                docs += 1
+                extracted_bytes += document['bytes']
+                
+                if docs % report_every == 0:
+                    self.report_throughput(docs, chunks, extracted_bytes, time.perf_counter() - started)
+        
+        self.report_throughput(docs, chunks, extracted_bytes, time.perf_counter() - started)
+        print(f"✅ Processed {docs} documents ({failed} skipped) into {chunks} chunks")
+    
+    @staticmethod
+    def source_url_for(path: str, directory: str, base_url: str = None) -> str:
+        """Public URL for a file mirrored under base_url, otherwise a file:// URL"""
+        if base_url:
+            relative = Path(path).relative_to(directory).as_posix()
+            return f"{base_url.rstrip('/')}/{relative}"
+        return Path(path).resolve().as_uri()
+    
+    @staticmethod
+    def report_throughput(docs: int, chunks: int, extracted_bytes: int, elapsed: float):
+        elapsed = max(elapsed, 1e-9)
+        print(f"📊 {docs} docs, {chunks} chunks in {elapsed:.1f}s — {docs / elapsed:.2f} docs/s, "
+              f"{chunks / elapsed:.1f} chunks/s, {extracted_bytes / elapsed / (1024 * 1024):.2f} MB/s")
+    
+    def has_metadata_column(self, conn) -> bool:
+        if self.metadata_column is None:
             with conn.cursor() as cur:
-                for i, chunk in enumerate(chunks):
-                    embedding = self.get_embedding(chunk)
-                    
-                    cur.execute("""
-                        INSERT INTO elective_docs (course_id, option_id, text, source_url, chunk_id, embedding)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                        ON CONFLICT DO NOTHING
-                    """, (course_id, option_id, chunk, source_url, i, embedding))
+                cur.execute("""
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'elective_docs' AND column_name = 'metadata'
+                """)
+                self.metadata_column = cur.fetchone() is not None
+        return self.metadata_column
+    
+    def store_chunks(self, chunks: Iterable[str], input_hash: str, source_url: str, course_id: str = None,
+                     option_id: str = None, batch_size: int = 64, conn=None, verbose: bool = True,
+                     metadata: Dict[str, Any] = None) -> int:
+        """Embed and insert chunks as they arrive from the chunker; returns the number of chunks
+        
+        Chunks are embedded and committed batch by batch; each committed batch is
+        recorded in the checkpoint journal so a resumed run only embeds the rest.
+        Every live embedding version's column is written (see embedding_migration.py).
+        Exact and near-duplicate chunks are dropped before embedding (see chunk_dedup.py).
+        metadata (title, kind, pages, bytes of the source file) is stored on every chunk
+        once add-elective-doc-metadata.sql has been run.
+        """
+        if conn is None:
+            with psycopg2.connect(self.db_url) as conn:
+                return self.store_chunks(chunks, input_hash, source_url, course_id, option_id,
+                                         batch_size, conn=conn, verbose=verbose, metadata=metadata)
+        
+        chunks = iter(chunks)
+        total = 0
+        
+        versions = live_versions(conn)
+        columns = [version['column_name'] for version in versions]
+        dedup = ChunkDeduplicator(conn) if dedup_enabled(conn) else None
+        dedup_columns = ['content_hash', 'minhash', 'lsh_bands'] if dedup else []
+        # Column -> placeholder for everything stored besides the text and vectors
+        extra = dict.fromkeys(dedup_columns, '%s')
+        if metadata is not None and self.has_metadata_column(conn):
+            extra['metadata'] = '%s::jsonb'
+        placeholders = ', '.join(['%s'] * 5 + ['%s::vector'] * len(columns) + list(extra.values()))
+        journal = CheckpointJournal(
+            f"process-doc:{source_url}",
+            hash_text(input_hash, course_id, option_id, *(f"{v['model']}:{v['dimensions']}" for v in versions)),
+            resume=self.resume
+        )
+        
+        with journal, conn.cursor() as cur:
+            start = 0
+            while True:
+                with span('transform', source=source_url) as current:
+                    batch = list(islice(chunks, batch_size))
+                    current.add(rows=len(batch), bytes=sum(len(chunk.encode('utf-8')) for chunk in batch))
+                if not batch:
+                    break
+                total += len(batch)
+                batch_key = f"chunks:{start}"
+                if journal.is_done(batch_key):
+                    start += len(batch)
+                    continue
+                
+                with span('dedup'):
+                    signed = dedup.filter(batch) if dedup else [{}] * len(batch)
+                # (chunk_id, chunk, dedup columns) for chunks worth embedding
+                keep = [(start + offset, chunk, sig) for offset, (chunk, sig) in enumerate(zip(batch, signed))
+                        if sig is not None]
+                embeddings = embed_for_versions(self.openai_client, [chunk for _, chunk, _ in keep], versions) \
+                    if keep else {}
                 
-                conn.commit()
-                print(f"Processed {len(chunks)} chunks from {source_url}")
+                with span('upload', table='elective_docs') as current:
+                    for position, (chunk_id, chunk, sig) in enumerate(keep):
+                        cur.execute(f"""
+                            INSERT INTO elective_docs (course_id, option_id, text, source_url, chunk_id,
+                                                       {', '.join(columns + list(extra))})
+                            VALUES ({placeholders})
+                            ON CONFLICT DO NOTHING
+                        """, (course_id, option_id, chunk, source_url, chunk_id,
+                              *(str(embeddings[column][position]) for column in columns),
+                              *(sig[column] for column in dedup_columns),
+                              *([json.dumps(metadata)] if 'metadata' in extra else [])))
+                    
+                    conn.commit()
+                    current.add(rows=len(keep), bytes=sum(len(chunk.encode('utf-8')) for _, chunk, _ in keep))
+                journal.mark_done(batch_key, len(batch))
+                start += len(batch)
+            
+            if verbose:
+                journal.report()
+                if dedup:
+                    dedup.report()
+                print(f"Processed {total} chunks from {source_url}")
+        return total
     
-    def upload_courses_from_csv(self, csv_file: str):
+    def upload_courses_from_csv(self, csv_file: str, batch_size: int = 200):
         """Upload courses from CSV file"""
         import pandas as pd
         
-        df = pd.read_csv(csv_file)
+        with span('parse', file=Path(csv_file).name) as current:
+            df = pd.read_csv(csv_file)
+            current.add(rows=len(df), bytes=os.path.getsize(csv_file))
+        journal = CheckpointJournal(f"upload-courses:{Path(csv_file).name}", hash_file(csv_file), resume=self.resume)
         
-        with psycopg2.connect(self.db_url) as conn:
+        with journal, psycopg2.connect(self.db_url) as conn:
             with conn.cursor() as cur:
-                for _, row in df.iterrows():
-                    cur.execute("""
-                        INSERT INTO courses (id, title, dept, units, level, description, 
-                                           terms_offered, prereqs, skills, workload, 
-                                           assessments, source_url)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (id) DO UPDATE SET
-                            title = EXCLUDED.title,
-                            dept = EXCLUDED.dept,
-                            units = EXCLUDED.units,
-                            level = EXCLUDED.level,
-                            description = EXCLUDED.description,
-                            terms_offered = EXCLUDED.terms_offered,
-                            prereqs = EXCLUDED.prereqs,
-                            skills = EXCLUDED.skills,
-                            workload = EXCLUDED.workload,
-                            assessments = EXCLUDED.assessments,
-                            source_url = EXCLUDED.source_url,
-                            updated_at = NOW()
-                    """, (
-                        row['id'], row['title'], row['dept'], row['units'], 
-                        row['level'], row['description'], 
-                        json.dumps(row['terms_offered']) if isinstance(row['terms_offered'], list) else row['terms_offered'],
-                        row['prereqs'], 
-                        json.dumps(row['skills']) if isinstance(row['skills'], list) else row['skills'],
-                        json.dumps(row['workload']) if isinstance(row['workload'], dict) else row['workload'],
-                        json.dumps(row['assessments']) if isinstance(row['assessments'], dict) else row['assessments'],
-                        row['source_url']
-                    ))
+                for start in range(0, len(df), batch_size):
+                    batch_key = f"rows:{start}"
+                    if journal.is_done(batch_key):
+                        continue
+                    
+                    with span('upload', table='courses') as current:
+                        for _, row in df.iloc[start:start + batch_size].iterrows():
+                            # skills are left to skill_tagging.py, which derives them from the embedding
+                            cur.execute("""
+                                INSERT INTO courses (id, title, dept, units, level, description, 
+                                                   terms_offered, prereqs, workload, 
+                                                   assessments, source_url)
+                                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                                ON CONFLICT (id) DO UPDATE SET
+                                    title = EXCLUDED.title,
+                                    dept = EXCLUDED.dept,
+                                    units = EXCLUDED.units,
+                                    level = EXCLUDED.level,
+                                    description = EXCLUDED.description,
+                                    terms_offered = EXCLUDED.terms_offered,
+                                    prereqs = EXCLUDED.prereqs,
+                                    workload = EXCLUDED.workload,
+                                    assessments = EXCLUDED.assessments,
+                                    source_url = EXCLUDED.source_url,
+                                    updated_at = NOW()
+                            """, (
+                                row['id'], row['title'], row['dept'], row['units'], 
+                                row['level'], row['description'], 
+                                json.dumps(row['terms_offered']) if isinstance(row['terms_offered'], list) else row['terms_offered'],
+                                row['prereqs'], 
+                                json.dumps(row['workload']) if isinstance(row['workload'], dict) else row['workload'],
+                                json.dumps(row['assessments']) if isinstance(row['assessments'], dict) else row['assessments'],
+                                row['source_url']
+                            ))
+                        conn.commit()
+                        current.add(rows=min(batch_size, len(df) - start))
+                    journal.mark_done(batch_key, min(batch_size, len(df) - start))
                 
-                conn.commit()
+                journal.report()
                 print(f"Uploaded {len(df)} courses")
     
-    def upload_options_from_csv(self, csv_file: str):
+    def upload_options_from_csv(self, csv_file: str, batch_size: int = 200):
         """Upload options from CSV file"""
         import pandas as pd
         
-        df = pd.read_csv(csv_file)
+        with span('parse', file=Path(csv_file).name) as current:
+            df = pd.read_csv(csv_file)
+            current.add(rows=len(df), bytes=os.path.getsize(csv_file))
+        journal = CheckpointJournal(f"upload-options:{Path(csv_file).name}", hash_file(csv_file), resume=self.resume)
         
-        with psycopg2.connect(self.db_url) as conn:
+        with journal, psycopg2.connect(self.db_url) as conn:
             with conn.cursor() as cur:
-                for _, row in df.iterrows():
-                    cur.execute("""
-                        INSERT INTO options (id, name, program, faculty, required_courses, 
-                                           selective_rules, description, source_url)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (id) DO UPDATE SET
-                            name = EXCLUDED.name,
-                            program = EXCLUDED.program,
-                            faculty = EXCLUDED.faculty,
-                            required_courses = EXCLUDED.required_courses,
-                            selective_rules = EXCLUDED.selective_rules,
-                            description = EXCLUDED.description,
-                            source_url = EXCLUDED.source_url,
-                            updated_at = NOW()
-                    """, (
-                        row['id'], row['name'], row['program'], row['faculty'],
-                        json.dumps(row['required_courses']) if isinstance(row['required_courses'], list) else row['required_courses'],
-                        json.dumps(row['selective_rules']) if isinstance(row['selective_rules'], dict) else row['selective_rules'],
-                        row['description'], row['source_url']
-                    ))
+                for start in range(0, len(df), batch_size):
+                    batch_key = f"rows:{start}"
+                    if journal.is_done(batch_key):
+                        continue
+                    
+                    with span('upload', table='options') as current:
+                        for _, row in df.iloc[start:start + batch_size].iterrows():
+                            cur.execute("""
+                                INSERT INTO options (id, name, program, faculty, required_courses, 
+                                                   selective_rules, description, source_url)
+                                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                                ON CONFLICT (id) DO UPDATE SET
+                                    name = EXCLUDED.name,
+                                    program = EXCLUDED.program,
+                                    faculty = EXCLUDED.faculty,
+                                    required_courses = EXCLUDED.required_courses,
+                                    selective_rules = EXCLUDED.selective_rules,
+                                    description = EXCLUDED.description,
+                                    source_url = EXCLUDED.source_url,
+                                    updated_at = NOW()
+                            """, (
+                                row['id'], row['name'], row['program'], row['faculty'],
+                                json.dumps(row['required_courses']) if isinstance(row['required_courses'], list) else row['required_courses'],
+                                json.dumps(row['selective_rules']) if isinstance(row['selective_rules'], dict) else row['selective_rules'],
+                                row['description'], row['source_url']
+                            ))
+                        conn.commit()
+                        current.add(rows=min(batch_size, len(df) - start))
+                    journal.mark_done(batch_key, min(batch_size, len(df) - start))
                 
-                conn.commit()
+                journal.report()
                 print(f"Uploaded {len(df)} options")
 
 def main():
     """Main function to run data processing"""
-    if len(sys.argv) < 2:
-        print("Usage: python data_processor.py <command> [args...]")
+    profile = pop_profile_flag()
+    resume = '--resume' in sys.argv
+    args = [arg for arg in sys.argv if arg != '--resume']
+    
+    # --name value options (process-dir only)
+    options = {}
+    for name in ('--base-url', '--course-id', '--option-id', '--workers'):
+        if name in args:
+            position = args.index(name)
+            if position + 1 >= len(args):
+                print(f"Error: {name} needs a value")
+                return
+            options[name[2:].replace('-', '_')] = args[position + 1]
+            del args[position:position + 2]
+    
+    if len(args) < 2:
+        print("Usage: python data_processor.py <command> [args...] [--resume] [--profile]")
         print("Commands:")
         print("  upload-courses <csv_file>")
         print("  upload-options <csv_file>")
         print("  process-doc <text_file> <source_url> [course_id] [option_id]")
+        print("  process-dir <directory> [--base-url URL] [--course-id ID] [--option-id ID] [--workers N]")
+        print("Options:")
+        print("  --resume   skip batches completed by an earlier interrupted run")
+        print("  --profile  write a cProfile, memory and stage-time report to backend/.cache/profiles/")
         return
     
-    processor = DataProcessor()
-    command = sys.argv[1]
-    
-    if command == "upload-courses":
-        if len(sys.argv) < 3:
-            print("Error: CSV file path required")
-            return
-        processor.upload_courses_from_csv(sys.argv[2])
-    
-    elif command == "upload-options":
-        if len(sys.argv) < 3:
-            print("Error: CSV file path required")
-            return
-        processor.upload_options_from_csv(sys.argv[2])
+    command = args[1]
+    if command not in ('upload-courses', 'upload-options', 'process-doc', 'process-dir'):
+        print(f"Unknown command: {command}")
+        return
     
-    elif command == "process-doc":
-        if len(sys.argv) < 4:
-            print("Error: text file and source URL required")
-            return
+    processor = DataProcessor(resume=resume)
+    with start_run(f"data-processor-{command}", profile=profile):
+        if command == "upload-courses":
+            if len(args) < 3:
+                print("Error: CSV file path required")
+                return
+            processor.upload_courses_from_csv(args[2])
         
-        with open(sys.argv[2], 'r', encoding='utf-8') as f:
-            text = f.read()
+        elif command == "upload-options":
+            if len(args) < 3:
+                print("Error: CSV file path required")
+                return
+            processor.upload_options_from_csv(args[2])
         
-        source_url = sys.argv[3]
-        course_id = sys.argv[4] if len(sys.argv) > 4 else None
-        option_id = sys.argv[5] if len(sys.argv) > 5 else None
+        elif command == "process-doc":
+            if len(args) < 4:
+                print("Error: text file and source URL required")
+                return
         
-        processor.process_document(text, source_url, course_id, option_id)
-    
-    else:
-        print(f"Unknown command: {command}")
+            source_url = args[3]
+            course_id = args[4] if len(args) > 4 else None
+            option_id = args[5] if len(args) > 5 else None
+        
+            processor.process_file(args[2], source_url, course_id, option_id)
+        
+        elif command == "process-dir":
+            if len(args) < 3:
+                print("Error: directory required")
+                return
+        
+            workers = int(options['workers']) if 'workers' in options else None
+            processor.process_directory(args[2], options.get('base_url'), options.get('course_id'),
+                                        options.get('option_id'), workers=workers)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+"""
+Multi-term degree planner
+Lays a student's electives out over their remaining study terms. Core courses come
+from uw_engineering_core_by_program_TIDY.json, and so do the elective slots each
+term leaves open ("Technical Elective", "Two Technical Electives",
+"Complementary Studies Elective", ...). The plan respects prerequisites, including
+electives planned in earlier terms, term offerings and a per-term workload cap
+on top of the core load. Electives are valued with the recommendation scorer,
+and the plan maximizes their total.
+
+The search is depth-first over the elective slots in term order, with the courses
+taken so far as an integer bitset. Three things prune it:
+  - candidates are tried best first, and a branch stops once its score plus the
+    best scores the remaining slots could still get cannot beat the best plan;
+  - interchangeable slots (same term and kind) take courses in index order, and
+    so do interchangeable courses, so no set of courses is tried in every permutation;
+  - a (term, courses taken) state reached before with at least the same score is
+    not searched again, since the rest of the plan only depends on that state.
+The bound assigns the untaken candidates to the remaining slots by term offering
+and kind. After MAX_NODES nodes the best plan found so far is returned, marked as
+not proven optimal.
+
+Commands:
+  plan <program> [--term 2B] [--completed ECE250 ...] [--goals robotics ...]
+  benchmark [--electives 600]  time one plan per program and start term on a synthetic catalog
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import numpy as np
+
+from recommendation_scorer import Catalog, ProfileBatch, score_batch, workload_total
+from simple_uw_processor import STUDY_TERMS, parse_course_code
+
+DEFAULT_JSON = Path(__file__).parent.parent / 'data-to-ingest' / 'uw_engineering_core_by_program_TIDY.json'
+
+# Stream 8 co-op sequence; pass --seasons to plan for another stream
+DEFAULT_SEASONS = {'1A': 'F', '1B': 'W', '2A': 'F', '2B': 'S', '3A': 'W', '3B': 'F', '4A': 'S', '4B': 'W'}
+# Hours per week; core courses without a stored workload count as the ingesters' default
+DEFAULT_MAX_TERM_WORKLOAD = 50
+DEFAULT_COURSE_WORKLOAD = 7
+# Best-scoring courses per slot kind the search considers (plus their elective prerequisites)
+DEFAULT_CANDIDATES = 40
+# Search nodes per plan (about 100 ms); the best plan found so far is returned, marked unproven
+MAX_NODES = 5000
+
+# Components of calculateCourseScore that value a course; prerequisites and terms are constraints here
+PLAN_COMPONENTS = ['goal', 'program', 'workload', 'level']
+
+COUNT_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6}
+COURSE_CODE = re.compile(r'\b([A-Z]{2,5})?\s*(\d{3}[A-Z]?)\b')
+
+def normalize_code(code: str) -> str:
+    return code.replace(' ', '').upper()
+
+def parse_slot(entry: str) -> Tuple[str, int]:
+    """Kind and count of an elective placeholder, e.g. 'Two Technical Electives' -> ('technical', 2)
+
+    'One of: CS 136/138 or ECE 250' is a choice slot, kind 'one of CS136/CS138/ECE250'.
+    """
+    lower = entry.lower()
+    if lower.startswith('one of'):
+        codes = sorted(code for group in parse_prereqs(entry) for code in group)
+        return f"one of {'/'.join(codes)}", 1
+    count = next((COUNT_WORDS.get(word, int(word) if word.isdigit() else 0)
+                  for word in re.findall(r'[a-z]+|\b\d\b', lower)
+                  if word in COUNT_WORDS or word.isdigit()), 1)
+    if any(word in lower for word in ('complementary', 'communication', 'impact', 'society')):
+        kind = 'complementary'
+    elif 'technical' in lower:
+        kind = 'technical'
+    else:
+        kind = 'any'
+    return kind, max(1, count)
+
+def parse_prereqs(text: Optional[str]) -> List[Set[str]]:
+    """Prerequisite groups that must all be met; any course in a group meets it
+
+    'ECE 250, MATH 211' -> [{ECE250}, {MATH211}]; 'CS 136/138 or ECE 250' -> [{CS136, CS138, ECE250}]
+    """
+    groups = []
+    for part in re.split(r',|;|\band\b', (text or '').upper().replace(' AND ', ',')):
+        codes, dept = set(), None
+        for match_dept, number in COURSE_CODE.findall(part):
+            dept = match_dept or dept
+            if dept:
+                codes.add(f"{dept}{number}")
+        if codes:
+            groups.append(codes)
+    return groups
+
+def load_curriculum(json_data: Dict[str, Any], program: str) -> Dict[str, Dict[str, List]]:
+    """Core course ids and elective slot kinds per study term"""
+    terms = json_data['programs'][program]['terms']
+    curriculum = {'core': {}, 'slots': {}}
+    for term in STUDY_TERMS:
+        core, slots = [], []
+        for entry in terms.get(term, []):
+            if ' - ' in entry:
+                if not entry.startswith('WKRPT'):
+                    core.append(normalize_code(parse_course_code(entry)['id']))
+            else:
+                kind, count = parse_slot(entry)
+                slots.extend([kind] * count)
+        curriculum['core'][term] = core
+        curriculum['slots'][term] = slots
+    return curriculum
+
+def remaining_terms(current_term: Optional[str]) -> List[str]:
+    if current_term not in STUDY_TERMS:
+        return list(STUDY_TERMS)
+    return STUDY_TERMS[STUDY_TERMS.index(current_term) + 1:]
+
+class DegreePlanner:
+    def __init__(self, courses: Sequence[Dict[str, Any]], curriculum: Dict[str, Dict[str, List]],
+                 max_term_workload: float = DEFAULT_MAX_TERM_WORKLOAD,
+                 seasons: Optional[Dict[str, str]] = None, candidates: int = DEFAULT_CANDIDATES,
+                 max_nodes: int = MAX_NODES):
+        self.courses = list(courses)
+        self.catalog = Catalog(self.courses)
+        self.by_id = {normalize_code(course['id']): course for course in self.courses}
+        self.curriculum = curriculum
+        self.max_term_workload = max_term_workload
+        self.seasons = seasons or DEFAULT_SEASONS
+        self.candidates = candidates
+        self.max_nodes = max_nodes
+        self.prereqs = [parse_prereqs(course.get('prereqs')) for course in self.courses]
+
+    def course_workload(self, course: Optional[Dict[str, Any]]) -> float:
+        if course is None or course.get('workload') is None:
+            return DEFAULT_COURSE_WORKLOAD
+        return workload_total(course['workload'])
+
+    def offered(self, course: Dict[str, Any], term: str) -> bool:
+        """terms_offered holds seasons (F/W/S) or study terms (1A..4B); no data means offered"""
+        offered = course.get('terms_offered') or []
+        if not offered:
+            return True
+        return term in offered or self.seasons.get(term) in offered
+
+    def fits(self, course: Dict[str, Any], kind: str) -> bool:
+        if kind.startswith('one of '):
+            return normalize_code(course['id']) in kind[len('one of '):].split('/')
+        cse = course.get('cse_classification')
+        if cse and cse != 'EXCLUSION':
+            return kind in ('complementary', 'any')
+        if kind == 'technical':
+            return (course.get('level') or 300) >= 300
+        return kind == 'any'
+
+    def plan(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        terms = remaining_terms(profile.get('current_term'))
+        core = self.curriculum['core']
+        core_ids = {code for term_core in core.values() for code in term_core}
+        done = {normalize_code(code) for code in profile.get('completed_courses') or []}
+        # Core courses of the current and earlier terms count as taken
+        for term in STUDY_TERMS:
+            if term in terms:
+                break
+            done.update(core[term])
+
+        # Value every course for this student in one vectorized pass
+        breakdown = score_batch(self.catalog, ProfileBatch(self.catalog, [profile]))
+        value = sum(breakdown.components[name][0].astype(np.int32) for name in PLAN_COMPONENTS)
+
+        slot_kinds = [(term, kind) for term in terms for kind in self.curriculum['slots'][term]]
+        needed_kinds = {kind for _, kind in slot_kinds}
+        open_rows = [row for row, course in enumerate(self.courses)
+                     if normalize_code(course['id']) not in core_ids | done]
+
+        # Best courses per kind, then the electives that unlock them
+        chosen: List[int] = []
+        for kind in sorted(needed_kinds):
+            fits = [row for row in open_rows if self.fits(self.courses[row], kind)]
+            chosen.extend(sorted(fits, key=lambda row: (-value[row], row))[:self.candidates])
+        open_ids = {normalize_code(self.courses[row]['id']): row for row in open_rows}
+        for row in list(chosen):
+            for group in self.prereqs[row]:
+                chosen.extend(open_ids[code] for code in group if code in open_ids)
+        rows = sorted(set(chosen), key=lambda row: (-int(value[row]), row))
+        index_of = {normalize_code(self.courses[row]['id']): i for i, row in enumerate(rows)}
+        scores = [int(value[row]) for row in rows]
+        loads = [self.course_workload(self.courses[row]) for row in rows]
+        kinds = [{kind for kind in needed_kinds if self.fits(self.courses[row], kind)} for row in rows]
+
+        # Per remaining term: which candidates are offered, and for each the prerequisite groups
+        # still open after completed and core courses, as bitsets of candidates that satisfy them
+        offered: List[List[bool]] = []
+        needs: List[List[Optional[List[int]]]] = []
+        core_load: List[float] = []
+        have = set(done)
+        for term in terms:
+            offered.append([self.offered(self.courses[row], term) for row in rows])
+            term_needs = []
+            for row in rows:
+                masks = []
+                for group in self.prereqs[row]:
+                    # Courses missing from the catalog can be neither planned nor checked
+                    group = {code for code in group if code in self.by_id}
+                    if not group or group & have:
+                        continue
+                    mask = sum(1 << index_of[code] for code in group if code in index_of)
+                    if not mask:
+                        masks = None  # unmeetable before this term
+                        break
+                    masks.append(mask)
+                term_needs.append(masks)
+            needs.append(term_needs)
+            core_load.append(sum(self.course_workload(self.by_id.get(code)) for code in core[term]))
+            have.update(core[term])
+
+        search = PlanSearch(terms, slot_kinds, scores, loads, kinds, offered, needs, core_load,
+                            self.max_term_workload, self.max_nodes)
+        best_score, best_slots = search.run()
+
+        plan_terms = []
+        for term_index, term in enumerate(terms):
+            electives = []
+            for (slot_term, kind), choice in zip(slot_kinds, best_slots):
+                if slot_term != term:
+                    continue
+                course = self.courses[rows[choice]] if choice is not None else None
+                electives.append({
+                    'slot': kind,
+                    'course_id': course['id'] if course else None,
+                    'title': course.get('title') if course else None,
+                    'score': scores[choice] if choice is not None else 0,
+                })
+            plan_terms.append({
+                'term': term,
+                'season': self.seasons.get(term),
+                'core': core[term],
+                'electives': electives,
+                'workload': core_load[term_index] + sum(loads[choice] for (slot_term, _), choice
+                                                        in zip(slot_kinds, best_slots)
+                                                        if slot_term == term and choice is not None),
+            })
+        return {
+            'terms': plan_terms,
+            'score': best_score,
+            'filled_slots': sum(choice is not None for choice in best_slots),
+            'slots': len(slot_kinds),
+            'candidates': len(rows),
+            'nodes': search.nodes,
+            'optimal': search.nodes < search.max_nodes,
+            'ms': (time.perf_counter() - started) * 1000,
+        }
+
+class PlanSearch:
+    """Branch-and-bound over elective slots with a (term, taken bitset) transposition table"""
+
+    def __init__(self, terms, slot_kinds, scores, loads, kinds, offered, needs, core_load, max_term_workload,
+                 max_nodes: int = MAX_NODES):
+        self.term_index = {term: i for i, term in enumerate(terms)}
+        self.slot_term = [self.term_index[term] for term, _ in slot_kinds]
+        self.slot_kind = [kind for _, kind in slot_kinds]
+        self.scores = scores
+        self.loads = loads
+        self.kinds = kinds
+        self.offered = offered
+        self.needs = needs
+        self.core_load = core_load
+        self.max_term_workload = max_term_workload
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.best = -1
+        self.best_slots: List[Optional[int]] = [None] * len(slot_kinds)
+        self.seen: Dict[Tuple[int, int], int] = {}
+
+        # Candidates that differ only in which course they are (same score, workload, slot kinds,
+        # offerings and prerequisites, and prerequisite of no other candidate) are interchangeable:
+        # one is only taken once every earlier one is
+        unlocks = 0
+        for term_needs in needs:
+            for masks in term_needs:
+                for mask in masks or []:
+                    unlocks |= mask
+        self.twins = [0] * len(scores)
+        signatures: Dict[Any, int] = {}
+        for i in range(len(scores)):
+            if (unlocks >> i) & 1:
+                continue
+            signature = (scores[i], loads[i], frozenset(kinds[i]), tuple(term[i] for term in offered),
+                         tuple(None if term[i] is None else tuple(term[i]) for term in needs))
+            self.twins[i] = signatures.get(signature, 0)
+            signatures[signature] = self.twins[i] | (1 << i)
+
+        # For the bound: from each slot on, the (term, kind) groups of slots left with their
+        # sizes, and for every candidate the groups it could fill at all: offered that term, and
+        # every prerequisite either already taken or placeable in an earlier term still to come.
+        # Prerequisites of the unlocking course and workload are ignored.
+        slots = len(self.slot_term)
+        self.groups: List[List[int]] = [[] for _ in range(slots + 1)]
+        self.edges: List[List[Tuple[int, List[int], List[Tuple[int, List[int]]]]]] = [[] for _ in range(slots + 1)]
+        for slot in range(slots):
+            keys: List[Tuple[int, str]] = []
+            for later in range(slot, slots):
+                key = (self.slot_term[later], self.slot_kind[later])
+                if key not in keys:
+                    keys.append(key)
+                    self.groups[slot].append(0)
+                self.groups[slot][keys.index(key)] += 1
+            placeable: Dict[int, int] = {}
+            for term, kind in keys:
+                placeable[term] = placeable.get(term, 0) | sum(
+                    1 << i for i in range(len(scores))
+                    if kind in kinds[i] and offered[term][i] and needs[term][i] is not None)
+            for i in range(len(scores)):
+                fits, pending = [], []
+                for g, (term, kind) in enumerate(keys):
+                    if kind not in kinds[i] or not offered[term][i] or needs[term][i] is None:
+                        continue
+                    earlier = 0
+                    for other, mask in placeable.items():
+                        if other < term:
+                            earlier |= mask
+                    # Prerequisites no earlier slot can hold must already be taken
+                    masks = [mask for mask in needs[term][i] if not mask & earlier]
+                    if masks:
+                        pending.append((g, masks))
+                    else:
+                        fits.append(g)
+                if fits or pending:
+                    self.edges[slot].append((i, fits, pending))
+        self.bounds: Dict[Tuple[int, int], int] = {}
+
+    def run(self) -> Tuple[int, List[Optional[int]]]:
+        self.search(0, 0, 0, 0.0, -1, 0, [])
+        return max(self.best, 0), self.best_slots
+
+    def optimistic(self, slot: int, taken: int) -> int:
+        """Most the slots from `slot` on could add: the best assignment of untaken candidates to them
+
+        Sets of candidates that can all be given a slot form a transversal matroid, so adding
+        candidates best first whenever an augmenting path finds them a slot is optimal.
+        """
+        key = (slot, taken)
+        if key in self.bounds:
+            return self.bounds[key]
+        free = list(self.groups[slot])
+        left = sum(free)
+        members: List[List[int]] = [[] for _ in free]
+        fits = {}
+        total = 0
+        for i, groups, pending in self.edges[slot]:
+            if left == 0:
+                break
+            if (taken >> i) & 1:
+                continue
+            if pending:
+                groups = groups + [g for g, masks in pending if all(mask & taken for mask in masks)]
+            fits[i] = groups
+            for g in groups:
+                if free[g]:
+                    free[g] -= 1
+                    members[g].append(i)
+                    break
+            else:
+                if not groups or not self.augment(i, fits, free, members, set()):
+                    continue
+            total += self.scores[i]
+            left -= 1
+        self.bounds[key] = total
+        return total
+
+    def augment(self, i: int, fits, free: List[int], members: List[List[int]], visited: Set[int]) -> bool:
+        for g in fits[i]:
+            if free[g]:
+                free[g] -= 1
+                members[g].append(i)
+                return True
+        for g in fits[i]:
+            if g in visited:
+                continue
+            visited.add(g)
+            for j in members[g]:
+                if self.augment(j, fits, free, members, visited):
+                    members[g].remove(j)
+                    members[g].append(i)
+                    return True
+        return False
+
+    def search(self, slot: int, taken: int, before_term: int, term_load: float, last: int,
+               score: int, choices: List[Optional[int]]):
+        self.nodes += 1
+        if slot == len(self.slot_term) or self.nodes >= self.max_nodes:
+            if score > self.best:
+                self.best = score
+                self.best_slots = choices + [None] * (len(self.slot_term) - len(choices))
+            return
+
+        term = self.slot_term[slot]
+        if slot == 0 or self.slot_term[slot - 1] != term:
+            # New term: everything taken so far counts towards prerequisites
+            before_term, term_load, last = taken, self.core_load[term], -1
+            key = (term, taken)
+            if self.seen.get(key, -1) >= score:
+                return
+            self.seen[key] = score
+        elif self.slot_kind[slot - 1] != self.slot_kind[slot]:
+            last = -1
+
+        rest = self.optimistic(slot + 1, taken)
+        kind = self.slot_kind[slot]
+        offered, needs = self.offered[term], self.needs[term]
+        for i in range(last + 1, len(self.scores)):
+            if score + self.scores[i] + rest <= self.best:
+                break  # later candidates score no higher
+            if (taken >> i) & 1 or kind not in self.kinds[i] or not offered[i] or self.twins[i] & ~taken:
+                continue
+            if term_load + self.loads[i] > self.max_term_workload:
+                continue
+            if needs[i] is None or any(not (mask & before_term) for mask in needs[i]):
+                continue
+            self.search(slot + 1, taken | (1 << i), before_term, term_load + self.loads[i], i,
+                        score + self.scores[i], choices + [i])
+
+        # Leave the slot empty; later slots of the same kind this term stay empty too
+        if score + rest > self.best:
+            self.search(slot + 1, taken, before_term, term_load, len(self.scores), score, choices + [None])
+
+def synthetic_electives(json_data: Dict[str, Any], count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Core courses from the curriculum plus random electives that require core courses of their
+    department or, now and then, another elective"""
+    from skill_tagging import SKILL_LABELS
+
+    rng = np.random.default_rng(seed)
+    courses, core_ids = {}, []
+    for program in json_data['programs']:
+        curriculum = load_curriculum(json_data, program)
+        for term, codes in curriculum['core'].items():
+            for code in codes:
+                level = (STUDY_TERMS.index(term) // 2 + 1) * 100
+                courses.setdefault(code, {'id': code, 'dept': re.match(r'[A-Z]+', code).group(0), 'level': level,
+                                          'skills': [], 'prereqs': '', 'terms_offered': ['F', 'W', 'S'],
+                                          'workload': {'reading': 2, 'assignments': 3, 'projects': 1, 'labs': 1}})
+                core_ids.append(code)
+    core_ids = sorted(set(core_ids))
+    depts = sorted({course['dept'] for course in courses.values()})
+    labels = list(SKILL_LABELS)
+    electives = []
+    for i in range(count):
+        dept = depts[rng.integers(len(depts))]
+        cse = rng.random() < 0.2
+        code = f"{'HIST' if cse else dept}{int(rng.integers(300, 500))}{chr(65 + i % 26)}"
+        prereq_pool = [core_id for core_id in core_ids if courses[core_id]['dept'] == dept] or core_ids
+        if electives and rng.random() < 0.15:
+            prereq_pool = [course['id'] for course in electives]
+        electives.append({
+            'id': code,
+            'title': f"Synthetic elective {i}",
+            'dept': 'HIST' if cse else dept,
+            'level': 300 if code[-4] == '3' else 400,
+            'skills': list(rng.choice(labels, size=int(rng.integers(1, 4)), replace=False)),
+            'prereqs': ', '.join(rng.choice(prereq_pool, size=min(len(prereq_pool), int(rng.integers(0, 3))), replace=False)) if not cse else '',
+            'terms_offered': sorted(rng.choice(['F', 'W', 'S'], size=int(rng.integers(1, 4)), replace=False).tolist()),
+            'workload': {'reading': int(rng.integers(1, 4)), 'assignments': int(rng.integers(1, 5)),
+                         'projects': int(rng.integers(0, 3)), 'labs': int(rng.integers(0, 3))},
+            'cse_classification': str(rng.choice(['A', 'B', 'C', 'D'])) if cse else None,
+        })
+    return list(courses.values()) + electives
+
+def benchmark(json_file: Path, electives: int):
+    with open(json_file, 'r', encoding='utf-8') as f:
+        json_data = json.load(f)
+    courses = synthetic_electives(json_data, electives)
+    print(f"📊 Planning on {len(courses)} courses ({electives} synthetic electives)")
+    print(f"{'program':<30} {'from':>4} {'slots':>6} {'filled':>7} {'score':>6} {'nodes':>7} {'ms':>8}")
+
+    timings, cut, agree = [], 0, 0
+    for program in json_data['programs']:
+        planner = DegreePlanner(courses, load_curriculum(json_data, program))
+        for current_term in ('1B', '2B', '3A'):
+            profile = {'program': program, 'current_term': current_term, 'completed_courses': [],
+                       'goal_tags': ['robotics', 'machine learning', 'software'], 'constraints': {}}
+            result = planner.plan(profile)
+            timings.append(result['ms'])
+            note = ''
+            if not result['optimal']:
+                # Compare with a search that runs to completion
+                planner.max_nodes = 10 ** 9
+                exhaustive = planner.plan(profile)
+                planner.max_nodes = MAX_NODES
+                cut += 1
+                agree += exhaustive['score'] == result['score']
+                note = f"  (node limit; exhaustive {exhaustive['score']} in {exhaustive['ms']:.0f} ms)"
+            print(f"{program:<30} {current_term:>4} {result['slots']:>6} {result['filled_slots']:>7} "
+                  f"{result['score']:>6} {result['nodes']:>7} {result['ms']:>8.1f}{note}")
+    p50, p95 = np.percentile(timings, [50, 95])
+    print(f"\n⏱️ p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {max(timings):.1f} ms over {len(timings)} plans")
+    print(f"   {len(timings) - cut} proven optimal; {agree}/{cut} stopped at the node limit had the optimal score")
+
+def load_courses(db_url: str) -> List[Dict[str, Any]]:
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(db_url)
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT id, title, dept, level, skills, prereqs, terms_offered, workload, cse_classification
+                FROM courses ORDER BY id
+            """)
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+def print_plan(program: str, result: Dict[str, Any]):
+    print(f"🗓️ {program}: {result['filled_slots']}/{result['slots']} elective slots filled, score {result['score']} "
+          f"({result['candidates']} candidates, {result['nodes']} nodes, {result['ms']:.1f} ms"
+          f"{'' if result['optimal'] else ', node limit reached'})")
+    for term in result['terms']:
+        print(f"\n  {term['term']} ({term['season'] or '?'}) - {term['workload']:.0f} h/week")
+        print(f"    core: {', '.join(term['core']) or '-'}")
+        for elective in term['electives']:
+            course = f"{elective['course_id']}: {elective['title']} ({elective['score']})" if elective['course_id'] else 'no eligible course'
+            print(f"    {elective['slot']:<13} {course}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan electives over the remaining study terms")
+    parser.add_argument('command', choices=['plan', 'benchmark'])
+    parser.add_argument('program', nargs='?', help="program name as in the curriculum file")
+    parser.add_argument('--term', help="current study term, e.g. 2B (planning starts after it)")
+    parser.add_argument('--completed', nargs='*', default=[], help="completed course codes")
+    parser.add_argument('--goals', nargs='*', default=[], help="goal tags / skills to favour")
+    parser.add_argument('--max-term-workload', type=float, default=DEFAULT_MAX_TERM_WORKLOAD,
+                        help="hours per week per term, core included")
+    parser.add_argument('--seasons', help="study term seasons, e.g. 3A=W,3B=F,4A=S,4B=W")
+    parser.add_argument('--candidates', type=int, default=DEFAULT_CANDIDATES)
+    parser.add_argument('--max-nodes', type=int, default=MAX_NODES)
+    parser.add_argument('--electives', type=int, default=600, help="benchmark electives")
+    parser.add_argument('--json', type=Path, default=DEFAULT_JSON, help="curriculum file")
+    args = parser.parse_args()
+
+    if args.command == 'benchmark':
+        benchmark(args.json, args.electives)
+        return
+
+    with open(args.json, 'r', encoding='utf-8') as f:
+        json_data = json.load(f)
+    if args.program not in json_data['programs']:
+        parser.error(f"program must be one of: {', '.join(json_data['programs'])}")
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    seasons = dict(DEFAULT_SEASONS)
+    if args.seasons:
+        seasons.update(pair.split('=', 1) for pair in args.seasons.split(','))
+    planner = DegreePlanner(load_courses(db_url), load_curriculum(json_data, args.program),
+                            args.max_term_workload, seasons, args.candidates, args.max_nodes)
+    result = planner.plan({
+        'program': args.program, 'current_term': args.term, 'completed_courses': args.completed,
+        'goal_tags': args.goals, 'constraints': {},
+    })
+    print_plan(args.program, result)
+
+if __name__ == "__main__":
+    main()
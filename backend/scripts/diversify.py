@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Diverse top-k selection for retrieval results
+Maximal marginal relevance over a candidate pool: each pick maximizes
+(1 - diversity) * similarity to the query - diversity * highest similarity to an
+earlier pick. An optional cap limits picks per source (page URL, course topic). The
+cap yields only when nothing else is left, so k results come back whenever the pool
+has k. search_elective_docs_diverse (data-to-ingest/add-diverse-retrieval.sql) runs
+the same selection in the database; benchmark_search.py uses this one to measure it.
+"""
+
+import re
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from quantized_index import normalize
+
+# Words per shingle when counting text a chunk repeats from earlier chunks
+SHINGLE_WORDS = 8
+
+def mmr(query: np.ndarray, vectors: np.ndarray, k: int, diversity: float = 0.3,
+        sources: Optional[Sequence] = None, per_source: Optional[int] = None) -> np.ndarray:
+    """Rows of vectors picked for the query, in pick order
+
+    diversity=0 is plain similarity order; per_source needs sources (one label per row).
+    """
+    vectors = normalize(vectors)
+    relevance = vectors @ normalize(query)
+    k = min(k, len(vectors))
+    closest = np.zeros(len(vectors), dtype=np.float32)  # highest similarity to a pick so far
+    available = np.ones(len(vectors), dtype=bool)
+    if sources is not None and per_source is not None:
+        labels, source_ids = np.unique(np.asarray(sources, dtype=object).astype(str), return_inverse=True)
+        source_counts = np.zeros(len(labels), dtype=np.int32)
+    else:
+        source_ids = None
+
+    picks = []
+    for _ in range(k):
+        scores = (1 - diversity) * relevance - diversity * closest
+        scores[~available] = -np.inf
+        if source_ids is not None:
+            capped = source_counts[source_ids] >= per_source
+            if not np.all(capped | ~available):
+                scores[capped] = -np.inf
+        pick = int(np.argmax(scores))
+        picks.append(pick)
+        available[pick] = False
+        np.maximum(closest, vectors @ vectors[pick], out=closest)
+        if source_ids is not None:
+            source_counts[source_ids[pick]] += 1
+    return np.asarray(picks, dtype=np.int64)
+
+def redundant_tokens(texts: Sequence[str], shingle: int = SHINGLE_WORDS) -> Tuple[int, int]:
+    """Words in texts covered by a shingle already seen in an earlier text, and all words"""
+    seen = set()
+    redundant = total = 0
+    for text in texts:
+        words = re.findall(r'\w+', (text or '').lower())
+        covered = np.zeros(len(words), dtype=bool)
+        shingles = [tuple(words[i:i + shingle]) for i in range(max(len(words) - shingle + 1, 0))]
+        for i, gram in enumerate(shingles):
+            if gram in seen:
+                covered[i:i + shingle] = True
+        seen.update(shingles)
+        redundant += int(covered.sum())
+        total += len(words)
+    return redundant, total
+
+def mean_pairwise_similarity(vectors: np.ndarray) -> float:
+    """Average cosine similarity between distinct rows (0 for fewer than two)"""
+    if len(vectors) < 2:
+        return 0.0
+    unit = normalize(vectors)
+    sims = unit @ unit.T
+    return float((sims.sum() - np.trace(sims)) / (len(unit) * (len(unit) - 1)))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Text extraction from local HTML and PDF files (calendar pages, course outlines)
+extract_document runs in worker processes, so it only takes and returns plain
+picklable values; iter_extracted keeps a bounded number of files in flight so a
+slow consumer (the embedder) never lets extracted text pile up in memory
+"""
+
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+HTML_SUFFIXES = {'.html', '.htm', '.xhtml'}
+PDF_SUFFIXES = {'.pdf'}
+TEXT_SUFFIXES = {'.txt', '.md'}
+SUPPORTED_SUFFIXES = HTML_SUFFIXES | PDF_SUFFIXES | TEXT_SUFFIXES
+
+def find_documents(directory: str) -> List[Path]:
+    """Supported files under a directory, in a stable order"""
+    return sorted(
+        path for path in Path(directory).rglob('*')
+        if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES
+    )
+
+def clean_text(text: str) -> str:
+    """Normalise whitespace and drop lines that are only page furniture"""
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r'[ \t\u00a0]+', ' ', line).strip()
+        # Page numbers and lone separators from PDF layouts
+        if re.fullmatch(r'(page )?\d+( of \d+)?|[-_=•·|]+', line, flags=re.IGNORECASE):
+            continue
+        lines.append(line)
+    # Keep paragraph breaks (the chunker splits on blank lines), collapse the rest
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+def extract_html(path: Path) -> Dict:
+    html = path.read_text(encoding='utf-8', errors='replace')
+    try:
+        import trafilatura
+        text = trafilatura.extract(html, include_comments=False, include_tables=True, favor_recall=True)
+        metadata = trafilatura.extract_metadata(html)
+        title = metadata.title if metadata else None
+    except ImportError:
+        text, title = None, None
+
+    if not text:
+        # Boilerplate removal found nothing (or trafilatura is missing): fall back to all visible text
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html, 'html.parser')
+        for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'noscript']):
+            tag.decompose()
+        title = title or (soup.title.string.strip() if soup.title and soup.title.string else None)
+        text = soup.get_text('\n')
+
+    return {'text': text, 'title': title, 'pages': 1}
+
+def extract_pdf(path: Path) -> Dict:
+    from pypdf import PdfReader
+
+    reader = PdfReader(str(path))
+    pages = [page.extract_text() or '' for page in reader.pages]
+    title = reader.metadata.title if reader.metadata and reader.metadata.title else None
+    return {'text': '\n\n'.join(pages), 'title': title, 'pages': len(pages)}
+
+def extract_document(path: str) -> Dict:
+    """Extract and clean one file; errors are returned, not raised, so one bad file never stops a run"""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    result = {'path': str(path), 'kind': suffix.lstrip('.'), 'text': '', 'title': None, 'pages': 0,
+              'bytes': 0, 'error': None}
+    try:
+        result['bytes'] = path.stat().st_size
+        if suffix in HTML_SUFFIXES:
+            result.update(extract_html(path))
+        elif suffix in PDF_SUFFIXES:
+            result.update(extract_pdf(path))
+        else:
+            result.update(text=path.read_text(encoding='utf-8', errors='replace'), pages=1)
+        result['text'] = clean_text(result['text'] or '')
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    return result
+
+def iter_extracted(paths: Iterable[Path], workers: Optional[int] = None) -> Iterator[Dict]:
+    """Extract files on a process pool, yielding results as they finish
+
+    At most two files per worker are in flight, so memory is bounded by the pool
+    size rather than the directory size.
+    """
+    workers = workers or os.cpu_count() or 1
+    paths = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for path in paths:
+            pending.add(pool.submit(extract_document, str(path)))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
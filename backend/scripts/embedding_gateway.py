@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Local embedding gateway shared by the frontend and the backend scripts
+Serves an OpenAI-compatible POST /v1/embeddings on localhost. Concurrent requests
+are micro-batched into one upstream call per few-ms window, identical texts already
+in flight are coalesced onto one future, and repeats are answered from a bounded
+in-memory LRU backed by an on-disk SQLite cache. GET /metrics reports hit rates,
+batch sizes and latency percentiles.
+
+Usage:
+  python embedding_gateway.py [--host 127.0.0.1] [--port 8765] [--window-ms 5] [--max-batch 256]
+Clients opt in with EMBEDDING_GATEWAY_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, OrderedDict, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dotenv import load_dotenv
+import numpy as np
+import openai
+
+from course_embeddings import EMBEDDING_MODEL
+from run_metrics import start_run
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / '.cache' / 'embeddings.sqlite3'
+
+# (model, dimensions or 0, text)
+CacheKey = Tuple[str, int, str]
+
+def cache_digest(key: CacheKey) -> str:
+    return hashlib.sha256(f"{key[0]}\x1f{key[1]}\x1f{key[2]}".encode('utf-8')).hexdigest()
+
+class DiskCache:
+    """float32 vectors in SQLite, keyed by a hash of model, dimensions and text"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                digest TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get_many(self, keys: List[CacheKey]) -> Dict[CacheKey, np.ndarray]:
+        digests = {cache_digest(key): key for key in keys}
+        found = {}
+        items = list(digests.items())
+        for start in range(0, len(items), 500):
+            chunk = items[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT digest, vector FROM embeddings WHERE digest IN ({','.join('?' * len(chunk))})",
+                [digest for digest, _ in chunk]
+            ).fetchall()
+            for digest, vector in rows:
+                found[digests[digest]] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[CacheKey, np.ndarray]):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (digest, vector, created_at) VALUES (?, ?, ?)",
+            [(cache_digest(key), vector.astype(np.float32).tobytes(), now) for key, vector in items.items()]
+        )
+        self.conn.commit()
+
+class GatewayMetrics:
+    def __init__(self, window: int = 2000):
+        self.counters = {'requests': 0, 'texts': 0, 'lru_hits': 0, 'disk_hits': 0, 'coalesced': 0,
+                         'upstream_texts': 0, 'upstream_calls': 0, 'upstream_errors': 0}
+        self.latencies = deque(maxlen=window)  # seconds per request
+        self.upstream_latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.started = time.time()
+
+    @staticmethod
+    def percentiles(values) -> Dict[str, float]:
+        if not values:
+            return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0}
+        p50, p95, p99 = np.percentile(np.fromiter(values, dtype=np.float64), [50, 95, 99]) * 1000
+        return {'p50_ms': round(float(p50), 2), 'p95_ms': round(float(p95), 2), 'p99_ms': round(float(p99), 2)}
+
+    def snapshot(self, lru_size: int) -> Dict:
+        texts = max(self.counters['texts'], 1)
+        return {
+            **self.counters,
+            'lru_size': lru_size,
+            'hit_rate': round((self.counters['lru_hits'] + self.counters['disk_hits']) / texts, 4),
+            'coalesce_rate': round(self.counters['coalesced'] / texts, 4),
+            'avg_batch_size': round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else 0.0,
+            'request_latency': self.percentiles(self.latencies),
+            'upstream_latency': self.percentiles(self.upstream_latencies),
+            'uptime_s': round(time.time() - self.started, 1),
+        }
+
+class EmbeddingGateway:
+    def __init__(self, window_ms: float = 5.0, max_batch: int = 256, lru_size: int = 50000,
+                 cache_path: Optional[Path] = DEFAULT_CACHE_PATH):
+        self.client = openai.AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.lru: 'OrderedDict[CacheKey, np.ndarray]' = OrderedDict()
+        self.lru_size = lru_size
+        self.disk = DiskCache(cache_path) if cache_path else None
+        self.in_flight: Dict[CacheKey, asyncio.Future] = {}
+        self.queues: Dict[Tuple[str, int], List[CacheKey]] = {}
+        self.flush_timers: Dict[Tuple[str, int], asyncio.Task] = {}  # per group, while keys wait for the window
+        self.batch_tasks = set()  # upstream calls in progress (referenced so they are not collected)
+        self.metrics = GatewayMetrics()
+
+    def _lru_get(self, key: CacheKey) -> Optional[np.ndarray]:
+        vector = self.lru.get(key)
+        if vector is not None:
+            self.lru.move_to_end(key)
+        return vector
+
+    def _lru_put(self, key: CacheKey, vector: np.ndarray):
+        self.lru[key] = vector
+        self.lru.move_to_end(key)
+        while len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    async def embed(self, texts: List[str], model: str, dimensions: Optional[int]) -> List[np.ndarray]:
+        """Vectors for texts in order, from cache, an in-flight request or the next batch"""
+        started = time.perf_counter()
+        self.metrics.counters['requests'] += 1
+        self.metrics.counters['texts'] += len(texts)
+        keys = [(model, dimensions or 0, text) for text in texts]
+        counts = Counter(keys)
+        results: Dict[CacheKey, np.ndarray] = {}
+
+        missing = []
+        for key in counts:
+            vector = self._lru_get(key)
+            if vector is not None:
+                results[key] = vector
+                self.metrics.counters['lru_hits'] += counts[key]
+            else:
+                missing.append(key)
+
+        if missing and self.disk:
+            found = await asyncio.to_thread(self.disk.get_many, missing)
+            for key, vector in found.items():
+                results[key] = vector
+                self._lru_put(key, vector)
+                self.metrics.counters['disk_hits'] += counts[key]
+            missing = [key for key in missing if key not in found]
+
+        waiting = {}
+        for key in missing:
+            if key in self.in_flight:
+                self.metrics.counters['coalesced'] += counts[key]
+            else:
+                self.in_flight[key] = asyncio.get_running_loop().create_future()
+                self._enqueue(key)
+            waiting[key] = self.in_flight[key]
+
+        for key, future in waiting.items():
+            results[key] = await future
+
+        self.metrics.latencies.append(time.perf_counter() - started)
+        return [results[key] for key in keys]
+
+    def _enqueue(self, key: CacheKey):
+        """Queue a key for its (model, dimensions) group: a full batch is sent at once,
+        otherwise a timer sends whatever has gathered when the window closes"""
+        group = (key[0], key[1])
+        queue = self.queues.setdefault(group, [])
+        queue.append(key)
+        if len(queue) >= self.max_batch:
+            # The queue is emptied here, so a pending timer has nothing left to send
+            timer = self.flush_timers.pop(group, None)
+            if timer:
+                timer.cancel()
+            self._send(group, self.queues.pop(group))
+        elif group not in self.flush_timers:
+            self.flush_timers[group] = asyncio.ensure_future(self._flush_after(group, self.window))
+
+    async def _flush_after(self, group: Tuple[str, int], delay: float):
+        await asyncio.sleep(delay)
+        # Deregister before anything else, so keys queued from now on start a new timer
+        del self.flush_timers[group]
+        batch = self.queues.pop(group, [])
+        if batch:
+            await self._flush(group, batch)
+
+    def _send(self, group: Tuple[str, int], batch: List[CacheKey]):
+        task = asyncio.ensure_future(self._flush(group, batch))
+        self.batch_tasks.add(task)
+        task.add_done_callback(self.batch_tasks.discard)
+
+    async def _flush(self, group: Tuple[str, int], batch: List[CacheKey]):
+        model, dimensions = group
+        started = time.perf_counter()
+        try:
+            kwargs = {'dimensions': dimensions} if dimensions else {}
+            response = await self.client.embeddings.create(model=model, input=[key[2] for key in batch], **kwargs)
+            vectors = [np.asarray(item.embedding, dtype=np.float32)
+                       for item in sorted(response.data, key=lambda item: item.index)]
+        except Exception as e:
+            self.metrics.counters['upstream_errors'] += 1
+            for key in batch:
+                future = self.in_flight.pop(key, None)
+                if future and not future.done():
+                    future.set_exception(e)
+            return
+
+        self.metrics.counters['upstream_calls'] += 1
+        self.metrics.counters['upstream_texts'] += len(batch)
+        self.metrics.batch_sizes.append(len(batch))
+        self.metrics.upstream_latencies.append(time.perf_counter() - started)
+
+        fresh = dict(zip(batch, vectors))
+        for key, vector in fresh.items():
+            self._lru_put(key, vector)
+            future = self.in_flight.pop(key, None)
+            if future and not future.done():
+                future.set_result(vector)
+        if self.disk:
+            await asyncio.to_thread(self.disk.put_many, fresh)
+
+    def metrics_snapshot(self) -> Dict:
+        return self.metrics.snapshot(len(self.lru))
+
+def encode_vector(vector: np.ndarray, encoding_format: str):
+    """OpenAI wire format: a float list, or base64 little-endian float32 (the Python SDK default)"""
+    if encoding_format == 'base64':
+        return base64.b64encode(vector.astype('<f4').tobytes()).decode('ascii')
+    return vector.tolist()
+
+async def handle_embeddings(gateway: EmbeddingGateway, body: Dict) -> Tuple[int, Dict]:
+    texts = body.get('input')
+    if isinstance(texts, str):
+        texts = [texts]
+    if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+        return 400, {'error': {'message': "input must be a string or a non-empty list of strings"}}
+
+    model = body.get('model') or EMBEDDING_MODEL
+    try:
+        vectors = await gateway.embed(texts, model, body.get('dimensions'))
+    except Exception as e:
+        return 502, {'error': {'message': f"upstream embedding call failed: {e}"}}
+
+    encoding_format = body.get('encoding_format', 'float')
+    return 200, {
+        'object': 'list',
+        'model': model,
+        'data': [{'object': 'embedding', 'index': i, 'embedding': encode_vector(vector, encoding_format)}
+                 for i, vector in enumerate(vectors)],
+        'usage': {'prompt_tokens': 0, 'total_tokens': 0},
+    }
+
+async def handle_connection(gateway: EmbeddingGateway, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Minimal HTTP/1.1 with keep-alive: enough for the OpenAI SDKs and fetch()"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+
+            path = path.split('?', 1)[0]
+            if method == 'POST' and path in ('/v1/embeddings', '/embeddings'):
+                try:
+                    status, payload = await handle_embeddings(gateway, json.loads(body or b'{}'))
+                except json.JSONDecodeError:
+                    status, payload = 400, {'error': {'message': 'invalid JSON body'}}
+            elif method == 'GET' and path == '/metrics':
+                status, payload = 200, gateway.metrics_snapshot()
+            elif method == 'GET' and path == '/health':
+                status, payload = 200, {'status': 'ok'}
+            else:
+                status, payload = 404, {'error': {'message': f"no route for {method} {path}"}}
+
+            data = json.dumps(payload).encode('utf-8')
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host: str, port: int, gateway: EmbeddingGateway, report_interval: float):
+    server = await asyncio.start_server(lambda r, w: handle_connection(gateway, r, w), host, port)
+    print(f"🚀 Embedding gateway on http://{host}:{port} (window {gateway.window * 1000:g} ms, "
+          f"max batch {gateway.max_batch}, LRU {gateway.lru_size})")
+
+    async def report():
+        while True:
+            await asyncio.sleep(report_interval)
+            m = gateway.metrics_snapshot()
+            print(f"📊 {m['requests']} requests, {m['texts']} texts | hit rate {m['hit_rate']:.1%} "
+                  f"(LRU {m['lru_hits']}, disk {m['disk_hits']}), coalesced {m['coalesced']} | "
+                  f"{m['upstream_calls']} upstream calls, avg batch {m['avg_batch_size']} | "
+                  f"p50 {m['request_latency']['p50_ms']} ms, p95 {m['request_latency']['p95_ms']} ms")
+
+    reporter = asyncio.ensure_future(report())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        reporter.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="Batching, caching embedding gateway")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--window-ms', type=float, default=5.0, help="how long to gather concurrent texts")
+    parser.add_argument('--max-batch', type=int, default=256, help="texts per upstream call")
+    parser.add_argument('--lru-size', type=int, default=50000, help="vectors kept in memory")
+    parser.add_argument('--cache', default=str(DEFAULT_CACHE_PATH), help="SQLite cache path ('' to disable)")
+    parser.add_argument('--report-interval', type=float, default=60.0)
+    parser.add_argument('--profile', action='store_true', help="write a cProfile and memory report to backend/.cache/profiles/ on shutdown")
+    args = parser.parse_args()
+
+    gateway = EmbeddingGateway(args.window_ms, args.max_batch, args.lru_size,
+                               Path(args.cache) if args.cache else None)
+    # Requests interleave on the event loop, so the gateway records no stages;
+    # the profile covers the whole loop from start to Ctrl+C
+    with start_run('embedding-gateway', profile=args.profile):
+        try:
+            asyncio.run(serve(args.host, args.port, gateway, args.report_interval))
+        except KeyboardInterrupt:
+            print("\n⏹️ Stopping embedding gateway")
+
+if __name__ == "__main__":
+    main()
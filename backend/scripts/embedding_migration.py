@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Zero-downtime embedding model migration
+Adds a versioned shadow embedding column next to the active one, backfills it in
+the background with a rate limit, and flips the search RPCs over in one transaction
+once every row is covered (see data-to-ingest/add-embedding-versions.sql)
+
+Commands:
+  add <version> --model M [--dimensions D]   add embedding_<version> columns and register the version
+  backfill <version> [--rows-per-sec R] [--flip]   embed rows missing the version, then build its index
+  status                                      coverage and index state of every version
+  flip <version>                              point the search RPCs at a fully covered version
+  rollback                                    flip back to the previously active version
+  retire <version> [--drop]                   stop maintaining a version (optionally drop its columns)
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dotenv import load_dotenv
+import openai
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from course_embeddings import EMBEDDING_MODEL, build_course_text, embed_texts, embedding_client
+from run_metrics import span, start_run
+
+# Load environment variables
+load_dotenv()
+
+VERSIONED_TABLES = ['courses', 'elective_docs']
+
+# pgvector's ivfflat/hnsw indexes stop at 2000 dimensions for the vector type
+MAX_INDEXED_DIMENSIONS = 2000
+
+# Used when add-embedding-versions.sql has not been run yet
+LEGACY_VERSION = {'version': 'v1', 'model': EMBEDDING_MODEL, 'dimensions': 1536,
+                  'column_name': 'embedding', 'status': 'active'}
+
+BACKFILL_CLAIM = {
+    'courses': """
+        SELECT id, title, description, skills, dept, level, prereqs, terms_offered
+        FROM courses
+        WHERE {column} IS NULL
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """,
+    'elective_docs': """
+        SELECT id, text
+        FROM elective_docs
+        WHERE {column} IS NULL
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """,
+}
+
+BACKFILL_TEXT = {
+    'courses': build_course_text,
+    'elective_docs': lambda row: row['text'],
+}
+
+# Search RPC bodies, one branch per served version; {column} is filled in per branch.
+# RETURN QUERY needs exact result types, hence the units cast (NUMERIC in the schema)
+RPCS = {
+    'search_courses_vector': {
+        'threshold': 0.3,
+        'count': 20,
+        'returns': """
+  id TEXT,
+  title TEXT,
+  dept TEXT,
+  number INT,
+  units FLOAT,
+  level INT,
+  description TEXT,
+  terms_offered JSONB,
+  prereqs TEXT,
+  skills JSONB,
+  workload JSONB,
+  assessments JSONB,
+  source_url TEXT,
+  similarity FLOAT""",
+        'query': """
+    SELECT
+      courses.id, courses.title, courses.dept, courses.number, courses.units::FLOAT, courses.level,
+      courses.description, courses.terms_offered, courses.prereqs, courses.skills,
+      courses.workload, courses.assessments, courses.source_url,
+      1 - (courses.{column} <=> query_embedding) AS similarity
+    FROM courses
+    WHERE courses.{column} IS NOT NULL
+      AND 1 - (courses.{column} <=> query_embedding) > match_threshold
+    ORDER BY courses.{column} <=> query_embedding
+    LIMIT match_count;""",
+    },
+    'search_elective_docs': {
+        'threshold': 0.5,
+        'count': 10,
+        'returns': """
+  id UUID,
+  course_id TEXT,
+  option_id TEXT,
+  text TEXT,
+  source_url TEXT,
+  similarity FLOAT""",
+        'query': """
+    SELECT
+      elective_docs.id, elective_docs.course_id, elective_docs.option_id,
+      elective_docs.text, elective_docs.source_url,
+      1 - (elective_docs.{column} <=> query_embedding) AS similarity
+    FROM elective_docs
+    WHERE 1 - (elective_docs.{column} <=> query_embedding) > match_threshold
+    ORDER BY elective_docs.{column} <=> query_embedding
+    LIMIT match_count;""",
+    },
+}
+
+def column_for(version: str) -> str:
+    if not re.fullmatch(r'[a-z][a-z0-9_]{0,30}', version):
+        raise ValueError(f"version must be lowercase letters, digits or underscores, got {version!r}")
+    return f"embedding_{version}"
+
+def index_name(table: str, column: str) -> str:
+    return f"idx_{table}_{column}"
+
+def live_versions(conn) -> List[Dict]:
+    """Every version whose columns are still written (active, previous and backfilling)"""
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT version, model, dimensions, column_name, status
+                    FROM embedding_versions
+                    WHERE status <> 'retired'
+                    ORDER BY created_at
+                """)
+                return cur.fetchall()
+    except psycopg2.errors.UndefinedTable:
+        return [LEGACY_VERSION]
+
+def live_versions_rest(supabase) -> List[Dict]:
+    """live_versions for scripts that reach the database through the Supabase client"""
+    try:
+        response = supabase.table('embedding_versions') \
+            .select('version, model, dimensions, column_name, status') \
+            .neq('status', 'retired').order('created_at').execute()
+    except Exception:
+        return [LEGACY_VERSION]  # add-embedding-versions.sql not run
+    return response.data or [LEGACY_VERSION]
+
+def active_version(conn) -> Dict:
+    """The version queries are embedded with; the legacy column before any migration"""
+    return next((v for v in live_versions(conn) if v['status'] == 'active'), LEGACY_VERSION)
+
+def embed_for_versions(openai_client, texts: List[str], versions: List[Dict]) -> Dict[str, List[List[float]]]:
+    """Embed the same texts once per live version, keyed by the version's column"""
+    embeddings = {}
+    for version in versions:
+        embeddings[version['column_name']] = embed_texts(openai_client, texts, version['model'], version['dimensions'])
+    return embeddings
+
+def load_version(cur, version: str) -> Optional[Dict]:
+    cur.execute("SELECT * FROM embedding_versions WHERE version = %s", (version,))
+    return cur.fetchone()
+
+def coverage(cur, column: str) -> Dict[str, Dict[str, int]]:
+    """Rows with and without a vector in the given column, per table"""
+    counts = {}
+    for table in VERSIONED_TABLES:
+        cur.execute(f"SELECT count(*), count({column}) FROM {table}")
+        total, covered = cur.fetchone()
+        counts[table] = {'total': total, 'covered': covered}
+    return counts
+
+def fully_covered(counts: Dict[str, Dict[str, int]]) -> bool:
+    return all(c['covered'] == c['total'] for c in counts.values())
+
+def index_exists(cur, table: str, column: str) -> bool:
+    if column == 'embedding':
+        return True  # created by the original schema scripts under several names
+    cur.execute("SELECT 1 FROM pg_indexes WHERE tablename = %s AND indexname = %s",
+                (table, index_name(table, column)))
+    return cur.fetchone() is not None
+
+def rpc_sql(active: Dict, versions: List[Dict]) -> str:
+    """DROP + CREATE statements for both search RPCs, routed by query model
+
+    Calls without query_model go to the active version; a client still embedding with
+    the previous version's model keeps getting answers from that version's column.
+    """
+    statements = []
+    others = [v for v in versions if v['status'] == 'previous']
+    for name, rpc in RPCS.items():
+        branches = [f"  IF query_model IS NULL OR (query_model = '{active['model']}' "
+                    f"AND vector_dims(query_embedding) = {active['dimensions']}) THEN\n"
+                    f"    RETURN QUERY{rpc['query'].format(column=active['column_name'])}"]
+        for version in others:
+            branches.append(f"  ELSIF query_model = '{version['model']}' "
+                            f"AND vector_dims(query_embedding) = {version['dimensions']} THEN\n"
+                            f"    RETURN QUERY{rpc['query'].format(column=version['column_name'])}")
+        branches.append("  ELSE\n"
+                        "    RAISE EXCEPTION 'No live embedding version for model % with % dimensions',\n"
+                        "      query_model, vector_dims(query_embedding);\n"
+                        "  END IF;")
+
+        statements.append(f"DROP FUNCTION IF EXISTS {name}(VECTOR, FLOAT, INT);")
+        statements.append(f"DROP FUNCTION IF EXISTS {name}(VECTOR, FLOAT, INT, TEXT);")
+        statements.append(f"""CREATE FUNCTION {name}(
+  query_embedding VECTOR,
+  match_threshold FLOAT DEFAULT {rpc['threshold']},
+  match_count INT DEFAULT {rpc['count']},
+  query_model TEXT DEFAULT NULL
+)
+RETURNS TABLE ({rpc['returns']}
+)
+LANGUAGE plpgsql STABLE
+AS $$
+#variable_conflict use_column
+BEGIN
+{chr(10).join(branches)}
+END;
+$$;""")
+    return "\n\n".join(statements)
+
+class EmbeddingMigration:
+    def __init__(self):
+        self.db_url = os.getenv('DATABASE_URL')
+        if not self.db_url:
+            print("❌ DATABASE_URL not found in environment variables")
+            sys.exit(1)
+
+        self.conn = psycopg2.connect(self.db_url)
+
+    def add(self, version: str, model: str, dimensions: int):
+        column = column_for(version)
+        if dimensions > MAX_INDEXED_DIMENSIONS:
+            print(f"❌ {dimensions} dimensions cannot be indexed by pgvector; "
+                  f"pass --dimensions {MAX_INDEXED_DIMENSIONS} or fewer (text-embedding-3 models shorten natively)")
+            sys.exit(1)
+
+        with self.conn:
+            with self.conn.cursor() as cur:
+                for table in VERSIONED_TABLES:
+                    cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} VECTOR({dimensions})")
+                cur.execute("""
+                    INSERT INTO embedding_versions (version, model, dimensions, column_name)
+                    VALUES (%s, %s, %s, %s)
+                """, (version, model, dimensions, column))
+        print(f"✅ Added {column} ({model}, {dimensions} dims) to {', '.join(VERSIONED_TABLES)}")
+        print(f"💡 Backfill it with: python embedding_migration.py backfill {version}")
+
+    def backfill(self, version: str, batch_size: int, rows_per_sec: float, flip: bool):
+        """Embed rows missing this version, at most rows_per_sec, then build its index"""
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            spec = load_version(cur, version)
+        self.conn.commit()
+        if not spec:
+            print(f"❌ Unknown version '{version}'")
+            sys.exit(1)
+
+        openai_client = embedding_client()
+        column = spec['column_name']
+        print(f"🚀 Backfilling {column} with {spec['model']} at up to {rows_per_sec:g} rows/s")
+
+        done = 0
+        last_report = time.time()
+        for table in VERSIONED_TABLES:
+            while True:
+                started = time.time()
+                with span('backfill', table=table) as batch_span:
+                    with self.conn:
+                        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                            with span('claim', table=table) as current:
+                                cur.execute(BACKFILL_CLAIM[table].format(column=column), (batch_size,))
+                                rows = cur.fetchall()
+                                current.add(rows=len(rows))
+                            if not rows:
+                                batch_span.discard()
+                                break
+
+                            texts = [BACKFILL_TEXT[table](row) or ' ' for row in rows]
+                            try:
+                                embeddings = embed_texts(openai_client, texts, spec['model'], spec['dimensions'])
+                            except openai.APIError as e:
+                                # Rolling back releases the rows for the next attempt
+                                print(f"⚠️ OpenAI error on {table}, backing off: {e}")
+                                batch_span.add(retries=1)
+                                self.conn.rollback()
+                                time.sleep(5.0)
+                                continue
+
+                            # Only the shadow column changes, so the embedding_stale trigger does not fire
+                            with span('upload', table=table) as current:
+                                cur.executemany(
+                                    f"UPDATE {table} SET {column} = %s::vector WHERE id = %s",
+                                    [(str(embedding), row['id']) for row, embedding in zip(rows, embeddings)]
+                                )
+                                current.add(rows=len(rows))
+                            batch_span.add(rows=len(rows))
+                done += len(rows)
+
+                if time.time() - last_report >= 30:
+                    self.status()
+                    last_report = time.time()
+
+                # Throttle so the backfill never competes with live traffic for OpenAI quota or I/O
+                pause = len(rows) / rows_per_sec - (time.time() - started)
+                if pause > 0:
+                    time.sleep(pause)
+
+        print(f"✅ Backfilled {done} rows")
+        self.build_indexes(spec)
+
+        if flip:
+            self.flip(version)
+
+    def build_indexes(self, spec: Dict):
+        """ivfflat learns its lists from existing rows, so the index is built after the backfill"""
+        column = spec['column_name']
+        self.conn.autocommit = True
+        try:
+            with self.conn.cursor() as cur:
+                for table in VERSIONED_TABLES:
+                    if index_exists(cur, table, column):
+                        continue
+                    print(f"🔧 Building {index_name(table, column)} (concurrently)...")
+                    cur.execute(f"""
+                        CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name(table, column)}
+                        ON {table} USING ivfflat ({column} vector_cosine_ops) WITH (lists = 100)
+                    """)
+        finally:
+            self.conn.autocommit = False
+
+    def status(self):
+        with self.conn:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("SELECT * FROM embedding_versions ORDER BY created_at")
+                versions = cur.fetchall()
+                print(f"{'version':>8} {'status':>12} {'dims':>5} {'index':>6}  coverage  model")
+                for spec in versions:
+                    if spec['status'] == 'retired':
+                        print(f"{spec['version']:>8} {spec['status']:>12} {spec['dimensions']:>5} {'-':>6}  -  {spec['model']}")
+                        continue
+                    counts = coverage(cur, spec['column_name'])
+                    indexed = all(index_exists(cur, table, spec['column_name']) for table in VERSIONED_TABLES)
+                    summary = ', '.join(
+                        f"{table} {c['covered']}/{c['total']}"
+                        f" ({100 * c['covered'] / c['total'] if c['total'] else 100:.1f}%)"
+                        for table, c in counts.items()
+                    )
+                    print(f"{spec['version']:>8} {spec['status']:>12} {spec['dimensions']:>5} "
+                          f"{'yes' if indexed else 'no':>6}  {summary}  {spec['model']}")
+
+    def flip(self, version: str, force: bool = False):
+        """Make a version active and rewrite the search RPCs, all in one transaction"""
+        with self.conn:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                # Serialises concurrent flips; readers keep using the old RPCs until commit
+                cur.execute("LOCK TABLE embedding_versions IN SHARE ROW EXCLUSIVE MODE")
+                target = load_version(cur, version)
+                if not target or target['status'] == 'retired':
+                    print(f"❌ Version '{version}' is unknown or retired")
+                    return False
+                if target['status'] == 'active':
+                    print(f"ℹ️ Version '{version}' is already active")
+                    return True
+
+                counts = coverage(cur, target['column_name'])
+                if not force and not fully_covered(counts):
+                    missing = sum(c['total'] - c['covered'] for c in counts.values())
+                    print(f"❌ {missing} rows still lack {target['column_name']}; finish the backfill first")
+                    return False
+                for table in VERSIONED_TABLES:
+                    if not index_exists(cur, table, target['column_name']):
+                        print(f"❌ {index_name(table, target['column_name'])} is missing; run backfill to build it")
+                        return False
+
+                cur.execute("UPDATE embedding_versions SET status = 'retired' WHERE status = 'previous'")
+                cur.execute("UPDATE embedding_versions SET status = 'previous' WHERE status = 'active'")
+                cur.execute("""
+                    UPDATE embedding_versions SET status = 'active', activated_at = NOW()
+                    WHERE version = %s
+                    RETURNING *
+                """, (version,))
+                active = cur.fetchone()
+
+                cur.execute("""
+                    SELECT * FROM embedding_versions WHERE status <> 'retired' ORDER BY created_at
+                """)
+                versions = cur.fetchall()
+                cur.execute(rpc_sql(active, versions))
+                # Have PostgREST pick up the new RPC signatures
+                cur.execute("NOTIFY pgrst, 'reload schema'")
+
+        print(f"✅ Search now serves '{version}' ({active['model']}, {active['dimensions']} dims)")
+        return True
+
+    def rollback(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT version FROM embedding_versions WHERE status = 'previous'")
+            row = cur.fetchone()
+        self.conn.commit()
+        if not row:
+            print("❌ No previous version to roll back to")
+            return False
+        # The previous version was kept current by the embedding worker, so it is still complete
+        return self.flip(row[0])
+
+    def retire(self, version: str, drop: bool):
+        with self.conn:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                spec = load_version(cur, version)
+                if not spec:
+                    print(f"❌ Unknown version '{version}'")
+                    return
+                if spec['status'] == 'active':
+                    print("❌ Cannot retire the active version; flip to another one first")
+                    return
+                cur.execute("UPDATE embedding_versions SET status = 'retired' WHERE version = %s", (version,))
+                if drop and spec['column_name'] != 'embedding':
+                    for table in VERSIONED_TABLES:
+                        cur.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {spec['column_name']}")
+        print(f"✅ Retired '{version}'{' and dropped its columns' if drop else ''}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate embeddings to a new model without search downtime")
+    parser.add_argument('command', choices=['add', 'backfill', 'status', 'flip', 'rollback', 'retire'])
+    parser.add_argument('version', nargs='?')
+    parser.add_argument('--model', help="embedding model for a new version (add only)")
+    parser.add_argument('--dimensions', type=int, default=1536, help="vector size for a new version (add only)")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--rows-per-sec', type=float, default=20.0, help="backfill rate limit")
+    parser.add_argument('--flip', action='store_true', help="flip to the version once the backfill completes")
+    parser.add_argument('--force', action='store_true', help="flip even if some rows lack the new embedding")
+    parser.add_argument('--drop', action='store_true', help="drop the retired version's columns (retire only)")
+    parser.add_argument('--profile', action='store_true', help="write a cProfile, memory and stage-time report to backend/.cache/profiles/ (backfill only)")
+    args = parser.parse_args()
+
+    if args.command not in ('status', 'rollback') and not args.version:
+        parser.error(f"{args.command} needs a version")
+
+    migration = EmbeddingMigration()
+    try:
+        if args.command == 'add':
+            if not args.model:
+                parser.error("add needs --model")
+            try:
+                migration.add(args.version, args.model, args.dimensions)
+            except ValueError as e:
+                parser.error(str(e))
+        elif args.command == 'backfill':
+            with start_run(f"embedding-backfill-{args.version}", profile=args.profile):
+                migration.backfill(args.version, args.batch_size, args.rows_per_sec, args.flip)
+        elif args.command == 'status':
+            migration.status()
+        elif args.command == 'flip':
+            if not migration.flip(args.version, force=args.force):
+                sys.exit(1)
+        elif args.command == 'rollback':
+            if not migration.rollback():
+                sys.exit(1)
+        else:
+            migration.retire(args.version, args.drop)
+    finally:
+        migration.conn.close()
+
+if __name__ == "__main__":
+    main()
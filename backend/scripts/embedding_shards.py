@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Shard coordination for full re-embedding runs across processes and machines
+Rows are assigned to shards by embedding_shard() (data-to-ingest/add-embedding-shards.sql);
+workers started with --shard i/n or --shard auto/n hold a lease per shard
+
+Coordinator commands:
+  init <n> [--job name] [--mark-stale]   create n pending leases (optionally flag every row stale)
+  status [--job name]                    per-shard worker, heartbeat, rows done and rows remaining
+  reassign [--job name] [--stall-after s] release leases whose worker stopped heartbeating
+"""
+
+import argparse
+import hashlib
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dotenv import load_dotenv
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from run_metrics import start_run
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_JOB = 'embeddings'
+SHARDED_TABLES = ['courses', 'elective_docs']
+
+def shard_of(row_id, shard_count: int) -> int:
+    """Python mirror of the SQL embedding_shard() function"""
+    return int(hashlib.md5(str(row_id).encode('utf-8')).hexdigest()[:7], 16) % shard_count
+
+def parse_shard(value: Optional[str]) -> Optional[Tuple[Optional[int], int]]:
+    """Parse 'i/n' into (i, n), or 'auto/n' into (None, n)"""
+    if not value:
+        return None
+    try:
+        index, count = value.split('/')
+        count = int(count)
+        index = None if index == 'auto' else int(index)
+    except ValueError:
+        raise ValueError(f"--shard must look like 'i/n' or 'auto/n', got {value!r}")
+    if count < 1 or (index is not None and not 0 <= index < count):
+        raise ValueError(f"--shard index must be in [0, {count}), got {value!r}")
+    return index, count
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class ShardLeases:
+    """Lease bookkeeping in embedding_shard_leases, shared by workers and the coordinator"""
+
+    def __init__(self, conn, job: str = DEFAULT_JOB):
+        self.conn = conn
+        self.job = job
+        self.worker = worker_name()
+
+    def claim_next(self, shard_count: int) -> Optional[int]:
+        """Take the lowest pending shard, or None when every shard is taken or done"""
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE embedding_shard_leases
+                    SET worker = %s, status = 'running', heartbeat_at = NOW()
+                    WHERE (job, shard_count, shard) = (
+                        SELECT job, shard_count, shard
+                        FROM embedding_shard_leases
+                        WHERE job = %s AND shard_count = %s AND status = 'pending'
+                        ORDER BY shard
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING shard
+                """, (self.worker, self.job, shard_count))
+                row = cur.fetchone()
+        return row[0] if row else None
+
+    def has_pending(self, shard_count: int) -> bool:
+        """Whether any shard of the job is still waiting for a worker"""
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    SELECT EXISTS (
+                        SELECT 1 FROM embedding_shard_leases
+                        WHERE job = %s AND shard_count = %s AND status = 'pending'
+                    )
+                """, (self.job, shard_count))
+                return cur.fetchone()[0]
+
+    def hold(self, shard: int, shard_count: int):
+        """Record a fixed --shard i/n worker as the lease holder"""
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO embedding_shard_leases (job, shard_count, shard, worker, status, heartbeat_at)
+                    VALUES (%s, %s, %s, %s, 'running', NOW())
+                    ON CONFLICT (job, shard_count, shard) DO UPDATE SET
+                        worker = EXCLUDED.worker,
+                        status = 'running',
+                        heartbeat_at = NOW()
+                """, (self.job, shard_count, shard, self.worker))
+
+    def heartbeat(self, shard: int, shard_count: int, rows: int):
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE embedding_shard_leases
+                    SET rows_done = rows_done + %s, heartbeat_at = NOW()
+                    WHERE job = %s AND shard_count = %s AND shard = %s AND worker = %s
+                """, (rows, self.job, shard_count, shard, self.worker))
+
+    def finish(self, shard: int, shard_count: int):
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE embedding_shard_leases
+                    SET status = 'done', heartbeat_at = NOW()
+                    WHERE job = %s AND shard_count = %s AND shard = %s AND worker = %s
+                """, (self.job, shard_count, shard, self.worker))
+
+def init_job(conn, job: str, shard_count: int, mark_stale: bool):
+    with conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM embedding_shard_leases WHERE job = %s", (job,))
+            cur.executemany(
+                "INSERT INTO embedding_shard_leases (job, shard_count, shard) VALUES (%s, %s, %s)",
+                [(job, shard_count, shard) for shard in range(shard_count)]
+            )
+            if mark_stale:
+                for table in SHARDED_TABLES:
+                    cur.execute(f"UPDATE {table} SET embedding_stale = true WHERE NOT embedding_stale")
+                    print(f"🔄 Flagged {cur.rowcount} {table} rows for re-embedding")
+    print(f"✅ Created {shard_count} pending shards for job '{job}'")
+    print(f"💡 Start workers with: python embedding_worker.py --once --job {job} --shard auto/{shard_count}")
+
+def remaining_by_shard(conn, shard_count: int):
+    """Stale rows per shard, counted in the database"""
+    remaining = {}
+    with conn:
+        with conn.cursor() as cur:
+            for table in SHARDED_TABLES:
+                cur.execute(f"""
+                    SELECT embedding_shard(id::text, %s) AS shard, count(*)
+                    FROM {table}
+                    WHERE embedding_stale
+                    GROUP BY 1
+                """, (shard_count,))
+                for shard, count in cur.fetchall():
+                    remaining[shard] = remaining.get(shard, 0) + count
+    return remaining
+
+def load_leases(conn, job: str):
+    with conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT shard, shard_count, worker, status, rows_done,
+                       EXTRACT(EPOCH FROM NOW() - heartbeat_at) AS heartbeat_age
+                FROM embedding_shard_leases
+                WHERE job = %s
+                ORDER BY shard
+            """, (job,))
+            return cur.fetchall()
+
+def show_status(conn, job: str, stall_after: float):
+    leases = load_leases(conn, job)
+    if not leases:
+        print(f"❌ No shards found for job '{job}' (run init first)")
+        return
+
+    shard_count = leases[0]['shard_count']
+    remaining = remaining_by_shard(conn, shard_count)
+
+    print(f"📊 Job '{job}' — {shard_count} shards")
+    print(f"{'shard':>5} {'status':>8} {'done':>8} {'left':>8} {'heartbeat':>10}  worker")
+    for lease in leases:
+        age = lease['heartbeat_age']
+        left = remaining.get(lease['shard'], 0)
+        stalled = lease['status'] == 'running' and age is not None and age > stall_after and left > 0
+        heartbeat = '-' if age is None else f"{age:.0f}s ago"
+        print(f"{lease['shard']:>5} {lease['status']:>8} {lease['rows_done']:>8} {left:>8} {heartbeat:>10}  "
+              f"{lease['worker'] or '-'}{'  ⚠️ stalled' if stalled else ''}")
+
+    total_left = sum(remaining.values())
+    total_done = sum(lease['rows_done'] for lease in leases)
+    print(f"\n✅ {total_done} rows embedded, {total_left} remaining")
+
+def reassign_stalled(conn, job: str, stall_after: float):
+    """Release running leases with an old heartbeat and work left, so auto workers pick them up"""
+    leases = load_leases(conn, job)
+    if not leases:
+        print(f"❌ No shards found for job '{job}'")
+        return
+
+    remaining = remaining_by_shard(conn, leases[0]['shard_count'])
+    released = 0
+    with conn:
+        with conn.cursor() as cur:
+            for lease in leases:
+                age = lease['heartbeat_age']
+                if lease['status'] != 'running' or age is None or age <= stall_after:
+                    continue
+                if remaining.get(lease['shard'], 0) == 0:
+                    continue
+                cur.execute("""
+                    UPDATE embedding_shard_leases
+                    SET status = 'pending', worker = NULL
+                    WHERE job = %s AND shard_count = %s AND shard = %s AND worker = %s
+                """, (job, lease['shard_count'], lease['shard'], lease['worker']))
+                if cur.rowcount:
+                    released += 1
+                    print(f"🔁 Released shard {lease['shard']} from {lease['worker']} (silent for {age:.0f}s)")
+    print(f"✅ Released {released} stalled shards")
+
+def main():
+    parser = argparse.ArgumentParser(description="Coordinate sharded embedding runs")
+    parser.add_argument('command', choices=['init', 'status', 'reassign'])
+    parser.add_argument('shards', nargs='?', type=int, help="number of shards (init only)")
+    parser.add_argument('--job', default=DEFAULT_JOB)
+    parser.add_argument('--mark-stale', action='store_true', help="flag every row for re-embedding (init only)")
+    parser.add_argument('--stall-after', type=float, default=300.0, help="seconds without a heartbeat before a shard counts as stalled")
+    parser.add_argument('--profile', action='store_true', help="write a cProfile, memory and stage-time report to backend/.cache/profiles/")
+    args = parser.parse_args()
+
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    if args.command == 'init' and not args.shards:
+        parser.error("init needs the number of shards")
+
+    conn = psycopg2.connect(db_url)
+    try:
+        with start_run(f'embedding-shards-{args.command}', profile=args.profile):
+            if args.command == 'init':
+                init_job(conn, args.job, args.shards, args.mark_stale)
+            elif args.command == 'status':
+                show_status(conn, args.job, args.stall_after)
+            else:
+                reassign_stalled(conn, args.job, args.stall_after)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Background worker that keeps course and document embeddings fresh
+Drains rows flagged embedding_stale (see data-to-ingest/add-embedding-dirty-tracking.sql)
+in batches claimed with FOR UPDATE SKIP LOCKED, so several workers can run side by side
+"""
+
+import argparse
+import os
+import select
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dotenv import load_dotenv
+import openai
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from course_embeddings import build_course_text, embedding_client
+from embedding_migration import embed_for_versions, live_versions
+from embedding_shards import DEFAULT_JOB, ShardLeases, parse_shard
+from run_metrics import span, start_run
+
+# Load environment variables
+load_dotenv()
+
+# Per-table claim query and the text to embed for a claimed row
+STALE_TABLES = {
+    'courses': {
+        'claim': """
+            SELECT id, title, description, skills, dept, level, prereqs, terms_offered
+            FROM courses
+            WHERE embedding_stale {shard_filter}
+            ORDER BY updated_at
+            LIMIT %(limit)s
+            FOR UPDATE SKIP LOCKED
+        """,
+        'text': build_course_text,
+    },
+    'elective_docs': {
+        'claim': """
+            SELECT id, text
+            FROM elective_docs
+            WHERE embedding_stale {shard_filter}
+            ORDER BY created_at
+            LIMIT %(limit)s
+            FOR UPDATE SKIP LOCKED
+        """,
+        'text': lambda row: row['text'],
+    },
+}
+
+SHARD_FILTER = "AND embedding_shard(id::text, %(shard_count)s) = %(shard)s"
+
+class EmbeddingWorker:
+    def __init__(self, tables: List[str], batch_size: int = 32,
+                 shard: Optional[Tuple[Optional[int], int]] = None, job: str = DEFAULT_JOB):
+        self.db_url = os.getenv('DATABASE_URL')
+        if not self.db_url:
+            print("❌ DATABASE_URL not found in environment variables")
+            sys.exit(1)
+
+        self.openai_client = embedding_client()
+        self.tables = tables
+        self.batch_size = batch_size
+        self.conn = psycopg2.connect(self.db_url)
+        self.drained = deque()  # (timestamp, rows) for the drain-rate window
+        self.total_drained = 0
+        self.shard = shard  # (index or None for auto, count) when running one slice of a sharded job
+        self.leases = ShardLeases(self.conn, job) if shard else None
+
+    def drain_batch(self, table: str, shard: Optional[int] = None) -> int:
+        """Claim one batch of stale rows, embed them and clear the flag in one transaction
+
+        Every live embedding version is rewritten, so a version being backfilled or kept
+        for rollback (see embedding_migration.py) never serves outdated vectors
+        """
+        spec = STALE_TABLES[table]
+        versions = live_versions(self.conn)
+        params = {'limit': self.batch_size}
+        shard_filter = ''
+        if shard is not None:
+            shard_filter = SHARD_FILTER
+            params.update(shard=shard, shard_count=self.shard[1])
+
+        with self.conn:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                with span('claim', table=table) as current:
+                    cur.execute(spec['claim'].format(shard_filter=shard_filter), params)
+                    rows = cur.fetchall()
+                    current.add(rows=len(rows))
+                    if not rows:
+                        current.discard()
+                        return 0
+
+                with span('transform', table=table) as current:
+                    texts = [spec['text'](row) or ' ' for row in rows]
+                    current.add(rows=len(texts), bytes=sum(len(text.encode('utf-8')) for text in texts))
+                embeddings = embed_for_versions(self.openai_client, texts, versions)
+
+                columns = list(embeddings)
+                assignments = ', '.join(f"{column} = %s::vector" for column in columns)
+                with span('upload', table=table) as current:
+                    cur.executemany(
+                        f"UPDATE {table} SET {assignments}, embedding_stale = false WHERE id = %s",
+                        [tuple(str(embeddings[column][i]) for column in columns) + (row['id'],)
+                         for i, row in enumerate(rows)]
+                    )
+                    current.add(rows=len(rows))
+
+        self.record_drained(len(rows))
+        if shard is not None:
+            self.leases.heartbeat(shard, self.shard[1], len(rows))
+        return len(rows)
+
+    def drain_pass(self, shard: Optional[int] = None, idle_sleep: float = 5.0) -> int:
+        """Drain one batch from every table, backing off on OpenAI errors"""
+        drained = 0
+        for table in self.tables:
+            with span('drain', table=table) as current:
+                try:
+                    rows = self.drain_batch(table, shard)
+                    if rows == 0:
+                        current.discard()
+                    drained += rows
+                except openai.APIError as e:
+                    # The claim transaction rolled back, so the rows stay stale for the next attempt
+                    print(f"⚠️ OpenAI error on {table}, backing off: {e}")
+                    current.add(retries=1)
+                    time.sleep(idle_sleep)
+        return drained
+
+    def run_sharded(self, once: bool, report_interval: float):
+        """Drain a fixed shard, or keep claiming pending shards in auto mode
+
+        An auto worker finishes its shard once it is drained and another shard is pending;
+        with nothing left to claim it keeps its last shard fresh until stopped (or --once)
+        """
+        index, shard_count = self.shard
+        if index is not None:
+            self.leases.hold(index, shard_count)
+
+        last_report = time.time()
+        shard = index if index is not None else self.leases.claim_next(shard_count)
+        while shard is not None:
+            print(f"🧩 Working on shard {shard}/{shard_count}")
+            while True:
+                drained = self.drain_pass(shard)
+                if time.time() - last_report >= report_interval:
+                    self.report()
+                    last_report = time.time()
+                if drained == 0:
+                    # In auto mode a drained shard is handed back as soon as another one is waiting
+                    if once or (index is None and self.leases.has_pending(shard_count)):
+                        break
+                    # Keep the lease alive while waiting for rows in this shard to go stale
+                    self.leases.heartbeat(shard, shard_count, 0)
+                    time.sleep(5.0)
+            self.leases.finish(shard, shard_count)
+            print(f"✅ Shard {shard}/{shard_count} drained")
+            shard = None if index is not None else self.leases.claim_next(shard_count)
+
+    def record_drained(self, rows: int):
+        now = time.time()
+        self.drained.append((now, rows))
+        self.total_drained += rows
+        while self.drained and self.drained[0][0] < now - 60:
+            self.drained.popleft()
+
+    def drain_rate(self) -> float:
+        """Rows per second over the last minute"""
+        if not self.drained:
+            return 0.0
+        window = max(time.time() - self.drained[0][0], 1.0)
+        return sum(rows for _, rows in self.drained) / window
+
+    def backlog(self) -> Dict[str, int]:
+        """Count stale rows per table (served by the partial embedding_stale indexes)"""
+        counts = {}
+        with self.conn:
+            with self.conn.cursor() as cur:
+                for table in self.tables:
+                    cur.execute(f"SELECT count(*) FROM {table} WHERE embedding_stale")
+                    counts[table] = cur.fetchone()[0]
+        return counts
+
+    def report(self):
+        backlog = self.backlog()
+        rate = self.drain_rate()
+        remaining = sum(backlog.values())
+        eta = f"{remaining / rate:.0f}s" if rate > 0 and remaining else '-'
+        print(f"📊 Backlog: {', '.join(f'{t}={n}' for t, n in backlog.items())} | "
+              f"drain rate {rate:.1f} rows/s | drained {self.total_drained} | ETA {eta}")
+
+    def wait_for_work(self, listen_conn, timeout: float):
+        """Sleep until a trigger sends NOTIFY embedding_stale or the timeout expires"""
+        if select.select([listen_conn], [], [], timeout) != ([], [], []):
+            listen_conn.poll()
+            listen_conn.notifies.clear()
+
+    def run(self, once: bool = False, idle_sleep: float = 5.0, report_interval: float = 30.0):
+        versions = ', '.join(f"{v['version']}={v['model']}" for v in live_versions(self.conn))
+        print(f"🚀 Embedding worker started for {', '.join(self.tables)} (batch size {self.batch_size}, versions {versions})")
+        self.report()
+
+        if self.shard:
+            try:
+                self.run_sharded(once, report_interval)
+            except KeyboardInterrupt:
+                print("\n⏹️ Stopping embedding worker (the coordinator will release its shard)")
+            finally:
+                self.report()
+                self.conn.close()
+            return
+
+        listen_conn = None
+        if not once:
+            listen_conn = psycopg2.connect(self.db_url)
+            listen_conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            listen_conn.cursor().execute("LISTEN embedding_stale")
+
+        last_report = time.time()
+        try:
+            while True:
+                drained = self.drain_pass(idle_sleep=idle_sleep)
+
+                if time.time() - last_report >= report_interval:
+                    self.report()
+                    last_report = time.time()
+
+                if drained == 0:
+                    if once:
+                        break
+                    self.wait_for_work(listen_conn, idle_sleep)
+        except KeyboardInterrupt:
+            print("\n⏹️ Stopping embedding worker")
+        finally:
+            self.report()
+            if listen_conn:
+                listen_conn.close()
+            self.conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain stale course/document embeddings")
+    parser.add_argument('--table', choices=['courses', 'elective_docs', 'all'], default='all')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--once', action='store_true', help="exit when the backlog is empty")
+    parser.add_argument('--report-interval', type=float, default=30.0, help="seconds between backlog reports")
+    parser.add_argument('--shard', help="process one slice of a sharded job: 'i/n', or 'auto/n' to claim pending shards")
+    parser.add_argument('--job', default=DEFAULT_JOB, help="sharded job name (see embedding_shards.py init)")
+    parser.add_argument('--profile', action='store_true', help="write a cProfile, memory and stage-time report to backend/.cache/profiles/")
+    args = parser.parse_args()
+
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+
+    tables = list(STALE_TABLES) if args.table == 'all' else [args.table]
+    worker = EmbeddingWorker(tables, batch_size=args.batch_size, shard=shard, job=args.job)
+    with start_run('embedding-worker', profile=args.profile):
+        worker.run(once=args.once, report_interval=args.report_interval)
+
+if __name__ == "__main__":
+    main()
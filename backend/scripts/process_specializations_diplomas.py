@@ -4,7 +4,6 @@ Processor for Waterloo Engineering Specializations and Diplomas JSON data
 Processes the JSON files and ingests them into Supabase
 """
 
-import json
 import os
 import sys
 import re
@@ -21,6 +20,8 @@ sys.path.append(str(project_root))
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from run_metrics import add, load_json, payload_bytes, pop_profile_flag, span, start_run
+
 # Load environment variables
 load_dotenv()
 
@@ -36,7 +37,8 @@ class SpecializationsDiplomasProcessor:
         print(f"✅ Connected to Supabase at {self.supabase_url}")
         
         # Test connection with retry logic
-        self.test_connection_with_retry()
+        with span('connect'):
+            self.test_connection_with_retry()
 
     def test_connection_with_retry(self, max_retries=3, delay=5):
         """Test database connection with retry logic"""
@@ -47,6 +49,7 @@ class SpecializationsDiplomasProcessor:
                 # Wait a bit before testing connection
                 if attempt > 0:
                     print(f"⏳ Waiting {delay} seconds before retry {attempt + 1}/{max_retries}...")
+                    add(retries=1)
                     time.sleep(delay)
                 
                 # Test connection by querying a simple table
@@ -108,38 +111,6 @@ class SpecializationsDiplomasProcessor:
                 return 400
         return 200
 
-    def get_skills_from_title(self, title: str) -> List[str]:
-        """Extract skills/topics from course title"""
-        skills = []
-        title_lower = title.lower()
-        
-        skill_keywords = {
-            'robotics': ['robot', 'robotics', 'manipulator'],
-            'control': ['control', 'feedback', 'regulation'],
-            'machine learning': ['machine learning', 'ml', 'ai', 'artificial intelligence'],
-            'software': ['software', 'programming', 'coding', 'development'],
-            'hardware': ['hardware', 'circuit', 'electronics', 'digital'],
-            'mechanics': ['mechanics', 'dynamics', 'statics', 'materials'],
-            'mathematics': ['math', 'calculus', 'statistics', 'probability'],
-            'design': ['design', 'engineering design', 'project'],
-            'systems': ['systems', 'system design', 'integration'],
-            'data': ['data', 'database', 'analytics', 'visualization'],
-            'communication': ['communication', 'writing', 'presentation'],
-            'environmental': ['environmental', 'sustainability', 'energy'],
-            'biomedical': ['biomedical', 'bio', 'medical', 'health'],
-            'language': ['language', 'linguistics', 'applied language'],
-            'sustainability': ['sustainability', 'environmental', 'green'],
-            'restoration': ['restoration', 'rehabilitation', 'ecological'],
-            'assessment': ['assessment', 'evaluation', 'analysis'],
-            'cities': ['cities', 'urban', 'planning', 'future cities']
-        }
-        
-        for skill, keywords in skill_keywords.items():
-            if any(keyword in title_lower for keyword in keywords):
-                skills.append(skill)
-        
-        return skills if skills else ['general engineering']
-
     def process_specializations(self, json_data: Dict[str, Any]) -> tuple:
         """Process specializations JSON and extract courses and options"""
         courses = {}  # Use dict to track by course ID
@@ -188,7 +159,6 @@ class SpecializationsDiplomasProcessor:
                                     'description': f"Course from {program_name} - {spec_name} specialization",
                                     'terms_offered': ["F", "W"],
                                     'prereqs': '',
-                                    'skills': self.get_skills_from_title(course_info['title']),
                                     'workload': {"reading": 2, "assignments": 3, "projects": 1, "labs": 1},
                                     'assessments': {"midterm": 30, "final": 40, "assignments": 30},
                                     'source_url': specialization.get('source', '')
@@ -215,7 +185,6 @@ class SpecializationsDiplomasProcessor:
                                     'description': f"Course from {program_name} - {spec_name} specialization",
                                     'terms_offered': ["F", "W"],
                                     'prereqs': '',
-                                    'skills': self.get_skills_from_title(course_info['title']),
                                     'workload': {"reading": 2, "assignments": 3, "projects": 1, "labs": 1},
                                     'assessments': {"midterm": 30, "final": 40, "assignments": 30},
                                     'source_url': specialization.get('source', '')
@@ -275,7 +244,6 @@ class SpecializationsDiplomasProcessor:
                                 'description': f"Course for {diploma_name} diploma",
                                 'terms_offered': ["F", "W"],
                                 'prereqs': '',
-                                'skills': self.get_skills_from_title(course_info['title']),
                                 'workload': {"reading": 2, "assignments": 3, "projects": 1, "labs": 1},
                                 'assessments': {"midterm": 30, "final": 40, "assignments": 30},
                                 'source_url': 'https://uwaterloo.ca/engineering/undergraduate-studies/specializations-and-more'
@@ -300,7 +268,6 @@ class SpecializationsDiplomasProcessor:
                             'description': f"Any {prefix.strip('*')} course for {diploma_name} diploma",
                             'terms_offered': ["F", "W"],
                             'prereqs': '',
-                            'skills': self.get_skills_from_title(f"{prefix.strip('*')} courses"),
                             'workload': {"reading": 2, "assignments": 3, "projects": 1, "labs": 1},
                             'assessments': {"midterm": 30, "final": 40, "assignments": 30},
                             'source_url': 'https://uwaterloo.ca/engineering/undergraduate-studies/specializations-and-more'
@@ -329,7 +296,9 @@ class SpecializationsDiplomasProcessor:
         for i in range(0, len(courses_data), batch_size):
             batch = courses_data[i:i + batch_size]
             try:
-                result = self.supabase.table('courses').upsert(batch, on_conflict='id').execute()
+                with span('upload', table='courses') as current:
+                    result = self.supabase.table('courses').upsert(batch, on_conflict='id').execute()
+                    current.add(rows=len(batch), bytes=payload_bytes(batch))
                 print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(courses_data) + batch_size - 1)//batch_size}")
             except Exception as e:
                 print(f"❌ Error uploading batch {i//batch_size + 1}: {e}")
@@ -347,7 +316,9 @@ class SpecializationsDiplomasProcessor:
         print(f"📋 Uploading {len(options_data)} options...")
         
         try:
-            result = self.supabase.table('options').upsert(options_data, on_conflict='id').execute()
+            with span('upload', table='options') as current:
+                result = self.supabase.table('options').upsert(options_data, on_conflict='id').execute()
+                current.add(rows=len(options_data), bytes=payload_bytes(options_data))
             print(f"✅ Successfully uploaded {len(options_data)} options!")
         except Exception as e:
             print(f"❌ Error uploading options: {e}")
@@ -357,11 +328,12 @@ class SpecializationsDiplomasProcessor:
         """Process specializations JSON file"""
         print(f"📖 Reading specializations file: {json_file_path}")
         
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = load_json(json_file_path)
         
         print("🔄 Processing specializations...")
-        courses_data, options_data = self.process_specializations(json_data)
+        with span('transform') as current:
+            courses_data, options_data = self.process_specializations(json_data)
+            current.add(rows=len(courses_data) + len(options_data))
         
         print(f"📊 Found {len(courses_data)} unique courses and {len(options_data)} specializations")
         
@@ -377,11 +349,12 @@ class SpecializationsDiplomasProcessor:
         """Process diplomas JSON file"""
         print(f"📖 Reading diplomas file: {json_file_path}")
         
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = load_json(json_file_path)
         
         print("🔄 Processing diplomas...")
-        courses_data, options_data = self.process_diplomas(json_data)
+        with span('transform') as current:
+            courses_data, options_data = self.process_diplomas(json_data)
+            current.add(rows=len(courses_data) + len(options_data))
         
         print(f"📊 Found {len(courses_data)} unique courses and {len(options_data)} diplomas")
         
@@ -410,38 +383,41 @@ class SpecializationsDiplomasProcessor:
         print("🎉 All processing complete!")
 
 def main():
+    profile = pop_profile_flag()
     if len(sys.argv) < 2:
-        print("Usage: python process_specializations_diplomas.py <command> [args...]")
+        print("Usage: python process_specializations_diplomas.py <command> [args...] [--profile]")
         print("Commands:")
         print("  specializations <json_file_path>")
         print("  diplomas <json_file_path>")
         print("  both <specializations_file> <diplomas_file>")
         return
     
+    command = sys.argv[1]
+    if command not in ('specializations', 'diplomas', 'both'):
+        print(f"Unknown command: {command}")
+        return
+    
     try:
-        processor = SpecializationsDiplomasProcessor()
-        command = sys.argv[1]
-        
-        if command == "specializations":
-            if len(sys.argv) < 3:
-                print("Error: JSON file path required")
-                return
-            processor.process_specializations_file(sys.argv[2])
-        
-        elif command == "diplomas":
-            if len(sys.argv) < 3:
-                print("Error: JSON file path required")
-                return
-            processor.process_diplomas_file(sys.argv[2])
-        
-        elif command == "both":
-            if len(sys.argv) < 4:
-                print("Error: Both file paths required")
-                return
-            processor.process_both_files(sys.argv[2], sys.argv[3])
-        
-        else:
-            print(f"Unknown command: {command}")
+        with start_run(f"process-specializations-diplomas-{command}", profile=profile):
+            processor = SpecializationsDiplomasProcessor()
+            
+            if command == "specializations":
+                if len(sys.argv) < 3:
+                    print("Error: JSON file path required")
+                    return
+                processor.process_specializations_file(sys.argv[2])
+            
+            elif command == "diplomas":
+                if len(sys.argv) < 3:
+                    print("Error: JSON file path required")
+                    return
+                processor.process_diplomas_file(sys.argv[2])
+            
+            elif command == "both":
+                if len(sys.argv) < 4:
+                    print("Error: Both file paths required")
+                    return
+                processor.process_both_files(sys.argv[2], sys.argv[3])
     
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -18,6 +18,9 @@ from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from run_metrics import load_json, pop_profile_flag, span, start_run
+from simple_uw_processor import index_programs, sort_study_terms
+
 # Load environment variables
 load_dotenv()
 
@@ -27,6 +30,7 @@ class UWDataProcessor:
         if not self.db_url:
             print("❌ DATABASE_URL not found in environment variables")
             sys.exit(1)
+        self.course_index = {}
     
     def parse_course_code(self, course_string: str) -> Dict[str, str]:
         """Parse course string like 'ECE 486 - Robot Dynamics and Control' into components"""
@@ -72,86 +76,48 @@ class UWDataProcessor:
         return 200
     
     def get_terms_offered(self, course_id: str) -> List[str]:
-        """Determine which terms a course is typically offered"""
-        # This is a simplified heuristic - in reality, you'd need more data
-        # For now, assume most courses are offered in F/W
-        return ["F", "W"]
-    
-    def get_skills_from_title(self, title: str) -> List[str]:
-        """Extract skills/topics from course title"""
-        skills = []
-        title_lower = title.lower()
-        
-        skill_keywords = {
-            'robotics': ['robot', 'robotics', 'manipulator'],
-            'control': ['control', 'feedback', 'regulation'],
-            'machine learning': ['machine learning', 'ml', 'ai', 'artificial intelligence'],
-            'software': ['software', 'programming', 'coding', 'development'],
-            'hardware': ['hardware', 'circuit', 'electronics', 'digital'],
-            'mechanics': ['mechanics', 'dynamics', 'statics', 'materials'],
-            'mathematics': ['math', 'calculus', 'statistics', 'probability'],
-            'design': ['design', 'engineering design', 'project'],
-            'systems': ['systems', 'system design', 'integration'],
-            'data': ['data', 'database', 'analytics', 'visualization']
-        }
-        
-        for skill, keywords in skill_keywords.items():
-            if any(keyword in title_lower for keyword in keywords):
-                skills.append(skill)
-        
-        return skills if skills else ['general engineering']
+        """Get the study terms (1A..4B) a course is scheduled in across all programs"""
+        entry = self.course_index.get(course_id)
+        if not entry:
+            return []
+        return sort_study_terms(entry['study_terms'])
     
     def process_programs(self, json_data: Dict[str, Any]):
         """Process all programs and extract course information"""
-        courses = set()
-        programs = []
+        index = index_programs(json_data, parse=self.parse_course_code)
+        self.course_index = index['courses']
+        courses = []
         
-        for program_name, program_data in json_data.get('programs', {}).items():
-            print(f"Processing program: {program_name}")
-            
-            # Create program entry
-            program_info = {
-                'id': program_name.lower().replace(' ', '-').replace('engineering', 'eng'),
-                'name': program_name,
-                'degree': program_data.get('degree', 'BASc'),
-                'calendar_year': program_data.get('calendar_year', '2023-2024'),
-                'description': f"{program_name} program requirements"
-            }
-            programs.append(program_info)
-            
-            # Process all terms and collect courses
-            for term, courses_list in program_data.get('terms', {}).items():
-                for course_string in courses_list:
-                    if course_string and not course_string.startswith('WKRPT') and not course_string.startswith('COMMST'):
-                        course_info = self.parse_course_code(course_string)
-                        if course_info['id'] not in [c['id'] for c in courses]:
-                            course_info.update({
-                                'level': self.get_course_level(course_info['id']),
-                                'terms_offered': self.get_terms_offered(course_info['id']),
-                                'skills': self.get_skills_from_title(course_info['title']),
-                                'units': 0.5,
-                                'description': f"Course from {program_name} program",
-                                'prereqs': '',
-                                'workload': {'reading': 2, 'assignments': 3, 'projects': 1, 'labs': 1},
-                                'assessments': {'midterm': 30, 'final': 40, 'assignments': 30},
-                                'source_url': f"https://uwaterloo.ca/engineering/undergraduate-studies/{program_name.lower().replace(' ', '-')}"
-                            })
-                            courses.add(tuple(course_info.items()))
+        for program in index['programs']:
+            print(f"Processing program: {program['name']}")
         
-        return list(courses), programs
+        for course_id, entry in self.course_index.items():
+            course_info = dict(entry['info'])
+            program_name = entry['first_program']
+            course_info.update({
+                'level': self.get_course_level(course_id),
+                'terms_offered': self.get_terms_offered(course_id),
+                'units': 0.5,
+                'description': f"Course from {program_name} program",
+                'prereqs': '',
+                'workload': {'reading': 2, 'assignments': 3, 'projects': 1, 'labs': 1},
+                'assessments': {'midterm': 30, 'final': 40, 'assignments': 30},
+                'source_url': f"https://uwaterloo.ca/engineering/undergraduate-studies/{program_name.lower().replace(' ', '-')}"
+            })
+            courses.append(course_info)
+        
+        return courses, index['programs']
     
-    def upload_courses(self, courses_data: List[tuple]):
+    def upload_courses(self, courses_data: List[Dict[str, Any]]):
         """Upload courses to database"""
         with psycopg2.connect(self.db_url) as conn:
             with conn.cursor() as cur:
-                for course_tuple in courses_data:
-                    course = dict(course_tuple)
-                    
+                for course in courses_data:
                     cur.execute("""
                         INSERT INTO courses (id, title, dept, units, level, description, 
-                                           terms_offered, prereqs, skills, workload, 
+                                           terms_offered, prereqs, workload, 
                                            assessments, source_url)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                         ON CONFLICT (id) DO UPDATE SET
                             title = EXCLUDED.title,
                             dept = EXCLUDED.dept,
@@ -160,7 +126,6 @@ class UWDataProcessor:
                             description = EXCLUDED.description,
                             terms_offered = EXCLUDED.terms_offered,
                             prereqs = EXCLUDED.prereqs,
-                            skills = EXCLUDED.skills,
                             workload = EXCLUDED.workload,
                             assessments = EXCLUDED.assessments,
                             source_url = EXCLUDED.source_url,
@@ -170,7 +135,6 @@ class UWDataProcessor:
                         course['level'], course['description'], 
                         json.dumps(course['terms_offered']),
                         course['prereqs'], 
-                        json.dumps(course['skills']),
                         json.dumps(course['workload']),
                         json.dumps(course['assessments']),
                         course['source_url']
@@ -202,29 +166,61 @@ class UWDataProcessor:
                 conn.commit()
                 print(f"✅ Uploaded {len(programs_data)} programs")
     
+    def upload_course_program_map(self):
+        """Link each course to every program whose core curriculum lists it"""
+        with psycopg2.connect(self.db_url) as conn:
+            with conn.cursor() as cur:
+                rows = 0
+                for course_id, entry in self.course_index.items():
+                    for program_id, program_terms in sorted(entry['programs'].items()):
+                        cur.execute("""
+                            INSERT INTO course_option_map (option_id, course_id, rule)
+                            VALUES (%s, %s, %s)
+                            ON CONFLICT (option_id, course_id) DO UPDATE SET
+                                rule = EXCLUDED.rule
+                        """, (
+                            program_id, course_id,
+                            json.dumps({'bucket': 'core', 'terms': sort_study_terms(program_terms)})
+                        ))
+                        rows += 1
+                
+                conn.commit()
+                print(f"✅ Linked {len(self.course_index)} courses to their programs ({rows} rows)")
+    
     def process_json_file(self, json_file_path: str):
         """Main method to process the JSON file"""
         print(f"📖 Reading JSON file: {json_file_path}")
         
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = load_json(json_file_path)
         
         print("🔄 Processing programs and courses...")
-        courses_data, programs_data = self.process_programs(json_data)
+        with span('transform') as current:
+            courses_data, programs_data = self.process_programs(json_data)
+            current.add(rows=len(courses_data) + len(programs_data))
         
         print(f"📊 Found {len(courses_data)} unique courses across {len(programs_data)} programs")
         
         print("💾 Uploading courses to database...")
-        self.upload_courses(courses_data)
+        with span('upload', table='courses') as current:
+            self.upload_courses(courses_data)
+            current.add(rows=len(courses_data))
         
         print("💾 Uploading programs to database...")
-        self.upload_programs(programs_data)
+        with span('upload', table='options') as current:
+            self.upload_programs(programs_data)
+            current.add(rows=len(programs_data))
+        
+        print("💾 Uploading course/program map...")
+        with span('upload', table='course_option_map') as current:
+            self.upload_course_program_map()
+            current.add(rows=sum(len(entry['programs']) for entry in self.course_index.values()))
         
         print("🎉 Data processing complete!")
 
 def main():
+    profile = pop_profile_flag()
     if len(sys.argv) < 2:
-        print("Usage: python process_uw_json.py <json_file_path>")
+        print("Usage: python process_uw_json.py <json_file_path> [--profile]")
         print("Example: python process_uw_json.py uw_engineering_core_by_program_updated.json")
         sys.exit(1)
     
@@ -233,8 +229,9 @@ def main():
         print(f"❌ File not found: {json_file}")
         sys.exit(1)
     
-    processor = UWDataProcessor()
-    processor.process_json_file(json_file)
+    with start_run('process-uw-json', profile=profile):
+        processor = UWDataProcessor()
+        processor.process_json_file(json_file)
 
 if __name__ == "__main__":
     main()
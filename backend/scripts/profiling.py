@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Profiling mode for the ingestion and embedding entry points
+Each entry point takes --profile and passes it to run_metrics.start_run(); this module
+is only imported for a profiled run, so an ordinary run pays nothing for it. A profiled
+run writes to backend/.cache/profiles/<job>-<time>/ (override with PROFILE_DIR):
+  cprofile.pstats   raw cProfile stats (python -m pstats, snakeviz)
+  cprofile.txt      top functions by cumulative and by own time
+  memory.txt        tracemalloc peak and the top allocation sites at the high-water mark
+  stages.txt/json   per-stage wall, self and CPU time from the run's spans
+
+cProfile and the stage CPU times cover the main thread; work done in extraction
+worker processes (data_processor.py process-dir) shows up as the wait for results.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Optional
+
+from run_metrics import COUNTERS, StageStats, format_bytes, format_summary
+
+DEFAULT_PROFILE_DIR = Path(__file__).parent.parent / '.cache' / 'profiles'
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+# Take a new allocation snapshot at a span boundary once traced memory has grown this
+# much past the last one, so the report shows the sites live near the peak
+SNAPSHOT_GROWTH = 1.1
+
+class RunProfiler:
+    def __init__(self, job: str, run_id: str, directory: Optional[str] = None):
+        root = Path(directory or os.getenv('PROFILE_DIR') or DEFAULT_PROFILE_DIR)
+        self.directory = root / f"{re.sub(r'[^A-Za-z0-9_.-]+', '-', job)}-{run_id}"
+        self.profiler = cProfile.Profile()
+        self.snapshot = None
+        self.snapshot_size = 0
+
+    def start(self):
+        tracemalloc.start()
+        self.profiler.enable()
+
+    def checkpoint(self):
+        """Called after every span: keep the allocation snapshot of the largest heap seen"""
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.snapshot_size * SNAPSHOT_GROWTH:
+            self.profiler.disable()
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = current
+            self.profiler.enable()
+
+    def stop(self, job: str, elapsed: float, stages: Dict[str, StageStats]):
+        self.profiler.disable()
+        self.checkpoint()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.profiler.dump_stats(str(self.directory / 'cprofile.pstats'))
+        self.write_functions()
+        self.write_memory(current, peak)
+        self.write_stages(job, elapsed, stages)
+
+    def write_functions(self):
+        report = io.StringIO()
+        for order in ('cumulative', 'tottime'):
+            report.write(f"Top {TOP_FUNCTIONS} functions by {order} time\n")
+            pstats.Stats(self.profiler, stream=report).strip_dirs().sort_stats(order).print_stats(TOP_FUNCTIONS)
+        (self.directory / 'cprofile.txt').write_text(report.getvalue(), encoding='utf-8')
+
+    def write_memory(self, current: int, peak: int):
+        lines = [f"Peak traced memory: {format_bytes(peak)}",
+                 f"Traced at exit:     {format_bytes(current)}"]
+        if self.snapshot:
+            snapshot = self.snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+                tracemalloc.Filter(False, '<unknown>'),
+            ))
+            lines.append(f"\nTop {TOP_ALLOCATIONS} allocation sites with {format_bytes(self.snapshot_size)} traced:")
+            for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                frame = stat.traceback[0]
+                lines.append(f"  {format_bytes(stat.size):>10} {stat.count:>9} blocks  {frame.filename}:{frame.lineno}")
+        (self.directory / 'memory.txt').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    def write_stages(self, job: str, elapsed: float, stages: Dict[str, StageStats]):
+        (self.directory / 'stages.txt').write_text(format_summary(job, elapsed, stages) + '\n', encoding='utf-8')
+        summary = {
+            stage: {
+                'spans': stats.spans,
+                'seconds': round(stats.seconds, 6),
+                'self_seconds': round(stats.self_seconds, 6),
+                'self_cpu_seconds': round(stats.self_cpu_seconds, 6),
+                'p50_ms': round(stats.percentile(50) * 1000, 3),
+                'p95_ms': round(stats.percentile(95) * 1000, 3),
+                **{name: stats.counts[name] for name in COUNTERS},
+                'errors': stats.errors,
+            }
+            for stage, stats in stages.items()
+        }
+        with open(self.directory / 'stages.json', 'w', encoding='utf-8') as f:
+            json.dump({'job': job, 'elapsed_seconds': round(elapsed, 6), 'stages': summary}, f, indent=2)
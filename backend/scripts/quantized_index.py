@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+In-memory quantized embedding index with full-precision re-ranking
+Coarse candidates come from a compact copy of the vectors (float16, scalar int8 or
+sign bits, optionally of a Matryoshka prefix only); the survivors are re-scored with
+the float32 vectors so the final ordering matches exact cosine search whenever the
+true neighbours survive
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+QUANTIZATION_MODES = ['float32', 'half', 'int8', 'binary']
+
+# Rows upcast at once when scoring float16/int8 codes
+BLOCK_ROWS = 4096
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalise rows so a dot product is cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def shorten(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """Matryoshka truncation: keep the first dims components and re-normalise"""
+    return normalize(np.asarray(vectors)[..., :dims])
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without a full sort"""
+    k = min(k, scores.shape[-1])
+    if k == scores.shape[-1]:
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part])]
+
+# 8-bit popcount table for Hamming distance on packed sign bits
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+class QuantizedIndex:
+    """Cosine search over one quantized copy of the corpus, re-ranked in float32
+
+    keep_full=False drops the float32 matrix after quantizing and re-ranks from the
+    dequantized codes instead, which is what a memory-bound deployment would do.
+    prefix_dims builds the coarse copy from the first n dimensions only, which for
+    text-embedding-3 (Matryoshka-trained) is the same vector the API returns when
+    asked for dimensions=n; the full vectors are then always kept for re-ranking.
+    """
+
+    def __init__(self, vectors: np.ndarray, ids: Optional[Sequence] = None, mode: str = 'int8',
+                 keep_full: bool = True, prefix_dims: Optional[int] = None):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"mode must be one of {QUANTIZATION_MODES}, got {mode!r}")
+
+        full = normalize(vectors)
+        self.mode = mode
+        self.ids = list(ids) if ids is not None else list(range(len(full)))
+        self.dims = full.shape[1]
+        self.prefix_dims = prefix_dims if prefix_dims and prefix_dims < self.dims else None
+        self.full = full if keep_full or mode == 'float32' or self.prefix_dims else None
+
+        coarse = shorten(full, self.prefix_dims) if self.prefix_dims else full
+        if mode == 'float32':
+            self.codes = coarse
+        elif mode == 'half':
+            self.codes = coarse.astype(np.float16)
+        elif mode == 'int8':
+            # Symmetric per-dimension scale; unit vectors keep every component in [-1, 1]
+            self.scale = np.maximum(np.abs(coarse).max(axis=0), 1e-12) / 127.0
+            self.codes = np.round(coarse / self.scale).astype(np.int8)
+        else:
+            self.codes = np.packbits(coarse > 0, axis=1)
+
+    def memory_bytes(self, include_full: bool = False) -> int:
+        """Bytes held by the quantized codes (plus the float32 re-rank copy if asked)"""
+        size = self.codes.nbytes
+        if self.mode == 'int8':
+            size += self.scale.nbytes
+        if include_full and self.full is not None and self.full is not self.codes:
+            size += self.full.nbytes
+        return size
+
+    def coarse_scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate similarity of a normalised query to every row (higher is closer)"""
+        if self.prefix_dims:
+            query = shorten(query, self.prefix_dims)
+        if self.mode == 'float32':
+            return self.codes @ query
+        if self.mode == 'half':
+            return self._blocked_dot(query)
+        if self.mode == 'int8':
+            return self._blocked_dot((query * self.scale).astype(np.float32))
+        # Negative Hamming distance between sign bits
+        query_bits = np.packbits(query > 0)
+        return -_POPCOUNT[np.bitwise_xor(self.codes, query_bits)].sum(axis=1, dtype=np.int32)
+
+    def _blocked_dot(self, query: np.ndarray) -> np.ndarray:
+        """Dot products against the codes, upcast a block at a time so BLAS does the work
+
+        NumPy has no fast float16/int8 matmul; a block-sized float32 scratch keeps the
+        speed of float32 search without ever materialising the full float32 matrix.
+        """
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), BLOCK_ROWS):
+            block = self.codes[start:start + BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores
+
+    def rerank_vectors(self, rows: np.ndarray) -> np.ndarray:
+        if self.full is not None:
+            return self.full[rows]
+        if self.mode == 'half':
+            return self.codes[rows].astype(np.float32)
+        if self.mode == 'int8':
+            return self.codes[rows].astype(np.float32) * self.scale
+        # Sign bits alone cannot rank finely; +-1 per dimension is the best available
+        return np.unpackbits(self.codes[rows], axis=1)[:, :self.dims].astype(np.float32) * 2 - 1
+
+    def search_rows(self, query: np.ndarray, k: int = 10, candidates: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+        """Row indices and cosine scores of the top k after re-ranking the coarse top N"""
+        query = normalize(query)
+        coarse = top_k(self.coarse_scores(query), max(candidates, k))
+        scores = self.rerank_vectors(coarse) @ query
+        order = top_k(scores, k)
+        return coarse[order], scores[order]
+
+    def search(self, query: np.ndarray, k: int = 10, candidates: int = 100) -> List[Tuple[object, float]]:
+        rows, scores = self.search_rows(query, k, candidates)
+        return [(self.ids[row], float(score)) for row, score in zip(rows, scores)]
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int = 10) -> List[np.ndarray]:
+    """Ground-truth neighbours by brute-force float32 cosine"""
+    scores = normalize(queries) @ normalize(corpus).T
+    return [top_k(row, k) for row in scores]
+
+def recall_at_k(found: Sequence[np.ndarray], truth: Sequence[np.ndarray], k: int = 10) -> float:
+    hits = sum(len(set(f[:k].tolist()) & set(t[:k].tolist())) for f, t in zip(found, truth))
+    return hits / max(sum(min(k, len(t)) for t in truth), 1)
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Query plan capture and regression guard for the hot catalog queries
+Replays the SQL behind the app's main catalog reads (the searchCourses ILIKE/JSONB
+filters and the vector search RPC bodies, see QUERIES) with EXPLAIN (ANALYZE,
+BUFFERS) and records each plan's shape, per-node timings and buffer counts as JSON.
+
+A query fails the check when:
+  - none of its expected indexes can serve it. This is probed with enable_seqscan
+    off, because on a small catalog the planner rightly prefers a seq scan even when
+    the index works.
+  - a relation the baseline read through an index is now read by a seq scan.
+  - its median execution time is over its budget, or over --max-slowdown times the
+    baseline median.
+Queries run in a transaction that is rolled back.
+
+Commands:
+  capture [--out plans.json] [--repeat 3]        record plans and timings
+  check --baseline plans.json [--out new.json]   capture and compare, exit 1 on a regression
+  list                                           print the query registry
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+DEFAULT_OUT_DIR = project_root / '.cache' / 'query_plans'
+DEFAULT_REPEAT = 3
+DEFAULT_MAX_SLOWDOWN = 3.0
+
+# Differences under this many ms are noise, whatever the ratio to the baseline
+MIN_SLOWDOWN_MS = 1.0
+
+# Parameter values looked up in the database before the run (e.g. a real embedding)
+SAMPLES = {
+    '@course_embedding': "SELECT embedding::TEXT FROM courses WHERE embedding IS NOT NULL LIMIT 1",
+    '@doc_embedding': "SELECT embedding::TEXT FROM elective_docs WHERE embedding IS NOT NULL LIMIT 1",
+}
+
+# name, where the app runs it, SQL (psycopg2 %(name)s parameters), parameters,
+# indexes that should be able to serve it (empty: none can) and a latency budget
+QUERIES = [
+    {
+        'name': 'courses_keyword_search',
+        'source': "searchCourses keyword OR chain (frontend/src/lib/search.ts)",
+        'sql': """
+            SELECT * FROM courses
+            WHERE title ILIKE %(first)s OR description ILIKE %(first)s OR skills @> %(first_skill)s::JSONB
+               OR title ILIKE %(second)s OR description ILIKE %(second)s OR skills @> %(second_skill)s::JSONB
+            LIMIT 20
+        """,
+        'params': {'first': '%robot%', 'first_skill': '["robotics"]',
+                   'second': '%control%', 'second_skill': '["control"]'},
+        'indexes': [],  # leading-wildcard ILIKE needs a pg_trgm index
+        'budget_ms': 50,
+    },
+    {
+        'name': 'courses_ai_fallback',
+        'source': "searchCourses machine/learning fallback (search.ts)",
+        'sql': """
+            SELECT * FROM courses
+            WHERE title ILIKE '%%artificial%%' OR title ILIKE '%%intelligence%%' OR title ILIKE '%%ai%%'
+               OR title ILIKE '%%ml%%' OR description ILIKE '%%artificial%%' OR description ILIKE '%%intelligence%%'
+               OR description ILIKE '%%ai%%' OR description ILIKE '%%ml%%'
+            LIMIT 20
+        """,
+        'params': {},
+        'indexes': [],
+        'budget_ms': 50,
+    },
+    {
+        'name': 'courses_skills_filter',
+        'source': "searchCourses filters.skills, JSONB cs (search.ts)",
+        'sql': "SELECT * FROM courses WHERE skills @> %(skills)s::JSONB LIMIT 20",
+        'params': {'skills': '["robotics"]'},
+        'indexes': ['idx_courses_skills'],
+        'budget_ms': 20,
+    },
+    {
+        'name': 'courses_dept_level_filter',
+        'source': "searchCourses filters.dept / filters.level (search.ts)",
+        'sql': "SELECT * FROM courses WHERE dept IN %(depts)s AND level IN %(levels)s LIMIT 20",
+        'params': {'depts': ('ECE', 'MTE'), 'levels': (300, 400)},
+        'indexes': ['idx_courses_dept', 'idx_courses_level'],
+        'budget_ms': 20,
+    },
+    {
+        'name': 'courses_vector_search',
+        'source': "search_courses_vector body (add-vector-search.sql)",
+        'sql': """
+            SELECT id, title, 1 - (embedding <=> %(embedding)s::VECTOR) AS similarity
+            FROM courses
+            WHERE embedding IS NOT NULL AND 1 - (embedding <=> %(embedding)s::VECTOR) > 0.3
+            ORDER BY embedding <=> %(embedding)s::VECTOR
+            LIMIT 20
+        """,
+        'params': {'embedding': '@course_embedding'},
+        'indexes': ['courses_embedding_idx'],
+        'budget_ms': 100,
+    },
+    {
+        'name': 'elective_docs_vector_search',
+        'source': "search_elective_docs body (complete-database-schema.sql)",
+        'sql': """
+            SELECT id, 1 - (embedding <=> %(embedding)s::VECTOR) AS similarity
+            FROM elective_docs
+            WHERE 1 - (embedding <=> %(embedding)s::VECTOR) > 0.5
+            ORDER BY embedding <=> %(embedding)s::VECTOR
+            LIMIT 10
+        """,
+        'params': {'embedding': '@doc_embedding'},
+        'indexes': ['idx_elective_docs_embedding'],
+        'budget_ms': 100,
+    },
+    {
+        'name': 'specializations_by_program',
+        'source': "searchSpecializations program filter (search.ts)",
+        'sql': "SELECT * FROM specializations WHERE program = %(program)s",
+        'params': {'program': 'Software Engineering'},
+        'indexes': ['idx_specializations_program'],
+        'budget_ms': 20,
+    },
+]
+
+def plan_nodes(plan: Dict[str, Any], depth: int = 0) -> Iterator[Dict[str, Any]]:
+    """Plan nodes in pre-order with the fields kept in the JSON report"""
+    loops = plan.get('Actual Loops', 1) or 1
+    yield {
+        'depth': depth,
+        'type': plan['Node Type'],
+        'relation': plan.get('Relation Name'),
+        'index': plan.get('Index Name'),
+        'rows': plan.get('Actual Rows'),
+        'loops': loops,
+        'ms': round(plan.get('Actual Total Time', 0.0) * loops, 3),
+        'shared_hit': plan.get('Shared Hit Blocks', 0),
+        'shared_read': plan.get('Shared Read Blocks', 0),
+    }
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child, depth + 1)
+
+def node_label(node: Dict[str, Any]) -> str:
+    label = node['type']
+    if node['relation']:
+        label += f" on {node['relation']}"
+    if node['index']:
+        label += f" using {node['index']}"
+    return label
+
+def relation_access(nodes: List[Dict[str, Any]]) -> Dict[str, str]:
+    """How each relation is read: seq, index or bitmap (the best access if it is read twice)"""
+    rank = {'seq': 0, 'bitmap': 1, 'index': 2}
+    access: Dict[str, str] = {}
+    for node in nodes:
+        if not node['relation']:
+            continue
+        if node['type'] == 'Seq Scan':
+            kind = 'seq'
+        elif node['type'] == 'Bitmap Heap Scan':
+            kind = 'bitmap'
+        elif node['type'] in ('Index Scan', 'Index Only Scan'):
+            kind = 'index'
+        else:
+            continue
+        if rank[kind] >= rank.get(access.get(node['relation']), -1):
+            access[node['relation']] = kind
+    return access
+
+class PlanCapture:
+    def __init__(self, conn, repeat: int = DEFAULT_REPEAT):
+        self.conn = conn
+        self.repeat = repeat
+
+    def samples(self) -> Dict[str, Optional[str]]:
+        values = {}
+        with self.conn.cursor() as cur:
+            for key, sql in SAMPLES.items():
+                try:
+                    cur.execute(sql)
+                    row = cur.fetchone()
+                    values[key] = row[0] if row else None
+                except Exception:
+                    values[key] = None
+                self.conn.rollback()
+        return values
+
+    def explain(self, sql: str, params: Dict[str, Any], analyze: bool = True,
+                seqscan: bool = True) -> Dict[str, Any]:
+        options = 'ANALYZE, BUFFERS, FORMAT JSON' if analyze else 'FORMAT JSON'
+        try:
+            with self.conn.cursor() as cur:
+                if not seqscan:
+                    cur.execute("SET LOCAL enable_seqscan = off")
+                cur.execute(f"EXPLAIN ({options}) {sql}", params)
+                return cur.fetchone()[0][0]
+        finally:
+            self.conn.rollback()
+
+    def capture_query(self, query: Dict[str, Any], samples: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        params = {}
+        for key, value in query['params'].items():
+            if isinstance(value, str) and value in SAMPLES:
+                if samples.get(value) is None:
+                    return {'name': query['name'], 'skipped': f"no value for {value}"}
+                value = samples[value]
+            params[key] = value
+
+        runs = [self.explain(query['sql'], params) for _ in range(self.repeat)]
+        result = runs[-1]
+        nodes = list(plan_nodes(result['Plan']))
+        root = result['Plan']
+
+        usable = None
+        if query['indexes']:
+            forced = list(plan_nodes(self.explain(query['sql'], params, analyze=False, seqscan=False)['Plan']))
+            usable = sorted({node['index'] for node in forced if node['index'] in query['indexes']})
+
+        return {
+            'name': query['name'],
+            'source': query['source'],
+            'shape': ['  ' * node['depth'] + node_label(node) for node in nodes],
+            'access': relation_access(nodes),
+            'indexes_used': sorted({node['index'] for node in nodes if node['index']}),
+            'expected_indexes': query['indexes'],
+            'usable_indexes': usable,
+            'planning_ms': round(result.get('Planning Time', 0.0), 3),
+            'execution_ms': [round(run.get('Execution Time', 0.0), 3) for run in runs],
+            'median_ms': round(statistics.median(run.get('Execution Time', 0.0) for run in runs), 3),
+            'budget_ms': query['budget_ms'],
+            'rows': root.get('Actual Rows'),
+            'shared_hit': root.get('Shared Hit Blocks', 0),
+            'shared_read': root.get('Shared Read Blocks', 0),
+            'nodes': nodes,
+        }
+
+    def capture(self, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        samples = self.samples()
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT version()")
+            server = cur.fetchone()[0]
+        self.conn.rollback()
+
+        queries = []
+        for query in QUERIES:
+            if names and query['name'] not in names:
+                continue
+            try:
+                queries.append(self.capture_query(query, samples))
+            except Exception as e:
+                self.conn.rollback()
+                queries.append({'name': query['name'], 'error': str(e).strip()})
+        return {
+            'captured_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'server': server,
+            'repeat': self.repeat,
+            'queries': queries,
+        }
+
+def find_regressions(report: Dict[str, Any], baseline: Optional[Dict[str, Any]],
+                     max_slowdown: float) -> Dict[str, List[str]]:
+    """Problems per query name; an empty list means it passed"""
+    previous = {query['name']: query for query in (baseline or {}).get('queries', [])}
+    problems: Dict[str, List[str]] = {}
+    for query in report['queries']:
+        found = problems.setdefault(query['name'], [])
+        if 'error' in query:
+            found.append(f"failed: {query['error']}")
+            continue
+        if 'skipped' in query:
+            continue
+        if query['expected_indexes'] and not query['usable_indexes']:
+            found.append(f"no usable index (expected one of {', '.join(query['expected_indexes'])})")
+        if query['median_ms'] > query['budget_ms']:
+            found.append(f"{query['median_ms']:.1f} ms over the {query['budget_ms']} ms budget")
+
+        before = previous.get(query['name'])
+        if not before or 'access' not in before:
+            continue
+        for relation, kind in before['access'].items():
+            now = query['access'].get(relation)
+            if kind in ('index', 'bitmap') and now == 'seq':
+                found.append(f"{relation}: {kind} scan became a seq scan")
+        if (query['median_ms'] > before['median_ms'] * max_slowdown
+                and query['median_ms'] - before['median_ms'] > MIN_SLOWDOWN_MS):
+            found.append(f"{query['median_ms']:.1f} ms vs {before['median_ms']:.1f} ms in the baseline")
+    return problems
+
+def print_report(report: Dict[str, Any], problems: Dict[str, List[str]]):
+    print(f"📋 {len(report['queries'])} queries on {report['server'].split(',')[0]}")
+    for query in report['queries']:
+        if 'skipped' in query:
+            print(f"  ⏭️ {query['name']:<28} skipped: {query['skipped']}")
+            continue
+        if 'error' in query:
+            print(f"  ❌ {query['name']:<28} {query['error']}")
+            continue
+        access = ', '.join(f"{relation} {kind}" for relation, kind in sorted(query['access'].items())) or '-'
+        mark = '❌' if problems.get(query['name']) else '✅'
+        print(f"  {mark} {query['name']:<28} {query['median_ms']:>8.2f} ms  "
+              f"{query['shared_hit'] + query['shared_read']:>6} buffers ({query['shared_read']} read)  {access}")
+        for problem in problems.get(query['name'], []):
+            print(f"       ⤷ {problem}")
+
+def write_report(report: Dict[str, Any], out: Optional[str]) -> Path:
+    if out:
+        path = Path(out)
+    else:
+        DEFAULT_OUT_DIR.mkdir(parents=True, exist_ok=True)
+        path = DEFAULT_OUT_DIR / f"plans-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture and check query plans of the hot catalog queries")
+    parser.add_argument('command', choices=['capture', 'check', 'list'])
+    parser.add_argument('--out', help=f"report path (default {DEFAULT_OUT_DIR}/plans-<time>.json)")
+    parser.add_argument('--baseline', help="earlier capture to compare with")
+    parser.add_argument('--only', help="comma-separated query names")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="runs per query; the median is kept")
+    parser.add_argument('--max-slowdown', type=float, default=DEFAULT_MAX_SLOWDOWN)
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for query in QUERIES:
+            print(f"  {query['name']:<28} {query['budget_ms']:>4} ms  {', '.join(query['indexes']) or 'no index'}  "
+                  f"({query['source']})")
+        return
+    if args.command == 'check' and not args.baseline:
+        parser.error("check needs --baseline")
+
+    names = [name.strip() for name in args.only.split(',')] if args.only else None
+    unknown = [name for name in names or [] if name not in {query['name'] for query in QUERIES}]
+    if unknown:
+        parser.error(f"unknown queries: {', '.join(unknown)}")
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+
+    from dotenv import load_dotenv
+    import psycopg2
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    conn = psycopg2.connect(db_url)
+    try:
+        report = PlanCapture(conn, args.repeat).capture(names)
+    finally:
+        conn.close()
+
+    problems = find_regressions(report, baseline, args.max_slowdown)
+    print_report(report, problems)
+    print(f"💾 Report written to {write_report(report, args.out)}")
+    failed = [name for name, found in problems.items() if found]
+    if args.command == 'check':
+        if failed:
+            print(f"❌ {len(failed)} of {len(report['queries'])} queries regressed: {', '.join(failed)}")
+            sys.exit(1)
+        print("✅ No plan or latency regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Vectorized course recommendation scoring
+Scores the whole catalog for one profile, or thousands of profiles at once, with
+the same six components as calculateCourseScore in frontend/src/lib/search.ts:
+goal match (0-40), program fit (0-15), prerequisites (0-15), term availability
+(0-10), workload (0-10) and level progression (0-10).
+
+The catalog is held as NumPy arrays: department codes, levels, term bitmasks, a
+skill count matrix, prerequisite token lists and workload vectors. Each string
+test calculateCourseScore makes per course (goal/skill substrings, completed
+course/prerequisite substrings) is evaluated once per distinct string pair, and
+everything after that is array arithmetic. score_course is a plain port of
+calculateCourseScore, used for explanations and to check the vectorized scores.
+
+Commands:
+  score <user_id> [--top 10]     rank every course for a stored profile
+  benchmark [--courses 5000] [--profiles 2000]
+                                 profiles x courses per second, checked against score_course
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import numpy as np
+
+COMPONENTS = ['goal', 'program', 'prereqs', 'term', 'workload', 'level']
+WORKLOAD_KEYS = ['reading', 'assignments', 'projects', 'labs']
+
+# getTermLevel and getNextTerm in search.ts, including their fallbacks
+TERM_LEVELS = {'1A': 100, '1B': 100, '2A': 200, '2B': 200, '3A': 300, '3B': 300, '4A': 400, '4B': 400}
+NEXT_TERMS = {'1A': '1B', '1B': '2A', '2A': '2B', '2B': '3A', '3A': '3B', '3B': '4A', '4A': '4B', '4B': '4B'}
+
+def term_level(term: str) -> int:
+    return TERM_LEVELS.get(term, 200)
+
+def next_term(term: str) -> str:
+    return NEXT_TERMS.get(term, '2A')
+
+def js_number(value: float) -> str:
+    """Numbers as JavaScript template strings print them"""
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+def workload_total(workload: Optional[Dict[str, Any]]) -> float:
+    return float(sum(value for value in (workload or {}).values() if isinstance(value, (int, float))))
+
+def score_course(course: Dict[str, Any], profile: Dict[str, Any], goal_tags: Optional[List[str]] = None) -> Dict[str, Any]:
+    """calculateCourseScore for one course, with its explanations"""
+    if goal_tags is None:
+        goal_tags = profile.get('goal_tags') or []
+    current_term = profile.get('current_term')
+    level = course.get('level') or 0
+    explanation = []
+    components = {}
+
+    # Goal match (0-40 points)
+    goals = [goal.lower() for goal in goal_tags]
+    matches = [skill for skill in (s.lower() for s in course.get('skills') or [])
+               if any(skill in goal or goal in skill for goal in goals)]
+    if matches:
+        components['goal'] = min(40, len(matches) * 10)
+        explanation.append(f"Matches your goals: {', '.join(matches)}")
+    else:
+        components['goal'] = 0
+        explanation.append('Limited alignment with your stated goals')
+
+    # Program fit (0-15 points)
+    program = profile.get('program')
+    components['program'] = 0
+    if program and course.get('dept') == program:
+        components['program'] += 10
+        explanation.append(f"Same department as your program ({program})")
+    elif program:
+        components['program'] += 5
+        explanation.append(f"Cross-departmental course ({course.get('dept')})")
+    if current_term and level >= term_level(current_term):
+        components['program'] += 5
+        explanation.append(f"Appropriate level for {current_term}")
+
+    # Prerequisites check (0-15 points)
+    prereqs = course.get('prereqs')
+    completed = [c.lower() for c in profile.get('completed_courses') or []]
+    if not prereqs:
+        components['prereqs'], prereqs_met = 15, True
+        explanation.append('No prerequisites required')
+    else:
+        prereq_list = [p.strip() for p in prereqs.split(',')]
+        met = [p for p in prereq_list if any(p.lower() in c for c in completed)]
+        prereqs_met = len(met) == len(prereq_list)
+        if prereqs_met:
+            components['prereqs'] = 15
+            explanation.append('All prerequisites met')
+        elif met:
+            components['prereqs'] = 8
+            explanation.append(f"Some prerequisites met ({len(met)}/{len(prereq_list)})")
+        else:
+            components['prereqs'] = 0
+            explanation.append(f"Prerequisites not met: {prereqs}")
+
+    # Term availability (0-10 points)
+    terms = course.get('terms_offered') or []
+    if not terms:
+        components['term'] = 5
+        explanation.append('Term availability unknown')
+    elif current_term and next_term(current_term) in terms:
+        components['term'] = 10
+        explanation.append(f"Offered next term ({next_term(current_term)})")
+    else:
+        components['term'] = 5
+        explanation.append(f"Offered in: {', '.join(terms)}")
+
+    # Workload alignment (0-10 points)
+    max_workload = (profile.get('constraints') or {}).get('max_workload')
+    components['workload'] = 5
+    if course.get('workload') is not None and max_workload:
+        total = workload_total(course['workload'])
+        if total <= max_workload:
+            components['workload'] = 10
+            explanation.append(f"Workload fits your constraints ({js_number(total)}/week)")
+        else:
+            components['workload'] = 2
+            explanation.append(f"Heavy workload ({js_number(total)}/week)")
+
+    # Level progression (0-10 points)
+    components['level'] = 5
+    if current_term:
+        base = term_level(current_term)
+        if base <= level <= base + 100:
+            components['level'] = 10
+            explanation.append(f"Appropriate level for {current_term}")
+        elif level < base:
+            components['level'] = 3
+            explanation.append(f"Lower level course ({course.get('level')}xx)")
+        else:
+            components['level'] = 7
+            explanation.append(f"Advanced course ({course.get('level')}xx)")
+
+    return {
+        'score': round(sum(components.values())),
+        'components': components,
+        'explanation': explanation,
+        'counts_toward': [],
+        'prereqs_met': prereqs_met,
+        'next_offered': list(terms),
+        'workload_score': components['workload'],
+    }
+
+class Catalog:
+    """Courses as column arrays, built once and shared by every profile batch"""
+
+    def __init__(self, courses: Sequence[Dict[str, Any]]):
+        self.courses = list(courses)
+        self.ids = [course['id'] for course in self.courses]
+        n = len(self.courses)
+
+        self.depts = sorted({course.get('dept') or '' for course in self.courses})
+        dept_code = {dept: code for code, dept in enumerate(self.depts)}
+        self.dept = np.array([dept_code[course.get('dept') or ''] for course in self.courses], dtype=np.int32)
+        self.level = np.array([course.get('level') or 0 for course in self.courses], dtype=np.int32)
+
+        # Term bitmasks: bit i set when the course is offered in self.terms[i]
+        self.terms = sorted({term for course in self.courses for term in course.get('terms_offered') or []})
+        if len(self.terms) > 64:
+            raise ValueError(f"{len(self.terms)} distinct terms do not fit a 64-bit mask")
+        self.term_bit = {term: np.uint64(1) << np.uint64(i) for i, term in enumerate(self.terms)}
+        self.term_mask = np.zeros(n, dtype=np.uint64)
+        for row, course in enumerate(self.courses):
+            for term in course.get('terms_offered') or []:
+                self.term_mask[row] |= self.term_bit[term]
+        self.has_terms = np.array([bool(course.get('terms_offered')) for course in self.courses])
+
+        # Skill count matrix (a course listing a skill twice counts it twice, like the TS filter)
+        self.skills = sorted({s.lower() for course in self.courses for s in course.get('skills') or []})
+        skill_index = {skill: i for i, skill in enumerate(self.skills)}
+        self.skill_counts = np.zeros((n, len(self.skills)), dtype=np.float32)
+        for row, course in enumerate(self.courses):
+            for skill in course.get('skills') or []:
+                self.skill_counts[row, skill_index[skill.lower()]] += 1
+
+        # Prerequisite tokens as one flat array with per-course offsets (courses with prereqs only)
+        self.has_prereqs = np.array([bool(course.get('prereqs')) for course in self.courses])
+        self.prereq_rows = np.nonzero(self.has_prereqs)[0]
+        token_lists = [[p.strip().lower() for p in self.courses[row]['prereqs'].split(',')] for row in self.prereq_rows]
+        self.prereq_tokens = sorted({token for tokens in token_lists for token in tokens})
+        token_index = {token: i for i, token in enumerate(self.prereq_tokens)}
+        self.prereq_flat = np.array([token_index[t] for tokens in token_lists for t in tokens], dtype=np.int64)
+        self.prereq_offsets = np.cumsum([0] + [len(tokens) for tokens in token_lists[:-1]]).astype(np.int64)
+        self.prereq_total = np.array([len(tokens) for tokens in token_lists], dtype=np.int32)
+
+        self.workload = np.array([[float((course.get('workload') or {}).get(key) or 0) for key in WORKLOAD_KEYS]
+                                  for course in self.courses], dtype=np.float32).reshape(n, len(WORKLOAD_KEYS))
+        self.workload_total = np.array([workload_total(course.get('workload')) for course in self.courses],
+                                       dtype=np.float32)
+        self.has_workload = np.array([course.get('workload') is not None for course in self.courses])
+
+    def __len__(self):
+        return len(self.courses)
+
+class ProfileBatch:
+    """Per-profile arrays aligned with a Catalog's vocabularies"""
+
+    def __init__(self, catalog: Catalog, profiles: Sequence[Dict[str, Any]]):
+        self.profiles = list(profiles)
+        n = len(self.profiles)
+        dept_code = {dept: code for code, dept in enumerate(catalog.depts)}
+
+        programs = [profile.get('program') for profile in self.profiles]
+        self.has_program = np.array([bool(program) for program in programs])
+        self.program = np.array([dept_code.get(program, -1) if program else -1 for program in programs], dtype=np.int32)
+
+        current_terms = [profile.get('current_term') for profile in self.profiles]
+        self.has_term = np.array([bool(term) for term in current_terms])
+        self.term_level = np.array([term_level(term) if term else 0 for term in current_terms], dtype=np.int32)
+        self.next_term_mask = np.array([catalog.term_bit.get(next_term(term), np.uint64(0)) if term else 0
+                                        for term in current_terms], dtype=np.uint64)
+
+        max_workloads = [(profile.get('constraints') or {}).get('max_workload') for profile in self.profiles]
+        self.max_workload = np.array([value or 0 for value in max_workloads], dtype=np.float32)
+
+        # Goal tag x skill substring tests, once per distinct goal
+        skills = np.array(catalog.skills, dtype=object)
+        goal_rows: Dict[str, np.ndarray] = {}
+        self.goal_skills = np.zeros((n, len(catalog.skills)), dtype=np.float32)
+        for row, profile in enumerate(self.profiles):
+            for goal in profile.get('goal_tags') or []:
+                goal = goal.lower()
+                if goal not in goal_rows:
+                    goal_rows[goal] = np.array([skill in goal or goal in skill for skill in skills], dtype=bool)
+                self.goal_skills[row] = np.maximum(self.goal_skills[row], goal_rows[goal])
+
+        # Completed course x prerequisite token substring tests, once per distinct completed course
+        tokens = np.array(catalog.prereq_tokens, dtype=str) if catalog.prereq_tokens else np.zeros(0, dtype=str)
+        completed_rows: Dict[str, np.ndarray] = {}
+        self.token_met = np.zeros((n, len(catalog.prereq_tokens)), dtype=bool)
+        for row, profile in enumerate(self.profiles):
+            for completed in profile.get('completed_courses') or []:
+                completed = completed.lower()
+                if completed not in completed_rows:
+                    completed_rows[completed] = (np.char.find(completed, tokens) >= 0) if len(tokens) else tokens.astype(bool)
+                self.token_met[row] |= completed_rows[completed]
+
+    def __len__(self):
+        return len(self.profiles)
+
+class ScoreBreakdown:
+    """Component scores, profiles x courses, int16"""
+
+    def __init__(self, components: Dict[str, np.ndarray], prereqs_met: np.ndarray):
+        self.components = components
+        self.prereqs_met = prereqs_met
+
+    @property
+    def total(self) -> np.ndarray:
+        return sum(self.components[name].astype(np.int32) for name in COMPONENTS)
+
+def score_batch(catalog: Catalog, profiles: ProfileBatch) -> ScoreBreakdown:
+    """Every component of calculateCourseScore for every (profile, course) pair"""
+    def pick(condition, yes, no):
+        return np.where(condition, np.int16(yes), np.int16(no)).astype(np.int16)
+
+    # Goal match: how many of the course's skills match any goal, 10 points each up to 40
+    matches = profiles.goal_skills @ catalog.skill_counts.T
+    goal = np.minimum(40, matches * 10).astype(np.int16)
+
+    has_program = profiles.has_program[:, None]
+    has_term = profiles.has_term[:, None]
+    level = catalog.level[None, :]
+    base = profiles.term_level[:, None]
+
+    program = (pick(has_program & (profiles.program[:, None] == catalog.dept[None, :]), 10, 0)
+               + pick(has_program & (profiles.program[:, None] != catalog.dept[None, :]), 5, 0)
+               + pick(has_term & (level >= base), 5, 0))
+
+    # Prerequisites: count met tokens per course with one gather and a segmented sum
+    prereqs = np.full((len(profiles), len(catalog)), 15, dtype=np.int16)
+    prereqs_met = np.ones((len(profiles), len(catalog)), dtype=bool)
+    if len(catalog.prereq_rows):
+        met = np.add.reduceat(profiles.token_met[:, catalog.prereq_flat].astype(np.int32),
+                              catalog.prereq_offsets, axis=1)
+        all_met = met == catalog.prereq_total[None, :]
+        prereqs[:, catalog.prereq_rows] = np.where(all_met, 15, np.where(met > 0, 8, 0))
+        prereqs_met[:, catalog.prereq_rows] = all_met
+
+    offered_next = (catalog.term_mask[None, :] & profiles.next_term_mask[:, None]) != 0
+    term = pick(catalog.has_terms[None, :] & has_term & offered_next, 10, 5)
+
+    fits = catalog.workload_total[None, :] <= profiles.max_workload[:, None]
+    applies = catalog.has_workload[None, :] & (profiles.max_workload[:, None] > 0)
+    workload = np.where(applies, np.where(fits, 10, 2), 5).astype(np.int16)
+
+    in_band = (level >= base) & (level <= base + 100)
+    level_score = np.where(has_term, np.where(in_band, 10, np.where(level < base, 3, 7)), 5).astype(np.int16)
+
+    return ScoreBreakdown({
+        'goal': goal, 'program': program, 'prereqs': prereqs,
+        'term': term, 'workload': workload, 'level': level_score,
+    }, prereqs_met)
+
+def top_courses(catalog: Catalog, profiles: Sequence[Dict[str, Any]], k: int = 10,
+                block_profiles: int = 256) -> List[List[Tuple[int, int]]]:
+    """Best k (course row, score) per profile, scored in blocks to bound memory"""
+    if not len(catalog):
+        return [[] for _ in profiles]
+    results = []
+    for start in range(0, len(profiles), block_profiles):
+        totals = score_batch(catalog, ProfileBatch(catalog, profiles[start:start + block_profiles])).total
+        kk = min(k, totals.shape[1])
+        part = np.argpartition(-totals, kk - 1, axis=1)[:, :kk]
+        for row, candidates in enumerate(part):
+            ordered = sorted(candidates.tolist(), key=lambda col: (-totals[row, col], col))
+            results.append([(col, int(totals[row, col])) for col in ordered])
+    return results
+
+def synthetic_catalog(courses: int, seed: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Random courses and profiles with the shapes and vocabularies of the real tables"""
+    from skill_tagging import SKILL_LABELS
+
+    rng = np.random.default_rng(seed)
+    depts = ['ECE', 'MTE', 'SYDE', 'ME', 'CIVE', 'CHE', 'MSCI', 'BME', 'ENVE', 'GENE', 'NE', 'SE', 'CS', 'MATH']
+    labels = list(SKILL_LABELS)
+    terms = ['F', 'W', 'S']
+    rows = []
+    for i in range(courses):
+        dept = depts[rng.integers(len(depts))]
+        level = int(rng.choice([100, 200, 300, 400]))
+        rows.append({
+            'id': f"{dept}{level + i % 100}-{i}",  # unique, and still contains the course code
+            'dept': dept,
+            'level': level,
+            'skills': list(rng.choice(labels, size=int(rng.integers(1, 4)), replace=False)),
+            'prereqs': ', '.join(f"{depts[rng.integers(len(depts))]}{int(rng.integers(100, 400))}"
+                                 for _ in range(int(rng.integers(0, 3)))),
+            'terms_offered': sorted(rng.choice(terms, size=int(rng.integers(0, 3)), replace=False).tolist()),
+            'workload': {key: int(rng.integers(0, 4)) for key in WORKLOAD_KEYS} if rng.random() < 0.9 else None,
+        })
+    course_ids = [row['id'] for row in rows]
+
+    def profiles(count: int) -> List[Dict[str, Any]]:
+        return [{
+            'program': depts[rng.integers(len(depts))] if rng.random() < 0.9 else None,
+            'current_term': str(rng.choice(list(TERM_LEVELS))) if rng.random() < 0.9 else None,
+            'completed_courses': list(rng.choice(course_ids, size=int(rng.integers(0, 30)))),
+            'goal_tags': list(rng.choice(labels + ['career_robotics', 'grad_school', 'ai'], size=int(rng.integers(0, 4)))),
+            'constraints': {'max_workload': int(rng.integers(4, 12))} if rng.random() < 0.5 else {},
+        } for _ in range(count)]
+
+    return rows, profiles
+
+def benchmark(courses: int, profiles: int, check: int):
+    rows, make_profiles = synthetic_catalog(courses)
+    people = make_profiles(profiles)
+
+    started = time.perf_counter()
+    catalog = Catalog(rows)
+    built = time.perf_counter() - started
+    print(f"📊 {courses} courses x {profiles} profiles (catalog arrays built in {built:.2f}s)")
+
+    started = time.perf_counter()
+    top_courses(catalog, people, k=10)
+    elapsed = time.perf_counter() - started
+    print(f"   vectorized   {elapsed:.2f}s  {profiles * courses / elapsed:,.0f} profile x course scores/s")
+
+    sample = people[:max(1, min(check, profiles))]
+    started = time.perf_counter()
+    reference = [[score_course(course, profile)['components'] for course in rows] for profile in sample]
+    scalar = time.perf_counter() - started
+    rate = len(sample) * courses / scalar
+    print(f"   score_course {scalar:.2f}s  {rate:,.0f} profile x course scores/s (on {len(sample)} profiles)")
+    print(f"   ⚡ {profiles * courses / elapsed / rate:.0f}x faster")
+
+    breakdown = score_batch(catalog, ProfileBatch(catalog, sample))
+    mismatches = sum(
+        int(breakdown.components[name][p, c]) != reference[p][c][name]
+        for p in range(len(sample)) for c in range(courses) for name in COMPONENTS
+    )
+    status = "✅" if mismatches == 0 else "❌"
+    print(f"   {status} {mismatches} component mismatches against score_course over {len(sample) * courses} pairs")
+
+def score_user(conn, user_id: str, top: int):
+    from psycopg2.extras import RealDictCursor
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT id, title, dept, level, skills, prereqs, terms_offered, workload FROM courses ORDER BY id")
+        rows = cur.fetchall()
+        cur.execute("""
+            SELECT user_id, program, current_term, completed_courses, goal_tags, constraints
+            FROM profiles WHERE user_id::text = %s
+        """, (user_id,))
+        profile = cur.fetchone()
+    if not profile:
+        print(f"❌ No profile for user {user_id}")
+        sys.exit(1)
+
+    catalog = Catalog(rows)
+    started = time.perf_counter()
+    best = top_courses(catalog, [profile], k=top)[0]
+    print(f"🎯 Top {len(best)} of {len(catalog)} courses for {user_id} "
+          f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+    for row, total in best:
+        course = catalog.courses[row]
+        result = score_course(course, profile)
+        parts = ', '.join(f"{name} {result['components'][name]}" for name in COMPONENTS)
+        print(f"  {total:>3}  {course['id']}: {course.get('title')}  ({parts})")
+        print(f"       {'; '.join(result['explanation'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Score courses for profiles with NumPy")
+    parser.add_argument('command', choices=['score', 'benchmark'])
+    parser.add_argument('user_id', nargs='?')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--courses', type=int, default=5000, help="benchmark catalog size")
+    parser.add_argument('--profiles', type=int, default=2000, help="benchmark profile count")
+    parser.add_argument('--check', type=int, default=20, help="profiles checked against score_course")
+    args = parser.parse_args()
+
+    if args.command == 'benchmark':
+        benchmark(args.courses, args.profiles, args.check)
+        return
+
+    if not args.user_id:
+        parser.error("score needs a user id")
+
+    from dotenv import load_dotenv
+    import psycopg2
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    conn = psycopg2.connect(db_url)
+    try:
+        score_user(conn, args.user_id, args.top)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
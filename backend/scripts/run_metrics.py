@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Structured metrics for ingestion and embedding runs
+Each stage of a run (parse, transform, embed, upload, ...) is timed, in wall and thread
+CPU time, as a span that carries row, byte, retry and API token counts. Finished spans
+are appended to a JSON lines file under .cache/metrics/, latencies are kept as a
+histogram per stage, and a summary table is printed when the run ends. Spans nest: a
+span's self time excludes the spans opened inside it, so the self column of the
+summary adds up to the run.
+
+Library code calls span()/add() unconditionally; outside start_run() they do nothing.
+Set METRICS_PORT to also serve the running totals in Prometheus text format on
+http://127.0.0.1:<port>/metrics (useful for the long-running embedding worker).
+
+Usage:
+  python run_metrics.py summary <run.jsonl>   print the summary table of an earlier run
+  python run_metrics.py list                  list recorded runs
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_METRICS_DIR = Path(__file__).parent.parent / '.cache' / 'metrics'
+
+# Upper bounds in seconds of the latency histogram buckets (an implicit +Inf bucket follows)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+COUNTERS = ('rows', 'bytes', 'retries', 'tokens')
+
+class Span:
+    def __init__(self, stage: str, attrs: Dict[str, Any], parent: Optional['Span']):
+        self.stage = stage
+        self.attrs = attrs
+        self.parent = parent
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.child_seconds = 0.0
+        self.child_cpu_seconds = 0.0
+        self.started = time.time()
+        self.dropped = False
+
+    def add(self, **counts: int):
+        """Add to this span's rows/bytes/retries/tokens"""
+        for name, value in counts.items():
+            self.counts[name] += value
+
+    def discard(self):
+        """Leave this span out of the run (e.g. an idle poll that found no work)"""
+        self.dropped = True
+
+class _NoSpan:
+    """Stand-in returned by span() when no run is being recorded"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, **counts: int):
+        pass
+
+    def discard(self):
+        pass
+
+NO_SPAN = _NoSpan()
+
+class StageStats:
+    def __init__(self, window: int = 5000):
+        self.spans = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.self_seconds = 0.0
+        self.self_cpu_seconds = 0.0
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latencies = deque(maxlen=window)  # recent durations for percentiles
+
+    def record(self, seconds: float, self_seconds: float, self_cpu_seconds: float, counts: Dict[str, int],
+               error: bool):
+        self.spans += 1
+        self.errors += error
+        self.seconds += seconds
+        self.self_seconds += self_seconds
+        self.self_cpu_seconds += self_cpu_seconds
+        for name in COUNTERS:
+            self.counts[name] += counts.get(name, 0)
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latencies.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+def format_bytes(count: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if count < 1024 or unit == 'GB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+def format_summary(job: str, elapsed: float, stages: Dict[str, StageStats]) -> str:
+    """Table of spans, time, latency percentiles and counts per stage"""
+    lines = [f"📊 {job} finished in {elapsed:.2f}s",
+             f"  {'stage':<12} {'spans':>6} {'total s':>9} {'self s':>9} {'cpu s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+             f"{'rows':>8} {'bytes':>10} {'tokens':>9} {'retries':>7} {'errors':>6}"]
+    for stage, stats in sorted(stages.items(), key=lambda item: -item[1].self_seconds):
+        lines.append(f"  {stage:<12} {stats.spans:>6} {stats.seconds:>9.2f} {stats.self_seconds:>9.2f} "
+                     f"{stats.self_cpu_seconds:>9.2f} "
+                     f"{stats.percentile(50) * 1000:>9.1f} {stats.percentile(95) * 1000:>9.1f} "
+                     f"{stats.counts['rows']:>8} {format_bytes(stats.counts['bytes']):>10} "
+                     f"{stats.counts['tokens']:>9} {stats.counts['retries']:>7} {stats.errors:>6}")
+    return '\n'.join(lines)
+
+def label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class RunMetrics:
+    """Spans and per-stage totals for one run of a job"""
+
+    def __init__(self, job: str, directory: Optional[str] = None, port: Optional[int] = None,
+                 profile: bool = False):
+        self.job = job
+        self.run_id = datetime.now().strftime('%Y%m%d-%H%M%S')
+        directory = Path(directory or os.getenv('METRICS_DIR') or DEFAULT_METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f"{re.sub(r'[^A-Za-z0-9_.-]+', '-', job)}-{self.run_id}.jsonl"
+        # Line buffered so a running job can be followed with tail -f
+        self.file = open(self.path, 'a', encoding='utf-8', buffering=1)
+        self.stages: Dict[str, StageStats] = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started = time.perf_counter()
+        self.server = None
+        self.profiler = None
+
+        port = port or os.getenv('METRICS_PORT')
+        if port:
+            self.serve(int(port))
+
+        if profile:
+            # Only a profiled run pays for cProfile and tracemalloc
+            from profiling import RunProfiler
+            self.profiler = RunProfiler(job, self.run_id)
+            self.profiler.start()
+
+    def current(self) -> Optional[Span]:
+        stack = getattr(self.local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, stage: str, **attrs: Any) -> Iterator[Span]:
+        stack = self.local.__dict__.setdefault('stack', [])
+        span = Span(stage, attrs, stack[-1] if stack else None)
+        stack.append(span)
+        error = None
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield span
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            cpu_seconds = time.thread_time() - cpu_started
+            stack.pop()
+            if not span.dropped:
+                if span.parent:
+                    span.parent.child_seconds += seconds
+                    span.parent.child_cpu_seconds += cpu_seconds
+                self.finish(span, seconds, cpu_seconds, error)
+
+    def finish(self, span: Span, seconds: float, cpu_seconds: float, error: Optional[str]):
+        self_seconds = max(seconds - span.child_seconds, 0.0)
+        self_cpu_seconds = max(cpu_seconds - span.child_cpu_seconds, 0.0)
+        record = {
+            'job': self.job,
+            'run': self.run_id,
+            'stage': span.stage,
+            'parent': span.parent.stage if span.parent else None,
+            'start': round(span.started, 3),
+            'seconds': round(seconds, 6),
+            'self_seconds': round(self_seconds, 6),
+            'cpu_seconds': round(cpu_seconds, 6),
+            'self_cpu_seconds': round(self_cpu_seconds, 6),
+            **span.counts,
+            'error': error,
+        }
+        if span.attrs:
+            record['attrs'] = span.attrs
+        line = json.dumps(record, default=str)
+        with self.lock:
+            self.stages.setdefault(span.stage, StageStats()).record(seconds, self_seconds, self_cpu_seconds,
+                                                                     span.counts, bool(error))
+            self.file.write(line + '\n')
+        if self.profiler:
+            self.profiler.checkpoint()
+
+    def prometheus(self) -> str:
+        """Running totals in the Prometheus text exposition format"""
+        job = label_value(self.job)
+        lines = ['# HELP pipeline_stage_seconds Wall time of stage spans',
+                 '# TYPE pipeline_stage_seconds histogram']
+        with self.lock:
+            stages = dict(self.stages)
+            for stage, stats in stages.items():
+                labels = f'job="{job}",stage="{label_value(stage)}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (math.inf,), stats.buckets):
+                    cumulative += count
+                    le = '+Inf' if bound == math.inf else f"{bound:g}"
+                    lines.append(f'pipeline_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'pipeline_stage_seconds_sum{{{labels}}} {stats.seconds:.6f}')
+                lines.append(f'pipeline_stage_seconds_count{{{labels}}} {stats.spans}')
+            for name in COUNTERS + ('errors',):
+                lines.append(f'# HELP pipeline_stage_{name}_total {name.capitalize()} counted by stage spans')
+                lines.append(f'# TYPE pipeline_stage_{name}_total counter')
+                for stage, stats in stages.items():
+                    value = stats.errors if name == 'errors' else stats.counts[name]
+                    lines.append(f'pipeline_stage_{name}_total{{job="{job}",stage="{label_value(stage)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int):
+        """Serve GET /metrics from a daemon thread for the life of the run"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"📈 Serving metrics on http://127.0.0.1:{port}/metrics")
+
+    def close(self):
+        elapsed = time.perf_counter() - self.started
+        if self.profiler:
+            self.profiler.stop(self.job, elapsed, self.stages)
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        self.file.close()
+        print()
+        print(format_summary(self.job, elapsed, self.stages))
+        print(f"  spans written to {self.path}")
+        if self.profiler:
+            print(f"🔬 Profile written to {self.profiler.directory}")
+
+_active: Optional[RunMetrics] = None
+
+@contextmanager
+def start_run(job: str, profile: bool = False) -> Iterator[RunMetrics]:
+    """Record spans for the duration of the block and print the summary at the end
+
+    A run started inside another one (e.g. an ingester called from another script)
+    joins the outer run instead of starting its own. profile=True also writes a
+    cProfile/tracemalloc report (see profiling.py).
+    """
+    global _active
+    if _active is not None:
+        yield _active
+        return
+    run = RunMetrics(job, profile=profile)
+    _active = run
+    try:
+        yield run
+    finally:
+        _active = None
+        run.close()
+
+def pop_profile_flag() -> bool:
+    """Remove --profile from sys.argv, for scripts that read their arguments by position"""
+    if '--profile' not in sys.argv:
+        return False
+    sys.argv[:] = [arg for arg in sys.argv if arg != '--profile']
+    return True
+
+def span(stage: str, **attrs: Any):
+    """Time a stage of the current run; a no-op span when no run is recorded"""
+    if _active is None:
+        return NO_SPAN
+    return _active.span(stage, **attrs)
+
+def add(**counts: int):
+    """Add counts (e.g. API tokens) to the innermost open span, if any"""
+    if _active is not None:
+        current = _active.current()
+        if current:
+            current.add(**counts)
+
+def traced(items: Iterable[Any], stage: str, measure: Optional[Callable[[Any], Dict[str, int]]] = None,
+           **attrs: Any) -> Iterator[Any]:
+    """Yield from items, timing the production of each one as a span of stage
+
+    measure(item) returns the counts to record for the item, e.g. {'rows': 1, 'bytes': n}
+    """
+    if _active is None:
+        yield from items
+        return
+    items = iter(items)
+    while True:
+        with span(stage, **attrs) as current:
+            try:
+                item = next(items)
+            except StopIteration:
+                current.discard()
+                return
+            if measure:
+                current.add(**measure(item))
+        yield item
+
+def load_json(path: str) -> Any:
+    """json.load a source file under a parse span that records its size"""
+    with span('parse', file=Path(path).name) as current:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        current.add(bytes=os.path.getsize(path))
+    return data
+
+def payload_bytes(rows: Any) -> int:
+    """Approximate request size of rows sent as JSON"""
+    return len(json.dumps(rows, default=str).encode('utf-8'))
+
+def read_stages(path: str) -> Dict[str, Any]:
+    """Rebuild the per-stage totals of a recorded run from its JSON lines"""
+    stages: Dict[str, StageStats] = {}
+    job, first, last = Path(path).stem, None, None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            job = record['job']
+            first = record['start'] if first is None else min(first, record['start'])
+            last = max(last or 0.0, record['start'] + record['seconds'])
+            stages.setdefault(record['stage'], StageStats()).record(
+                record['seconds'], record['self_seconds'], record.get('self_cpu_seconds', 0.0), record,
+                bool(record['error']))
+    return {'job': job, 'elapsed': (last - first) if first is not None else 0.0, 'stages': stages}
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect recorded ingestion/embedding runs")
+    parser.add_argument('command', choices=['summary', 'list'])
+    parser.add_argument('path', nargs='?', help="run file for summary (default: the latest run)")
+    parser.add_argument('--dir', default=os.getenv('METRICS_DIR') or str(DEFAULT_METRICS_DIR))
+    args = parser.parse_args()
+
+    runs: List[Path] = sorted(Path(args.dir).glob('*.jsonl'), key=lambda path: path.stat().st_mtime)
+    if args.command == 'list':
+        if not runs:
+            print(f"No runs recorded in {args.dir}")
+        for path in runs:
+            print(f"  {path.name:<60} {format_bytes(path.stat().st_size):>10}")
+        return
+
+    path = args.path or (str(runs[-1]) if runs else None)
+    if not path:
+        print(f"❌ No runs recorded in {args.dir}")
+        sys.exit(1)
+    run = read_stages(path)
+    print(format_summary(run['job'], run['elapsed'], run['stages']))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Incremental schema migrations
+Applies the SQL files in data-to-ingest in the order of MIGRATIONS and records each
+file's SHA-256 in schema_migrations, so a redeploy only runs files that are new or
+were edited since they were applied. An edited file runs again from the top, so the
+add-*.sql migrations are written to be re-runnable (IF NOT EXISTS, CREATE OR REPLACE,
+DROP ... IF EXISTS) and are edited in place. complete-database-schema.sql is the
+exception: later files replace some of its functions, and running it again would
+bring the old versions back. Change the base schema with a new migration instead.
+
+Files are split into statements with a lexer that knows quoted strings, comments
+and $tag$ function bodies. A file's statements run in one transaction, except index
+builds: CREATE INDEX on a table the file does not create itself becomes CREATE
+INDEX CONCURRENTLY and runs after the commit, outside any transaction, so building
+it does not block writes. An invalid index left by an interrupted concurrent build
+is dropped and rebuilt.
+
+Commands:
+  status                                   applied, changed and pending migrations
+  apply [--dry-run] [--only f] [--through f]  run pending and changed migrations
+  baseline [--only f] [--through f]        record migrations as applied without running them
+                                           (the part of a database set up by hand before this runner)
+  split [file]                   print a file's statements and how each would run
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+MIGRATIONS_DIR = project_root / 'data-to-ingest'
+
+# Dependency order: each file only needs objects from the files above it
+MIGRATIONS = [
+    'complete-database-schema.sql',
+    'add-vector-search.sql',
+    'add-embedding-dirty-tracking.sql',
+    'add-embedding-shards.sql',
+    'add-embedding-versions.sql',
+    'add-quantized-embeddings.sql',
+    'add-short-embeddings.sql',
+    'add-elective-doc-dedup.sql',
+    'add-elective-doc-metadata.sql',
+    'add-answer-cache.sql',
+    'add-course-neighbors.sql',
+    'add-skill-topics.sql',
+    'add-cohort-recommendations.sql',
+    'add-diverse-retrieval.sql',
+    'add-chat-context.sql',
+    'add-course-facets.sql',
+    'add-table-checksums.sql',
+]
+
+# Waiting longer than this for a table lock fails the migration instead of queueing
+# every query on that table behind it
+DEFAULT_LOCK_TIMEOUT = '10s'
+
+LEDGER_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+      filename TEXT PRIMARY KEY,
+      checksum TEXT NOT NULL,
+      statements INT NOT NULL,
+      duration_ms INT NOT NULL,
+      applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    )
+"""
+
+# Session-level advisory lock key, so two deploys cannot apply migrations at once
+LOCK_KEY = 'schema_migrations'
+
+DOLLAR_TAG = re.compile(r'\$([A-Za-z_\200-\377][A-Za-z0-9_\200-\377]*)?\$')
+NAME = r'((?:"[^"]+"|[\w$]+)(?:\.(?:"[^"]+"|[\w$]+))?)'
+CREATE_TABLE = re.compile(r'CREATE\s+(?:(?:GLOBAL\s+|LOCAL\s+)?(?:TEMP|TEMPORARY)\s+|UNLOGGED\s+)?TABLE\s+'
+                          r'(?:IF\s+NOT\s+EXISTS\s+)?' + NAME, re.I)
+CREATE_INDEX = re.compile(r'CREATE\s+(UNIQUE\s+)?INDEX\s+(CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?'
+                          r'(?:' + NAME + r'\s+)?ON\s+(?:ONLY\s+)?' + NAME, re.I)
+NON_TRANSACTIONAL = re.compile(r'(?:DROP\s+INDEX|REINDEX\s+(?:\([^)]*\)\s*)?\w+|REFRESH\s+MATERIALIZED\s+VIEW)'
+                               r'\s+CONCURRENTLY\b|VACUUM\b|CREATE\s+DATABASE\b|ALTER\s+SYSTEM\b', re.I)
+
+def split_statements(sql: str) -> List[str]:
+    """SQL text as a list of statements, without the separating semicolons.
+    Semicolons inside quotes, comments and dollar-quoted bodies do not split;
+    comments before a statement are dropped and comment-only text gives nothing."""
+    statements = []
+    start = None  # first code character of the current statement
+    i, n = 0, len(sql)
+    while i < n:
+        c = sql[i]
+        if c == '-' and sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end < 0 else end + 1
+            continue
+        if c == '/' and sql.startswith('/*', i):
+            depth, i = 1, i + 2  # block comments nest in PostgreSQL
+            while i < n and depth:
+                if sql.startswith('/*', i):
+                    depth, i = depth + 1, i + 2
+                elif sql.startswith('*/', i):
+                    depth, i = depth - 1, i + 2
+                else:
+                    i += 1
+            continue
+        if c.isspace():
+            i += 1
+            continue
+        if start is None:
+            start = i
+        if c == ';':
+            statements.append(sql[start:i].strip())
+            start = None
+            i += 1
+        elif c == "'":
+            # E'...' strings take backslash escapes; '' is a quote in every string
+            escapes = i > 0 and sql[i - 1] in 'eE' and (i < 2 or not (sql[i - 2].isalnum() or sql[i - 2] == '_'))
+            i += 1
+            while i < n:
+                if escapes and sql[i] == '\\':
+                    i += 2
+                elif sql[i] == "'":
+                    if not sql.startswith("''", i):
+                        break
+                    i += 2
+                else:
+                    i += 1
+            i += 1
+        elif c == '"':
+            end = i + 1
+            while True:
+                end = sql.find('"', end)
+                if end < 0 or not sql.startswith('""', end):
+                    break
+                end += 2
+            i = n if end < 0 else end + 1
+        elif c == '$' and not (i > 0 and (sql[i - 1].isalnum() or sql[i - 1] in '_$')):
+            tag = DOLLAR_TAG.match(sql, i)
+            if tag:
+                end = sql.find(tag.group(0), tag.end())
+                i = n if end < 0 else end + len(tag.group(0))
+            else:
+                i += 1  # $1 parameter
+        else:
+            i += 1
+    if start is not None and sql[start:].strip():
+        statements.append(sql[start:].strip())
+    return statements
+
+def unquoted(name: str) -> str:
+    """Unqualified, case-folded relation name"""
+    last = name.split('.')[-1]
+    return last[1:-1] if last.startswith('"') else last.lower()
+
+def plan_statements(statements: List[str]) -> Tuple[List[str], List[str]]:
+    """(statements for the transaction, statements to run after it in autocommit)"""
+    created = {unquoted(match.group(1)) for match in map(CREATE_TABLE.match, statements) if match}
+    transactional, concurrent = [], []
+    for statement in statements:
+        index = CREATE_INDEX.match(statement)
+        if index and not index.group(2) and unquoted(index.group(4)) not in created:
+            concurrent.append(re.sub(r'\bINDEX\s+', 'INDEX CONCURRENTLY ', statement, count=1, flags=re.I))
+        elif (index and index.group(2)) or NON_TRANSACTIONAL.match(statement):
+            concurrent.append(statement)
+        else:
+            transactional.append(statement)
+    return transactional, concurrent
+
+def read_migration(filename: str) -> Tuple[str, str]:
+    """(SQL text, checksum); line endings are normalized so a Windows checkout hashes the same"""
+    sql = (MIGRATIONS_DIR / filename).read_text(encoding='utf-8').replace('\r\n', '\n')
+    return sql, hashlib.sha256(sql.encode('utf-8')).hexdigest()
+
+def select_migrations(only: Optional[List[str]] = None, through: Optional[str] = None) -> List[str]:
+    """MIGRATIONS narrowed to the files in only and those up to and including through"""
+    selected = MIGRATIONS[:MIGRATIONS.index(through) + 1] if through else MIGRATIONS
+    return [filename for filename in selected if not only or filename in only]
+
+class MigrationRunner:
+    def __init__(self, conn, lock_timeout: str = DEFAULT_LOCK_TIMEOUT):
+        self.conn = conn
+        self.lock_timeout = lock_timeout
+
+    def applied(self) -> Dict[str, str]:
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute(LEDGER_SQL)
+                cur.execute("SELECT filename, checksum FROM schema_migrations")
+                return dict(cur.fetchall())
+
+    def pending(self, only: Optional[List[str]] = None,
+                through: Optional[str] = None) -> List[Tuple[str, str, str, str]]:
+        """(filename, sql, checksum, 'new' | 'changed') for files to run, in order"""
+        applied = self.applied()
+        work = []
+        for filename in select_migrations(only, through):
+            sql, checksum = read_migration(filename)
+            if filename not in applied:
+                work.append((filename, sql, checksum, 'new'))
+            elif applied[filename] != checksum:
+                work.append((filename, sql, checksum, 'changed'))
+        return work
+
+    def status(self):
+        applied = self.applied()
+        for filename in MIGRATIONS:
+            _, checksum = read_migration(filename)
+            if filename not in applied:
+                print(f"  ⏳ {filename} pending")
+            elif applied[filename] != checksum:
+                print(f"  ✏️ {filename} changed since applied")
+            else:
+                print(f"  ✅ {filename}")
+        unknown = sorted(set(applied) - set(MIGRATIONS))
+        for filename in unknown:
+            print(f"  ❔ {filename} in the ledger but not in MIGRATIONS")
+
+    def apply(self, dry_run: bool = False, only: Optional[List[str]] = None,
+              through: Optional[str] = None) -> int:
+        started = time.perf_counter()
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(hashtext(%s))", (LOCK_KEY,))
+        self.conn.commit()
+        try:
+            work = self.pending(only, through)
+            if not work:
+                print(f"✅ Schema up to date ({len(MIGRATIONS)} migrations, {time.perf_counter() - started:.2f}s)")
+                return 0
+            for filename, sql, checksum, reason in work:
+                transactional, concurrent = plan_statements(split_statements(sql))
+                print(f"🔧 {filename} ({reason}): {len(transactional)} statements"
+                      f"{f' + {len(concurrent)} concurrent' if concurrent else ''}")
+                if dry_run:
+                    for statement in concurrent:
+                        print(f"     ⤷ {first_line(statement)}")
+                    continue
+                self.apply_file(filename, checksum, transactional, concurrent)
+        finally:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (LOCK_KEY,))
+            self.conn.commit()
+        print(f"{'🔍 Dry run: nothing applied' if dry_run else '🎉 Applied'} {len(work)} migrations "
+              f"in {time.perf_counter() - started:.2f}s")
+        return len(work)
+
+    def apply_file(self, filename: str, checksum: str, transactional: List[str], concurrent: List[str]):
+        started = time.perf_counter()
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("SET LOCAL lock_timeout = %s", (self.lock_timeout,))
+                for statement in transactional:
+                    try:
+                        cur.execute(statement)
+                    except Exception:
+                        print(f"  ❌ {filename} failed at: {first_line(statement)}")
+                        raise
+
+        if concurrent:
+            self.conn.autocommit = True
+            try:
+                with self.conn.cursor() as cur:
+                    for statement in concurrent:
+                        self.drop_invalid_index(cur, statement)
+                        print(f"  ⤷ {first_line(statement)}")
+                        try:
+                            cur.execute(statement)
+                        except Exception:
+                            print(f"  ❌ {filename} failed at: {first_line(statement)}")
+                            raise
+            finally:
+                self.conn.autocommit = False
+
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        self.record(filename, checksum, len(transactional) + len(concurrent), duration_ms)
+        print(f"  ✅ {filename} in {duration_ms} ms")
+
+    def drop_invalid_index(self, cur, statement: str):
+        """A failed CREATE INDEX CONCURRENTLY leaves an invalid index that IF NOT EXISTS would keep"""
+        index = CREATE_INDEX.match(statement)
+        if not index or not index.group(3):
+            return
+        cur.execute("""
+            SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)
+        """, (index.group(3),))
+        row = cur.fetchone()
+        if row and row[0]:
+            print(f"  🧹 dropping invalid index {index.group(3)} from an interrupted build")
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index.group(3)}")
+
+    def record(self, filename: str, checksum: str, statements: int, duration_ms: int):
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO schema_migrations (filename, checksum, statements, duration_ms)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (filename) DO UPDATE
+                    SET checksum = EXCLUDED.checksum, statements = EXCLUDED.statements,
+                        duration_ms = EXCLUDED.duration_ms, applied_at = NOW()
+                """, (filename, checksum, statements, duration_ms))
+
+    def baseline(self, only: Optional[List[str]] = None, through: Optional[str] = None):
+        """Record migrations as applied without running them
+
+        Only mark what the database really has: a file recorded here is never run
+        by apply until it is edited
+        """
+        self.applied()  # creates the ledger
+        filenames = select_migrations(only, through)
+        for filename in filenames:
+            sql, checksum = read_migration(filename)
+            self.record(filename, checksum, len(split_statements(sql)), 0)
+            print(f"  📌 {filename}")
+        print(f"✅ Recorded {len(filenames)} migrations as applied")
+
+def first_line(statement: str, width: int = 90) -> str:
+    line = ' '.join(statement.split())
+    return line if len(line) <= width else line[:width - 3] + '...'
+
+def show_split(filenames: List[str]):
+    total = 0
+    for filename in filenames:
+        sql, checksum = read_migration(filename)
+        started = time.perf_counter()
+        statements = split_statements(sql)
+        transactional, concurrent = plan_statements(statements)
+        ms = (time.perf_counter() - started) * 1000
+        total += len(statements)
+        print(f"📄 {filename}: {len(transactional)} in transaction, {len(concurrent)} concurrent "
+              f"({ms:.1f} ms, sha256 {checksum[:12]})")
+        if len(filenames) == 1:
+            for statement in transactional:
+                print(f"   tx  {first_line(statement)}")
+            for statement in concurrent:
+                print(f"   ⤷   {first_line(statement)}")
+    if len(filenames) > 1:
+        print(f"📊 {total} statements in {len(filenames)} files")
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply new and changed schema migrations")
+    parser.add_argument('command', choices=['status', 'apply', 'baseline', 'split'])
+    parser.add_argument('file', nargs='?', help="migration file for split")
+    parser.add_argument('--dry-run', action='store_true', help="list what apply would run")
+    parser.add_argument('--only', help="comma-separated migration files to consider")
+    parser.add_argument('--through', help="consider migrations up to and including this file")
+    parser.add_argument('--lock-timeout', default=DEFAULT_LOCK_TIMEOUT)
+    args = parser.parse_args()
+
+    if args.command == 'split':
+        show_split([args.file] if args.file else MIGRATIONS)
+        return
+
+    only = [name.strip() for name in args.only.split(',')] if args.only else None
+    unknown = [name for name in (only or []) + ([args.through] if args.through else []) if name not in MIGRATIONS]
+    if unknown:
+        parser.error(f"not in MIGRATIONS: {', '.join(unknown)}")
+    if args.command == 'baseline' and not (only or args.through):
+        parser.error("baseline needs --only or --through: record only what the database already has")
+
+    from dotenv import load_dotenv
+    import psycopg2
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    conn = psycopg2.connect(db_url)
+    try:
+        runner = MigrationRunner(conn, args.lock_timeout)
+        if args.command == 'status':
+            runner.status()
+        elif args.command == 'apply':
+            runner.apply(args.dry_run, only, args.through)
+        else:
+            runner.baseline(only, args.through)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -54,73 +54,122 @@ def get_course_level(course_id: str) -> int:
             return 400
     return 200
 
-def get_skills_from_title(title: str) -> List[str]:
-    """Extract skills/topics from course title"""
-    skills = []
-    title_lower = title.lower()
-    
-    skill_keywords = {
-        'robotics': ['robot', 'robotics', 'manipulator'],
-        'control': ['control', 'feedback', 'regulation'],
-        'machine learning': ['machine learning', 'ml', 'ai', 'artificial intelligence'],
-        'software': ['software', 'programming', 'coding', 'development'],
-        'hardware': ['hardware', 'circuit', 'electronics', 'digital'],
-        'mechanics': ['mechanics', 'dynamics', 'statics', 'materials'],
-        'mathematics': ['math', 'calculus', 'statistics', 'probability'],
-        'design': ['design', 'engineering design', 'project'],
-        'systems': ['systems', 'system design', 'integration'],
-        'data': ['data', 'database', 'analytics', 'visualization'],
-        'communication': ['communication', 'writing', 'presentation'],
-        'environmental': ['environmental', 'sustainability', 'energy'],
-        'biomedical': ['biomedical', 'bio', 'medical', 'health']
-    }
-    
-    for skill, keywords in skill_keywords.items():
-        if any(keyword in title_lower for keyword in keywords):
-            skills.append(skill)
-    
-    return skills if skills else ['general engineering']
+STUDY_TERMS = ['1A', '1B', '2A', '2B', '3A', '3B', '4A', '4B']
 
-def process_programs(json_data: Dict[str, Any]) -> tuple:
-    """Process all programs and extract course information"""
-    courses = {}  # Use dict instead of set to track by course ID
+def is_course_entry(course_string: str) -> bool:
+    """Check whether a term list entry is a real course (not a work report or placeholder)"""
+    return bool(course_string) and not course_string.startswith('WKRPT') and not course_string.startswith('COMMST') and course_string != 'Approved Elective'
+
+def get_program_id(program_name: str) -> str:
+    """Build the options table id for a program, e.g. 'Civil Engineering' -> 'civil-eng'"""
+    return program_name.lower().replace(' ', '-').replace('engineering', 'eng')
+
+def sort_study_terms(terms) -> List[str]:
+    """Order study terms 1A..4B, keeping any unknown labels at the end"""
+    order = {term: i for i, term in enumerate(STUDY_TERMS)}
+    return sorted(terms, key=lambda term: (order.get(term, len(order)), term))
+
+def index_programs(json_data: Dict[str, Any], parse=parse_course_code) -> Dict[str, Any]:
+    """Walk every program and study term once, indexing courses by ID
+
+    Each course is parsed the first time it is seen; later sightings only add
+    the program and study term to its sets, so the walk is linear in the
+    number of term list entries.
+    """
+    courses = {}  # course_id -> {'info', 'first_program', 'programs': {program_id: terms}, 'study_terms'}
     programs = []
+    term_index = {}  # study term -> set of course IDs
+    program_index = {}  # program ID -> {study term: [course IDs]}
     
     for program_name, program_data in json_data.get('programs', {}).items():
-        print(f"Processing program: {program_name}")
-        
-        # Create program entry
-        program_info = {
-            'id': program_name.lower().replace(' ', '-').replace('engineering', 'eng'),
+        program_id = get_program_id(program_name)
+        programs.append({
+            'id': program_id,
             'name': program_name,
             'degree': program_data.get('degree', 'BASc'),
             'calendar_year': program_data.get('calendar_year', '2023-2024'),
             'description': f"{program_name} program requirements"
-        }
-        programs.append(program_info)
+        })
+        program_terms = program_index.setdefault(program_id, {})
         
-        # Process all terms and collect courses
         for term, courses_list in program_data.get('terms', {}).items():
+            term_courses = program_terms.setdefault(term, [])
+            term_seen = term_index.setdefault(term, set())
+            
             for course_string in courses_list:
-                if course_string and not course_string.startswith('WKRPT') and not course_string.startswith('COMMST') and course_string != 'Approved Elective':
-                    course_info = parse_course_code(course_string)
-                    course_id = course_info['id']
-                    
-                    if course_id not in courses:
-                        course_info.update({
-                            'level': get_course_level(course_id),
-                            'terms_offered': '["F", "W"]',  # JSON string
-                            'skills': json.dumps(get_skills_from_title(course_info['title'])),  # Convert to JSON string
-                            'units': 0.5,
-                            'description': f"Course from {program_name} program",
-                            'prereqs': '',
-                            'workload': '{"reading": 2, "assignments": 3, "projects": 1, "labs": 1}',
-                            'assessments': '{"midterm": 30, "final": 40, "assignments": 30}',
-                            'source_url': f"https://uwaterloo.ca/engineering/undergraduate-studies/{program_name.lower().replace(' ', '-')}"
-                        })
-                        courses[course_id] = course_info
-    
-    return list(courses.values()), programs
+                if not is_course_entry(course_string):
+                    continue
+                
+                course_info = parse(course_string)
+                if not course_info:
+                    continue
+                course_id = course_info['id']
+                
+                entry = courses.get(course_id)
+                if entry is None:
+                    entry = {
+                        'info': course_info,
+                        'first_program': program_name,
+                        'programs': {},
+                        'study_terms': set()
+                    }
+                    courses[course_id] = entry
+                
+                entry['programs'].setdefault(program_id, set()).add(term)
+                entry['study_terms'].add(term)
+                term_seen.add(course_id)
+                term_courses.append(course_id)
+    
+    return {
+        'courses': courses,
+        'programs': programs,
+        'term_index': {term: sorted(ids) for term, ids in term_index.items()},
+        'program_index': program_index
+    }
+
+def process_programs(json_data: Dict[str, Any]) -> tuple:
+    """Process all programs and extract course information"""
+    index = index_programs(json_data)
+    courses = []
+    
+    for program in index['programs']:
+        print(f"Processing program: {program['name']}")
+    
+    for course_id, entry in index['courses'].items():
+        course_info = dict(entry['info'])
+        program_name = entry['first_program']
+        course_info.update({
+            'level': get_course_level(course_id),
+            'terms_offered': json.dumps(sort_study_terms(entry['study_terms'])),  # JSON string
+            'units': 0.5,
+            'description': f"Course from {program_name} program",
+            'prereqs': '',
+            'workload': '{"reading": 2, "assignments": 3, "projects": 1, "labs": 1}',
+            'assessments': '{"midterm": 30, "final": 40, "assignments": 30}',
+            'source_url': f"https://uwaterloo.ca/engineering/undergraduate-studies/{program_name.lower().replace(' ', '-')}"
+        })
+        courses.append(course_info)
+    
+    return courses, index['programs'], index
+
+def save_course_index_json(index: Dict[str, Any], filename: str = 'processed_course_index.json'):
+    """Save the study term and program indexes built by index_programs"""
+    output = {
+        'term_index': index['term_index'],
+        'program_index': index['program_index'],
+        'courses': {
+            course_id: {
+                'programs': sorted(entry['programs']),
+                'study_terms': sort_study_terms(entry['study_terms'])
+            }
+            for course_id, entry in index['courses'].items()
+        }
+    }
+    
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2)
+    
+    print(f"✅ Saved term/program index for {len(output['courses'])} courses to {filename}")
 
 def save_courses_csv(courses_data: List[Dict[str, Any]], filename: str = 'processed_courses.csv'):
     """Save courses data to CSV file"""
@@ -130,15 +179,16 @@ def save_courses_csv(courses_data: List[Dict[str, Any]], filename: str = 'proces
     
     # courses_data is already a list of dicts
     
+    # No skills column: skills are tagged from the embeddings by skill_tagging.py
     fieldnames = ['id', 'title', 'dept', 'number', 'units', 'level', 'description', 'terms_offered', 
-                  'prereqs', 'skills', 'workload', 'assessments', 'source_url']
+                  'prereqs', 'workload', 'assessments', 'source_url']
     
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
         
         for course in courses_data:
-            # Skills are already JSON strings, just write the row
+            # JSON columns are already strings, just write the row
             writer.writerow(course)
     
     print(f"✅ Saved {len(courses_data)} courses to {filename}")
@@ -185,18 +235,20 @@ def main():
         json_data = json.load(f)
     
     print("🔄 Processing programs and courses...")
-    courses_data, programs_data = process_programs(json_data)
+    courses_data, programs_data, course_index = process_programs(json_data)
     
     print(f"📊 Found {len(courses_data)} unique courses across {len(programs_data)} programs")
     
     # Save to CSV files
     save_courses_csv(courses_data, 'processed_courses.csv')
     save_programs_csv(programs_data, 'processed_programs.csv')
+    save_course_index_json(course_index, 'processed_course_index.json')
     
     print("\n🎉 Data processing complete!")
     print("📁 Generated files:")
     print("   - processed_courses.csv (for courses table)")
     print("   - processed_programs.csv (for options table)")
+    print("   - processed_course_index.json (study term and program indexes)")
     print("\n💡 Next steps:")
     print("   1. Set up your Supabase database")
     print("   2. Use the admin interface to upload these CSV files")
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Skill tags and topic clusters from course embeddings
+Replaces the keyword get_skills_from_title guesses the ingesters used to make.
+Each skill label has a short prototype description, embedded with the active
+embedding model. A course is tagged with the labels whose prototypes are nearest
+its own embedding. Mini-batch spherical k-means groups the catalog into topics.
+Results go to courses.skills, courses.topic_id and course_topics
+(see data-to-ingest/add-skill-topics.sql).
+
+Only rows whose tags or topic changed are written, so a rerun after a handful
+of courses were re-embedded touches only those.
+
+Commands:
+  tag [--topics 24] [--max-skills 3] [--margin 0.03] [--dry-run]
+  show                               print the stored topics
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import numpy as np
+
+from catalog_facets import refresh
+from course_neighbors import load_course_embeddings, parse_vector
+from quantized_index import normalize
+
+# Label -> prototype text. Labels are what ends up in courses.skills, so keep them
+# short and lowercase like the filters that query them.
+SKILL_LABELS = {
+    'robotics': "robotics, robot kinematics and dynamics, manipulators, mobile robots and autonomous systems",
+    'control': "control systems, feedback control, system dynamics, PID and state-space controller design",
+    'machine learning': "machine learning, artificial intelligence, neural networks, pattern recognition and data-driven models",
+    'software': "software engineering, programming, algorithms, data structures and software design",
+    'embedded': "embedded systems, microcontrollers, microprocessors, real-time and interfacing hardware",
+    'hardware': "digital logic, computer architecture, circuits and hardware design",
+    'electronics': "analog and digital electronics, transistors, amplifiers and electronic circuits",
+    'signal processing': "signals and systems, digital signal processing, filters, Fourier analysis and image processing",
+    'communications': "communication systems, wireless, networking protocols and information theory",
+    'power': "power systems, electrical machines, power electronics and energy conversion",
+    'data': "databases, data management, data analytics and visualization",
+    'security': "computer security, cryptography and secure systems",
+    'mathematics': "calculus, linear algebra, differential equations, numerical methods and discrete mathematics",
+    'statistics': "probability, statistics, stochastic processes and experimental data analysis",
+    'physics': "physics, electricity and magnetism, waves, optics and quantum mechanics",
+    'chemistry': "chemistry, chemical reactions, chemical processes and reaction engineering",
+    'mechanics': "engineering mechanics, statics, dynamics and mechanics of deformable solids",
+    'materials': "materials science, material properties, polymers, metals and composites",
+    'thermodynamics': "thermodynamics, heat transfer and thermal systems",
+    'fluid mechanics': "fluid mechanics, hydraulics, aerodynamics and flow",
+    'structures': "structural analysis and design, concrete and steel structures, geotechnical engineering",
+    'manufacturing': "manufacturing processes, production systems, quality control and operations",
+    'design': "engineering design projects, design studio, prototyping and capstone design",
+    'biomedical': "biomedical engineering, physiology, biomechanics and medical devices",
+    'environmental': "environmental engineering, sustainability, water resources, pollution and renewable energy",
+    'management': "engineering economics, project management, entrepreneurship and business",
+    'human factors': "human factors, ergonomics, user interfaces and human-computer interaction",
+    'communication': "technical communication, writing and presentation skills",
+    'ethics and society': "engineering ethics, professional practice, society, policy and social impact of technology",
+}
+
+DEFAULT_TOPICS = 24
+DEFAULT_MAX_SKILLS = 3
+# Labels within this cosine similarity of the best one are kept as well
+DEFAULT_MARGIN = 0.03
+
+def assign_skills(vectors: np.ndarray, prototypes: np.ndarray, labels: List[str],
+                  max_skills: int = DEFAULT_MAX_SKILLS, margin: float = DEFAULT_MARGIN) -> List[List[str]]:
+    """Nearest label prototypes per course, best first; every course gets at least one"""
+    scores = vectors @ prototypes.T
+    order = np.argsort(-scores, axis=1)[:, :max_skills]
+    best = scores[np.arange(len(scores)), order[:, 0]]
+    return [
+        [labels[j] for j in row_order if row_scores[j] >= row_best - margin]
+        for row_order, row_scores, row_best in zip(order, scores, best)
+    ]
+
+def kmeans_plus_plus(vectors: np.ndarray, k: int, rng: np.random.Generator, sample: int = 10000) -> np.ndarray:
+    """k-means++ seeding on cosine distance, from a sample of at most `sample` rows"""
+    if len(vectors) > sample:
+        vectors = vectors[rng.choice(len(vectors), size=sample, replace=False)]
+    centers = [vectors[rng.integers(len(vectors))]]
+    distance = 1 - vectors @ centers[0]
+    for _ in range(1, k):
+        weights = np.maximum(distance, 0) ** 2
+        total = weights.sum()
+        index = rng.choice(len(vectors), p=weights / total) if total > 0 else rng.integers(len(vectors))
+        centers.append(vectors[index])
+        distance = np.minimum(distance, 1 - vectors @ vectors[index])
+    return np.stack(centers)
+
+def nearest_centers(vectors: np.ndarray, centers: np.ndarray, block_rows: int = 4096) -> np.ndarray:
+    return np.concatenate([
+        np.argmax(vectors[start:start + block_rows] @ centers.T, axis=1)
+        for start in range(0, len(vectors), block_rows)
+    ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+def minibatch_kmeans(vectors: np.ndarray, k: int, init: Optional[np.ndarray] = None,
+                     batch_size: int = 1024, max_iterations: int = 200, tolerance: float = 1e-4,
+                     seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical mini-batch k-means on unit vectors; returns (centers, label per row)
+
+    Each step assigns a random batch to its nearest centers and moves every center
+    towards its batch members with a per-center learning rate of 1 / points seen,
+    then projects it back onto the unit sphere.
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    centers = (normalize(init.astype(np.float32)) if init is not None and len(init) == k
+               else kmeans_plus_plus(vectors, k, rng)).copy()
+    counts = np.zeros(k, dtype=np.float64)
+
+    for _ in range(max_iterations):
+        batch = vectors[rng.choice(len(vectors), size=min(batch_size, len(vectors)), replace=False)]
+        assigned = np.argmax(batch @ centers.T, axis=1)
+        sizes = np.bincount(assigned, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, assigned, batch)
+
+        moved = sizes > 0
+        counts[moved] += sizes[moved]
+        rate = (sizes[moved] / counts[moved])[:, None].astype(np.float32)
+        previous = centers.copy()
+        centers[moved] = normalize((1 - rate) * centers[moved] + rate * sums[moved] / sizes[moved, None])
+        if np.max(1 - np.sum(previous * centers, axis=1)) < tolerance:
+            break
+
+    return centers, nearest_centers(vectors, centers)
+
+class SkillTagger:
+    def __init__(self, conn, topics: int = DEFAULT_TOPICS, max_skills: int = DEFAULT_MAX_SKILLS,
+                 margin: float = DEFAULT_MARGIN):
+        self.conn = conn
+        self.topics = topics
+        self.max_skills = max_skills
+        self.margin = margin
+
+    def prototypes(self, version: Dict) -> np.ndarray:
+        """Label prototype embeddings in the same model and dimensions as the course column"""
+        from course_embeddings import embed_texts, embedding_client
+
+        dimensions = version['dimensions'] if version['model'].startswith('text-embedding-3') else None
+        vectors = embed_texts(embedding_client(), list(SKILL_LABELS.values()), version['model'], dimensions)
+        return normalize(np.asarray(vectors, dtype=np.float32))
+
+    def previous_centroids(self, column: str) -> Optional[np.ndarray]:
+        """Last run's centroids for this column, so topic ids carry over between runs"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT centroid::text FROM course_topics
+                WHERE embedding_column = %s AND centroid IS NOT NULL
+                ORDER BY topic_id
+            """, (column,))
+            rows = cur.fetchall()
+        return np.stack([parse_vector(row[0]) for row in rows]) if rows else None
+
+    def tag(self, dry_run: bool = False):
+        from embedding_migration import active_version
+
+        started = time.perf_counter()
+        version = active_version(self.conn)
+        column = version['column_name']
+        ids, _, vectors = load_course_embeddings(self.conn, column)
+        if not ids:
+            print("⚠️ No course embeddings found; run the embedding worker first")
+            return
+        print(f"📚 Loaded {len(ids)} course embeddings from {column} ({version['model']})")
+
+        labels = list(SKILL_LABELS)
+        prototypes = self.prototypes(version)
+        skills = assign_skills(vectors, prototypes, labels, self.max_skills, self.margin)
+        tagged = time.perf_counter()
+
+        previous = self.previous_centroids(column)
+        warm = previous is not None and len(previous) == min(self.topics, len(ids))
+        centers, topic_of = minibatch_kmeans(vectors, self.topics, init=previous if warm else None)
+        clustered = time.perf_counter()
+
+        topics = self.describe_topics(centers, topic_of, skills, prototypes, labels)
+        print(f"   skills {tagged - started:.2f}s, {len(centers)} topics {clustered - tagged:.2f}s"
+              f"{' (warm start)' if warm else ''}")
+        for topic in topics:
+            print(f"   topic {topic['topic_id']:>2} {topic['label']:<20} {topic['size']:>5} courses  "
+                  f"{', '.join(topic['top_skills'])}")
+
+        if dry_run:
+            print("🔍 Dry run: nothing written")
+            return
+        changed = self.store(ids, skills, topic_of, topics, column)
+        print(f"✅ Updated skills/topic for {changed} of {len(ids)} courses")
+        if changed:
+            refresh(self.conn)
+
+    def describe_topics(self, centers: np.ndarray, topic_of: np.ndarray, skills: List[List[str]],
+                        prototypes: np.ndarray, labels: List[str]) -> List[Dict]:
+        """Topic rows: nearest label to each centroid and the commonest skills of its courses"""
+        topics = []
+        members: Dict[int, Counter] = {topic: Counter() for topic in range(len(centers))}
+        for topic, course_skills in zip(topic_of.tolist(), skills):
+            members[topic].update(course_skills)
+        nearest_label = np.argmax(centers @ prototypes.T, axis=1)
+        for topic, center in enumerate(centers):
+            counts = members[topic]
+            topics.append({
+                'topic_id': topic,
+                'label': labels[nearest_label[topic]],
+                'size': int(np.sum(topic_of == topic)),
+                'top_skills': [label for label, _ in counts.most_common(3)],
+                'centroid': center,
+            })
+        return topics
+
+    def store(self, ids: List[str], skills: List[List[str]], topic_of: np.ndarray,
+              topics: List[Dict], column: str) -> int:
+        from psycopg2.extras import execute_values
+
+        with self.conn:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TEMP TABLE course_tags (id TEXT PRIMARY KEY, skills JSONB, topic_id INT)
+                    ON COMMIT DROP
+                """)
+                execute_values(cur, "INSERT INTO course_tags (id, skills, topic_id) VALUES %s",
+                               [(course_id, json.dumps(course_skills), int(topic))
+                                for course_id, course_skills, topic in zip(ids, skills, topic_of.tolist())],
+                               page_size=5000)
+                # Unchanged rows are skipped so they do not fire the catalog triggers
+                cur.execute("""
+                    UPDATE courses
+                    SET skills = course_tags.skills, topic_id = course_tags.topic_id
+                    FROM course_tags
+                    WHERE courses.id = course_tags.id
+                      AND (courses.skills, courses.topic_id) IS DISTINCT FROM (course_tags.skills, course_tags.topic_id)
+                """)
+                changed = cur.rowcount
+
+                cur.execute("DELETE FROM course_topics")
+                execute_values(cur, """
+                    INSERT INTO course_topics (topic_id, label, size, top_skills, centroid, embedding_column)
+                    VALUES %s
+                """, [(topic['topic_id'], topic['label'], topic['size'], json.dumps(topic['top_skills']),
+                       '[' + ','.join(f'{value:.6f}' for value in topic['centroid']) + ']', column)
+                      for topic in topics])
+        return changed
+
+    def show(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT topic_id, label, size, top_skills, updated_at FROM course_topics ORDER BY size DESC")
+            rows = cur.fetchall()
+        if not rows:
+            print("⚠️ No topics stored; run 'skill_tagging.py tag' first")
+            return
+        print(f"📊 {len(rows)} topics (computed {rows[0][4]:%Y-%m-%d %H:%M})")
+        for topic_id, label, size, top_skills, _ in rows:
+            print(f"  {topic_id:>3} {label:<20} {size:>5} courses  {', '.join(top_skills)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag courses with skills and topics from their embeddings")
+    parser.add_argument('command', choices=['tag', 'show'])
+    parser.add_argument('--topics', type=int, default=DEFAULT_TOPICS, help="number of k-means topics")
+    parser.add_argument('--max-skills', type=int, default=DEFAULT_MAX_SKILLS)
+    parser.add_argument('--margin', type=float, default=DEFAULT_MARGIN,
+                        help="keep labels within this similarity of the best")
+    parser.add_argument('--dry-run', action='store_true', help="print the topics without writing")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    import psycopg2
+
+    load_dotenv()
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        sys.exit(1)
+
+    conn = psycopg2.connect(db_url)
+    try:
+        tagger = SkillTagger(conn, args.topics, args.max_skills, args.margin)
+        if args.command == 'tag':
+            tagger.tag(args.dry_run)
+        else:
+            tagger.show()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
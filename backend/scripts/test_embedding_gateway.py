@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test the embedding gateway's micro-batching against a fake upstream (no network)
+Run with: python test_embedding_gateway.py (or pytest)
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')  # the client is replaced before any call
+
+from embedding_gateway import EmbeddingGateway
+
+class FakeEmbeddings:
+    """Answers embeddings.create with a 2-dim vector derived from each text"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, model, input, **kwargs):
+        self.calls.append(list(input))
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[float(len(text)), float(i)])
+                                     for i, text in enumerate(input)])
+
+def make_gateway(max_batch: int) -> EmbeddingGateway:
+    gateway = EmbeddingGateway(window_ms=5, max_batch=max_batch, cache_path=None)
+    gateway.client = SimpleNamespace(embeddings=FakeEmbeddings())
+    return gateway
+
+def check_idle(gateway: EmbeddingGateway):
+    assert not gateway.queues, f"keys left queued: {gateway.queues}"
+    assert not gateway.in_flight
+    assert not gateway.flush_timers
+
+def test_request_larger_than_max_batch():
+    """300 texts with max_batch 256 used to leave 44 keys queued with no flush scheduled"""
+    async def run():
+        gateway = make_gateway(max_batch=256)
+        texts = [f"text {i}" for i in range(300)]
+        vectors = await asyncio.wait_for(gateway.embed(texts, 'model', None), timeout=5)
+        assert len(vectors) == 300
+        assert sorted(len(call) for call in gateway.client.embeddings.calls) == [44, 256]
+        check_idle(gateway)
+    asyncio.run(run())
+
+def test_concurrent_requests_overflowing_max_batch():
+    """Two requests that together pass max_batch both complete"""
+    async def run():
+        gateway = make_gateway(max_batch=256)
+        first = gateway.embed([f"a {i}" for i in range(200)], 'model', None)
+        second = gateway.embed([f"b {i}" for i in range(200)], 'model', None)
+        a, b = await asyncio.wait_for(asyncio.gather(first, second), timeout=5)
+        assert len(a) == len(b) == 200
+        assert sum(len(call) for call in gateway.client.embeddings.calls) == 400
+        check_idle(gateway)
+    asyncio.run(run())
+
+def test_duplicates_are_embedded_once():
+    async def run():
+        gateway = make_gateway(max_batch=256)
+        vectors = await asyncio.wait_for(gateway.embed(['same', 'same', 'other'], 'model', None), timeout=5)
+        assert gateway.client.embeddings.calls == [['same', 'other']]
+        assert (vectors[0] == vectors[1]).all()
+        again = await gateway.embed(['same'], 'model', None)
+        assert (again[0] == vectors[0]).all()
+        assert gateway.metrics.counters['lru_hits'] == 1
+        check_idle(gateway)
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Tests for the min_tokens floor in text_chunker.iter_chunks
+Run with: python -m pytest scripts/test_text_chunker.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from text_chunker import chunk_text
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+def test_short_document_gives_one_chunk():
+    chunks = list(chunk_text('Prerequisite: ECE 250.', min_tokens=12, count_tokens=count_words))
+    assert chunks == ['Prerequisite: ECE 250.']
+
+def test_short_trailing_fragment_is_dropped():
+    sentence = ' '.join(['word'] * 10) + '.'
+    text = f"{sentence} {sentence} Tail."
+    chunks = list(chunk_text(text, max_tokens=20, overlap_tokens=0, min_tokens=5, count_tokens=count_words))
+    assert chunks == [f"{sentence} {sentence}"]
+
+if __name__ == "__main__":
+    test_short_document_gives_one_chunk()
+    test_short_trailing_fragment_is_dropped()
+    print("✅ text_chunker tests passed")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Token-aware streaming text chunker for document ingestion
+Reads text block by block (from a file, a memory map or a string), splits it into
+sentences and packs whole sentences into chunks of at most max_tokens tokens as
+counted by the embedding model's tokenizer. Chunks are yielded as they are produced,
+so memory stays bounded by the block size however large the document is.
+"""
+
+import codecs
+import io
+import mmap
+import os
+import re
+from typing import Callable, Iterable, Iterator, List, Optional
+
+# Tokenizer used by text-embedding-3-small/large and ada-002
+EMBEDDING_ENCODING = 'cl100k_base'
+
+DEFAULT_MAX_TOKENS = 300
+DEFAULT_OVERLAP_TOKENS = 40
+DEFAULT_MIN_TOKENS = 12
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+# A sentence ends at . ! or ? followed by whitespace, or at a blank line
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+
+# Text without any sentence end (tables, dumps) is cut at whitespace past this length
+MAX_PENDING_CHARS = 1 << 16
+
+def load_token_counter(encoding_name: str = EMBEDDING_ENCODING) -> Callable[[str], int]:
+    """Token counter for the embedding model, or a ~4 chars/token estimate without tiktoken"""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(encoding_name)
+    except ImportError:
+        return lambda text: (len(text) + 3) // 4
+    except Exception as e:
+        # tiktoken downloads its BPE files on first use, which fails offline
+        print(f"⚠️ Tokenizer '{encoding_name}' unavailable ({type(e).__name__}), estimating tokens from length")
+        return lambda text: (len(text) + 3) // 4
+
+    return lambda text: len(encoding.encode_ordinary(text))
+
+def iter_blocks(source, block_size: int = DEFAULT_BLOCK_SIZE, use_mmap: bool = True) -> Iterator[str]:
+    """Yield decoded text blocks from a path or an open text/binary file
+
+    Paths are memory-mapped when possible and decoded incrementally, so a multi-byte
+    UTF-8 character split across two blocks is still decoded correctly.
+    """
+    if isinstance(source, io.TextIOBase):
+        yield from iter(lambda: source.read(block_size), '')
+        return
+
+    if hasattr(source, 'read'):
+        yield from _decode_blocks(iter(lambda: source.read(block_size), b''))
+        return
+
+    with open(source, 'rb') as f:
+        if use_mmap and os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from _decode_blocks(_mapped_blocks(mapped, block_size))
+        else:
+            yield from _decode_blocks(iter(lambda: f.read(block_size), b''))
+
+def _mapped_blocks(mapped: mmap.mmap, block_size: int) -> Iterator[bytes]:
+    """Slice a memory map block by block, releasing pages already consumed"""
+    can_release = hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_DONTNEED')
+    for start in range(0, len(mapped), block_size):
+        block = mapped[start:start + block_size]
+        if can_release:
+            # Clean file-backed pages: dropping them only means a re-read if touched again
+            mapped.madvise(mmap.MADV_DONTNEED, start - start % mmap.PAGESIZE,
+                           min(block_size, len(mapped) - start) + start % mmap.PAGESIZE)
+        yield block
+
+def _decode_blocks(blocks: Iterable[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for block in blocks:
+        text = decoder.decode(block)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+def iter_sentences(blocks: Iterable[str]) -> Iterator[str]:
+    """Split streamed text into sentences, carrying the unfinished one across blocks"""
+    pending = ''
+    for block in blocks:
+        text = pending + block
+        start = 0
+        for match in SENTENCE_END.finditer(text):
+            # A match touching the end of the block may continue in the next one
+            if match.end() == len(text):
+                break
+            sentence = text[start:match.start()].strip()
+            if sentence:
+                yield sentence
+            start = match.end()
+        pending = text[start:]
+
+        # Keep memory bounded when the text never ends a sentence
+        while len(pending) > MAX_PENDING_CHARS:
+            cut = pending.rfind(' ', 0, MAX_PENDING_CHARS)
+            cut = cut if cut > 0 else MAX_PENDING_CHARS
+            if pending[:cut].strip():
+                yield pending[:cut].strip()
+            pending = pending[cut:]
+    if pending.strip():
+        yield pending.strip()
+
+def split_long_sentence(sentence: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """Break a sentence that alone exceeds max_tokens on word boundaries"""
+    pieces, words, size = [], [], 0
+    for word in sentence.split():
+        tokens = count_tokens(' ' + word)
+        if words and size + tokens > max_tokens:
+            pieces.append(' '.join(words))
+            words, size = [], 0
+        words.append(word)
+        size += tokens
+    if words:
+        pieces.append(' '.join(words))
+    return pieces
+
+def iter_chunks(sentences: Iterable[str], max_tokens: int = DEFAULT_MAX_TOKENS,
+                overlap_tokens: int = DEFAULT_OVERLAP_TOKENS, min_tokens: int = DEFAULT_MIN_TOKENS,
+                count_tokens: Optional[Callable[[str], int]] = None) -> Iterator[str]:
+    """Pack whole sentences into chunks of at most max_tokens tokens
+
+    Consecutive chunks share trailing sentences worth up to overlap_tokens. The overlap
+    is always smaller than the chunk it came from, so every chunk makes progress.
+    A fragment under min_tokens is dropped only once a chunk has been yielded, so a
+    short document still gives one chunk.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+    count_tokens = count_tokens or load_token_counter()
+
+    window: List[tuple] = []  # (sentence, tokens)
+    size = 0
+    fresh = False  # window holds a sentence not yet emitted in any chunk
+    emitted = False
+
+    for sentence in sentences:
+        # Count the joining space too, so the sum never undercounts the joined chunk
+        tokens = count_tokens(' ' + sentence)
+        parts = [(sentence, tokens)] if tokens <= max_tokens else [
+            (piece, count_tokens(' ' + piece)) for piece in split_long_sentence(sentence, max_tokens, count_tokens)
+        ]
+
+        for part, part_tokens in parts:
+            if window and size + part_tokens > max_tokens:
+                if fresh and (size >= min_tokens or not emitted):
+                    yield ' '.join(s for s, _ in window)
+                    emitted = True
+                # Keep the tail of the window as overlap, dropping at least one sentence
+                keep, kept = [], 0
+                for s, t in reversed(window[1:]):
+                    if kept + t > overlap_tokens or kept + t + part_tokens > max_tokens:
+                        break
+                    keep.insert(0, (s, t))
+                    kept += t
+                window, size = keep, kept
+            window.append((part, part_tokens))
+            size += part_tokens
+            fresh = True
+
+    if window and fresh and (size >= min_tokens or not emitted):
+        yield ' '.join(s for s, _ in window)
+
+def chunk_text(text: str, **options) -> Iterator[str]:
+    """Lazily chunk an in-memory string"""
+    return chunk_stream(io.StringIO(text), **options)
+
+def chunk_stream(source, max_tokens: int = DEFAULT_MAX_TOKENS, overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+                 min_tokens: int = DEFAULT_MIN_TOKENS, block_size: int = DEFAULT_BLOCK_SIZE,
+                 use_mmap: bool = True, count_tokens: Optional[Callable[[str], int]] = None) -> Iterator[str]:
+    """Lazily chunk a file path or an open file object"""
+    return iter_chunks(
+        iter_sentences(iter_blocks(source, block_size, use_mmap)),
+        max_tokens=max_tokens,
+        overlap_tokens=overlap_tokens,
+        min_tokens=min_tokens,
+        count_tokens=count_tokens,
+    )
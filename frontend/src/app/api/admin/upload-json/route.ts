@@ -51,21 +51,6 @@ export async function POST(request: NextRequest) {
                              parseInt(number) < 300 ? 200 : 
                              parseInt(number) < 400 ? 300 : 400
 
-                // Extract skills from title
-                const skills = []
-                const titleLower = title.toLowerCase()
-                if (titleLower.includes('robot') || titleLower.includes('robotics')) skills.push('robotics')
-                if (titleLower.includes('control')) skills.push('control')
-                if (titleLower.includes('machine learning') || titleLower.includes('ai')) skills.push('machine learning')
-                if (titleLower.includes('software') || titleLower.includes('programming')) skills.push('software')
-                if (titleLower.includes('hardware') || titleLower.includes('circuit')) skills.push('hardware')
-                if (titleLower.includes('mechanics') || titleLower.includes('dynamics')) skills.push('mechanics')
-                if (titleLower.includes('math') || titleLower.includes('calculus')) skills.push('mathematics')
-                if (titleLower.includes('design')) skills.push('design')
-                if (titleLower.includes('systems')) skills.push('systems')
-                if (titleLower.includes('data')) skills.push('data')
-                if (skills.length === 0) skills.push('general engineering')
-
                 courses.push({
                   id: courseId,
                   title: title,
@@ -76,7 +61,6 @@ export async function POST(request: NextRequest) {
                   description: `Course from ${programName} program`,
                   terms_offered: ["F", "W"],
                   prereqs: '',
-                  skills: skills,
                   workload: { reading: 2, assignments: 3, projects: 1, labs: 1 },
                   assessments: { midterm: 30, final: 40, assignments: 30 },
                   source_url: `https://uwaterloo.ca/engineering/undergraduate-studies/${programName.toLowerCase().replace(/\s+/g, '-')}`
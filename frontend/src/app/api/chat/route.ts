@@ -1,7 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { supabase } from '@/lib/supabase'
 import { getChatCompletion, getEmbedding } from '@/lib/openai'
-import { searchElectiveDocs, searchCourses, searchSpecializations, searchCertificates, searchDiplomas, calculateCourseScore } from '@/lib/search'
+import { searchElectiveDocs, searchCourses, searchSpecializations, searchCertificates, searchDiplomas, calculateCourseScore, getChatContext, ChatContext, diversifyCourses } from '@/lib/search'
 
 // Extract program from user message
 function extractProgramFromMessage(message: string): string | null {
@@ -32,9 +32,12 @@ import { enhancedSearch } from '@/lib/web-search'
 import { getRecentMessages } from '@/lib/langchain-memory'
 import { UserProfile } from '@/lib/types'
 import { demoCourses, demoOptions } from '@/lib/demo-data'
+import { lookupCachedAnswer, profileFingerprint, storeCachedAnswer } from '@/lib/answer-cache'
+import { getCohortRecommendations } from '@/lib/cohort-recommendations'
 
 export async function POST(request: NextRequest) {
   try {
+    const startedAt = Date.now()
     const { message, sessionId, userId } = await request.json()
 
     if (!message || !sessionId || !userId) {
@@ -128,37 +131,6 @@ export async function POST(request: NextRequest) {
     // Get recent conversation history
     const recentMessages = await getRecentMessages(sessionId, 6)
 
-    // Search for relevant information using vector search with error handling
-    let searchResults = []
-    try {
-      searchResults = await searchCourses(message, {
-        term: profile.current_term,
-        skills: profile.goal_tags
-      })
-    } catch (error) {
-      console.error('❌ Error searching courses:', error)
-      // Use demo data as fallback
-      searchResults = [
-        {
-          id: "ECE486",
-          title: "Robot Dynamics and Control",
-          dept: "ECE",
-          number: 486,
-          units: 0.5,
-          level: 400,
-          description: "Advanced course covering robot kinematics, dynamics, and control systems.",
-          terms_offered: ["F", "W"],
-          prereqs: "ECE 380, MATH 211",
-          skills: ["robotics", "control", "dynamics"],
-          workload: { reading: 3, assignments: 4, projects: 2, labs: 2 },
-          assessments: { midterm: 30, final: 40, assignments: 20, project: 10 },
-          source_url: "https://uwaterloo.ca/electrical-computer-engineering/undergraduate-studies/course-catalog/ece-486"
-        }
-      ]
-      console.log('⚠️ Using demo data due to search error')
-    }
-
-    // Search for specializations, certificates, and diplomas
     // Use program from profile, or try to extract from conversation if empty
     const programToSearch = profile.program || extractProgramFromMessage(message) || 'Software Engineering'
     console.log(`🔍 Using program for search: "${programToSearch}" (from profile: "${profile.program}")`)
@@ -176,35 +148,98 @@ export async function POST(request: NextRequest) {
       }
     }
     
-    // Search for information with error handling
-    let specializations = []
-    let certificates = []
-    let diplomas = []
+    // Standalone first-turn questions can be answered from the semantic answer cache;
+    // follow-ups depend on the conversation so they always run the full pipeline
+    const { hit: cachedAnswer, key: cacheKey } = recentMessages.length === 0
+      ? await lookupCachedAnswer(message, profileFingerprint(profile, programToSearch))
+      : { hit: null, key: null }
+
+    if (cachedAnswer) {
+      console.log(`⚡ Answer cache hit (similarity ${cachedAnswer.similarity.toFixed(3)}, saved ~${cachedAnswer.savedMs} ms)`)
+      await saveExchange(sessionId, message, cachedAnswer.response, cachedAnswer.citations)
+      return NextResponse.json({
+        response: cachedAnswer.response,
+        recommendations: cachedAnswer.recommendations,
+        sources: [],
+        used_web_search: false,
+        cached: true
+      })
+    }
+
+    // All catalog context in one round trip; the individual searches are the fallback
+    let searchResults: any[] = []
+    let specializations: any[] = []
+    let certificates: any[] = []
+    let diplomas: any[] = []
     let docChunks: any[] = []
 
+    let chatContext: ChatContext | null = null
     try {
-      specializations = await searchSpecializations(message, programToSearch, 3)
+      chatContext = await getChatContext(message, programToSearch, {
+        skills: profile.goal_tags,
+        queryEmbedding: cacheKey?.embedding
+      })
     } catch (error) {
-      console.error('❌ Error searching specializations:', error)
+      console.error('❌ Error loading chat context:', error)
     }
 
-    try {
-      certificates = await searchCertificates(message, programToSearch, 3)
-    } catch (error) {
-      console.error('❌ Error searching certificates:', error)
-    }
+    if (chatContext) {
+      ({ courses: searchResults, specializations, certificates, diplomas, docs: docChunks } = chatContext)
+    } else {
+      // Search for relevant information using vector search with error handling
+      try {
+        searchResults = await searchCourses(message, {
+          term: profile.current_term,
+          skills: profile.goal_tags
+        })
+      } catch (error) {
+        console.error('❌ Error searching courses:', error)
+        // Use demo data as fallback
+        searchResults = [
+          {
+            id: "ECE486",
+            title: "Robot Dynamics and Control",
+            dept: "ECE",
+            number: 486,
+            units: 0.5,
+            level: 400,
+            description: "Advanced course covering robot kinematics, dynamics, and control systems.",
+            terms_offered: ["F", "W"],
+            prereqs: "ECE 380, MATH 211",
+            skills: ["robotics", "control", "dynamics"],
+            workload: { reading: 3, assignments: 4, projects: 2, labs: 2 },
+            assessments: { midterm: 30, final: 40, assignments: 20, project: 10 },
+            source_url: "https://uwaterloo.ca/electrical-computer-engineering/undergraduate-studies/course-catalog/ece-486"
+          }
+        ]
+        console.log('⚠️ Using demo data due to search error')
+      }
 
-    try {
-      diplomas = await searchDiplomas(message, programToSearch, 3)
-    } catch (error) {
-      console.error('❌ Error searching diplomas:', error)
-    }
+      // Search for specializations, certificates, and diplomas with error handling
+      try {
+        specializations = await searchSpecializations(message, programToSearch, 3)
+      } catch (error) {
+        console.error('❌ Error searching specializations:', error)
+      }
 
-    try {
-      // Get relevant document chunks for RAG
-      docChunks = await searchElectiveDocs(message, 0.6, 5)
-    } catch (error) {
-      console.error('❌ Error searching document chunks:', error)
+      try {
+        certificates = await searchCertificates(message, programToSearch, 3)
+      } catch (error) {
+        console.error('❌ Error searching certificates:', error)
+      }
+
+      try {
+        diplomas = await searchDiplomas(message, programToSearch, 3)
+      } catch (error) {
+        console.error('❌ Error searching diplomas:', error)
+      }
+
+      try {
+        // Get relevant document chunks for RAG
+        docChunks = await searchElectiveDocs(message, 0.6, 5)
+      } catch (error) {
+        console.error('❌ Error searching document chunks:', error)
+      }
     }
 
     // Build context for the LLM
@@ -233,24 +268,11 @@ export async function POST(request: NextRequest) {
     const aiResponse = await getChatCompletion(messages)
 
     // Save messages to database
-    await supabase.from('messages').insert([
-      {
-        session_id: sessionId,
-        role: 'user',
-        content: message,
-        tokens: Math.ceil(message.length / 4)
-      },
-      {
-        session_id: sessionId,
-        role: 'assistant',
-        content: aiResponse,
-        tokens: Math.ceil(aiResponse.length / 4),
-        citations: docChunks.map(chunk => ({
-          url: chunk.source_url,
-          text: chunk.text.substring(0, 200) + '...'
-        }))
-      }
-    ])
+    const citations = docChunks.map(chunk => ({
+      url: chunk.source_url,
+      text: chunk.text.substring(0, 200) + '...'
+    }))
+    await saveExchange(sessionId, message, aiResponse, citations)
 
     // Generate course recommendations if relevant
     let recommendations = []
@@ -266,6 +288,10 @@ export async function POST(request: NextRequest) {
       console.log('📚 Generated recommendations:', recommendations.length, 'courses')
     }
 
+    if (cacheKey) {
+      await storeCachedAnswer(cacheKey, message, { response: aiResponse, recommendations, citations }, Date.now() - startedAt)
+    }
+
     console.log('📤 API Response:', {
       responseLength: aiResponse.length,
       recommendationsCount: recommendations.length,
@@ -288,6 +314,29 @@ export async function POST(request: NextRequest) {
   }
 }
 
+async function saveExchange(
+  sessionId: string,
+  message: string,
+  aiResponse: string,
+  citations: Array<{ url: string; text: string }>
+) {
+  await supabase.from('messages').insert([
+    {
+      session_id: sessionId,
+      role: 'user',
+      content: message,
+      tokens: Math.ceil(message.length / 4)
+    },
+    {
+      session_id: sessionId,
+      role: 'assistant',
+      content: aiResponse,
+      tokens: Math.ceil(aiResponse.length / 4),
+      citations
+    }
+  ])
+}
+
 function buildContext(
   searchResults: any,
   docChunks: any[],
@@ -301,7 +350,7 @@ function buildContext(
   // Add course information
   if (searchResults && searchResults.length > 0) {
     context += 'Available Courses:\n'
-    searchResults.slice(0, 5).forEach((course: any) => {
+    diversifyCourses(searchResults, 5).forEach((course: any) => {
       context += `- ${course.id}: ${course.title} (${course.dept})\n`
       context += `  Description: ${course.description?.substring(0, 200)}...\n`
       context += `  Skills: ${course.skills?.join(', ')}\n`
@@ -659,6 +708,13 @@ async function generateRecommendations(
   query: string
 ): Promise<any[]> {
   console.log('🔍 generateRecommendations called with:', { query, profile: profile.program, term: profile.current_term })
+
+  // Precomputed list for the student's cohort, re-ranked for them; searched and scored live otherwise
+  const cohortRecommendations = await getCohortRecommendations(profile, extractKeyTerms(query))
+  if (cohortRecommendations) {
+    console.log('🎯 Cohort recommendations:', cohortRecommendations.length, 'recommendations')
+    return cohortRecommendations
+  }
   
   // Search for relevant courses (don't filter by term - use it as guidance only)
   const courses = await searchCourses(query, {
@@ -671,7 +727,7 @@ async function generateRecommendations(
   }
 
   // Calculate scores and generate recommendations
-  const recommendations = courses
+  const scored = courses
     .map(course => {
       const scoreData = calculateCourseScore(course, profile, profile.goal_tags)
       console.log(`📊 Course ${course.id} score:`, scoreData.score)
@@ -681,7 +737,7 @@ async function generateRecommendations(
       }
     })
     .sort((a, b) => b.score - a.score)
-    .slice(0, 5)
+  const recommendations = diversifyCourses(scored, 5, recommendation => recommendation.course.topic_id)
 
   console.log('🎯 Final recommendations:', recommendations.length, 'recommendations')
   return recommendations
@@ -0,0 +1,54 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { getCourseFacets } from '@/lib/search'
+import { FacetFilters } from '@/lib/types'
+
+// Comma-separated query parameters, e.g. /api/facets?dept=ECE,SE&level=400&skills=robotics
+function listParam(request: NextRequest, name: string): string[] | undefined {
+  const values = (request.nextUrl.searchParams.get(name) || '')
+    .split(',')
+    .map(value => value.trim())
+    .filter(Boolean)
+  return values.length > 0 ? values : undefined
+}
+
+export async function GET(request: NextRequest) {
+  try {
+    const filters: FacetFilters = {}
+    const dept = listParam(request, 'dept')
+    const level = listParam(request, 'level')
+    const termsOffered = listParam(request, 'terms_offered')
+    const skills = listParam(request, 'skills')
+    if (dept) filters.dept = dept
+    if (level) filters.level = level.map(Number).filter(Number.isFinite)
+    if (termsOffered) filters.terms_offered = termsOffered
+    if (skills) filters.skills = skills
+
+    const result = await getCourseFacets(filters)
+    if (!result) {
+      return NextResponse.json(
+        {
+          status: 'error',
+          message: 'Course facets unavailable',
+          error: 'Run add-course-facets.sql and scripts/catalog_facets.py build'
+        },
+        { status: 500 }
+      )
+    }
+
+    return NextResponse.json({
+      status: 'ok',
+      filters,
+      total: result.total,
+      facets: result.facets
+    })
+  } catch (error) {
+    return NextResponse.json(
+      {
+        status: 'error',
+        message: 'Facet lookup failed',
+        error: error instanceof Error ? error.message : 'Unknown error'
+      },
+      { status: 500 }
+    )
+  }
+}
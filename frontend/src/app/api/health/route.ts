@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server'
 import { supabase } from '@/lib/supabase'
+import { getAnswerCacheStats } from '@/lib/answer-cache'
 
 export async function GET() {
   try {
@@ -24,7 +25,9 @@ export async function GET() {
       status: 'healthy',
       timestamp: new Date().toISOString(),
       database: 'connected',
-      courses_count: data?.length || 0
+      courses_count: data?.length || 0,
+      // Per-day lookups, hit ratio and latency saved (null until add-answer-cache.sql is run)
+      answer_cache: await getAnswerCacheStats()
     })
   } catch (error) {
     return NextResponse.json(
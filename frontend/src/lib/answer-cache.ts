@@ -0,0 +1,114 @@
+import { createHash } from 'crypto'
+import { supabase } from './supabase'
+import { getEmbedding } from './openai'
+import { getActiveEmbeddingVersion } from './search'
+import { UserProfile } from './types'
+
+// Semantic answer cache (backend/data-to-ingest/add-answer-cache.sql)
+// A question is served from cache when a cached question from the same kind of
+// student is at least this similar and the catalog has not been re-ingested since
+const SIMILARITY_THRESHOLD = Number(process.env.ANSWER_CACHE_THRESHOLD || 0.95)
+const CACHE_ENABLED = process.env.ANSWER_CACHE_ENABLED !== 'false'
+
+export interface CachedAnswer {
+  response: string
+  recommendations: any[]
+  citations: Array<{ url: string; text: string }>
+  similarity: number
+  savedMs: number
+}
+
+// Key for a pending miss, passed back to storeCachedAnswer once the answer is computed
+export interface AnswerCacheKey {
+  embedding: number[]
+  model: string
+  fingerprint: string
+  catalogVersion: number
+}
+
+// Everything about the student that changes the answer: program, term, the completed-course set
+// and the goal tags (they steer the system prompt, the course skills filter and recommendation scoring)
+export function profileFingerprint(profile: UserProfile, program: string): string {
+  const completed = [...new Set((profile.completed_courses || []).map(code => code.replace(/\s+/g, '').toUpperCase()))].sort()
+  const goals = [...new Set((profile.goal_tags || []).map(tag => tag.trim().toLowerCase()))].sort()
+  const profileHash = createHash('sha256').update(`${completed.join(',')}|${goals.join(',')}`).digest('hex').slice(0, 16)
+  return `${program || 'unknown'}|${profile.current_term || 'unknown'}|${profileHash}`
+}
+
+export async function lookupCachedAnswer(
+  message: string,
+  fingerprint: string
+): Promise<{ hit: CachedAnswer | null; key: AnswerCacheKey | null }> {
+  if (!CACHE_ENABLED) {
+    return { hit: null, key: null }
+  }
+
+  try {
+    const { value: embeddingVersion } = await getActiveEmbeddingVersion()
+    const embedding = await getEmbedding(message, embeddingVersion.model, embeddingVersion.dimensions)
+    const model = `${embeddingVersion.model}:${embeddingVersion.dimensions}`
+
+    const { data, error } = await supabase.rpc('match_cached_answer', {
+      query_embedding: embedding,
+      query_model: model,
+      fingerprint,
+      similarity_threshold: SIMILARITY_THRESHOLD
+    })
+    if (error || !data || data.length === 0) {
+      // add-answer-cache.sql not run yet: answer normally
+      if (error) console.warn('⚠️ Answer cache lookup failed:', error.message)
+      return { hit: null, key: null }
+    }
+
+    const row = data[0]
+    const key = { embedding, model, fingerprint, catalogVersion: row.cache_version }
+    if (!row.hit) {
+      return { hit: null, key }
+    }
+    return {
+      hit: {
+        response: row.answer,
+        recommendations: row.recommendations || [],
+        citations: row.citations || [],
+        similarity: row.similarity,
+        savedMs: row.saved_ms
+      },
+      key
+    }
+  } catch (error) {
+    console.warn('⚠️ Answer cache unavailable:', error)
+    return { hit: null, key: null }
+  }
+}
+
+export async function storeCachedAnswer(
+  key: AnswerCacheKey,
+  message: string,
+  answer: { response: string; recommendations: any[]; citations: Array<{ url: string; text: string }> },
+  computeMs: number
+): Promise<void> {
+  // Dropped by the RPC if an ingestion run bumped the catalog version in the meantime
+  const { error } = await supabase.rpc('store_cached_answer', {
+    query_embedding: key.embedding,
+    query_model: key.model,
+    fingerprint: key.fingerprint,
+    query_text: message,
+    answer: answer.response,
+    answer_recommendations: answer.recommendations,
+    answer_citations: answer.citations,
+    computed_under: key.catalogVersion,
+    compute_ms: Math.round(computeMs)
+  })
+  if (error) {
+    console.warn('⚠️ Failed to store cached answer:', error.message)
+  }
+}
+
+// Hit ratio and latency saved per day
+export async function getAnswerCacheStats(days: number = 7) {
+  const { data, error } = await supabase.rpc('get_answer_cache_stats', { days })
+  if (error) {
+    return null
+  }
+  return data
+}
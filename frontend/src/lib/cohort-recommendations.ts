@@ -0,0 +1,59 @@
+import { createHash } from 'crypto'
+import { supabase } from './supabase'
+import { calculateCourseScore, diversifyCourses } from './search'
+import { Course, UserProfile } from './types'
+
+// Precomputed recommendation lists (backend/data-to-ingest/add-cohort-recommendations.sql)
+// scripts/cohort_recommendations.py ranks the whole catalog once per program, term and
+// goal set; a request only re-ranks its cohort's list with the student's own
+// prerequisites and workload. A cohort is keyed on the student's first three goals
+const MAX_COHORT_GOALS = 3
+const COHORT_DEPTH = 100
+// Words of a question that say nothing about which courses it is about
+const QUERY_STOPWORDS = new Set([
+  'what', 'which', 'want', 'take', 'taking', 'should', 'could', 'would', 'course', 'courses', 'elective',
+  'electives', 'recommend', 'recommendations', 'some', 'good', 'about', 'with', 'interested', 'learn',
+  'like', 'that', 'this', 'have', 'next', 'term', 'please', 'give'
+])
+
+// Must match cohort_fingerprint() in backend/scripts/cohort_recommendations.py
+export function cohortFingerprint(profile: UserProfile): string {
+  const goals = [...new Set((profile.goal_tags || []).map(goal => goal.toLowerCase()))].slice(0, MAX_COHORT_GOALS).sort()
+  return createHash('sha256')
+    .update(`${profile.program || ''}|${profile.current_term || ''}|${goals.join(',')}`)
+    .digest('hex')
+}
+
+// Cohort courses re-ranked for this student, or null when the cohort has no stored list
+// or the question names something none of its courses cover
+export async function getCohortRecommendations(
+  profile: UserProfile,
+  queryTerms: string[],
+  limit: number = 5
+): Promise<any[] | null> {
+  const { data, error } = await supabase.rpc('get_cohort_recommendations', {
+    fingerprint: cohortFingerprint(profile),
+    match_count: COHORT_DEPTH
+  })
+  if (error || !data || data.length === 0) {
+    // add-cohort-recommendations.sql not run, or a cohort the last refresh has not seen
+    if (error) console.warn('⚠️ Cohort recommendations unavailable:', error.message)
+    return null
+  }
+
+  // Narrow to courses the question is about; a question about something outside the
+  // list is left to live search
+  const courses: Course[] = data.map(({ cohort_rank, cohort_score, ...course }: any) => course)
+  const terms = queryTerms.filter(term => term.length > 3 && !QUERY_STOPWORDS.has(term))
+  const relevant = terms.length === 0 ? courses : courses.filter(course => terms.some(term =>
+    course.title.toLowerCase().includes(term) ||
+    (course.skills || []).some(skill => skill.toLowerCase().includes(term))
+  ))
+  if (relevant.length === 0) return null
+
+  // Stable sort keeps the cohort order between equal personal scores
+  const scored = relevant
+    .map(course => ({ course, ...calculateCourseScore(course, profile, profile.goal_tags) }))
+    .sort((a, b) => b.score - a.score)
+  return diversifyCourses(scored, limit, recommendation => recommendation.course.topic_id)
+}
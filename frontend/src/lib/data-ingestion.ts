@@ -44,10 +44,11 @@ export async function ingestCourses(courses: Course[]): Promise<void> {
     console.log('🔍 Course fields:', Object.keys(courses[0]))
   }
 
-  // Filter out any fields that don't exist in the courses table schema
+  // Filter out any fields that don't exist in the courses table schema. skills is left out:
+  // it is tagged from the embeddings by backend/scripts/skill_tagging.py, and an upload must not reset it
   const validCourseFields = [
     'id', 'title', 'dept', 'number', 'units', 'level', 'description', 'faculty', 'cse_classification',
-    'terms_offered', 'prereqs', 'workload', 'skills', 'assessments', 'source_url'
+    'terms_offered', 'prereqs', 'workload', 'assessments', 'source_url'
   ]
   
   const filteredCourses = courses.map(course => {
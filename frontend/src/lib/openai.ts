@@ -15,11 +15,43 @@ const openai = new OpenAI({
 
 export { openai }
 
+// Local embedding gateway (backend/scripts/embedding_gateway.py): batches concurrent
+// requests, coalesces identical ones and caches vectors shared with the backend scripts
+const embeddingGatewayUrl = process.env.EMBEDDING_GATEWAY_URL?.replace(/\/$/, '')
+
+async function getGatewayEmbedding(text: string, model: string, dimensions?: number): Promise<number[]> {
+  const response = await fetch(`${embeddingGatewayUrl}/v1/embeddings`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ model, input: text, ...(dimensions ? { dimensions } : {}) }),
+    signal: AbortSignal.timeout(10000),
+  })
+  if (!response.ok) {
+    throw new Error(`gateway returned ${response.status}`)
+  }
+  const data = await response.json()
+  return data.data[0].embedding
+}
+
 // Embedding function for RAG
-export async function getEmbedding(text: string): Promise<number[]> {
+// Pass the model/dimensions of the embedding version being searched (see getActiveEmbeddingVersion)
+export async function getEmbedding(
+  text: string,
+  model: string = 'text-embedding-3-large',
+  dimensions?: number
+): Promise<number[]> {
+  if (embeddingGatewayUrl) {
+    try {
+      return await getGatewayEmbedding(text, model, dimensions)
+    } catch (error) {
+      console.warn('⚠️ Embedding gateway unavailable, calling OpenAI directly:', error)
+    }
+  }
+
   const response = await openai.embeddings.create({
-    model: 'text-embedding-3-large',
+    model,
     input: text,
+    ...(dimensions ? { dimensions } : {}),
   })
   
   return response.data[0].embedding
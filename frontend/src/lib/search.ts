@@ -1,6 +1,6 @@
 import { supabase } from './supabase'
 import { getEmbedding } from './openai'
-import { Course, CourseRecommendation, SearchFilters, UserProfile } from './types'
+import { Course, CourseFacetCount, CourseRecommendation, FacetFilters, SearchFilters, UserProfile } from './types'
 import { demoCourses } from './demo-data'
 
 // Map program abbreviations to full names
@@ -27,28 +27,206 @@ function getFullProgramName(abbreviation: string): string {
   return PROGRAM_ABBREVIATIONS[abbreviation] || abbreviation
 }
 
+// Embedding version currently served by the search RPCs (flipped by scripts/embedding_migration.py)
+const EMBEDDING_VERSION_TTL_MS = 60_000
+const DEFAULT_EMBEDDING_VERSION = { version: 'v1', model: 'text-embedding-3-small', dimensions: 1536 }
+let cachedEmbeddingVersion: {
+  value: typeof DEFAULT_EMBEDDING_VERSION
+  versioned: boolean  // false until add-embedding-versions.sql (which adds the query_model RPC argument) has been run
+  fetchedAt: number
+} | null = null
+
+export async function getActiveEmbeddingVersion() {
+  if (cachedEmbeddingVersion && Date.now() - cachedEmbeddingVersion.fetchedAt < EMBEDDING_VERSION_TTL_MS) {
+    return cachedEmbeddingVersion
+  }
+  
+  const { data, error } = await supabase.rpc('get_active_embedding_version')
+  const versioned = !error && !!data && data.length > 0
+  cachedEmbeddingVersion = {
+    value: versioned ? data[0] : DEFAULT_EMBEDDING_VERSION,
+    versioned,
+    fetchedAt: Date.now()
+  }
+  return cachedEmbeddingVersion
+}
+
+// Document search takes candidates from the 256-dim short vector and re-scores them on
+// the full one (add-short-embeddings.sql); set TWO_STAGE_SEARCH=false to search the full
+// vector directly. Falls back to the plain RPC until that file has been run.
+let twoStageSearch = process.env.TWO_STAGE_SEARCH !== 'false'
+const TWO_STAGE_CANDIDATES = 100
+
 // Vector similarity search for RAG
 export async function searchElectiveDocs(
   query: string,
   threshold: number = 0.5,
   limit: number = 10
 ): Promise<Array<{ text: string; source_url: string; similarity: number }>> {
-  const queryEmbedding = await getEmbedding(query)
-  
-  const { data, error } = await supabase.rpc('search_elective_docs', {
+  // The RPC routes by query_model, so a stale cached version still hits a matching column during a flip
+  const { value: embeddingVersion, versioned } = await getActiveEmbeddingVersion()
+  const queryEmbedding = await getEmbedding(query, embeddingVersion.model, embeddingVersion.dimensions)
+  const params = {
     query_embedding: queryEmbedding,
     match_threshold: threshold,
+    match_count: limit,
+    ...(versioned ? { query_model: embeddingVersion.model } : {})
+  }
+  
+  if (twoStageSearch) {
+    const { data, error } = await supabase.rpc('search_elective_docs_two_stage', {
+      ...params,
+      candidate_count: Math.max(TWO_STAGE_CANDIDATES, limit)
+    })
+    if (!error) {
+      return data || []
+    }
+    console.warn('⚠️ Two-stage search unavailable, searching the full vector:', error.message)
+    twoStageSearch = false
+  }
+  
+  const { data, error } = await supabase.rpc('search_elective_docs', params)
+  
+  if (error) {
+    console.error('Vector search error:', error)
+    return []
+  }
+  
+  return data || []
+}
+
+// Document chunks are picked for diversity out of a larger pool (add-diverse-retrieval.sql),
+// so overlapping chunks of one page do not fill the context
+const DOC_POOL = 25
+const DOC_DIVERSITY = 0.2
+const DOC_PER_SOURCE = 2
+// Courses of one skill topic (scripts/skill_tagging.py) shown together
+const COURSES_PER_TOPIC = 2
+
+// Everything the chat route needs for one message, from a single get_chat_context call
+// (backend/data-to-ingest/add-chat-context.sql). Returns null if the RPC is unavailable,
+// in which case callers fall back to the individual search functions.
+export interface ChatContext {
+  courses: Course[]
+  specializations: any[]
+  certificates: any[]
+  diplomas: any[]
+  docs: Array<{ text: string; source_url: string; similarity: number }>
+}
+
+export async function getChatContext(
+  query: string,
+  program: string,
+  options: {
+    skills?: string[]
+    queryEmbedding?: number[]  // reuse an embedding of the active version, if one was already computed
+    courseLimit?: number
+    optionLimit?: number
+    docLimit?: number
+    docThreshold?: number
+    docPool?: number
+  } = {}
+): Promise<ChatContext | null> {
+  const { value: embeddingVersion, versioned } = await getActiveEmbeddingVersion()
+  let queryEmbedding = options.queryEmbedding
+  if (!queryEmbedding) {
+    try {
+      queryEmbedding = await getEmbedding(query, embeddingVersion.model, embeddingVersion.dimensions)
+    } catch (error) {
+      console.error('❌ Error embedding query, skipping document search:', error)
+    }
+  }
+  
+  const { data, error } = await supabase.rpc('get_chat_context', {
+    query_text: query,
+    query_embedding: queryEmbedding ?? null,
+    program: program ? getFullProgramName(program) : null,
+    skills: options.skills && options.skills.length > 0 ? options.skills : null,
+    course_limit: options.courseLimit ?? 20,
+    option_limit: options.optionLimit ?? 3,
+    doc_limit: options.docLimit ?? 5,
+    doc_threshold: options.docThreshold ?? 0.6,
+    doc_pool: options.docPool ?? DOC_POOL,
+    doc_diversity: DOC_DIVERSITY,
+    doc_per_source: DOC_PER_SOURCE,
+    ...(versioned ? { query_model: embeddingVersion.model } : {})
+  })
+  
+  if (error || !data) {
+    console.warn('⚠️ get_chat_context unavailable, using individual searches:', error?.message)
+    return null
+  }
+  
+  // Same fallback as searchCourses when nothing matches
+  const courses: Course[] = data.courses?.length > 0 ? data.courses : filterDemoCourses(query, { skills: options.skills }, options.courseLimit ?? 20)
+  console.log(`✅ Chat context: ${courses.length} courses, ${data.specializations.length} specializations, ` +
+    `${data.certificates.length} certificates, ${data.diplomas.length} diplomas, ${data.docs.length} doc chunks`)
+  return { ...data, courses }
+}
+
+// The first `limit` items in order, at most perTopic from one skill topic; others fill in if short
+export function diversifyCourses<T>(
+  items: T[],
+  limit: number,
+  topicOf: (item: T) => number | null | undefined = (item: any) => item.topic_id,
+  perTopic: number = COURSES_PER_TOPIC
+): T[] {
+  const counts = new Map<number, number>()
+  const picked: T[] = []
+  const skipped: T[] = []
+  for (const item of items) {
+    if (picked.length === limit) break
+    const topic = topicOf(item)
+    if (topic == null || (counts.get(topic) ?? 0) < perTopic) {
+      if (topic != null) counts.set(topic, (counts.get(topic) ?? 0) + 1)
+      picked.push(item)
+    } else {
+      skipped.push(item)
+    }
+  }
+  return picked.concat(skipped.slice(0, limit - picked.length))
+}
+
+// "Courses like this": precomputed neighbours from scripts/course_neighbors.py
+export async function getSimilarCourses(
+  courseId: string,
+  limit: number = 10
+): Promise<Array<Course & { similarity: number }>> {
+  const { data, error } = await supabase.rpc('get_similar_courses', {
+    target_course_id: courseId.replace(/\s+/g, '').toUpperCase(),
     match_count: limit
   })
   
   if (error) {
-    console.error('Vector search error:', error)
+    console.error('Similar courses error:', error)
     return []
   }
   
   return data || []
 }
 
+// Matching courses and per-value counts for catalog filters, from the bitmaps
+// scripts/catalog_facets.py materializes (null until add-course-facets.sql is run and built)
+export async function getCourseFacets(
+  filters: FacetFilters = {}
+): Promise<{ total: number, facets: Record<string, CourseFacetCount[]> } | null> {
+  const [count, values] = await Promise.all([
+    supabase.rpc('count_courses_by_facets', { filters }),
+    supabase.rpc('get_course_facets', { filters })
+  ])
+  
+  if (count.error || values.error) {
+    console.error('Course facets error:', count.error || values.error)
+    return null
+  }
+  
+  const facets: Record<string, CourseFacetCount[]> = {}
+  for (const row of (values.data || []) as CourseFacetCount[]) {
+    (facets[row.facet] = facets[row.facet] || []).push(row)
+  }
+  return { total: count.data ?? 0, facets }
+}
+
 // Course search with filters
 export async function searchCourses(
   query: string,
@@ -159,18 +337,6 @@ export async function searchCourses(
   console.log('🔍 Executing database query...')
   console.log('🔍 Query details:', { query, filters, limit })
   
-  // First, let's test if we can query the database at all
-  const { data: testData, error: testError } = await supabase
-    .from('courses')
-    .select('id, title')
-    .limit(3)
-  
-  console.log('🔍 Database connectivity test:', { 
-    testFound: testData?.length || 0, 
-    testError: testError?.message || 'None',
-    sampleCourses: testData?.slice(0, 2).map(c => ({ id: c.id, title: c.title })) || []
-  })
-  
   const { data, error } = await supabaseQuery
   
   if (error) {
@@ -8,6 +8,7 @@ export interface Course {
   description?: string
   faculty?: string
   cse_classification?: string
+  topic_id?: number | null  // skill topic from scripts/skill_tagging.py
   terms_offered: string[]
   prereqs?: string
   workload?: {
@@ -125,3 +126,19 @@ export interface SearchFilters {
   skills?: string[]
   max_workload?: number
 }
+
+// Keys of the catalog facets (scripts/catalog_facets.py); values within a facet are
+// alternatives except skills, where every one is required
+export interface FacetFilters {
+  dept?: string[]
+  level?: number[]
+  terms_offered?: string[]
+  skills?: string[]
+}
+
+export interface CourseFacetCount {
+  facet: keyof FacetFilters
+  value: string
+  courses: number
+  selected: boolean
+}